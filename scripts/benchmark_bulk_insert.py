@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入db_base模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from src.db_base.bulk_writer import BulkWriter
+from src.db_base.stock_db_base import StockDbBase
+
+'''
+    DataFrame批量写入性能对比：逐行处理的旧实现 vs BulkWriter
+    场景：
+        daily: 3年日线（约730行/只）
+        5m:    1年5分钟线（约11700行/只）
+
+    用法：
+        python scripts/benchmark_bulk_insert.py
+        python scripts/benchmark_bulk_insert.py --stocks 100 --chunk-size 2000
+'''
+
+def make_daily_data(code, years=3):
+    dates = pd.bdate_range(end=datetime.date.today(), periods=int(243 * years))
+    n = len(dates)
+    close = 10 + np.cumsum(np.random.randn(n) * 0.1)
+    df = pd.DataFrame({
+        'date': dates.date,
+        'code': code,
+        'open': close + np.random.randn(n) * 0.05,
+        'high': close + 0.2,
+        'low': close - 0.2,
+        'close': close,
+        'volume': np.random.randint(1e5, 1e7, n),
+        'amount': np.random.rand(n) * 1e8,
+        'change_percent': np.random.randn(n),
+        'turnover_rate': np.random.rand(n) * 5,
+        'adjustflag': 3,
+    })
+    # 模拟停牌等缺失值
+    df.loc[df.sample(frac=0.01).index, 'turnover_rate'] = np.nan
+    return df
+
+def make_5m_data(code, days=243):
+    dates = pd.bdate_range(end=datetime.date.today(), periods=days)
+    # A股每日48根5分钟k线：09:35-11:30、13:05-15:00
+    bar_offsets = list(pd.timedelta_range('09:35:00', '11:30:00', freq='5min')) + list(pd.timedelta_range('13:05:00', '15:00:00', freq='5min'))
+    times = pd.DatetimeIndex([d + offset for d in dates for offset in bar_offsets])
+    n = len(times)
+    close = 10 + np.cumsum(np.random.randn(n) * 0.01)
+    return pd.DataFrame({
+        'date': times.date,
+        'time': times,
+        'code': code,
+        'open': close,
+        'high': close + 0.02,
+        'low': close - 0.02,
+        'close': close,
+        'volume': np.random.randint(1e3, 1e6, n),
+        'amount': np.random.rand(n) * 1e7,
+        'adjustflag': 3,
+    })
+
+def legacy_insert(conn, table_name, df_data, if_exists="replace"):
+    '''优化前StockDbBase.insert_dataframe_to_table的写入逻辑'''
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    if cur.fetchone()[0] > 0:
+        cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+        if cur.fetchone()[0] > 0 and if_exists == "replace":
+            cur.execute(f"DELETE FROM {table_name}")
+    conn.commit()
+
+    columns = list(df_data.columns)
+    placeholders = ', '.join('?' * len(columns))
+    columns_str = ', '.join([f'"{col}"' for col in columns])
+    insert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
+
+    processed_records = []
+    for record in df_data.to_dict('records'):
+        processed_record = {}
+        for key, value in record.items():
+            if pd.isna(value):
+                processed_record[key] = None
+            elif isinstance(value, (np.integer, np.floating)):
+                processed_record[key] = value.item()
+            elif isinstance(value, np.bool_):
+                processed_record[key] = bool(value)
+            elif isinstance(value, (pd.Timestamp, datetime.datetime)):
+                processed_record[key] = value.strftime('%Y-%m-%d %H:%M:%S')
+            elif isinstance(value, datetime.date):
+                processed_record[key] = str(value)
+            else:
+                processed_record[key] = value
+        processed_records.append(tuple(processed_record.values()))
+
+    cur.executemany(insert_sql, processed_records)
+    conn.commit()
+    return cur.rowcount
+
+def bulk_insert(writer):
+    def _insert(conn, table_name, df_data, if_exists="replace"):
+        cur = conn.cursor()
+        row_count = writer.write(cur, table_name, df_data, if_exists)
+        conn.commit()
+        return row_count
+    return _insert
+
+def run_case(name, insert_func, table_name, list_df, db_dir):
+    create_sql = StockDbBase(db_dir).get_baostock_create_table_sql(table_name)
+    total_rows = 0
+    elapsed = 0.0
+    for i, df_data in enumerate(list_df):
+        conn = sqlite3.connect(os.path.join(db_dir, f"{name}_{i}.db"))
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(create_sql)
+        conn.commit()
+
+        start_time = time.perf_counter()
+        insert_func(conn, table_name, df_data, "replace")
+        elapsed += time.perf_counter() - start_time
+
+        total_rows += len(df_data)
+        conn.close()
+    return total_rows, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='DataFrame批量写入SQLite性能对比')
+    parser.add_argument('--stocks', type=int, default=50, help='每个场景写入的股票数量，默认50')
+    parser.add_argument('--chunk-size', type=int, default=BulkWriter.DEFAULT_CHUNK_SIZE, help='BulkWriter每批行数')
+    parser.add_argument('--synchronous', default=BulkWriter.DEFAULT_PRAGMAS['synchronous'], help='PRAGMA synchronous')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    pragmas = dict(BulkWriter.DEFAULT_PRAGMAS, synchronous=args.synchronous)
+    writer = BulkWriter(args.chunk_size, pragmas)
+
+    scenarios = [
+        ('daily_3y', 'stock_data_1d', [make_daily_data(f"sh.6{i:05d}") for i in range(args.stocks)]),
+        ('5m_1y', 'stock_data_5m', [make_5m_data(f"sh.6{i:05d}") for i in range(args.stocks)]),
+    ]
+
+    print(f"{'场景':<10}{'实现':<10}{'行数':>12}{'耗时(秒)':>12}{'行/秒':>14}")
+    with tempfile.TemporaryDirectory() as db_dir:
+        for scenario_name, table_name, list_df in scenarios:
+            results = {}
+            for impl_name, insert_func in (('legacy', legacy_insert), ('bulk', bulk_insert(writer))):
+                total_rows, elapsed = run_case(f"{scenario_name}_{impl_name}", insert_func, table_name, list_df, db_dir)
+                results[impl_name] = total_rows / elapsed if elapsed > 0 else float('inf')
+                print(f"{scenario_name:<10}{impl_name:<10}{total_rows:>12}{elapsed:>12.3f}{results[impl_name]:>14.0f}")
+            print(f"{scenario_name:<10}{'加速比':<10}{results['bulk'] / results['legacy']:>48.2f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入gui、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+# 无显示环境下也可运行
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pyqtgraph as pg
+from PyQt5 import QtGui, QtCore
+from PyQt5.QtWidgets import QApplication
+
+from gui.qt_widgets.MComponents.indicators.item.candlestick_item import CandlestickItem
+from manager.indicators_config_manager import get_kline_half_width, IndicatrosEnum, get_dict_kline_color
+
+'''
+    蜡烛图重绘耗时与k线数量的关系：逐根绘制的旧实现 vs NumPy批量绘制 vs 视口裁剪、LOD聚合
+        生成：生成QPicture的耗时（数据变化、视图超出已绘制范围或缩放级别变化时发生）
+        重绘：将QPicture绘制到1600x900图像上的耗时（每次视图刷新时发生）
+        legacy：逐根绘制全部k线；vectorized：批量绘制全部k线
+        culled：只显示最新--visible根k线，只绘制可见范围及余量
+        lod：缩小到显示全部k线，按像素列聚合
+        平移：以--visible根k线的窗口从头平移到尾，每帧平均耗时（含按需重绘）
+
+    用法：
+        python scripts/benchmark_candlestick_render.py
+        python scripts/benchmark_candlestick_render.py --bars 250 1000 5000 20000 --repeat 5
+        python scripts/benchmark_candlestick_render.py --bars 120000 --visible 500   # 约10年5分钟k线
+'''
+
+IMAGE_WIDTH, IMAGE_HEIGHT = 1600, 900
+
+def make_ohlc_data(bars):
+    close = 10 + np.cumsum(np.random.randn(bars) * 0.1)
+    open_price = close + np.random.randn(bars) * 0.05
+    # 约5%的一字板（开盘价等于收盘价）
+    doji = np.random.rand(bars) < 0.05
+    open_price[doji] = close[doji]
+    return pd.DataFrame({
+        'open': open_price,
+        'high': np.maximum(open_price, close) + np.random.rand(bars) * 0.2,
+        'low': np.minimum(open_price, close) - np.random.rand(bars) * 0.2,
+        'close': close,
+    })
+
+def legacy_generate_picture(data):
+    '''优化前CandlestickItem.generatePicture的蜡烛绘制逻辑（不含均线）'''
+    picture = QtGui.QPicture()
+    p = QtGui.QPainter(picture)
+    w = get_kline_half_width()
+    dict_kline_color = get_dict_kline_color()
+    for i in range(len(data)):
+        open_price = data['open'].iloc[i]
+        close_price = data['close'].iloc[i]
+        high_price = data['high'].iloc[i]
+        low_price = data['low'].iloc[i]
+
+        if close_price < open_price:
+            p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
+            p.setBrush(pg.mkBrush(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
+            p.drawLine(QtCore.QPointF(i, low_price), QtCore.QPointF(i, high_price))
+            p.drawRect(QtCore.QRectF(i - w, open_price, w * 2, close_price - open_price))
+        else:
+            p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_ASC.value]))
+            p.setBrush(QtGui.QBrush(QtCore.Qt.NoBrush))
+            if high_price != close_price:
+                p.drawLine(QtCore.QPointF(i, high_price), QtCore.QPointF(i, close_price))
+            if low_price != open_price:
+                p.drawLine(QtCore.QPointF(i, open_price), QtCore.QPointF(i, low_price))
+            if close_price == open_price:
+                p.drawLine(QtCore.QPointF(i - w, open_price), QtCore.QPointF(i + w, open_price))
+            else:
+                p.drawRect(QtCore.QRectF(i - w, open_price, w * 2, close_price - open_price))
+    p.end()
+    return picture
+
+class FixedViewCandlestickItem(CandlestickItem):
+    '''以固定的可见范围、图像宽度代替ViewBox，模拟视图中的绘制'''
+    def __init__(self, data, visible_start, visible_end):
+        self.visible_start = visible_start
+        self.visible_end = visible_end
+        super().__init__(data)
+        self.ma_visible = False
+
+    def get_visible_range(self):
+        bars_per_pixel = (self.visible_end - self.visible_start) / IMAGE_WIDTH
+        return self.visible_start, self.visible_end, self.get_lod_step(bars_per_pixel)
+
+def vectorized_generate_picture(data):
+    item = CandlestickItem(data)
+    item.ma_visible = False
+    item.generatePicture()
+    return item.picture
+
+def culled_generate_picture(data, visible_bars):
+    item = FixedViewCandlestickItem(data, max(len(data) - visible_bars, 0), len(data))
+    item.generatePicture()
+    return item.picture
+
+def lod_generate_picture(data):
+    item = FixedViewCandlestickItem(data, 0, len(data))
+    item.generatePicture()
+    return item.picture
+
+def get_view_transform(data, visible_start, visible_end):
+    '''将[visible_start, visible_end)范围映射到整个图像'''
+    y_min, y_max = data['low'].min(), data['high'].max()
+    transform = QtGui.QTransform()
+    transform.scale(IMAGE_WIDTH / max(visible_end - visible_start, 1), -IMAGE_HEIGHT / max(y_max - y_min, 1e-6))
+    transform.translate(-visible_start, -y_max)
+    return transform
+
+def repaint_time(picture, data, repeat, visible_start=0, visible_end=None):
+    '''将QPicture按可见范围缩放后绘制到图像上，返回单次平均耗时'''
+    image = QtGui.QImage(IMAGE_WIDTH, IMAGE_HEIGHT, QtGui.QImage.Format_ARGB32_Premultiplied)
+    transform = get_view_transform(data, visible_start, len(data) if visible_end is None else visible_end)
+
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        image.fill(QtCore.Qt.white)
+        p = QtGui.QPainter(image)
+        p.setTransform(transform)
+        p.drawPicture(0, 0, picture)
+        p.end()
+    return (time.perf_counter() - start_time) / repeat
+
+def pan_time(data, visible_bars, pan_step):
+    '''
+    模拟平移：可见窗口每帧右移pan_step根，超出已绘制范围时才重新生成QPicture
+
+    返回:
+        (每帧平均耗时, 帧数, 重新生成次数)
+    '''
+    image = QtGui.QImage(IMAGE_WIDTH, IMAGE_HEIGHT, QtGui.QImage.Format_ARGB32_Premultiplied)
+    visible_bars = min(visible_bars, len(data))
+    item = FixedViewCandlestickItem(data, 0, visible_bars)
+    frames, renders = 0, 0
+    start_time = time.perf_counter()
+    for visible_start in range(0, len(data) - visible_bars + 1, pan_step):
+        item.visible_start, item.visible_end = visible_start, visible_start + visible_bars
+        if item.need_render():
+            item.generatePicture()
+            renders += 1
+        image.fill(QtCore.Qt.white)
+        p = QtGui.QPainter(image)
+        p.setTransform(get_view_transform(data, item.visible_start, item.visible_end))
+        p.drawPicture(0, 0, item.picture)
+        p.end()
+        frames += 1
+    return (time.perf_counter() - start_time) / max(frames, 1), frames, renders
+
+def main():
+    parser = argparse.ArgumentParser(description='蜡烛图重绘性能对比')
+    parser.add_argument('--bars', type=int, nargs='+', default=[250, 1000, 5000, 20000, 100000], help='k线数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每项测试重复次数')
+    parser.add_argument('--skip-legacy-above', type=int, default=20000, help='k线数量超过该值时跳过旧实现')
+    parser.add_argument('--visible', type=int, default=120, help='可见k线数量（culled、平移）')
+    parser.add_argument('--pan-step', type=int, default=10, help='平移时每帧移动的k线数')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    np.random.seed(0)
+
+    print(f"{'k线数量':<10}{'实现':<12}{'生成(ms)':>12}{'重绘(ms)':>12}")
+    for bars in args.bars:
+        data = make_ohlc_data(bars)
+        visible_start = max(bars - args.visible, 0)
+        impls = [
+            ('vectorized', vectorized_generate_picture, 0),
+            ('culled', lambda df: culled_generate_picture(df, args.visible), visible_start),
+            ('lod', lod_generate_picture, 0),
+        ]
+        if bars <= args.skip_legacy_above:
+            impls.insert(0, ('legacy', legacy_generate_picture, 0))
+
+        for impl_name, generate_func, view_start in impls:
+            start_time = time.perf_counter()
+            for _ in range(args.repeat):
+                picture = generate_func(data)
+            generate_ms = (time.perf_counter() - start_time) / args.repeat * 1000
+            paint_ms = repaint_time(picture, data, args.repeat, view_start) * 1000
+            print(f"{bars:<10}{impl_name:<12}{generate_ms:>12.2f}{paint_ms:>12.2f}")
+
+    print()
+    print(f"{'k线数量':<10}{'平移帧数':>10}{'重新生成':>10}{'每帧(ms)':>12}")
+    for bars in args.bars:
+        frame_time, frames, renders = pan_time(make_ohlc_data(bars), args.visible, args.pan_step)
+        print(f"{bars:<10}{frames:>10}{renders:>10}{frame_time * 1000:>12.2f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入indicators模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from indicators import indicator_kernels as kernels
+
+'''
+    指标核函数微基准：每个核函数与对应的pandas实现比较耗时及最大误差
+        rolling_max/rolling_min：rolling(window).max()/min()
+        wma：rolling(window).apply(加权平均, raw=True)（耗时较长，超过--apply-limit根时跳过）
+        rolling_mean：rolling(window, min_periods=1).mean()
+        rolling_mean_std：rolling(window).mean() + rolling(window).std()
+    --stocks大于1时输入为二维矩阵（行：k线，列：股票，即panel_indicators的用法），与DataFrame.rolling比较
+    单只股票的rolling_mean/rolling_mean_std慢于pandas，stock_data_indicators只使用rolling_max/rolling_min与wma；
+    面板时rolling_mean仍慢于DataFrame.rolling，panel_indicators只对BOLL使用rolling_mean_std
+
+    用法：
+        python scripts/benchmark_indicator_kernels.py
+        python scripts/benchmark_indicator_kernels.py --bars 1000 100000 1000000 --window 20 --repeat 5
+        python scripts/benchmark_indicator_kernels.py --bars 250 750 --stocks 5000
+'''
+
+def make_close(bars, stocks=1):
+    shape = (bars,) if stocks <= 1 else (bars, stocks)
+    close = 10 + np.cumsum(np.random.randn(*shape) * 0.1, axis=0)
+    # 停牌缺失、一字板（连续相同值）
+    close[np.random.rand(*shape) < 0.01] = np.nan
+    for start in np.random.randint(0, bars, size=max(bars // 1000, 1)):
+        close[start:start + 30] = close[start]
+    return close
+
+def best_time(func, repeat):
+    '''多次运行取最短耗时（ms）'''
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def max_error(values, expected):
+    values = np.asarray(values, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    if not np.array_equal(np.isnan(values), np.isnan(expected)):
+        return float('nan')
+    diff = np.abs(values - expected)
+    return float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.
+
+def get_cases(close, window, apply_limit):
+    series = pd.Series(close) if close.ndim == 1 else pd.DataFrame(close)
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    cases = [
+        ('rolling_max', lambda: kernels.rolling_max(close, window), lambda: series.rolling(window).max()),
+        ('rolling_min', lambda: kernels.rolling_min(close, window), lambda: series.rolling(window).min()),
+        ('rolling_mean', lambda: kernels.rolling_mean(close, window, min_periods=1),
+         lambda: series.rolling(window, min_periods=1).mean()),
+        ('rolling_mean_std', lambda: np.concatenate(kernels.rolling_mean_std(close, window)),
+         lambda: np.concatenate([series.rolling(window).mean(), series.rolling(window).std()])),
+    ]
+    if close.size <= apply_limit:
+        cases.append(('wma', lambda: kernels.wma(close, window),
+                      lambda: series.rolling(window, min_periods=window).apply(lambda x: np.dot(x, weights) / weights.sum(), raw=True)))
+    else:
+        cases.append(('wma', lambda: kernels.wma(close, window), None))
+    return cases
+
+def main():
+    parser = argparse.ArgumentParser(description='指标核函数微基准')
+    parser.add_argument('--bars', type=int, nargs='+', default=[1000, 100000, 1000000], help='k线数量')
+    parser.add_argument('--window', type=int, default=20, help='窗口大小')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数（取最短耗时）')
+    parser.add_argument('--stocks', type=int, default=1, help='股票数量，大于1时按面板（二维矩阵）计算')
+    parser.add_argument('--apply-limit', type=int, default=100000, help='rolling().apply()对比的最大数据量（k线数量×股票数量）')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    print(f"窗口: {args.window}, 股票数量: {args.stocks}")
+    print(f"{'k线数量':<10}{'核函数':<20}{'NumPy(ms)':>12}{'pandas(ms)':>12}{'加速比':>10}{'最大误差':>14}")
+    for bars in args.bars:
+        close = make_close(bars, args.stocks)
+        for name, kernel_func, pandas_func in get_cases(close, args.window, args.apply_limit):
+            kernel_ms, result = best_time(kernel_func, args.repeat)
+            if pandas_func is None:
+                print(f"{bars:<10}{name:<20}{kernel_ms:>12.3f}{'-':>12}{'-':>10}{'-':>14}")
+                continue
+            pandas_ms, expected = best_time(pandas_func, 1 if name == 'wma' else args.repeat)
+            print(f"{bars:<10}{name:<20}{kernel_ms:>12.3f}{pandas_ms:>12.3f}{pandas_ms / kernel_ms:>10.1f}"
+                  f"{max_error(result, expected):>14.2e}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
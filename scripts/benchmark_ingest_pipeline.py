@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import tempfile
+import argparse
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入processor、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from processor.baostock_data_source import DATA_SOURCE_LOCAL, create_data_source
+
+'''
+    离线压测下载入库流程：本地数据源（模拟k线 + 可配置延迟、错误注入） -> BaostockDownloadEngine多进程下载 -> 单一写入者入库
+    直接调用一键更新使用的BaostockDownloadEngine.run（含类型转换、save_stock_data_to_db、下载日志），不访问网络，结果可复现，
+    用于对比不同工作进程数、限流参数下的吞吐量。
+    在临时工作目录中运行，引擎按相对路径创建的数据库（./data/...）均位于临时目录，不影响项目数据。
+
+    用法：
+        python scripts/benchmark_ingest_pipeline.py
+        python scripts/benchmark_ingest_pipeline.py --stocks 200 --workers 1 4 8 --latency 0.05 --error-rate 0.02
+        python scripts/benchmark_ingest_pipeline.py --replay-dir ./data/replay --periods 1d 30m
+'''
+
+def build_jobs(stock_count, periods, start_date, end_date):
+    """从本地数据源的模拟股票列表中取沪深主板股票生成任务"""
+    data_source = create_data_source({'provider': DATA_SOURCE_LOCAL, 'stock_count': stock_count})
+    data_source.login()
+    rs = data_source.query_all_stock()
+    codes = []
+    while (rs.error_code == '0') & rs.next():
+        code = rs.get_row_data()[0]
+        if code.startswith('sh.60') or code.startswith('sz.00'):
+            codes.append(code)
+
+    return [{'code': code, 'period': period, 'start_date': start_date, 'end_date': end_date, 'write_way': 'replace', 'target_date': end_date}
+            for period in periods for code in codes[:stock_count]]
+
+def run_case(jobs, workers, data_source_settings, rate_limit, burst, max_retries):
+    """
+    执行一轮压测
+
+    Returns:
+        dict: BaostockDownloadEngine.run的执行结果统计
+    """
+    from processor.baostock_download_engine import BaostockDownloadEngine
+
+    engine = BaostockDownloadEngine(workers=workers, rate_limit=rate_limit, burst=burst, max_retries=max_retries,
+                                    backoff_base=0.01, data_source_settings=data_source_settings)
+    return engine.run(jobs)
+
+def main():
+    parser = argparse.ArgumentParser(description='离线压测Baostock下载入库流程')
+    parser.add_argument('--stocks', type=int, default=100, help='股票数量，默认100')
+    parser.add_argument('--periods', nargs='+', default=['1d'], help="周期，如1d 1w 30m，默认1d")
+    parser.add_argument('--start-date', default='2023-01-01', help='开始日期')
+    parser.add_argument('--end-date', default='2025-12-31', help='结束日期')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='依次测试的工作进程数')
+    parser.add_argument('--rate-limit', type=float, default=0, help='全局每秒请求数上限，0表示不限流')
+    parser.add_argument('--burst', type=int, default=4, help='令牌桶突发请求数')
+    parser.add_argument('--max-retries', type=int, default=3, help='单个任务最大重试次数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟每次请求的网络延迟（秒）')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='模拟每次翻页的延迟（秒）')
+    parser.add_argument('--page-size', type=int, default=10000, help='每页行数')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='请求及翻页失败概率')
+    parser.add_argument('--seed', type=int, default=0, help='错误注入随机种子')
+    parser.add_argument('--replay-dir', default='', help='录制数据目录，缺失的数据使用模拟k线')
+    args = parser.parse_args()
+
+    data_source_settings = {
+        'provider': DATA_SOURCE_LOCAL,
+        'replay_dir': args.replay_dir,
+        'seed': args.seed,
+        'latency': args.latency,
+        'page_latency': args.page_latency,
+        'error_rate': args.error_rate,
+        'page_size': args.page_size,
+    }
+    jobs = build_jobs(args.stocks, args.periods, args.start_date, args.end_date)
+
+    print(f"任务数: {len(jobs)}，请求延迟: {args.latency}秒，错误率: {args.error_rate}，限流: {args.rate_limit or '无'}")
+    print(f"{'进程数':<8}{'耗时(秒)':>10}{'任务/秒':>10}{'行/秒':>12}{'失败':>6}{'加速比':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)  # 各轮均以replace方式写入同一临时数据库
+        for workers in args.workers:
+            result = run_case(jobs, workers, data_source_settings, args.rate_limit, args.burst, args.max_retries)
+            jobs_per_second = result['processed'] / result['elapsed'] if result['elapsed'] > 0 else float('inf')
+            rows_per_second = result['rows'] / result['elapsed'] if result['elapsed'] > 0 else float('inf')
+            baseline = baseline or jobs_per_second
+            print(f"{workers:<8}{result['elapsed']:>10.2f}{jobs_per_second:>10.1f}{rows_per_second:>12.0f}"
+                  f"{len(result['failed']):>6}{jobs_per_second / baseline:>8.2f}x")
+        os.chdir(project_root)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
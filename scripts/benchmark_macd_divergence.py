@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入indicators、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from indicators import stock_data_indicators as sdi
+from indicators.macd_divergence import DEFAULT_DIFF_RATIO, DEFAULT_MA52_TOLERANCE
+from indicators.panel_indicators import calculate_market_macd_divergence
+from manager.indicators_config_manager import IndicatrosEnum
+
+from benchmark_panel_indicators import make_market_data
+
+'''
+    全市场MACD零轴下方单位调整周期、背离的耗时及与逐根k线循环实现的一致性
+        全市场：calculate_market_macd_divergence一次计算全部股票（含面板计算diff、dea、MA24、MA52）
+        逐只：reference_macd_divergence按股票逐根k线循环计算（由抽样耗时估算全市场），并与全市场结果逐根、逐周期比较
+    原stock_data_indicators.macd_deviation的iterrows实现未完成（找到线段后没有划分周期、没有返回结果），
+    reference_macd_divergence沿用其逐根k线向前遍历的写法，按macd_divergence模块说明中的规则独立实现，不调用macd_divergence
+    需在项目根目录下运行（读取指标配置）
+
+    用法：
+        python scripts/benchmark_macd_divergence.py
+        python scripts/benchmark_macd_divergence.py --stocks 5000 --bars 750 --check 200
+'''
+
+PERIOD_COLUMNS = ('start', 'end', 'low_index', 'status', 'invalid')
+
+def is_below(value):
+    return not np.isnan(value) and value < 0
+
+def reference_macd_divergence(low, high, close, diff, dea, ma24, ma52,
+                              diff_ratio=DEFAULT_DIFF_RATIO, ma52_tolerance=DEFAULT_MA52_TOLERANCE):
+    '''
+    逐根k线循环的参考实现（单只股票）
+    返回:
+        (macd_period, macd_divergence, list_periods): 逐根k线的结果，每个周期一个dict（键同PERIOD_COLUMNS）
+    '''
+    rows = len(close)
+    macd_period = np.zeros(rows, dtype=np.int64)
+    macd_divergence = np.zeros(rows, dtype=np.int64)
+    list_periods = []
+    in_leg = False
+    leg_periods = []        # 当前线段的周期
+    period = None           # 当前周期（结束后保留到下一周期开始）
+    for i in range(rows):
+        diff_below, dea_below = is_below(diff[i]), is_below(dea[i])
+        prev_diff_below = i > 0 and is_below(diff[i - 1])
+        prev_dea_below = i > 0 and is_below(dea[i - 1])
+        start_event = (diff_below and not prev_diff_below and not prev_dea_below) or (dea_below and not prev_dea_below)
+        end_event = i == 0 or (not dea_below and prev_dea_below) or (not diff_below and prev_diff_below and not dea_below)
+        was_in_leg = in_leg
+        if start_event:
+            in_leg = True
+        elif end_event:
+            in_leg = False
+        if not in_leg:
+            period = None
+            continue
+        if not was_in_leg:
+            leg_periods = []
+            period = None
+
+        price_back = close[i] > ma24[i] or high[i] >= ma52[i] * (1 - ma52_tolerance)
+        if period is None or (period['end'] >= 0 and not price_back and diff[i] < 0):
+            # 线段第一根k线，或周期结束后第一根离开零轴的k线
+            period = {'start': i, 'end': -1, 'number': len(leg_periods) + 1,
+                      'prev': leg_periods[-1] if leg_periods else None,
+                      'low': np.nan, 'low_index': -1, 'low_diff': np.nan, 'min_diff': np.nan,
+                      'min_close': np.nan, 'min_close_diff': np.nan, 'status': 0, 'invalid': False}
+            leg_periods.append(period)
+            list_periods.append(period)
+            prev = period['prev']
+            running_low = running_diff = np.nan
+        if period['end'] < 0:
+            # 周期内统计量（含回到零轴的k线）
+            if low[i] < period['low'] or np.isnan(period['low']):
+                if not np.isnan(low[i]):
+                    period['low'], period['low_index'], period['low_diff'] = low[i], i, diff[i]
+            if close[i] < period['min_close'] or (np.isnan(period['min_close']) and not np.isnan(close[i])):
+                period['min_close'], period['min_close_diff'] = close[i], diff[i]
+            period['min_diff'] = np.fmin(period['min_diff'], diff[i])
+            running_low = np.fmin(running_low, low[i])
+            running_diff = np.fmin(running_diff, diff[i])
+            if i != period['start'] and (diff[i] >= 0 or (price_back and diff[i] >= diff_ratio * period['min_diff'])):
+                period['end'] = i
+                set_period_status(period)
+
+        macd_period[i] = period['number']
+        if period['end'] >= 0:
+            macd_divergence[i] = period['status']
+        elif prev is not None and not np.isnan(low[i]) and not np.isnan(diff[i]) \
+                and running_diff > prev['min_diff'] and running_low < prev['low']:
+            macd_divergence[i] = 1
+    for period in list_periods:
+        if period['end'] < 0:
+            set_period_status(period)
+    return macd_period, macd_divergence, list_periods
+
+def set_period_status(period):
+    '''与线段内的上一周期比较：背离、下跌动能不足，及上一周期是否失效'''
+    prev = period['prev']
+    if prev is None:
+        return
+    if period['min_diff'] > prev['min_diff']:
+        period['status'] = 1 if period['low'] < prev['low'] else 2
+    if period['min_close'] < prev['low'] and period['min_close_diff'] < prev['low_diff']:
+        prev['invalid'] = True
+
+def reference_stock(stock_data):
+    '''单只股票：按stock_data_indicators计算diff、dea、MA24、MA52后调用reference_macd_divergence'''
+    sdi.auto_macd_calulate(stock_data)
+    close = stock_data['close']
+    return reference_macd_divergence(
+        stock_data['low'].to_numpy(), stock_data['high'].to_numpy(), close.to_numpy(),
+        stock_data[IndicatrosEnum.MACD_DIFF.value].to_numpy(), stock_data[IndicatrosEnum.MACD_DEA.value].to_numpy(),
+        close.rolling(window=24, min_periods=1).mean().to_numpy(), close.rolling(window=52, min_periods=1).mean().to_numpy())
+
+def main():
+    parser = argparse.ArgumentParser(description='全市场MACD背离计算耗时与一致性校验')
+    parser.add_argument('--stocks', type=int, default=5000, help='股票数量')
+    parser.add_argument('--bars', type=int, default=750, help='每只股票最多的k线数量')
+    parser.add_argument('--check', type=int, default=100, help='逐只校验、计时的股票数量')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    df_market = make_market_data(args.stocks, args.bars)
+    print(f"股票数量: {args.stocks}，k线数量: {len(df_market)}")
+
+    market_start = time.perf_counter()
+    df_periods = calculate_market_macd_divergence(df_market)
+    market_s = time.perf_counter() - market_start
+
+    codes = df_market['code'].unique()[:args.check]
+    df_check = df_market[df_market['code'].isin(codes)]
+    mismatch = 0
+    batch_s = 0.
+    for code, df_stock in df_check.groupby('code'):
+        df_stock = df_stock.sort_values('date')
+        stock_data = df_stock[['date', 'open', 'high', 'low', 'close']].reset_index(drop=True)
+        batch_start = time.perf_counter()
+        macd_period, macd_divergence, list_periods = reference_stock(stock_data)
+        batch_s += time.perf_counter() - batch_start
+        mismatch += int((df_stock['macd_period'].to_numpy() != macd_period).sum())
+        mismatch += int((df_stock['macd_divergence'].to_numpy() != macd_divergence).sum())
+
+        # 周期表：全市场结果的行号为df_market的index，转为该股票内的行号
+        positions = pd.Series(np.arange(len(df_stock)), index=df_stock.index)
+        df_market_periods = df_periods[df_periods['code'] == code].copy()
+        for column in ('start', 'end', 'low_index'):
+            values = df_market_periods[column].to_numpy()
+            df_market_periods[column] = np.where(values >= 0, positions.reindex(values).to_numpy(), -1)
+        df_expected = pd.DataFrame(list_periods, columns=PERIOD_COLUMNS)
+        if len(df_market_periods) != len(df_expected):
+            mismatch += abs(len(df_market_periods) - len(df_expected)) or 1
+            continue
+        for column in PERIOD_COLUMNS:
+            mismatch += int((df_market_periods[column].to_numpy().astype(np.int64)
+                             != df_expected[column].to_numpy().astype(np.int64)).sum())
+
+    print(f"单位调整周期: {len(df_periods)}，背离: {int((df_periods['status'] == 1).sum())}，"
+          f"下跌动能不足: {int((df_periods['status'] == 2).sum())}，失效: {int(df_periods['invalid'].sum())}")
+    print(f"一致性（抽样{len(codes)}只，不一致数量）: {mismatch}")
+    print(f"逐只循环计算（估算全市场）: {batch_s / len(codes) * args.stocks:.2f}s")
+    print(f"全市场计算: {market_s:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入indicators、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from indicators import stock_data_indicators as sdi
+from manager.indicators_config_manager import IndicatrosEnum
+from indicators.panel_indicators import calculate_market_indicators
+
+'''
+    全市场（面板）指标计算与逐只批量计算的一致性校验及耗时对比（MACD、KDJ、RSI、BOLL、MA，参数取用户指标配置）
+        一致性：长表中每只股票的指标与stock_data_indicators对该股票单独计算的结果逐位比较（抽样--check只），
+               BOLL面板使用核函数rolling_mean_std，按--boll-tolerance（绝对误差）比较
+        逐只：按code分组逐只调用stock_data_indicators的耗时（由抽样耗时估算全市场）
+        面板：calculate_market_indicators一次计算全部股票的耗时
+    模拟数据中各股票的k线数量不同（上市时间不同），并含停牌缺失的日期
+    需在项目根目录下运行（读取指标配置）
+
+    用法：
+        python scripts/benchmark_panel_indicators.py
+        python scripts/benchmark_panel_indicators.py --stocks 5000 --bars 750 --check 200
+'''
+
+def make_market_data(stocks, bars):
+    dates = pd.date_range('2020-01-01', periods=bars, freq='B').strftime('%Y-%m-%d').to_numpy()
+    list_df = []
+    for index in range(stocks):
+        length = np.random.randint(bars // 10, bars + 1)
+        keep = np.random.rand(length) > 0.02        # 停牌
+        close = 10 + np.cumsum(np.random.randn(length) * 0.1)
+        open_price = close + np.random.randn(length) * 0.05
+        high = np.maximum(open_price, close) + np.random.rand(length) * 0.2
+        low = np.minimum(open_price, close) - np.random.rand(length) * 0.2
+        # 一字板：最高价等于最低价，RSV为0/0
+        flat = np.random.rand(length) < 0.02
+        open_price[flat] = high[flat] = low[flat] = close[flat]
+        list_df.append(pd.DataFrame({
+            'code': f'sh.{600000 + index}', 'date': dates[bars - length:][keep],
+            'open': open_price[keep], 'high': high[keep], 'low': low[keep], 'close': close[keep],
+        }))
+    df_market = pd.concat(list_df, ignore_index=True)
+    # 打乱行顺序，校验面板计算不依赖输入顺序
+    return df_market.sample(frac=1, random_state=0).reset_index(drop=True)
+
+def batch_calculate(stock_data):
+    sdi.auto_macd_calulate(stock_data)
+    sdi.auto_ma_calulate(stock_data)
+    sdi.auto_kdj_calulate(stock_data)
+    sdi.auto_rsi_calulate(stock_data)
+    sdi.auto_boll_calulate(stock_data)
+    return stock_data
+
+BOLL_COLUMNS = (IndicatrosEnum.BOLL_MID.value, IndicatrosEnum.BOLL_UPPER.value, IndicatrosEnum.BOLL_LOWER.value)
+
+def count_mismatch(values, expected, tolerance=0.):
+    '''tolerance为0时逐位比较，否则按绝对误差比较（NaN视为相等），返回不一致的数量'''
+    values = np.asarray(values, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    both_nan = np.isnan(values) & np.isnan(expected)
+    if tolerance > 0:
+        with np.errstate(invalid='ignore'):
+            same = np.abs(values - expected) <= tolerance
+    else:
+        same = values.view(np.int64) == expected.view(np.int64)
+    return int((~(both_nan | same)).sum())
+
+def main():
+    parser = argparse.ArgumentParser(description='全市场指标计算一致性校验与性能对比')
+    parser.add_argument('--stocks', type=int, default=5000, help='股票数量')
+    parser.add_argument('--bars', type=int, default=750, help='每只股票最多的k线数量')
+    parser.add_argument('--check', type=int, default=100, help='逐只校验、计时的股票数量')
+    parser.add_argument('--boll-tolerance', type=float, default=1e-5, help='BOLL列允许的绝对误差')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    df_market = make_market_data(args.stocks, args.bars)
+    print(f"股票数量: {args.stocks}，k线数量: {len(df_market)}")
+
+    panel_start = time.perf_counter()
+    calculate_market_indicators(df_market)
+    panel_s = time.perf_counter() - panel_start
+
+    codes = df_market['code'].unique()[:args.check]
+    df_check = df_market[df_market['code'].isin(codes)]
+    mismatch = 0
+    columns = None
+    batch_s = 0.
+    for code, df_stock in df_check.groupby('code'):
+        df_stock = df_stock.sort_values('date')
+        stock_data = df_stock[['date', 'open', 'high', 'low', 'close']].reset_index(drop=True)
+        batch_start = time.perf_counter()
+        expected = batch_calculate(stock_data)
+        batch_s += time.perf_counter() - batch_start
+        columns = [column for column in expected.columns if column not in ('date', 'open', 'high', 'low', 'close')]
+        mismatch += sum(count_mismatch(df_stock[column], expected[column],
+                                       args.boll_tolerance if column in BOLL_COLUMNS else 0.) for column in columns)
+
+    print(f"指标列: {columns}")
+    print(f"一致性（抽样{len(codes)}只，不一致数量）: {mismatch}")
+    print(f"逐只计算（估算全市场）: {batch_s / len(codes) * args.stocks:.2f}s")
+    print(f"面板计算: {panel_s:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入gui、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+# 无显示环境下也可运行
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+
+from gui.qt_widgets.MComponents.indicators.kline_widget import KLineWidget
+from gui.qt_widgets.MComponents.indicators.volume_widget import VolumeWidget
+from gui.qt_widgets.MComponents.indicators.macd_widget import MacdWidget
+from gui.qt_widgets.MComponents.indicators.kdj_widget import KdjWidget
+from gui.qt_widgets.MComponents.indicators.rsi_widget import RsiWidget
+from indicators import stock_data_indicators as sdi
+
+'''
+    复盘回放每一步的图表刷新耗时：全量更新（update_data） vs 增量追加（append_data）
+    模拟IndicatorsViewWidget.update_chart：每步数据多一根k线，五个图表（K线、成交量、MACD、KDJ、RSI）
+    更新数据、视图平移到最新120根、同步Y轴，并在离屏窗口中实际绘制一帧
+        更新：数据更新及坐标轴调整耗时
+        绘制：五个图表绘制一帧的耗时（离屏软件渲染，含坐标轴、网格）
+    需在项目根目录下运行（图表控件按相对路径加载ui文件）
+
+    用法：
+        python scripts/benchmark_replay_render.py
+        python scripts/benchmark_replay_render.py --bars 750 --steps 300 --frame-budget 50
+'''
+
+WIDGET_CLASSES = [KLineWidget, VolumeWidget, MacdWidget, KdjWidget, RsiWidget]
+
+def make_stock_data(bars):
+    close = 10 + np.cumsum(np.random.randn(bars) * 0.1)
+    open_price = close + np.random.randn(bars) * 0.05
+    df = pd.DataFrame({
+        'open': open_price,
+        'high': np.maximum(open_price, close) + np.random.rand(bars) * 0.2,
+        'low': np.minimum(open_price, close) - np.random.rand(bars) * 0.2,
+        'close': close,
+        'volume': np.random.randint(1_000_000, 50_000_000, bars).astype(np.float64),
+        'amount': np.random.rand(bars) * 1e9,
+        'turnover_rate': np.random.rand(bars) * 5,
+        'date': pd.date_range('2022-01-01', periods=bars).date,
+    })
+    sdi.default_indicators_auto_calculate(df)
+    sdi.auto_kdj_calulate(df)
+    return df
+
+def create_widgets(df, start_index, width, height):
+    widgets = [widget_class(df.iloc[:start_index + 1], 0) for widget_class in WIDGET_CLASSES]
+    kline_plot_widget = widgets[0].get_plot_widget()
+    for widget in widgets:
+        widget.resize(width, height)
+        if widget is not widgets[0]:
+            # 与IndicatorsViewWidget.add_indicator_chart一致，X轴与K线图联动
+            widget.get_plot_widget().setXLink(kline_plot_widget)
+            kline_plot_widget.setXLink(widget.get_plot_widget())
+    return widgets
+
+def run_replay(df, start_index, steps, incremental, width, height):
+    '''
+    返回:
+        (list[float], list[float]): 每一步数据更新、绘制的耗时（秒）
+    '''
+    widgets = create_widgets(df, start_index, width, height)
+    widgets[0].auto_scale_to_latest(120)
+    for widget in widgets:
+        widget.grab()
+
+    update_times, paint_times = [], []
+    for index in range(start_index + 1, min(start_index + 1 + steps, len(df))):
+        data = df.iloc[:index + 1]
+        update_start = time.perf_counter()
+        for widget in widgets:
+            if incremental:
+                widget.append_data(data)
+            else:
+                widget.update_data(data)
+        widgets[0].auto_scale_to_latest(120)
+        for widget in widgets[1:]:
+            widget.slot_range_changed()
+        paint_start = time.perf_counter()
+        for widget in widgets:
+            widget.grab()       # 强制绘制一帧
+        update_times.append(paint_start - update_start)
+        paint_times.append(time.perf_counter() - paint_start)
+
+    for widget in widgets:
+        widget.close()
+    return update_times, paint_times
+
+def main():
+    parser = argparse.ArgumentParser(description='复盘回放图表刷新性能对比')
+    parser.add_argument('--bars', type=int, default=750, help='k线数量，默认750（约3年日线）')
+    parser.add_argument('--start', type=int, default=120, help='回放起始索引')
+    parser.add_argument('--steps', type=int, default=300, help='回放步数')
+    parser.add_argument('--frame-budget', type=float, default=50, help='每步耗时预算（毫秒），超出记为掉帧')
+    parser.add_argument('--width', type=int, default=1600, help='图表宽度')
+    parser.add_argument('--height', type=int, default=300, help='单个图表高度')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    np.random.seed(0)
+    df = make_stock_data(args.bars)
+
+    print(f"k线数量: {args.bars}，图表数: {len(WIDGET_CLASSES)}，步数: {args.steps}，每步预算: {args.frame_budget}ms")
+    print(f"{'实现':<14}{'更新(ms)':>10}{'绘制(ms)':>10}{'合计P95(ms)':>14}{'合计最大(ms)':>14}{'超预算':>8}")
+    for impl_name, incremental in (('update_data', False), ('append_data', True)):
+        update_times, paint_times = run_replay(df, args.start, args.steps, incremental, args.width, args.height)
+        if len(update_times) == 0:
+            print(f"{impl_name:<14}无回放步数")
+            continue
+        update_times, paint_times = np.array(update_times) * 1000, np.array(paint_times) * 1000
+        step_times = update_times + paint_times
+        over_budget = int((step_times > args.frame_budget).sum())
+        print(f"{impl_name:<14}{update_times.mean():>10.2f}{paint_times.mean():>10.2f}"
+              f"{np.percentile(step_times, 95):>14.2f}{step_times.max():>14.2f}{over_budget:>8}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
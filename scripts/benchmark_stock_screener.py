@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入indicators、processor模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from indicators import stock_data_indicators as sdi
+from db_base.stock_db_base import StockDbBase
+from db_base.stock_column_store import StockColumnStore
+from processor.stock_screener_engine import BUILTIN_RULES, load_latest_bars, screen_frame, rank_results
+
+from benchmark_panel_indicators import make_market_data
+
+'''
+    全市场选股引擎（内置均线规则）的耗时及与逐只筛选的一致性
+        模拟数据先写入临时目录下的存储（--storage），耗时包含读取：
+            sqlite：每只股票一个数据库，与引擎相同按股票逐条LIMIT查询（StockDbBase.get_latest_data）
+            parquet：列式存储一次批量读取（需pyarrow）
+            memory：不读存储，只比较计算
+        引擎：load_latest_bars读取全部股票最近N根k线组成长表，screen_frame一次计算均线、向量化判断
+        逐只：每只股票单独读取、计算均线后判断最后一根k线
+        每条规则分别计时（与StockScreenerEngine.screen一致，每次选股都重新读取）
+    需在项目根目录下运行（读取指标配置）
+
+    用法：
+        python scripts/benchmark_stock_screener.py
+        python scripts/benchmark_stock_screener.py --stocks 5000 --bars 120 --storage parquet
+'''
+
+TABLE_NAME = 'stock_data_1d'
+
+def stock_match(stock_data, rule_name):
+    '''逐只判断，与内置规则的定义一致'''
+    close = stock_data['close'].to_numpy()
+    def ma(period):
+        column = f'ma{period}'
+        if column not in stock_data.columns:
+            sdi.ma(stock_data, column, period)
+        return stock_data[column].to_numpy()
+
+    if rule_name.startswith('daily_up_ma'):
+        values = ma(int(rule_name[len('daily_up_ma'):]))
+        return len(values) >= 2 and close[-1] > values[-1] and values[-1] >= values[-2]
+    upper, lower = [int(part[2:]) for part in rule_name[len('daily_down_between_'):].split('_')]
+    return ma(lower)[-1] < close[-1] < ma(upper)[-1]
+
+def create_storage(storage_name, root_dir, df_market):
+    '''将模拟数据写入存储，返回存储实例（memory返回None）'''
+    if storage_name == 'sqlite':
+        storage = StockDbBase(root_dir)
+        for code, df_stock in df_market.groupby('code'):
+            storage.save_bao_stock_data_to_db(code, df_stock.sort_values('date'), 'replace', TABLE_NAME)
+        return storage
+    if storage_name == 'parquet':
+        storage = StockColumnStore(root_dir)
+        storage.write_dataframe(df_market, TABLE_NAME)
+        return storage
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='全市场选股引擎耗时与一致性校验')
+    parser.add_argument('--stocks', type=int, default=5000, help='股票数量')
+    parser.add_argument('--bars', type=int, default=120, help='每只股票读取的最近k线数量')
+    parser.add_argument('--storage', choices=['sqlite', 'parquet', 'memory'], default='sqlite', help='读取数据的存储')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    df_market = make_market_data(args.stocks, args.bars)
+    # load_latest_bars丢弃成交量缺失的行
+    df_market['volume'] = np.random.randint(1000, 1000000, size=len(df_market)).astype(np.float64)
+    codes = sorted(df_market['code'].unique())
+    latest_date = df_market['date'].max()
+    print(f"股票数量: {args.stocks}，k线数量: {len(df_market)}，存储: {args.storage}")
+
+    with tempfile.TemporaryDirectory() as root_dir:
+        storage = create_storage(args.storage, root_dir, df_market)
+        dict_stock_data = {code: df_stock.sort_values('date').reset_index(drop=True) for code, df_stock in df_market.groupby('code')}
+
+        def load_market():
+            if storage is None:
+                return df_market.copy()
+            return load_latest_bars(storage, codes, TABLE_NAME, args.bars)
+
+        def load_stock(code):
+            if storage is None:
+                return dict_stock_data[code].copy()
+            if isinstance(storage, StockDbBase):
+                return storage.get_latest_data(code, args.bars, TABLE_NAME)
+            return storage.read_stock(code, TABLE_NAME).tail(args.bars).reset_index(drop=True)
+
+        for rule_name, rule in BUILTIN_RULES.items():
+            engine_start = time.perf_counter()
+            df_bars = load_market()
+            engine_read_s = time.perf_counter() - engine_start
+            df_result = rank_results([screen_frame(df_bars, [rule])], [rule])
+            engine_s = time.perf_counter() - engine_start
+
+            batch_read_s = 0.
+            batch_start = time.perf_counter()
+            set_expected = set()
+            for code in codes:
+                read_start = time.perf_counter()
+                stock_data = load_stock(code)
+                batch_read_s += time.perf_counter() - read_start
+                if not stock_data.empty and stock_data['date'].iloc[-1] == latest_date and stock_match(stock_data, rule_name):
+                    set_expected.add(code)
+            batch_s = time.perf_counter() - batch_start
+
+            mismatch = len(set_expected ^ set(df_result['code']))
+            print(f"{rule_name:<32}入选: {len(df_result):<6}不一致: {mismatch:<4}"
+                  f"逐只: {batch_s:.2f}s（读取{batch_read_s:.2f}s）  引擎: {engine_s:.2f}s（读取{engine_read_s:.2f}s）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
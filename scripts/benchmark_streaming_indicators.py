@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入indicators、manager模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from indicators import stock_data_indicators as sdi
+from indicators.streaming_indicators import StreamingIndicatorEngine
+
+'''
+    增量指标计算与批量计算的一致性校验及耗时对比（MACD、KDJ、RSI、BOLL、MA，参数取用户指标配置）
+        一致性：增量计算（全量、逐根追加、回退后重新追加）的结果与stock_data_indicators批量计算逐位比较
+        批量：每追加一根k线对全部数据重新计算的耗时
+        增量：每追加一根k线只更新递推状态的耗时
+        回退：seek回退--seek-back根k线的耗时（从最近的快照补算）
+    需在项目根目录下运行（读取指标配置）
+
+    用法：
+        python scripts/benchmark_streaming_indicators.py
+        python scripts/benchmark_streaming_indicators.py --bars 750 5000 --steps 200
+'''
+
+def make_stock_data(bars):
+    close = 10 + np.cumsum(np.random.randn(bars) * 0.1)
+    open_price = close + np.random.randn(bars) * 0.05
+    high = np.maximum(open_price, close) + np.random.rand(bars) * 0.2
+    low = np.minimum(open_price, close) - np.random.rand(bars) * 0.2
+    # 一字板：最高价等于最低价，RSV为0/0
+    flat = np.random.rand(bars) < 0.02
+    open_price[flat] = high[flat] = low[flat] = close[flat]
+    return pd.DataFrame({'open': open_price, 'high': high, 'low': low, 'close': close})
+
+def batch_calculate(stock_data):
+    sdi.auto_macd_calulate(stock_data)
+    sdi.auto_ma_calulate(stock_data)
+    sdi.auto_kdj_calulate(stock_data)
+    sdi.auto_rsi_calulate(stock_data)
+    sdi.auto_boll_calulate(stock_data)
+    return stock_data
+
+def count_mismatch(values, expected):
+    '''逐位比较（NaN视为相等），返回不一致的数量'''
+    values = np.asarray(values, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    both_nan = np.isnan(values) & np.isnan(expected)
+    same_bits = values.view(np.int64) == expected.view(np.int64)
+    return int((~(both_nan | same_bits)).sum())
+
+def check_consistency(df, engine, start):
+    '''返回{校验项: 不一致的数量}'''
+    expected = batch_calculate(df.copy())
+    columns = engine.get_columns()
+    result = {}
+
+    full = engine.calculate(df.copy())
+    result['全量'] = sum(count_mismatch(full[column], expected[column]) for column in columns)
+
+    # 逐根追加：前start根全量计算，之后每次多一行
+    appended = engine.calculate(df.iloc[:start].copy())
+    for length in range(start + 1, len(df) + 1):
+        appended = pd.concat([appended, df.iloc[length - 1:length]])
+        engine.append(appended)
+    result['追加'] = sum(count_mismatch(appended[column], expected[column]) for column in columns)
+
+    # 回退到start后重新追加
+    engine.seek(df, start)
+    list_rows = [engine.update(bar) for bar in engine.iter_bars(df, start, len(df))]
+    result['回退'] = sum(count_mismatch([row[column] for row in list_rows], expected[column].iloc[start:])
+                       for column in columns)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='增量指标计算一致性校验与性能对比')
+    parser.add_argument('--bars', type=int, nargs='+', default=[750, 5000], help='k线数量')
+    parser.add_argument('--steps', type=int, default=100, help='追加的k线数量')
+    parser.add_argument('--seek-back', type=int, default=60, help='回退的k线数量')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    engine = StreamingIndicatorEngine()
+    print(f"指标列: {engine.get_columns()}")
+    print(f"{'k线数量':<10}{'一致性（不一致数量）':<28}{'批量(ms/根)':>12}{'增量(ms/根)':>12}{'回退(ms)':>10}")
+    for bars in args.bars:
+        df = make_stock_data(bars)
+        steps = min(args.steps, bars - 1)
+        start = bars - steps
+        consistency = check_consistency(df, engine, start)
+
+        batch_start = time.perf_counter()
+        for length in range(start + 1, bars + 1):
+            batch_calculate(df.iloc[:length].copy())
+        batch_ms = (time.perf_counter() - batch_start) / steps * 1000
+
+        engine.calculate(df.iloc[:start].copy())
+        bars_iter = list(engine.iter_bars(df, start, bars))
+        stream_start = time.perf_counter()
+        for bar in bars_iter:
+            engine.update(bar)
+        stream_ms = (time.perf_counter() - stream_start) / steps * 1000
+
+        seek_start = time.perf_counter()
+        engine.seek(df, bars - args.seek_back)
+        seek_ms = (time.perf_counter() - seek_start) * 1000
+
+        text = '，'.join(f"{key}{value}" for key, value in consistency.items())
+        print(f"{bars:<10}{text:<28}{batch_ms:>12.3f}{stream_ms:>12.3f}{seek_ms:>10.3f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
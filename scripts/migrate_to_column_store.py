@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import logging
+from datetime import datetime
+import time
+import argparse
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+# 添加src目录到Python路径，以便导入db_base模块
+src_path = os.path.join(project_root, 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from src.db_base.stock_db_base import StockDbBase
+from src.db_base.stock_column_store import StockColumnStore
+from src.manager.config_manager import ConfigManager
+from src.manager.logging_manager import get_logger
+
+'''
+    将按股票分文件的SQLite数据库（data/database/stocks/db/baostock/<board>/<code>.db）
+    迁移为按周期、板块、年份分区的Parquet列式存储。
+
+    用法：
+        python scripts/migrate_to_column_store.py
+        python scripts/migrate_to_column_store.py --periods stock_data_1d stock_data_1w --boards sh_main sz_main --enable
+'''
+
+def setup_logging(log_level=logging.INFO):
+    """设置日志配置"""
+    log_dir = os.path.join(project_root, 'data/logs/scripts')
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    log_file = os.path.join(log_dir, f'column_store_migrate_{datetime.now().strftime("%Y%m%d")}.log')
+
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    return get_logger(__name__)
+
+def migrate_period(stock_db_base, column_store, table_name, boards, batch_size, logger):
+    """
+    迁移单个周期的数据
+
+    Returns:
+        int: 迁移的总行数
+    """
+    total_rows = 0
+    start_time = time.time()
+
+    for board in boards:
+        board_dir = stock_db_base.get_db_dir() / board
+        if not board_dir.exists():
+            logger.info(f"{board} 目录不存在，跳过")
+            continue
+
+        codes = stock_db_base.get_stock_list_by_path(board_dir)
+        logger.info(f"开始迁移 {board} 板块 {table_name}，共 {len(codes)} 个数据库文件")
+
+        batch = []
+        for i, code in enumerate(codes, 1):
+            if not stock_db_base.check_table_exists(code, table_name):
+                continue
+
+            df_data = stock_db_base.get_bao_stock_data(code, table_name)
+            if df_data is None or df_data.empty:
+                continue
+
+            batch.append(df_data)
+
+            # 按股票数量分批写入，控制内存占用
+            if len(batch) >= batch_size:
+                total_rows += column_store.write_dataframe(pd.concat(batch, ignore_index=True), table_name)
+                batch = []
+
+            if i % 500 == 0:
+                logger.info(f"{board} {table_name} 已处理 {i}/{len(codes)}")
+
+        if batch:
+            total_rows += column_store.write_dataframe(pd.concat(batch, ignore_index=True), table_name)
+
+        # 释放当前线程持有的SQLite连接
+        stock_db_base.close_connection()
+
+    partition_count = column_store.compact(table_name)
+    elapsed_time = time.time() - start_time
+    logger.info(f"{table_name} 迁移完成，共 {total_rows} 行，合并 {partition_count} 个分区，耗时: {elapsed_time:.2f}秒")
+    return total_rows
+
+def main():
+    parser = argparse.ArgumentParser(description='单股SQLite数据库迁移为Parquet列式存储')
+    parser.add_argument('--src', default='./data/database/stocks/db/baostock',
+                       help='单股SQLite数据库根目录')
+    parser.add_argument('--dst', default=None,
+                       help='列式存储根目录，默认为./data/database/stocks/parquet/baostock')
+    parser.add_argument('--periods', nargs='+',
+                       default=['stock_data_1d', 'stock_data_1w', 'stock_data_15m', 'stock_data_30m', 'stock_data_60m'],
+                       help='需要迁移的周期表名')
+    parser.add_argument('--boards', nargs='+',
+                       default=['sh_main', 'sz_main', 'gem', 'star'],
+                       choices=['sh_main', 'sz_main', 'gem', 'star', 'bse'],
+                       help='需要迁移的板块')
+    parser.add_argument('--batch-size', type=int, default=200,
+                       help='每批写入的股票数量，默认200')
+    parser.add_argument('--enable', action='store_true',
+                       help='迁移完成后在配置文件中启用列式存储（[Storage] backend = parquet）')
+    parser.add_argument('--log-level', default='INFO',
+                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='设置日志级别')
+
+    args = parser.parse_args()
+
+    logger = setup_logging(getattr(logging, args.log_level))
+
+    if not StockColumnStore.is_available():
+        logger.error("未安装pyarrow，请先执行: pip install pyarrow")
+        return 1
+
+    stock_db_base = StockDbBase(args.src)
+    column_store = StockColumnStore(args.dst)
+
+    total_start_time = time.time()
+    for table_name in args.periods:
+        if not stock_db_base.is_valid_table_name(table_name):
+            logger.error(f"非法表名: {table_name}")
+            continue
+
+        if column_store.has_period(table_name):
+            # 重复迁移会产生重复数据，直接覆盖已有周期
+            logger.info(f"清空列式存储中已有的 {table_name} 数据")
+            column_store.drop_period(table_name)
+
+        migrate_period(stock_db_base, column_store, table_name, args.boards, args.batch_size, logger)
+
+    total_elapsed_time = time.time() - total_start_time
+    logger.info(f"全部迁移完成，总耗时: {total_elapsed_time:.2f}秒，即{total_elapsed_time/60:.2f}分钟")
+
+    if args.enable:
+        config_manager = ConfigManager()
+        config_manager.set('Storage', 'backend', 'parquet')
+        if args.dst:
+            config_manager.set('Storage', 'parquet_dir', args.dst)
+        config_manager.save()
+        logger.info(f"已在 {config_manager.get_config_path()} 中启用列式存储")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
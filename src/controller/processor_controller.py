@@ -1,5 +1,8 @@
+import pandas as pd
+
 from processor.ak_stock_data_processor import AKStockDataProcessor
 from processor.baostock_processor import BaoStockProcessor
+from processor.stock_screener_engine import StockScreenerEngine
 from manager.config_manager import ConfigManager
 
 from manager.logging_manager import get_logger
@@ -26,6 +29,7 @@ class ProcessorController:
             # 初始化成员变量
             cls._instance.stock_processor = AKStockDataProcessor()
             cls._instance.bao_stock_processor = BaoStockProcessor() # 创建实例
+            cls._instance.screener_engine = StockScreenerEngine() # 全市场选股引擎
             cls._instance._is_initialized = False # 控制器自身状态
         return cls._instance
 
@@ -82,35 +86,41 @@ class ProcessorController:
         self.bao_stock_processor.update_sh_main_daily_data()
 
     # 策略筛选
-    
+    def run_screener(self, rule_name, boards=None, top=None):
+        '''按内置规则执行全市场选股，返回按rank排序的入选股票'''
+        try:
+            return self.screener_engine.screen(rule_name, boards=boards, top=top)
+        except Exception as e:
+            self.logger.exception(f"选股规则{rule_name}执行失败: {e}")
+            return pd.DataFrame()
 
     def process_daily_up_ma52_filter(self):
         self.logger.info("process_daily_up_ma52_filter")
-        result = self.bao_stock_processor.daily_up_ma52_filter()
+        result = self.run_screener('daily_up_ma52')
         self.logger.info("process_daily_up_ma52_filter done.")
         self.logger.info(result)
 
     def process_daily_up_ma24_filter(self):
         self.logger.info("process_daily_up_ma24_filter")
-        result = self.bao_stock_processor.daily_up_ma24_filter()
+        result = self.run_screener('daily_up_ma24')
         self.logger.info("process_daily_up_ma24_filter done.")
         self.logger.info(result)
 
     def process_daily_up_ma10_filter(self):
         self.logger.info("process_daily_up_ma10_filter")
-        result = self.bao_stock_processor.daily_up_ma10_filter()
+        result = self.run_screener('daily_up_ma10')
         self.logger.info("process_daily_up_ma10_filter done.")
         self.logger.info(result)
 
     def process_daily_down_between_ma24_ma52_filter(self):
         self.logger.info("process_daily_down_between_ma24_ma52_filter")
-        result = self.bao_stock_processor.daily_down_between_ma24_ma52_filter()
+        result = self.run_screener('daily_down_between_ma24_ma52')
         self.logger.info("process_daily_down_between_ma24_ma52_filter done.")
         self.logger.info(result)
 
     def process_daily_down_between_ma5_ma52_filter(self):
         self.logger.info("process_daily_down_between_ma5_ma52_filter")
-        result = self.bao_stock_processor.daily_down_between_ma5_ma52_filter()
+        result = self.run_screener('daily_down_between_ma5_ma52')
         self.logger.info("process_daily_down_between_ma5_ma52_filter done.")
         self.logger.info(result)
 
@@ -0,0 +1,170 @@
+import threading
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from manager.config_manager import ConfigManager
+from manager.logging_manager import get_logger
+
+'''
+    DataFrame批量写入SQLite的公共实现，StockDbBase与CommonDBBase共用
+    1. 按列向量化转换为Python原生类型，NaN/NaT按列替换为None，不再逐个单元格判断
+    2. 按chunk_size分批executemany，全部批次在同一个事务中提交
+    3. 写入前设置PRAGMA（synchronous、cache_size、temp_store），可通过配置文件调整：
+        [Database]
+        synchronous = NORMAL
+        cache_size = -65536
+        temp_store = MEMORY
+        bulk_chunk_size = 5000
+'''
+
+class BulkWriter:
+    """
+    DataFrame批量写入器
+    """
+    DEFAULT_PRAGMAS = {
+        'synchronous': 'NORMAL',    # WAL模式下NORMAL即可保证一致性
+        'cache_size': -65536,       # 负数单位为KB，即64MB
+        'temp_store': 'MEMORY',
+    }
+    DEFAULT_CHUNK_SIZE = 5000
+
+    def __init__(self, chunk_size=None, pragmas=None):
+        """
+        参数:
+            chunk_size (int, optional): 每批executemany的行数，默认5000
+            pragmas (dict, optional): 写入前设置的PRAGMA，None表示使用默认值，{}表示不设置
+        """
+        self.logger = get_logger(__name__)
+        self.chunk_size = chunk_size if chunk_size and chunk_size > 0 else self.DEFAULT_CHUNK_SIZE
+        self.pragmas = dict(self.DEFAULT_PRAGMAS) if pragmas is None else dict(pragmas)
+
+    # ------------------------------------------------------------数据转换------------------------------------------------------------
+    @staticmethod
+    def _convert_column(series):
+        """将单列转换为Python原生类型的object数组，缺失值为None"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            # numpy数值数组转object时即为Python原生int、float、bool
+            if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                values = series.to_numpy(dtype=object, na_value=None)
+            else:
+                values = series.to_numpy().astype(object)
+        else:
+            values = series.to_numpy(dtype=object)
+            inferred_type = pd.api.types.infer_dtype(series, skipna=True)
+            if inferred_type in ('datetime', 'datetime64'):
+                values = np.array([v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime.datetime) else v for v in values], dtype=object)
+            elif inferred_type == 'date':
+                values = np.array([str(v) if isinstance(v, datetime.date) else v for v in values], dtype=object)
+            elif inferred_type not in ('string', 'empty'):
+                # 混合类型列中可能含有numpy标量
+                values = np.array([v.item() if isinstance(v, np.generic) else v for v in values], dtype=object)
+
+        mask = series.isna().to_numpy()
+        if mask.any():
+            values[mask] = None
+        return values
+
+    @classmethod
+    def dataframe_to_records(cls, df_data):
+        """
+        将DataFrame转换为executemany所需的元组列表
+
+        返回:
+            list[tuple]: 每行一个元组，顺序与df_data.columns一致
+        """
+        if df_data is None or df_data.empty:
+            return []
+        columns = [cls._convert_column(df_data.iloc[:, i]) for i in range(df_data.shape[1])]
+        return list(zip(*columns))
+
+    # ------------------------------------------------------------写入------------------------------------------------------------
+    @staticmethod
+    def build_insert_sql(table_name, columns, if_exists="append"):
+        """根据写入方式生成INSERT语句，ignore模式跳过主键冲突的数据，其余模式覆盖"""
+        placeholders = ', '.join('?' * len(columns))
+        columns_str = ', '.join([f'"{col}"' for col in columns])  # 用引号包围列名防止关键字冲突
+        if if_exists == "ignore":
+            return f'INSERT OR IGNORE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
+        return f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
+
+    def apply_pragmas(self, cur):
+        """在当前连接上设置写入PRAGMA"""
+        for key, value in self.pragmas.items():
+            if not str(value).lstrip('-').isalnum():
+                self.logger.warning(f"忽略非法的PRAGMA配置: {key}={value}")
+                continue
+            cur.execute(f"PRAGMA {key}={value}")
+
+    def prepare_table(self, cur, table_name, if_exists="append"):
+        """
+        按写入方式处理表中已有数据，与后续插入处于同一事务中
+
+        返回:
+            int: replace模式下删除的行数
+        """
+        if if_exists == "replace":
+            cur.execute(f'DELETE FROM "{table_name}"')
+            return cur.rowcount
+        if if_exists == "fail":
+            cur.execute(f'SELECT 1 FROM "{table_name}" LIMIT 1')
+            if cur.fetchone() is not None:
+                raise ValueError(f"表 {table_name} 中已存在数据，根据if_exists='fail'参数，操作被终止")
+        return 0
+
+    def write(self, cur, table_name, df_data, if_exists="append", prepare_table=True):
+        """
+        将DataFrame写入表中，调用方负责提供游标并在结束后提交事务
+
+        参数:
+            cur: sqlite3游标
+            table_name (str): 表名
+            df_data (DataFrame): 列名需与表列名一致
+            if_exists (str): "replace", "append", "fail", "ignore"
+            prepare_table (bool): False时不清空、不检查已有数据，replace仅按主键覆盖
+        返回:
+            int: 插入的行数
+        """
+        if df_data is None or df_data.empty:
+            return 0
+
+        columns = list(df_data.columns)
+        if not columns:
+            raise ValueError("DataFrame没有有效的列")
+
+        records = self.dataframe_to_records(df_data)
+        insert_sql = self.build_insert_sql(table_name, columns, if_exists)
+
+        # synchronous不能在事务中修改，连接已处于事务中时沿用当前设置
+        if not cur.connection.in_transaction:
+            self.apply_pragmas(cur)
+        if prepare_table:
+            self.prepare_table(cur, table_name, if_exists)
+
+        row_count = 0
+        for start in range(0, len(records), self.chunk_size):
+            cur.executemany(insert_sql, records[start:start + self.chunk_size])
+            row_count += cur.rowcount
+        return row_count
+
+
+_default_bulk_writer = None
+_default_bulk_writer_lock = threading.Lock()
+
+def get_default_bulk_writer():
+    """获取默认批量写入器，PRAGMA与批大小从配置文件[Database]读取"""
+    global _default_bulk_writer
+    if _default_bulk_writer is None:
+        with _default_bulk_writer_lock:
+            if _default_bulk_writer is None:
+                config_manager = ConfigManager()
+                pragmas = {}
+                for key, default in BulkWriter.DEFAULT_PRAGMAS.items():
+                    value = config_manager.get('Database', key, None)
+                    pragmas[key] = default if value in (None, '') else value
+                chunk_size = config_manager.getint('Database', 'bulk_chunk_size', BulkWriter.DEFAULT_CHUNK_SIZE)
+                _default_bulk_writer = BulkWriter(chunk_size, pragmas)
+    return _default_bulk_writer
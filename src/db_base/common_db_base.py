@@ -8,6 +8,7 @@ import time
 import numpy as np
 
 from manager.logging_manager import get_logger
+from db_base.bulk_writer import get_default_bulk_writer
 
 class CommonDBBasePool:
     """管理多个 CommonDBBase 实例的池（单例模式）"""
@@ -71,6 +72,7 @@ class CommonDBBase:
 
         self._local = threading.local()     # 多线程隔离
         self._lock = threading.Lock()       # 保护共享资源
+        self.bulk_writer = get_default_bulk_writer()    # DataFrame批量写入
         
         # 连接管理相关属性
         self._connection_timestamps = {}    # 记录每个线程连接的最后使用时间
@@ -388,29 +390,6 @@ class CommonDBBase:
             return self._insert_dataframe_fast(table_name, df_data, if_exists)
         
         try:
-            # 检查表是否存在数据
-            table_exists = False
-            row_count = 0
-            if not fast_mode:  # 非快速模式下才检查
-                with self._get_connection() as cur:
-                    cur.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-                    table_exists = cur.fetchone()[0] > 0
-                    
-                    if table_exists:
-                        cur.execute(f"SELECT COUNT(*) FROM {table_name}")
-                        row_count = cur.fetchone()[0]
-                        
-                        if row_count > 0:
-                            if if_exists == "fail":
-                                raise ValueError(f"表 {table_name} 中已存在数据，根据if_exists='fail'参数，操作被终止")
-                            elif if_exists == "replace":
-                                cur.execute(f"DELETE FROM {table_name}")
-                                self.logger.info(f"已清空表 {table_name} 中的 {row_count} 行数据")
-                            elif if_exists == "ignore":
-                                self.logger.info(f"表 {table_name} 中已存在数据，将忽略重复数据进行插入")
-                    else:
-                        self.logger.info(f"表 {table_name} 不存在，将创建新表")
-
             # 获取DataFrame的列名
             df_columns = list(df_data.columns)
             if not df_columns:
@@ -448,40 +427,9 @@ class CommonDBBase:
                 # 筛选出需要插入的列数据
                 df_filtered = df_data[columns_to_insert].copy()
             
-            # 准备插入语句
-            placeholders = ', '.join('?' * len(columns_to_insert))
-            columns_str = ', '.join([f'"{col}"' for col in columns_to_insert])  # 用引号包围列名防止关键字冲突
-            
-            # 根据if_exists参数选择不同的插入策略
-            if if_exists == "ignore":
-                insert_sql = f'INSERT OR IGNORE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            else:
-                insert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            
-            # 将DataFrame转换为记录列表
-            records = df_filtered.to_dict('records')
-            
-            # 处理缺失值，将NaN替换为None
-            processed_records = []
-            for record in records:
-                processed_record = {}
-                for key, value in record.items():
-                    # 处理NaN值
-                    if pd.isna(value):
-                        processed_record[key] = None
-                    # 处理numpy数据类型
-                    elif isinstance(value, (np.integer, np.floating)):
-                        processed_record[key] = value.item()  # 转换为Python原生类型
-                    elif isinstance(value, np.bool_):
-                        processed_record[key] = bool(value)
-                    else:
-                        processed_record[key] = value
-                processed_records.append(tuple(processed_record.values()))
-            
-            # 执行批量插入
+            # 清空旧数据与插入在同一事务中完成
             with self._get_connection() as cur:
-                cur.executemany(insert_sql, processed_records)
-                row_count = cur.rowcount
+                row_count = self.bulk_writer.write(cur, table_name, df_filtered, if_exists)
                 self.logger.info(f"成功向表 {table_name} {if_exists} {row_count} 行数据")
                 return row_count
                 
@@ -507,32 +455,8 @@ class CommonDBBase:
         
         """
         try:
-            # 获取DataFrame的列名
-            columns = list(df_data.columns)
-            
-            # 准备插入语句
-            placeholders = ', '.join('?' * len(columns))
-            columns_str = ', '.join([f'"{col}"' for col in columns])
-            
-            # 根据if_exists参数选择不同的插入策略
-            if if_exists == "ignore":
-                insert_sql = f'INSERT OR IGNORE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            else:
-                insert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            
-            # 直接转换DataFrame为记录列表（不进行额外处理）
-            records = df_data.to_dict('records')
-            
-            # 简单处理缺失值
-            processed_records = []
-            for record in records:
-                processed_record = tuple(None if pd.isna(value) else value for value in record.values())
-                processed_records.append(processed_record)
-            
-            # 执行批量插入
             with self._get_connection() as cur:
-                cur.executemany(insert_sql, processed_records)
-                row_count = cur.rowcount
+                row_count = self.bulk_writer.write(cur, table_name, df_data, if_exists, prepare_table=False)
                 self.logger.info(f"快速插入完成，向表 {table_name} 插入 {row_count} 行数据")
                 return row_count
                 
@@ -672,39 +596,9 @@ class CommonDBBase:
             # 筛选出需要插入的列数据
             df_filtered = df_data[columns_to_insert].copy()
         
-        # 准备插入语句
-        placeholders = ', '.join('?' * len(columns_to_insert))
-        columns_str = ', '.join([f'"{col}"' for col in columns_to_insert])
-        
-        # 根据if_exists参数选择不同的插入策略
-        if if_exists == "ignore":
-            insert_sql = f'INSERT OR IGNORE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-        else:
-            insert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-        
-        # 将DataFrame转换为记录列表
-        records = df_filtered.to_dict('records')
-        
-        # 处理缺失值
-        processed_records = []
-        for record in records:
-            processed_record = {}
-            for key, value in record.items():
-                if pd.isna(value):
-                    processed_record[key] = None
-                elif isinstance(value, (np.integer, np.floating)):
-                    processed_record[key] = value.item()
-                elif isinstance(value, np.bool_):
-                    processed_record[key] = bool(value)
-                else:
-                    processed_record[key] = value
-            processed_records.append(tuple(processed_record.values()))
-        
         # 执行批量插入
         with self._get_connection() as cur:
-            cur.executemany(insert_sql, processed_records)
-            row_count = cur.rowcount
-            return row_count
+            return self.bulk_writer.write(cur, table_name, df_filtered, if_exists, prepare_table=False)
 
     # ======================== 数据删除接口 ========================
     def delete_data(self, table_name, condition=None, params=None):
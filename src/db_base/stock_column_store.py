@@ -0,0 +1,303 @@
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from common.common_api import *
+from manager.logging_manager import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，未安装时仅使用SQLite存储
+    pa = None
+    pc = None
+    ds = None
+    pq = None
+
+'''
+    列式行情存储（Parquet）
+    目录结构：
+        <root>/
+            stock_data_1d/
+                board=sh_main/
+                    year=2024/
+                        part-xxxx.parquet
+                    year=2025/
+                board=sz_main/
+            stock_data_1w/
+            stock_data_30m/
+    每个周期一套按板块、年份分区的文件，全市场扫描只需读取少量大文件，不再逐个打开单股SQLite数据库。
+    每次写入带写入序号列（_write_seq），主键重复时保留序号最大（最后写入）的行；
+    分区内文件数超过COMPACT_FILE_COUNT时写入后自动合并。
+'''
+
+class StockColumnStore:
+    """
+    按周期、板块、年份分区的列式行情存储
+    """
+    DEFAULT_ROOT_DIR = "./data/database/stocks/parquet/baostock"
+    PARTITION_COLUMNS = ['board', 'year']
+    WRITE_SEQ_COLUMN = '_write_seq'
+    COMPACT_FILE_COUNT = 8      # 分区内文件数超过该值时写入后自动合并
+
+    def __init__(self, root_dir=None):
+        """
+        初始化列式存储
+
+        参数:
+            root_dir (str, optional): 存储根目录，为空时使用DEFAULT_ROOT_DIR
+        """
+        self.logger = get_logger(__name__)
+        self.root_dir = Path(root_dir or self.DEFAULT_ROOT_DIR)
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()   # 写入、压缩互斥
+        self._dict_has_period = {}      # {table_name: bool}，has_period的结果缓存，写入、删除时更新
+        self._last_write_seq = 0
+
+    @staticmethod
+    def is_available():
+        """是否已安装pyarrow"""
+        return pa is not None
+
+    def get_period_dir(self, table_name):
+        return self.root_dir / table_name
+
+    def has_period(self, table_name):
+        """指定周期是否已有数据文件（结果缓存，目录只扫描一次）"""
+        has_data = self._dict_has_period.get(table_name)
+        if has_data is None:
+            period_dir = self.get_period_dir(table_name)
+            has_data = period_dir.exists() and any(period_dir.rglob("*.parquet"))
+            self._dict_has_period[table_name] = has_data
+        return has_data
+
+    def _next_write_seq(self):
+        """单调递增的写入序号（纳秒时间戳），跨进程、重启后仍按写入先后排序"""
+        self._last_write_seq = max(time.time_ns(), self._last_write_seq + 1)
+        return self._last_write_seq
+
+    def get_key_columns(self, table_name):
+        """主键列，与SQLite表主键保持一致"""
+        if table_name in ('stock_data', 'stock_data_1d', 'stock_data_1w', 'stock_data_1m'):
+            return ['date', 'code']
+        return ['date', 'time', 'code']
+
+    # ------------------------------------------------------------写入------------------------------------------------------------
+    def _normalize_frame(self, df_data):
+        """统一日期、时间列为字符串（与SQLite中存储格式一致），并补充分区列"""
+        df = df_data.copy()
+        if 'date' in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df['date']):
+                df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+            else:
+                df['date'] = df['date'].astype(str)
+        if 'time' in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df['time']):
+                df['time'] = df['time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            else:
+                df['time'] = df['time'].astype(str)
+        if 'volume' in df.columns:
+            df['volume'] = pd.to_numeric(df['volume'], errors='coerce').astype('Int64')
+        if 'adjustflag' in df.columns:
+            df['adjustflag'] = pd.to_numeric(df['adjustflag'], errors='coerce').astype('Int64')
+
+        codes = df['code'].astype(str)
+        board_map = {code: identify_stock_board(code) for code in codes.unique()}
+        df['board'] = codes.map(board_map)
+        df['year'] = df['date'].str.slice(0, 4).astype('int32')
+        return df
+
+    def write_dataframe(self, df_data, table_name):
+        """
+        追加写入一批K线数据（可包含多只股票）
+
+        参数:
+            df_data (DataFrame): 至少包含date、code列
+            table_name (str): 周期表名，例如stock_data_1d
+        返回:
+            int: 写入行数
+        """
+        if not self.is_available():
+            raise RuntimeError("未安装pyarrow，无法使用列式存储")
+
+        if df_data is None or df_data.empty:
+            return 0
+
+        df = self._normalize_frame(df_data)
+        with self._lock:
+            write_seq = self._next_write_seq()
+            df[self.WRITE_SEQ_COLUMN] = write_seq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pq.write_to_dataset(
+                table,
+                root_path=str(self.get_period_dir(table_name)),
+                partition_cols=self.PARTITION_COLUMNS,
+                basename_template=f"part-{write_seq:020d}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            )
+            self._dict_has_period[table_name] = True
+
+            # 增量更新每次只追加少量行，分区内小文件过多时合并
+            key_columns = self.get_key_columns(table_name)
+            for board, year in df[self.PARTITION_COLUMNS].drop_duplicates().itertuples(index=False):
+                year_dir = self.get_period_dir(table_name) / f"board={board}" / f"year={year}"
+                files = sorted(year_dir.glob("*.parquet"))
+                if len(files) > self.COMPACT_FILE_COUNT:
+                    self._compact_partition(year_dir, files, key_columns)
+        return len(df)
+
+    def delete_stock(self, code, table_name):
+        """删除某只股票在指定周期下的全部数据（重写该股票所在板块的分区文件）"""
+        if not self.has_period(table_name):
+            return 0
+
+        board = identify_stock_board(code)
+        board_dir = self.get_period_dir(table_name) / f"board={board}"
+        if not board_dir.exists():
+            return 0
+
+        deleted_count = 0
+        with self._lock:
+            for year_dir in board_dir.iterdir():
+                files = list(year_dir.glob("*.parquet"))
+                if not files:
+                    continue
+                table = pa.concat_tables([pq.read_table(str(f)) for f in files])
+                mask = pc.equal(table['code'], code)
+                hit_count = pc.sum(mask).as_py() or 0
+                if hit_count == 0:
+                    continue
+                kept = table.filter(pc.invert(mask))
+                self._replace_partition_files(year_dir, files, kept)
+                deleted_count += hit_count
+            self._dict_has_period.pop(table_name, None)
+        return deleted_count
+
+    def compact(self, table_name):
+        """
+        合并每个分区下的小文件，并按主键去重（保留最后写入的数据）
+
+        返回:
+            int: 处理的分区数量
+        """
+        if not self.has_period(table_name):
+            return 0
+
+        key_columns = self.get_key_columns(table_name)
+        partition_count = 0
+        with self._lock:
+            for year_dir in self.get_period_dir(table_name).glob("board=*/year=*"):
+                files = sorted(year_dir.glob("*.parquet"))
+                if len(files) <= 1:
+                    continue
+                self._compact_partition(year_dir, files, key_columns)
+                partition_count += 1
+        return partition_count
+
+    def _compact_partition(self, partition_dir, files, key_columns):
+        df = pd.concat([pq.read_table(str(f)).to_pandas() for f in files], ignore_index=True)
+        df = self._drop_duplicate_keys(df, key_columns)
+        df = df.sort_values(['code'] + [c for c in key_columns if c != 'code'], ignore_index=True)
+        self._replace_partition_files(partition_dir, files, pa.Table.from_pandas(df, preserve_index=False))
+
+    def _drop_duplicate_keys(self, df, key_columns):
+        """主键重复时保留写入序号最大的行"""
+        if self.WRITE_SEQ_COLUMN in df.columns:
+            df = df.sort_values(self.WRITE_SEQ_COLUMN, kind='stable')
+        return df.drop_duplicates(subset=key_columns, keep='last')
+
+    def _replace_partition_files(self, partition_dir, old_files, table):
+        """先写新文件再删除旧文件，避免中途失败导致分区数据丢失"""
+        new_file = partition_dir / f"part-{self._next_write_seq():020d}-{uuid.uuid4().hex[:8]}-0.parquet"
+        if table.num_rows > 0:
+            pq.write_table(table, str(new_file))
+        for f in old_files:
+            f.unlink()
+
+    def drop_period(self, table_name):
+        """删除指定周期的全部数据"""
+        period_dir = self.get_period_dir(table_name)
+        if period_dir.exists():
+            shutil.rmtree(period_dir)
+        self._dict_has_period.pop(table_name, None)
+
+    # ------------------------------------------------------------读取------------------------------------------------------------
+    def _build_filter(self, codes=None, boards=None, start_date=None, end_date=None):
+        expr = None
+
+        def _and(a, b):
+            return b if a is None else a & b
+
+        if boards:
+            expr = _and(expr, ds.field('board').isin(list(boards)))
+        if codes:
+            expr = _and(expr, ds.field('code').isin(list(codes)))
+        if start_date:
+            start_date = str(start_date)
+            expr = _and(expr, ds.field('year') >= int(start_date[:4]))
+            expr = _and(expr, ds.field('date') >= start_date)
+        if end_date:
+            end_date = str(end_date)
+            expr = _and(expr, ds.field('year') <= int(end_date[:4]))
+            expr = _and(expr, ds.field('date') <= end_date)
+        return expr
+
+    def read(self, table_name, codes=None, boards=None, start_date=None, end_date=None, columns=None):
+        """
+        读取指定周期的数据，支持按股票、板块、日期过滤（分区裁剪 + 谓词下推）
+
+        返回:
+            DataFrame: 按code、date(、time)排序，不包含board、year分区列
+        """
+        if not self.is_available() or not self.has_period(table_name):
+            return pd.DataFrame()
+
+        # 按代码过滤时可以直接裁剪到对应板块
+        if codes and not boards:
+            boards = {identify_stock_board(code) for code in codes}
+
+        dataset = ds.dataset(str(self.get_period_dir(table_name)), format="parquet", partitioning="hive")
+        read_columns = None
+        if columns:
+            read_columns = list(dict.fromkeys(list(columns) + self.get_key_columns(table_name) + [self.WRITE_SEQ_COLUMN]))
+
+        table = dataset.to_table(columns=read_columns, filter=self._build_filter(codes, boards, start_date, end_date))
+        df = table.to_pandas()
+        if df.empty:
+            return pd.DataFrame()
+
+        key_columns = self.get_key_columns(table_name)
+        df = self._drop_duplicate_keys(df, key_columns)
+        df = df.drop(columns=[c for c in self.PARTITION_COLUMNS + [self.WRITE_SEQ_COLUMN] if c in df.columns])
+        sort_columns = ['code'] + [c for c in key_columns if c != 'code']
+        return df.sort_values(sort_columns, ignore_index=True)
+
+    def read_stock(self, code, table_name, start_date=None, end_date=None):
+        """读取单只股票数据，列顺序与SQLite保持一致"""
+        df = self.read(table_name, codes=[code], start_date=start_date, end_date=end_date)
+        return df.reset_index(drop=True)
+
+    def read_latest_rows(self, table_name, count=1, boards=None, start_date=None):
+        """
+        读取全市场每只股票的最后count行数据
+
+        参数:
+            start_date (str, optional): 只扫描该日期之后的分区，默认扫描全部
+        """
+        df = self.read(table_name, boards=boards, start_date=start_date)
+        if df.empty:
+            return df
+        return df.groupby('code', sort=False).tail(count).reset_index(drop=True)
+
+    def list_codes(self, table_name, boards=None):
+        """列出指定周期下已存储的股票代码"""
+        df = self.read(table_name, boards=boards, columns=['code'])
+        if df.empty:
+            return []
+        return df['code'].drop_duplicates().tolist()
@@ -12,6 +12,7 @@ import weakref
 from collections import OrderedDict
 
 from manager.logging_manager import get_logger
+from db_base.bulk_writer import get_default_bulk_writer
 
 '''
     常规插入：executemany+ 分批提交
@@ -52,6 +53,8 @@ class StockDbBase:
         self._local = threading.local()     # 多线程隔离
         self._lock = threading.Lock()       # 保护​​共享资源​​
 
+        self.bulk_writer = get_default_bulk_writer()    # DataFrame批量写入
+
     @contextmanager
     def _get_connection(self, db_path, max_connections=5):
         """线程安全的数据库连接获取（LRU连接池）"""
@@ -210,72 +213,9 @@ class StockDbBase:
             raise ValueError("if_exists参数必须是'replace', 'append', 'fail', 'ignore'之一")
 
         try:
-            # 检查表是否存在数据
-            with self._get_connection(db_path) as cur:
-                cur.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-                table_exists = cur.fetchone()[0] > 0
-                
-                if table_exists:
-                    cur.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    row_count = cur.fetchone()[0]
-                    
-                    if row_count > 0:
-                        if if_exists == "fail":
-                            raise ValueError(f"表 {table_name} 中已存在数据，根据if_exists='fail'参数，操作被终止")
-                        elif if_exists == "replace":
-                            cur.execute(f"DELETE FROM {table_name}")
-                            self.logger.info(f"已清空表 {table_name} 中的 {row_count} 行数据")
-                        elif if_exists == "ignore":
-                            # 对于ignore模式，我们检查主键冲突，只插入不重复的数据
-                            self.logger.info(f"表 {table_name} 中已存在数据，将忽略重复数据进行插入")
-                else:
-                    self.logger.info(f"表 {table_name} 不存在，将创建新表")
-
-            # 获取DataFrame的列名
-            columns = list(df_data.columns)
-            if not columns:
-                raise ValueError("DataFrame没有有效的列")
-            
-            # 准备插入语句
-            placeholders = ', '.join('?' * len(columns))
-            columns_str = ', '.join([f'"{col}"' for col in columns])  # 用引号包围列名防止关键字冲突
-            
-            # 根据if_exists参数选择不同的插入策略
-            if if_exists == "ignore":
-                insert_sql = f'INSERT OR IGNORE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            else:
-                insert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
-            
-            # 将DataFrame转换为记录列表
-            records = df_data.to_dict('records')
-            
-            # 处理缺失值，将NaN替换为None
-            processed_records = []
-            for record in records:
-                processed_record = {}
-                for key, value in record.items():
-                    # 处理NaN值
-                    if pd.isna(value):
-                        processed_record[key] = None
-                    # 处理numpy数据类型
-                    elif isinstance(value, (np.integer, np.floating)):
-                        processed_record[key] = value.item()  # 转换为Python原生类型
-                    elif isinstance(value, np.bool_):
-                        processed_record[key] = bool(value)
-                    elif isinstance(value, (pd.Timestamp, datetime.datetime)):
-                        # 处理时间戳类型，转换为字符串格式
-                        processed_record[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                    elif isinstance(value, datetime.date):
-                        # 处理日期类型
-                        processed_record[key] = str(value)
-                    else:
-                        processed_record[key] = value
-                processed_records.append(tuple(processed_record.values()))
-            
-            # 执行批量插入
+            # 清空旧数据与插入在同一事务中完成，不再逐次统计表行数
             with self._get_connection(db_path) as cur:
-                cur.executemany(insert_sql, processed_records)
-                row_count = cur.rowcount
+                row_count = self.bulk_writer.write(cur, table_name, df_data, if_exists)
                 # self.logger.info(f"成功向表 {table_name} {if_exists} {row_count} 行数据")
                 return row_count
                 
@@ -842,18 +782,46 @@ class StockDbBase:
             self.logger.info(f"获取股票 {stock_code} 数据时出错: {str(e)}")
             return None
 
-    def get_latest_data(self, stock_code, count=1):
+    def get_latest_data(self, stock_code, count=1, table_name="stock_data", end_date=None):
         """
-        获取指定股票最近几天的数据
+        获取指定股票最近count根k线的数据
         
         参数:
             stock_code (str): 股票代码
-            days (int, optional): 获取最近几天的数据，默认为1天
+            count (int, optional): k线数量，默认为1
+            table_name (str, optional): 表名
+            end_date (str, optional): 截止日期（含），默认为最新
             
         返回:
-            DataFrame: 最近几天的股票数据
+            DataFrame: 按日期升序排列的最近count行数据，数据库或表不存在时为空DataFrame
         """
-        pass
+        if not self.is_valid_table_name(table_name):
+            raise ValueError(f"非法表名{table_name}！")
+
+        # 不存在时不连接，避免创建空的数据库文件
+        if not self.check_stock_db_exists(stock_code):
+            return pd.DataFrame()
+
+        db_path = self.get_db_path(stock_code)
+        try:
+            with self._get_connection(db_path) as cur:
+                query = f"SELECT * FROM {table_name}"
+                params = []
+                if end_date:
+                    query += " WHERE date <= ?"
+                    params.append(end_date)
+                # 分钟级数据同一日期有多行，再按time排序
+                cur.execute(f"SELECT * FROM {table_name} LIMIT 0")
+                has_time = 'time' in [description[0] for description in cur.description]
+                query += " ORDER BY date DESC, time DESC LIMIT ?" if has_time else " ORDER BY date DESC LIMIT ?"
+                params.append(int(count))
+                cur.execute(query, params)
+                column_names = [description[0] for description in cur.description]
+                rows = cur.fetchall()
+                return pd.DataFrame(rows[::-1], columns=column_names)
+        except Exception as e:
+            self.logger.info(f"获取股票 {stock_code} 最近{count}行数据时出错: {str(e)}")
+            return pd.DataFrame()
 
 
     def update_stock_data(self, stock_code, stock_data):
@@ -1261,6 +1229,30 @@ class StockDbBase:
             self.logger.info(f"获取股票数据时出错: {str(e)}, code: {stock_code}")
             return pd.DataFrame()
 
+    def get_max_date(self, stock_code, table_name="stock_data"):
+        """
+        获取指定股票指定周期表中数据的最后日期，仅查询MAX(date)，不读取历史数据
+
+        返回:
+            str: 最后日期（YYYY-MM-DD），数据库或表不存在、表为空时返回None
+        """
+        if not self.is_valid_table_name(table_name):
+            raise ValueError(f"非法表名{table_name}！")
+
+        if not self.check_stock_db_exists(stock_code):
+            return None
+
+        db_path = self.get_db_path(stock_code)
+        try:
+            with self._get_connection(db_path) as cur:
+                cur.execute(f"SELECT MAX(date) FROM {table_name}")
+                row = cur.fetchone()
+                return str(row[0])[:10] if row and row[0] is not None else None
+        except sqlite3.Error as e:
+            # 表不存在
+            self.logger.debug(f"获取最后日期失败: {str(e)}, code: {stock_code}, table: {table_name}")
+            return None
+
     def save_bao_stock_data_to_db(self, stock_code, stock_data, writeWay="replace", table_name="stock_data"):
         db_path = self.get_db_path(stock_code)
 
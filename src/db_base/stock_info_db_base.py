@@ -102,6 +102,9 @@ class StockInfoDBBase(CommonDBBase):
         """
         self.create_table('stock_basic_info', create_table_sql)
 
+        self.init_latest_bars_table()
+        self.init_fetch_journal_table()
+
     def init_efinance_db(self):
         self.create_table('stock_basic_info', '''
                     CREATE TABLE IF NOT EXISTS stock_basic_info (
@@ -1172,6 +1175,187 @@ class StockInfoDBBase(CommonDBBase):
             self.logger.info(f"获取最新日期的股票信息数据时出错: {str(e)}")
             return pd.DataFrame()
 
+    # ----------------------latest_bars快照表：每只股票每个周期仅保留最后一根k线-----------------------------------------
+    LATEST_BARS_COLUMNS = ['date', 'time', 'code', 'open', 'high', 'low', 'close', 'volume', 'amount', 'change_percent', 'turnover_rate', 'adjustflag']
+
+    def init_latest_bars_table(self):
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS latest_bars (
+            period TEXT NOT NULL,                       -- 周期表名，例如stock_data_1d
+            date DATE NOT NULL,
+            time DATETIME,                              -- 日线、周线为NULL
+            code TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            amount REAL,
+            change_percent REAL,
+            turnover_rate REAL,
+            adjustflag INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (period, code)
+        )
+        """
+        self.create_table('latest_bars', create_table_sql)
+
+    def save_latest_bars(self, df_data, period_table, force=False):
+        """
+        更新latest_bars快照表
+
+        :param df_data: k线数据，可包含多只股票、多行，每只股票只取最后一根k线
+        :param period_table: 周期表名，例如stock_data_1d
+        :param force: True时无条件覆盖（全量替换写入时使用），否则只在新k线不早于快照时更新
+        :return: 操作的行数
+        """
+        if df_data is None or df_data.empty:
+            return 0
+
+        columns = [col for col in self.LATEST_BARS_COLUMNS if col in df_data.columns]
+        df = df_data[columns].copy()
+
+        # 与单股数据库中的存储格式保持一致
+        if pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+        else:
+            df['date'] = df['date'].astype(str)
+        sort_columns = ['code', 'date']
+        if 'time' in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df['time']):
+                df['time'] = df['time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            else:
+                df['time'] = df['time'].astype(str)
+            sort_columns.append('time')
+
+        df = df.sort_values(sort_columns).drop_duplicates(subset=['code'], keep='last')
+        df.insert(0, 'period', period_table)
+        df = df.astype(object).where(df.notna(), None)
+
+        columns = list(df.columns)
+        update_clause = ', '.join([f"{col} = excluded.{col}" for col in columns if col not in ('period', 'code')])
+        sql = f"""INSERT INTO latest_bars ({', '.join(columns)}, updated_at) VALUES ({', '.join(['?'] * len(columns))}, CURRENT_TIMESTAMP)
+                  ON CONFLICT(period, code) DO UPDATE SET {update_clause}, updated_at = CURRENT_TIMESTAMP"""
+        if not force:
+            # 追加写入时防止较早的k线覆盖快照
+            sql += """ WHERE excluded.date > latest_bars.date
+                       OR (excluded.date = latest_bars.date AND IFNULL(excluded.time, '') >= IFNULL(latest_bars.time, ''))"""
+
+        records = [tuple(v.item() if hasattr(v, 'item') else v for v in row) for row in df.itertuples(index=False, name=None)]
+        try:
+            with self._get_connection() as cur:
+                cur.executemany(sql, records)
+                return cur.rowcount
+        except Exception as e:
+            self.logger.info(f"更新latest_bars快照表失败: {str(e)}, period: {period_table}")
+            return 0
+
+    def get_latest_bars(self, period_table, codes=None):
+        """
+        一次查询获取指定周期所有（或指定）股票的最后一根k线
+
+        :return: DataFrame，每只股票一行，不包含period、updated_at列
+        """
+        try:
+            with self._get_connection() as cur:
+                query = "SELECT * FROM latest_bars WHERE period = ?"
+                params = [period_table]
+                if codes:
+                    query += f" AND code IN ({','.join(['?'] * len(codes))})"
+                    params.extend(codes)
+                cur.execute(query, params)
+
+                column_names = [description[0] for description in cur.description]
+                rows = cur.fetchall()
+
+            if not rows:
+                return pd.DataFrame()
+
+            df = pd.DataFrame(rows, columns=column_names).drop(columns=['period', 'updated_at'])
+            if df['time'].isna().all():
+                df = df.drop(columns=['time'])
+            return df
+        except Exception as e:
+            self.logger.info(f"读取latest_bars快照表时出错: {str(e)}, period: {period_table}")
+            return pd.DataFrame()
+
+    def delete_latest_bars(self, period_table, codes=None):
+        """删除快照表中指定周期（或指定股票）的数据"""
+        with self._get_connection() as cur:
+            query = "DELETE FROM latest_bars WHERE period = ?"
+            params = [period_table]
+            if codes:
+                query += f" AND code IN ({','.join(['?'] * len(codes))})"
+                params.extend(codes)
+            cur.execute(query, params)
+            return cur.rowcount
+
+
+    # ----------------------fetch_journal下载日志表：记录每只股票每个周期本轮更新的完成状态与水位线-----------------------------------------
+    FETCH_JOURNAL_DONE = 'done'
+    FETCH_JOURNAL_FAILED = 'failed'
+
+    def init_fetch_journal_table(self):
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS fetch_journal (
+            period TEXT NOT NULL,                       -- 周期表名，例如stock_data_1d
+            code TEXT NOT NULL,
+            target_date DATE NOT NULL,                  -- 本轮更新的目标交易日
+            status TEXT NOT NULL,                       -- done / failed
+            watermark DATE,                             -- 处理完成后本地数据的最后日期
+            error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (period, code)
+        )
+        """
+        self.create_table('fetch_journal', create_table_sql)
+
+    def save_fetch_journal(self, period_table, records):
+        """
+        记录股票下载状态，每只股票每个周期只保留最近一次的记录
+
+        :param period_table: 周期表名，例如stock_data_1d
+        :param records: [(code, target_date, status, watermark, error), ...]
+        :return: 操作的行数
+        """
+        if not records:
+            return 0
+
+        sql = """INSERT INTO fetch_journal (period, code, target_date, status, watermark, error, updated_at)
+                 VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                 ON CONFLICT(period, code) DO UPDATE SET target_date = excluded.target_date, status = excluded.status,
+                     watermark = excluded.watermark, error = excluded.error, updated_at = CURRENT_TIMESTAMP"""
+        try:
+            with self._get_connection() as cur:
+                cur.executemany(sql, [(period_table,) + tuple(record) for record in records])
+                return cur.rowcount
+        except Exception as e:
+            self.logger.info(f"写入fetch_journal下载日志失败: {str(e)}, period: {period_table}")
+            return 0
+
+    def get_fetch_journal_done_codes(self, period_table, target_date):
+        """
+        获取指定周期本轮（target_date）已完成的股票代码
+
+        :return: set
+        """
+        try:
+            with self._get_connection() as cur:
+                cur.execute("SELECT code FROM fetch_journal WHERE period = ? AND target_date = ? AND status = ?",
+                            (period_table, target_date, self.FETCH_JOURNAL_DONE))
+                return {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            self.logger.info(f"读取fetch_journal下载日志时出错: {str(e)}, period: {period_table}")
+            return set()
+
+    def delete_fetch_journal(self, period_table=None):
+        """清空下载日志，period_table为None时清空所有周期"""
+        with self._get_connection() as cur:
+            if period_table is None:
+                cur.execute("DELETE FROM fetch_journal")
+            else:
+                cur.execute("DELETE FROM fetch_journal WHERE period = ?", (period_table,))
+            return cur.rowcount
 
 # 测试代码
 if __name__ == "__main__":
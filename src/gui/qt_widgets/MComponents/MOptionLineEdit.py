@@ -1,12 +1,15 @@
 # gui/qt_widgets/MComponents/MOptionLineEdit.py
 
-from PyQt5.QtWidgets import QLineEdit, QListWidget, QWidget
-from PyQt5.QtCore import pyqtSignal, QTimer, Qt
+from PyQt5.QtWidgets import QLineEdit, QListView, QWidget
+from PyQt5.QtCore import pyqtSignal, QTimer, Qt, QStringListModel
 import logging
 
+from utils.option_search_index import OptionSearchIndex
+
 class MOptionLineEdit(QLineEdit):
     """
     带有选项列表的LineEdit控件
+    输入时通过OptionSearchIndex查找（代码前缀、名称子串、拼音首字母），选项列表为模型/视图，只绘制可见行
     """
     # 自定义信号
     optionSelected = pyqtSignal(str)  # 当选项被选中时发出信号
@@ -16,7 +19,11 @@ class MOptionLineEdit(QLineEdit):
         self.logger = logging.getLogger(__name__)
         
         # 初始化选项列表
-        self.options_list_widget = QListWidget()
+        self.options_model = QStringListModel(self)
+        self.options_list_widget = QListView()
+        self.options_list_widget.setModel(self.options_model)
+        self.options_list_widget.setUniformItemSizes(True)
+        self.options_list_widget.setEditTriggers(QListView.NoEditTriggers)
         # 使用更可靠的父窗口设置方式
         if parent:
             self.options_list_widget.setParent(parent)
@@ -30,10 +37,11 @@ class MOptionLineEdit(QLineEdit):
         # 数据属性
         self.all_options = []
         self.filtered_options = []
+        self.search_index = OptionSearchIndex()
         
         # 连接信号
         self.textChanged.connect(self.on_text_changed)
-        self.options_list_widget.itemClicked.connect(self.on_option_selected)
+        self.options_list_widget.clicked.connect(self.on_option_selected)
         self.editingFinished.connect(self.hide_options_list)
         
         # 安装事件过滤器
@@ -47,6 +55,7 @@ class MOptionLineEdit(QLineEdit):
         """
         self.all_options = list(options) if options else []
         self.filtered_options = self.all_options[:]
+        self.search_index.set_options(self.all_options)
         
     def on_text_changed(self, text):
         """
@@ -57,13 +66,8 @@ class MOptionLineEdit(QLineEdit):
         except:
             pass  # 忽略日志初始化问题
             
-        if not text:
-            # 显示所有选项
-            self.filtered_options = self.all_options[:]
-        else:
-            # 根据输入过滤选项
-            self.filtered_options = [option for option in self.all_options 
-                                   if text.lower() in option.lower()]
+        # 为空时显示所有选项，否则按索引查找（排序后最多max_results个，输入追加字符时在上次结果中过滤）
+        self.filtered_options = self.search_index.search(text)
         
         # 更新选项列表显示
         self.update_options_list()
@@ -79,12 +83,7 @@ class MOptionLineEdit(QLineEdit):
         """
         更新选项列表显示
         """
-        # 清空现有选项
-        self.options_list_widget.clear()
-        
-        # 添加过滤后的选项
-        for option in self.filtered_options:
-            self.options_list_widget.addItem(option)
+        self.options_model.setStringList(self.filtered_options)
             
     def position_options_list(self):
         """
@@ -116,11 +115,11 @@ class MOptionLineEdit(QLineEdit):
         # self.options_list_widget.setZValue(1000)
         self.options_list_widget.activateWindow()
         
-    def on_option_selected(self, item):
+    def on_option_selected(self, index):
         """
         处理选项被点击
         """
-        selected_text = item.text()
+        selected_text = index.data()
         try:
             self.logger.debug(f"选中的选项为：{selected_text}")
         except:
@@ -177,7 +176,7 @@ class MOptionLineEdit(QLineEdit):
             self.on_text_changed(current_text)
         else:
             # 如果没有文本，显示所有选项
-            self.filtered_options = self.all_options[:]
+            self.filtered_options = self.search_index.search("")
             self.update_options_list()
             if self.filtered_options:
                 self.position_options_list()
@@ -142,10 +142,9 @@ class AmountWidget(BaseIndicatorWidget):
         if self.type != sender.type:
             # self.logger.info(f"不响应其他窗口的鼠标移动事件")
             return
-        amount = self.df_data.iloc[closest_index]['amount'] / 100000000
-        self.label_total_amount.setText(f"总金额：{amount:.2f}亿")
+        self.label_total_amount.setText(self.get_label_texts('amount', "总金额：", "亿", 100000000)[closest_index])
 
-        change_percent = self.df_data.iloc[closest_index]['change_percent']
+        change_percent = self.get_column_values('change_percent')[closest_index]
         if change_percent > 0:
             self.label_total_amount.setStyleSheet(f"color: {dict_kline_color_hex[IndicatrosEnum.KLINE_ASC.value]};")
         else:
@@ -1,9 +1,10 @@
 # base_chart_widget.py
-from PyQt5.QtCore import Qt, pyqtSignal, QObject
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QTimer, QPointF
 from PyQt5 import QtWidgets, uic, QtGui
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 import pyqtgraph as pg
 import numpy as np
+import pandas as pd
 
 from manager.period_manager import TimePeriod
 
@@ -24,6 +25,49 @@ class SignalManager(QObject):
 # 创建全局信号管理器实例
 signal_manager = SignalManager()
 
+class MouseMoveCoalescer(QObject):
+    '''
+    合并鼠标移动事件：所有联动的指标图共用，每帧（约16ms）最多处理一次
+        空闲时的第一次移动立即处理，之后同一帧内的移动只保留最后一次，帧结束时处理
+        每次处理都会触发全部指标图的十字线、标签更新，合并后高频鼠标事件不再堆积
+    '''
+    FRAME_INTERVAL_MS = 16
+
+    def __init__(self):
+        super().__init__()
+        self.pending = None     # (widget, pos) 本帧内最后一次未处理的移动
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def post(self, widget, pos):
+        if self.timer.isActive():
+            self.pending = (widget, QPointF(pos))
+            return
+        self.timer.start()
+        self.dispatch(widget, pos)
+
+    def cancel(self, widget):
+        if self.pending is not None and self.pending[0] is widget:
+            self.pending = None
+
+    def flush(self):
+        if self.pending is None:
+            return
+        widget, pos = self.pending
+        self.pending = None
+        self.timer.start()
+        self.dispatch(widget, pos)
+
+    def dispatch(self, widget, pos):
+        try:
+            widget.handle_mouse_moved(pos)
+        except RuntimeError:    # 控件已销毁
+            pass
+
+mouse_move_coalescer = MouseMoveCoalescer()
+
 class BaseIndicatorWidget(QWidget):
     # 定义自定义信号。问题：虽然信号属于类，但是连接却是和示例绑定的，因此无法实现父类中触发信号，传递到所有子类槽函数响应。实际上只有触发信号的子类示例的槽函数响应。
     # sig_update_labels = pyqtSignal(int)  # 点击信号
@@ -37,11 +81,15 @@ class BaseIndicatorWidget(QWidget):
     # _shared_x_labels = {}
     # _shared_left_y_labels = {}
 
+    BAR_HIT_DISTANCE = 0.25 / 2     # 鼠标与k线中心的最大距离
+
     def __init__(self, data, type=0, parent=None):
         super(BaseIndicatorWidget, self).__init__(parent)
 
         self.item = None
         self.df_data = None
+        self.dict_label_cache = {}      # {列名: 列数据数组, (列名, 前缀, 后缀, 除数): 每根k线的标签文本数组}，数据变化时清空
+        self.label_cache_data = None
         self.logger = None
         self.plot_widget = None
         self.type = type   # 0：行情，1：策略，2：复盘
@@ -173,10 +221,44 @@ class BaseIndicatorWidget(QWidget):
     def update_data(self, data):
         # self.logger.info(f"更新数据{self.get_chart_name()}, data长度：{len(data)}")
         self.df_data = data
+        self.clear_label_cache()
         self.update_widget_labels()
         self.draw()
         self.update()
 
+    def append_data(self, data):
+        '''
+            回放前进一根k线：不清空、重建图表，图元只绘制新增的一根
+            坐标轴范围由调用方随后的auto_scale_to_latest、slot_range_changed调整
+        '''
+        if not self.can_update_incrementally(data, 1):
+            self.update_data(data)
+            return
+
+        self.df_data = data
+        self.clear_label_cache()
+        self.update_widget_labels()
+        self.item.append_data(data)
+
+    def remove_last_data(self, data):
+        '''回放后退一根k线：不清空、重建图表，图元丢弃最后一根'''
+        if not self.can_update_incrementally(data, -1):
+            self.update_data(data)
+            return
+
+        self.df_data = data
+        self.clear_label_cache()
+        self.update_widget_labels()
+        self.item.remove_last_data(data)
+
+    def can_update_incrementally(self, data, length_change):
+        '''新数据与当前数据只相差最后一根k线，且列结构不变时才能增量更新'''
+        if self.item is None or self.df_data is None or self.df_data.empty or data is None or data.empty:
+            return False
+        if len(data) != len(self.df_data) + length_change:
+            return False
+        return data.columns.equals(self.df_data.columns) and self.validate_data()
+
     def update_widget_labels(self):
         """钩子方法：子类可以重写此方法添加额外的标签更新"""
         pass
@@ -187,20 +269,50 @@ class BaseIndicatorWidget(QWidget):
     def get_plot_widget(self):
         return self.plot_widget
     
+    def clear_label_cache(self):
+        self.dict_label_cache.clear()
+        self.label_cache_data = self.df_data
+
+    def get_column_values(self, column):
+        '''列数据的numpy数组，按数据缓存，鼠标移动时按下标取值'''
+        if self.label_cache_data is not self.df_data:
+            self.clear_label_cache()
+
+        values = self.dict_label_cache.get(column)
+        if values is None:
+            values = self.df_data[column].to_numpy()
+            self.dict_label_cache[column] = values
+        return values
+
+    def get_label_texts(self, column, prefix="", suffix="", divisor=1):
+        '''
+        每根k线的标签文本数组（数值保留两位小数），按数据缓存，同一列只格式化一次
+        例如：get_label_texts('ma5', 'MA5:')[index]
+        '''
+        values = self.get_column_values(column)
+        key = (column, prefix, suffix, divisor)
+        texts = self.dict_label_cache.get(key)
+        if texts is None:
+            if np.issubdtype(values.dtype, np.number):
+                texts = np.char.mod('%.2f', values.astype(np.float64) / divisor)
+            else:
+                texts = pd.Series(values).astype(str).to_numpy().astype(str)   # 与pandas显示一致（日期时间不含'T'）
+            if prefix or suffix:
+                texts = np.char.add(np.char.add(prefix, texts), suffix)
+            self.dict_label_cache[key] = texts
+        return texts
+
     def get_date_text_with_style(self, index):
         try:
             # 检查索引是否有效
             if index < 0 or index >= len(self.df_data):
                 return ""
             
-            # 使用 .loc 访问器获取指定行的 时间列数据
             s_col_name = 'date'
             if TimePeriod.is_minute_level(self.period):
                 s_col_name = 'time'
-                
-            date_str = self.df_data.loc[index, s_col_name]
-            label_main_x_text_with_style = '<div style="color: black; background-color: white; border: 3px solid black; padding: 2px;">{}</div>'.format(date_str)
-            return label_main_x_text_with_style
+
+            return self.get_label_texts(s_col_name, '<div style="color: black; background-color: white; border: 3px solid black; padding: 2px;">', '</div>')[index]
         except Exception as e:
             self.logger.error(f"获取日期文本时出错: {e}")
             return ""
@@ -357,7 +469,35 @@ class BaseIndicatorWidget(QWidget):
         # 触发Y轴范围调整
         self.slot_range_changed()
 
+    def get_bar_x_values(self):
+        """钩子方法：k线中心的x坐标，默认第i根k线位于x=i；x坐标不均匀的子类返回递增数组，按二分查找"""
+        return None
+
+    def get_closest_index(self, x_val):
+        """
+        鼠标x坐标对应的k线
+        返回:
+            (index, x): k线索引及其中心x坐标，鼠标不在k线上时为(None, None)
+        """
+        x_values = self.get_bar_x_values()
+        if x_values is None:
+            index = int(np.floor(x_val + 0.5))
+            center = index
+        else:
+            index = int(np.searchsorted(x_values, x_val))
+            if index > 0 and (index == len(x_values) or x_val - x_values[index - 1] <= x_values[index] - x_val):
+                index -= 1
+            center = float(x_values[index]) if 0 <= index < len(x_values) else None
+
+        if 0 <= index < len(self.df_data) and center is not None and abs(center - x_val) <= self.BAR_HIT_DISTANCE:
+            return index, center
+        return None, None
+
     def slot_mouse_moved(self, pos):
+        """鼠标移动事件：合并到帧，每帧最多处理一次"""
+        mouse_move_coalescer.post(self, pos)
+
+    def handle_mouse_moved(self, pos):
         """鼠标移动事件处理"""
         if self.plot_widget is None or self.df_data is None or self.df_data.empty:
             return
@@ -412,22 +552,8 @@ class BaseIndicatorWidget(QWidget):
             self.left_y_label.show()
 
 
-            bar_centers = list(range(len(self.df_data)))
-            
-            closest_index = None
-            min_distance = float('inf')
-            
-            for i, center in enumerate(bar_centers):
-                distance = abs(center - x_val)
-                if distance <= 0.25 / 2:
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_index = i
-            
-            closest_x = None    # 这里closest_x其实和closest_index一样，都是从0开始
+            closest_index, closest_x = self.get_closest_index(x_val)     # closest_x默认和closest_index一样，都是从0开始
             if closest_index is not None:
-                
-                closest_x = bar_centers[closest_index]
 
                 # 显示所有图表的垂直线
                 # for chart_name, v_line in BaseIndicatorWidget._shared_v_lines.items():
@@ -508,6 +634,7 @@ class BaseIndicatorWidget(QWidget):
         """
         当鼠标离开控件时，隐藏所有标签和十字线
         """
+        mouse_move_coalescer.cancel(self)
         self.hide_all_labels()
         super().leaveEvent(event)
 
@@ -12,6 +12,7 @@ from gui.qt_widgets.MComponents.indicators.setting.boll_setting_dialog import Bo
 
 from manager.indicators_config_manager import *
 from indicators.stock_data_indicators import *
+from indicators.indicator_registry import get_indicator_registry
 
 class BollWidget(BaseIndicatorWidget):
     def __init__(self, data, type, parent=None):
@@ -99,7 +100,7 @@ class BollWidget(BaseIndicatorWidget):
         result = dlg.exec()
         if result == QDialog.Accepted:
             self.logger.info("更新BOLL设置")
-            auto_boll_calulate(self.df_data)
+            get_indicator_registry().ensure(self.df_data, IndicatrosEnum.BOLL.value)
             self.update_data(self.df_data)
             self.auto_scale_to_latest(120)
     
@@ -149,7 +150,7 @@ class BollWidget(BaseIndicatorWidget):
         }
         for id, setting in dict_settings.items():
             if id in self.dict_label.keys() and setting.name in self.df_data.columns:
-                self.dict_label[id].setText(f"{setting.name}:{self.df_data.iloc[closest_index][setting.name]:.2f}")
+                self.dict_label[id].setText(self.get_label_texts(setting.name, f"{setting.name}:")[closest_index])
                 self.dict_label[id].setVisible(setting.visible)
                 self.dict_label[id].setStyleSheet(f"color: {setting.color_hex}")
 
@@ -20,18 +20,36 @@ from gui.qt_widgets.MComponents.indicators.boll_widget import BollWidget
 from gui.qt_widgets.MComponents.mloading_widget import LoadingWidget
 
 from indicators import stock_data_indicators as sdi
+from indicators.indicator_registry import get_indicator_registry, DEFAULT_INDICATOR_NAMES
 
 from manager.period_manager import TimePeriod, ReviewPeriodProcessData
+from manager.period_alignment_manager import get_period_alignment_manager
 from manager.bao_stock_data_manager import BaostockDataManager
 
 from manager.indicators_config_manager import get_indicator_config_manager, IndicatrosEnum
 
+from thread.task_pool import get_default_task_pool
+from thread.stock_data_load_task import StockDataLoadTask
+
 class IndicatorsViewWidget(QWidget):
     _shared_object_id = 0
 
+    # 各指标图需要计算的指标（见indicator_registry），只计算已显示的指标图
+    dict_panel_indicator_names = {
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.VOLUME): ['change_percent'],
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.AMOUNT): ['change_percent'],
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.MACD): [IndicatrosEnum.MACD.value],
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.KDJ): [IndicatrosEnum.KDJ.value],
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.RSI): [IndicatrosEnum.RSI.value],
+        IndicatrosEnum.get_chinese_label(IndicatrosEnum.BOLL): [IndicatrosEnum.BOLL.value],
+    }
+
     sig_current_animation_index_changed = pyqtSignal(int)
     sig_init_review_animation_finished = pyqtSignal(bool, object)
     sig_animation_play_finished = pyqtSignal()
+    sig_chart_data_loaded = pyqtSignal(str)     # 异步加载的图表数据已显示，参数为code
+
+    LOADING_DELAY_MS = 200      # 异步加载超过该时长仍未完成时才显示Loading，避免命中缓存时闪烁
 
     def __init__(self, parent=None):
         super(IndicatorsViewWidget, self).__init__(parent)
@@ -61,6 +79,12 @@ class IndicatorsViewWidget(QWidget):
 
         self.current_selected_code = ""
         self.dict_stock_data = {}         # {TimePeriod: DataFrame}，只保存选中code的各个级别的k线数据
+        self.df_chart_source = None       # 当前图表数据截取自的完整k线数据，用于判断回放时能否增量更新图表
+
+        # 图表数据异步加载：每次请求递增request_id，只显示最后一次请求的结果
+        self.chart_load_request_id = 0
+        self.pending_chart_load = None    # (request_id, data) 正在加载的请求
+        self.chart_load_task_id = None
 
 
         # 复盘相关参数
@@ -105,8 +129,7 @@ class IndicatorsViewWidget(QWidget):
         self.btn_time.setEnabled(False)
         self.btn_1m.setEnabled(False)
         self.btn_5m.setEnabled(False)
-        self.btn_10m.setEnabled(False)
-        self.btn_120m.setEnabled(False)
+        self.btn_10m.setEnabled(False)     # 选中股票后按本地是否存储了源周期启用，见update_10m_btn
 
         # self.init_stock_card_list()
 
@@ -211,11 +234,30 @@ class IndicatorsViewWidget(QWidget):
             if btn.isChecked():  # 忽略选中的按钮
                 continue
             
-            if self.period_button_group.id(btn) in [0, 2, 6]:
+            # 1分钟无法由已存储的周期合成
+            if self.period_button_group.id(btn) in [0]:
+                continue
+
+            if btn is self.btn_10m:
+                btn.setEnabled(b_enable and self.has_10m_source())
                 continue
 
             btn.setEnabled(b_enable)
 
+    def has_10m_source(self):
+        '''10分钟k线不下载，只能由本地的5分钟k线合成（见kline_resampler），当前股票存储了10分钟或5分钟k线时可用'''
+        if not self.current_selected_code:
+            return False
+        bao_stock_data_manager = BaostockDataManager()
+        return bao_stock_data_manager.has_stored_period(self.current_selected_code, TimePeriod.MINUTE_10) or \
+            bao_stock_data_manager.get_resample_source_period(self.current_selected_code, TimePeriod.MINUTE_10) is not None
+
+    def update_10m_btn(self):
+        '''切换股票后更新10分钟按钮的可用状态（选中的按钮、动画播放中不修改）'''
+        if self.btn_10m.isChecked() or self.is_playing:
+            return
+        self.btn_10m.setEnabled(self.has_10m_source())
+
     def get_current_date_time_by_index(self, index):
         if self.df_data is None or self.df_data.empty:  # 获取数据失败
             return None
@@ -272,6 +314,17 @@ class IndicatorsViewWidget(QWidget):
     
         return self.dict_stock_data[time_period]
     
+    def get_current_period(self):
+        checked_btn = self.period_button_group.checkedButton()
+        if checked_btn is None:
+            return TimePeriod.DAY
+        return TimePeriod.from_label(checked_btn.text())
+
+    def get_enabled_periods(self):
+        '''已启用的周期按钮对应的周期（可切换的周期），用于预取'''
+        return [TimePeriod.from_label(btn.text()) for btn in self.period_button_group.buttons()
+                if self.period_button_group.id(btn) >= 0 and btn.isEnabled()]
+
     def get_stock_data_by_period(self, period):
         if period not in self.dict_stock_data.keys():   # 暂无该级别数据
             return pd.DataFrame()
@@ -288,6 +341,7 @@ class IndicatorsViewWidget(QWidget):
             self.dict_stock_data.clear()
             self.dict_stock_data = {}
             self.current_selected_code = code
+            self.update_10m_btn()
         
         period_text = checked_btn.text()
         time_period = TimePeriod.from_label(period_text)
@@ -321,6 +375,80 @@ class IndicatorsViewWidget(QWidget):
         else:
             # self.logger.info(f"{code}的{period_text}数据已存在，无需重复加载")
             pass
+
+    def update_chart_async(self, data):
+        '''
+            在后台线程读取k线并计算指标，完成后在界面线程更新图表（行情模块切换股票）
+            已有当前周期数据时直接更新；再次调用时取消尚未完成的上一次加载，其结果到达后丢弃
+        '''
+        code = data['code']
+        period = self.get_current_period()
+        df_period = self.get_stock_data_by_period(period)
+        if code == self.current_selected_code and df_period is not None and not df_period.empty:
+            self.cancel_chart_load()
+            self.update_chart(data)
+            self.sig_chart_data_loaded.emit(code)
+            return
+
+        self.cancel_chart_load()
+        self.chart_load_request_id += 1
+        request_id = self.chart_load_request_id
+        self.pending_chart_load = (request_id, data)
+
+        task = StockDataLoadTask(request_id, code, period, self.get_visible_indicator_names())
+        task.task_completed.connect(self.slot_chart_data_loaded)
+        task.task_error.connect(self.slot_chart_data_load_error)
+        self.chart_load_task_id = get_default_task_pool().submit(task)
+        QtCore.QTimer.singleShot(self.LOADING_DELAY_MS, lambda: self.show_chart_loading(request_id))
+
+    def show_chart_loading(self, request_id):
+        if self.pending_chart_load is not None and self.pending_chart_load[0] == request_id:
+            self.show_loading("dots", "loading...")
+
+    def cancel_chart_load(self):
+        '''取消尚未完成的图表数据加载'''
+        if self.chart_load_task_id is not None:
+            get_default_task_pool().cancel_task(self.chart_load_task_id)
+            self.chart_load_task_id = None
+        if self.pending_chart_load is not None:
+            self.pending_chart_load = None
+            self.hide_loading()
+
+    def slot_chart_data_loaded(self, task_id, result):
+        if result is None or self.pending_chart_load is None or result['request_id'] != self.pending_chart_load[0]:
+            # self.logger.info(f"丢弃已过期的图表数据：{task_id}")
+            return
+
+        data = self.pending_chart_load[1]
+        self.pending_chart_load = None
+        self.chart_load_task_id = None
+        self.hide_loading()
+
+        code, period, df_data = result['code'], result['period'], result['data']
+        if df_data is not None and not df_data.empty:
+            if code != self.current_selected_code:
+                self.dict_stock_data = {}
+                self.current_selected_code = code
+                self.update_10m_btn()
+            self.dict_stock_data[period] = df_data
+        # 无本地数据时update_chart按原流程从Baostock获取
+        self.update_chart(data)
+        self.sig_chart_data_loaded.emit(code)
+
+    def slot_chart_data_load_error(self, task_id, error):
+        if self.chart_load_task_id != task_id:
+            return
+        self.logger.warning(f"后台加载图表数据失败：{error}")
+        self.chart_load_task_id = None
+        self.pending_chart_load = None
+        self.hide_loading()
+
+    def get_period_alignment(self):
+        '''选中code已加载各周期的k线索引映射，周期数据有变化时重新计算'''
+        alignment = get_period_alignment_manager().get_alignment(self.current_selected_code)
+        for period, df_period in self.dict_stock_data.items():
+            alignment.set_period_data(period, df_period)
+        return alignment
     def show_default_indicator(self):
         self.btn_indicator_volume.setChecked(True)
         self.slot_btn_indicator_volume_clicked()
@@ -338,6 +466,10 @@ class IndicatorsViewWidget(QWidget):
         self.kline_widget.set_stock_name(data['name'])
 
         df = self.get_stock_data()
+        # 在完整数据上按需计算已显示的指标图需要的指标（已计算过的跳过），回放截取的数据随之带有指标列
+        self.ensure_indicator_data(df, self.get_visible_indicator_names())
+        df_previous_data, df_previous_source = self.df_data, self.df_chart_source
+        self.df_chart_source = df
         if start_index is not None and start_index != "":  # 获取数据成功
             # self.logger.info(f"df的长度: {len(df)}")
             # if self.max_animation_index == -1:
@@ -376,6 +508,13 @@ class IndicatorsViewWidget(QWidget):
         if self.df_data is None or self.df_data.empty:  # 获取数据失败
             return
 
+        # 回放逐根前进、后退时（同一份数据只多/少最后一根），各图表增量更新，不重建整幅图
+        length_change = 0
+        if start_index is not None and start_index != "" and df_previous_source is df and df_previous_data is not None:
+            length_change = len(self.df_data) - len(df_previous_data)
+            if length_change not in (1, -1):
+                length_change = 0
+
         # if self.kline_widget is None:
         #     self.kline_widget = KLineWidget(self.df_data, self)
         #     self.verticalLayout.addWidget(self.kline_widget, 3)
@@ -386,26 +525,41 @@ class IndicatorsViewWidget(QWidget):
         #     if kline_plot_widget:
         #         kline_plot_widget.sigRangeChanged.connect(self.slot_range_changed)
         
-        self.kline_widget.update_data(self.df_data)
+        self.update_widget_data(self.kline_widget, self.df_data, length_change)
 
         is_ma_checked = self.btn_indicator_ma.isChecked()
         self.kline_widget.show_ma(is_ma_checked)
 
-        self.update_indicator_chart(self.df_data)
+        self.update_indicator_chart(self.df_data, length_change)
 
         #if start_date is None or start_date == "":
+        x_range = self.kline_widget.get_current_range()[0]
         self.kline_widget.auto_scale_to_latest(120)
+        if length_change != 0 and self.kline_widget.get_current_range()[0] == x_range:
+            # 增量更新时未重设坐标轴范围，X轴范围不变（数据不足120根）时不会触发sigRangeChanged，需手动同步Y轴
+            self.slot_range_changed()
 
         # 更新最后一根k线指标值
 
-    def update_indicator_chart(self, df_data):
+    def update_widget_data(self, widget, df_data, length_change=0):
+        '''
+            length_change为1、-1时增量追加、删除最后一根k线，否则全量更新
+        '''
+        if length_change == 1:
+            widget.append_data(df_data)
+        elif length_change == -1:
+            widget.remove_last_data(df_data)
+        else:
+            widget.update_data(df_data)
+
+    def update_indicator_chart(self, df_data, length_change=0):
         is_volume_checked = self.btn_indicator_volume.isChecked()
         if is_volume_checked:
             volume_widget = self.indicator_widgets[IndicatrosEnum.get_chinese_label(IndicatrosEnum.VOLUME)]
             if volume_widget is None:
                 self.btn_indicator_volume.setChecked(False)
             else:
-                volume_widget.update_data(df_data)
+                self.update_widget_data(volume_widget, df_data, length_change)
             
 
         is_amount_checked = self.btn_indicator_amount.isChecked()
@@ -414,7 +568,7 @@ class IndicatorsViewWidget(QWidget):
             if amount_widget is None:
                 self.btn_indicator_amount.setChecked(False)
             else:
-                amount_widget.update_data(df_data)
+                self.update_widget_data(amount_widget, df_data, length_change)
 
         is_macd_checked = self.btn_indicator_macd.isChecked()
         if is_macd_checked:
@@ -422,7 +576,7 @@ class IndicatorsViewWidget(QWidget):
             if macd_widget is None:
                 self.btn_indicator_macd.setChecked(False)
             else:
-                macd_widget.update_data(df_data)
+                self.update_widget_data(macd_widget, df_data, length_change)
 
         is_kdj_checked = self.btn_indicator_kdj.isChecked()
         if is_kdj_checked:
@@ -430,7 +584,7 @@ class IndicatorsViewWidget(QWidget):
             if kdj_widget is None:
                 self.btn_indicator_kdj.setChecked(False)
             else:
-                kdj_widget.update_data(df_data)
+                self.update_widget_data(kdj_widget, df_data, length_change)
 
         is_rsi_checked = self.btn_indicator_rsi.isChecked()
         if is_rsi_checked:
@@ -438,7 +592,7 @@ class IndicatorsViewWidget(QWidget):
             if rsi_widget is None:
                 self.btn_indicator_rsi.setChecked(False)
             else:
-                rsi_widget.update_data(df_data)
+                self.update_widget_data(rsi_widget, df_data, length_change)
 
         is_boll_checked = self.btn_indicator_boll.isChecked()
         if is_boll_checked:
@@ -446,7 +600,7 @@ class IndicatorsViewWidget(QWidget):
             if boll_widget is None:
                 self.btn_indicator_boll.setChecked(False)
             else:
-                boll_widget.update_data(df_data)
+                self.update_widget_data(boll_widget, df_data, length_change)
 
 
     def draw_volume(self):
@@ -462,35 +616,36 @@ class IndicatorsViewWidget(QWidget):
         return widget
 
     def draw_kdj(self):
-        # 因源数据中没有自带KDJ指标，需要手动计算
-        if IndicatrosEnum.KDJ_K.value not in self.df_data.columns or IndicatrosEnum.KDJ_D.value not in self.df_data.columns or IndicatrosEnum.KDJ_J.value not in self.df_data.columns:
-            sdi.kdj(self.df_data) 
-
         widget = KdjWidget(self.df_data, self.type, self)
         return widget
 
     def draw_rsi(self):
-        # 因源数据中没有自带RSI指标，需要手动计算
-        rsi_columns = get_indicator_config_manager().get_user_config_columns_by_indicator_type(IndicatrosEnum.RSI.value)
-        missing_rsi = [col for col in rsi_columns if col not in self.df_data.columns]
-        if missing_rsi:
-            sdi.rsi(self.df_data, period=6)   # 计算RSI6
-            sdi.rsi(self.df_data, period=12)  # 计算RSI12
-            sdi.rsi(self.df_data, period=24)  # 计算RSI24
-
         widget = RsiWidget(self.df_data, self.type, self)
         return widget
 
     def draw_boll(self):
-        # 因源数据中没有自带BOLL指标，需要手动计算
-        boll_columns = [IndicatrosEnum.BOLL_UPPER.value, IndicatrosEnum.BOLL_MID.value, IndicatrosEnum.BOLL_LOWER.value]
-        missing_boll = [col for col in boll_columns if col not in self.df_data.columns]
-        if missing_boll:
-            sdi.boll(self.df_data)
-
         widget = BollWidget(self.df_data, self.type, self)
         return widget
 
+    def get_visible_indicator_names(self):
+        list_names = list(DEFAULT_INDICATOR_NAMES)
+        for indicator_name in self.indicator_widgets:
+            list_names.extend(self.dict_panel_indicator_names.get(indicator_name, []))
+        return list_names
+
+    def ensure_indicator_data(self, df, list_indicator_names):
+        '''
+            按需计算指标列，返回是否有新计算的指标
+            df为当前图表数据截取自的完整数据时，重新截取self.df_data，使其带上新计算的列
+        '''
+        if df is None or df.empty:
+            return False
+        if not get_indicator_registry().ensure(df, list_indicator_names):
+            return False
+        if df is self.df_chart_source and self.df_data is not None and self.df_data is not df:
+            self.df_data = df.iloc[:len(self.df_data)]
+        return True
+
     def add_indicator_chart(self, indicator_name):
         '''
             动态添加指标图
@@ -510,6 +665,12 @@ class IndicatorsViewWidget(QWidget):
             self.logger.info(f"指标 {indicator_name} 已经存在")
             return self.indicator_widgets[indicator_name]
 
+        # 新显示的指标图：先计算其需要的指标
+        if self.df_chart_source is not None:
+            self.ensure_indicator_data(self.df_chart_source, self.dict_panel_indicator_names.get(indicator_name, []))
+        elif self.df_data is not None:
+            self.ensure_indicator_data(self.df_data, self.dict_panel_indicator_names.get(indicator_name, []))
+
         indicator_widget = None
         if indicator_name == IndicatrosEnum.get_chinese_label(IndicatrosEnum.VOLUME):
             indicator_widget = self.draw_volume()
@@ -757,15 +918,14 @@ class IndicatorsViewWidget(QWidget):
         last_period_chinese_text = TimePeriod.get_chinese_label(last_period)
         target_period_chinese_text = TimePeriod.get_chinese_label(target_period)
         self.logger.info(f"已切换成功的最小周期：{min_period_chinese_text}，来源周期：{last_period_chinese_text}，目标周期：{target_period_chinese_text}")
-        current_time = self.dict_period_process_data[last_period].current_date_time
-        self.logger.info(f"来源周期的current_time：{current_time}")
-        if target_period not in self.dict_period_process_data:
-            if TimePeriod.is_minute_level(target_period):
-                return self.get_target_index_by_time(current_time, target_period)
-                
-            return -1
-        
-        if TimePeriod.is_minute_level(self.min_period) and TimePeriod.is_minute_level(target_period):
+        alignment = self.get_period_alignment()
+        last_index = self.dict_period_process_data[last_period].current_index
+        self.logger.info(f"来源周期的current_index：{last_index}，current_time：{self.dict_period_process_data[last_period].current_date_time}")
+        if target_period >= TimePeriod.WEEK:
+            # 本周未结束时，Baostock无本周周线数据，因此取来源k线日期之前的最后一根
+            return alignment.get_before_day_index(last_period, last_index, target_period)
+
+        if target_period in self.dict_period_process_data and TimePeriod.is_minute_level(self.min_period) and TimePeriod.is_minute_level(target_period):
             # 最小周期当前索引的time。问题：已加载15、30、60分钟数据时，15切30,30分钟级别能前进，切换15分钟还是未前进的时间。
             # df = self.get_stock_data_by_period(self.min_period)
             # index = self.dict_period_process_data[self.min_period].current_index
@@ -796,14 +956,11 @@ class IndicatorsViewWidget(QWidget):
                 self.logger.info(f"b_check_2: {b_check_2}")
 
             if b_check and b_check_2:
-                self.logger.info(f"来源周期last_period索引没有变化，自动切换到目标周期target_period的上次索引时间")
-                current_time = self.dict_period_process_data[target_period].current_date_time
+                self.logger.info(f"来源周期last_period索引没有变化，自动切换到目标周期target_period的上次索引")
+                return self.dict_period_process_data[target_period].current_index
 
-            self.logger.info(f"更新后的current_time：{current_time}")
-
-            return self.get_target_index_by_time(current_time, target_period)
-
-        return -1
+        # 目标周期较粗时为所属的k线，较细时为包含的最后一根k线
+        return alignment.map_index(last_period, last_index, target_period)
     
     def is_period_process_data_index_changed(self):
         for period, process_data in self.dict_period_process_data.items():
@@ -812,27 +969,6 @@ class IndicatorsViewWidget(QWidget):
             
         return False
     
-    def get_target_index_by_time(self, current_time, target_period):
-        # 将current_time转换为datetime对象
-        if isinstance(current_time, str):
-            current_time = pd.to_datetime(current_time)
-
-        # 根据目标周期确定时间区间
-        target_time_intervals = self.get_time_intervals_for_period(target_period)
-
-        # 查找current_time在哪个时间区间内
-        for i, (start_time, end_time) in enumerate(target_time_intervals):
-            # 构造完整的日期时间用于比较
-            current_date = current_time.date()
-            interval_start = pd.Timestamp.combine(current_date, start_time)
-            interval_end = pd.Timestamp.combine(current_date, end_time)
-            
-            if interval_start <= current_time <= interval_end:
-                return i
-            
-        return -1
-
-
     # -----------------------复盘回放相关接口----------------------
     def init_animation(self, data, start_date, b_init=True):
         dict_return = {}
@@ -858,12 +994,12 @@ class IndicatorsViewWidget(QWidget):
             target_period = TimePeriod.from_label(target_period_text)
             current_period_date_col = 'time' if TimePeriod.is_minute_level(last_period) else 'date'
 
+            alignment = self.get_period_alignment()
             if b_init:
-                matching_indices = df[df['date'] <= start_date].index
-                if len(matching_indices) > 0:
+                start_index = alignment.find_last_index_by_date(target_period, start_date)
+                if start_index >= 0:
                         # 普通处理
-                        self.logger.info(f"动画初始化--找到 {len(matching_indices)} 个匹配的日期记录")
-                        self.start_animation_index = matching_indices[-1]
+                        self.start_animation_index = start_index
                         self.logger.info(f"start_date索引: {self.start_animation_index}")
 
                         review_period_process_data = ReviewPeriodProcessData()
@@ -888,15 +1024,11 @@ class IndicatorsViewWidget(QWidget):
                 else:
                     self.logger.warning(f"普通处理--未找到匹配的日期记录：{start_date}")
             else:
-                if checked_id >= 8:
-                    matching_indices = df[df['date'] < start_date].index    # 这里使用<是因为本周未结束时，Baostock无本周周线数据，因此加载上周周线数据。
-                else:
-                    matching_indices = df[df['date'] == start_date].index
-
-                matching_indices_len = len(matching_indices)
-                self.logger.info(f"切换--找到 {matching_indices_len} 个匹配的日期记录")
+                # 来源周期当前k线在目标周期中对应的k线
+                start_index = self.get_target_index_auto(last_period, target_period)
+                self.logger.info(f"切换--目标周期索引：{start_index}")
 
-                if matching_indices_len > 0:
+                if start_index >= 0:
                     # 周期切换步骤。来源周期，目标周期
                     # 目标周期是否第一次切换？
                     # 第一次切换默认到最后索引
@@ -912,9 +1044,7 @@ class IndicatorsViewWidget(QWidget):
                     last_start_index = self.dict_period_process_data[last_period].current_start_index
                     self.logger.info(f"来源周期[{s_last_period_text}]索引：{last_current_index}，日期：{self.dict_period_process_data[last_period].current_date_time}，来源周期[{s_last_period_text}]开始索引：{last_start_index}, 开始日期：{self.dict_period_process_data[last_period].current_start_date_time}")
                     
-                    index = self.get_target_index_auto(last_period, target_period)
-                    self.logger.info(f"目标周期索引：{index}")
-                    self.start_animation_index = matching_indices[index]
+                    self.start_animation_index = start_index
                     if target_period not in self.dict_period_process_data:
                         # 第1次切换，默认到最后索引
                         self.logger.info(f"第1次切换")
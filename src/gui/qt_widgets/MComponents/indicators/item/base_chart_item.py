@@ -0,0 +1,264 @@
+import math
+
+import pyqtgraph as pg
+from PyQt5 import QtGui, QtCore
+import numpy as np
+
+from gui.qt_widgets.MComponents.indicators.item.item_render_utils import to_float_array, get_cached_pen, get_no_brush, build_polyline_path, \
+    get_bucket_centers, aggregate_minmax, build_envelope_path
+
+'''
+    指标图元基类：视口裁剪 + 分级细节（LOD）绘制
+    1. 只绘制可见X范围及两侧余量内的数据，平移未超出已绘制范围时直接复用QPicture
+    2. ViewBox的sigRangeChanged会回调viewRangeChanged，此时只做范围判断，需要重绘时请求刷新，在下一次paint中生成QPicture
+    3. 每像素对应多根k线时按step根一组聚合（step取2的幂，保证每组至少占一个像素列），缩放级别不变时不重绘
+    4. boundingRect始终为全量数据的范围，不随绘制范围变化，自动缩放、Y轴范围计算不受影响
+    5. 回放时追加、删除最后一根k线走增量路径：新k线及其与前一根相连的指标线段单独绘制到一个图块（QPicture），
+       与已绘制的QPicture叠加显示，不重新生成整幅图；图块数量超过上限或视图超出已绘制范围时再合并重绘
+
+    子类实现：
+        get_required_columns(): 必要的数据列
+        get_y_range(): 全量数据的纵坐标范围
+        draw_range(p, start, end, step): 绘制[start, end)范围内的数据，step > 1时每step根聚合为一组；
+            折线需从start - 1开始绘制（见get_line_start），保证单根k线的图块能与前一根相连
+'''
+
+class BaseChartItem(pg.GraphicsObject):
+    RENDER_MARGIN_RATIO = 0.5       # 可见范围两侧额外绘制的宽度（相对可见宽度）
+    LOD_BARS_PER_PIXEL = 1.0        # 每像素k线数超过该值时启用聚合
+    MAX_TILES = 32                  # 增量绘制的图块数量上限，超过后合并重绘
+
+    def __init__(self, data):
+        pg.GraphicsObject.__init__(self)
+        self.check_data(data)
+
+        self.picture = QtGui.QPicture()
+        self.rendered_range = None      # 当前QPicture及图块覆盖的(start, end, step)
+        self.tiles = []                 # 增量绘制的图块[(index, QPicture)]，按追加顺序排列
+        self.set_data(data)
+
+    def get_required_columns(self):
+        return []
+
+    def check_data(self, data):
+        # 数据验证
+        required_columns = self.get_required_columns()
+        if not all(col in data.columns for col in required_columns):
+            raise ValueError(f"缺少必要的数据列，需要: {required_columns}")
+
+    def get_data(self):
+        return self.data
+
+    def set_data(self, data):
+        self.data = data                # data should be a Pandas.DataFrame (date, code, open, high, low, close...)
+        self.data_length = len(data)
+        self.dict_arrays = {}           # (列名, 缩放) -> float64缓冲区，绘制时按需转换并缓存，容量可大于data_length
+        self.bounds = self._compute_bounds()
+        self.rendered_range = None
+        self.tiles = []
+
+    def update_data(self, data):
+        self.check_data(data)
+        self.prepareGeometryChange()  # 通知框架几何形状可能发生了变化
+        self.set_data(data)
+        self.update()  # 触发重绘
+
+    def invalidate(self):
+        """颜色、显隐等绘制设置变化后调用，下一次paint时重新生成QPicture"""
+        self.rendered_range = None
+        self.tiles = []
+        self.update()
+
+    def append_data(self, data):
+        """
+        追加一根k线（data比当前数据多最后一行）：只绘制新k线所在的图块
+        data长度不符时按update_data全量更新
+        """
+        if len(data) != self.data_length + 1:
+            self.update_data(data)
+            return
+
+        self.check_data(data)
+        self.prepareGeometryChange()
+        index = self.data_length
+        for (column, scale), buffer in list(self.dict_arrays.items()):
+            if column not in data.columns:
+                del self.dict_arrays[(column, scale)]
+                continue
+            if len(buffer) <= index:
+                # 容量翻倍，均摊O(1)
+                new_buffer = np.empty(max(index * 2, 64), dtype=np.float64)
+                new_buffer[:index] = buffer[:index]
+                self.dict_arrays[(column, scale)] = buffer = new_buffer
+            buffer[index] = to_float_array(data[column].iloc[-1:])[0] / scale
+        self.data = data
+        self.data_length += 1
+
+        y_range = self.get_y_range(index)
+        if y_range is not None:
+            new_bounds = QtCore.QRectF(-1, y_range[0], self.data_length + 1, y_range[1] - y_range[0])
+            self.bounds = self.bounds.united(new_bounds) if self.bounds.isValid() else new_bounds
+        self.bounds.setRight(self.data_length)
+
+        # 已绘制范围的末尾正好是新k线、且未聚合时才能单独绘制图块
+        if self.rendered_range is not None and len(self.tiles) < self.MAX_TILES:
+            rendered_start, rendered_end, rendered_step = self.rendered_range
+            if rendered_end < index:
+                # 新k线不在已绘制范围内，视图移动到该处时由need_render触发重绘
+                self.update()
+                return
+            if rendered_step == 1 and rendered_end == index:
+                self.tiles.append((index, self.render_picture(index, index + 1, 1)))
+                self.rendered_range = (rendered_start, self.data_length, rendered_step)
+                self.update()
+                return
+        self.rendered_range = None
+        self.update()
+
+    def remove_last_data(self, data):
+        """
+        删除最后一根k线（data比当前数据少最后一行）：最后一根位于图块中时直接丢弃该图块
+        data长度不符时按update_data全量更新
+        """
+        if len(data) != self.data_length - 1:
+            self.update_data(data)
+            return
+
+        self.prepareGeometryChange()
+        self.data = data
+        self.data_length -= 1       # 缓冲区保留容量，多出的一位在下次追加时覆盖
+        self.bounds = self._compute_bounds()
+
+        if self.tiles and self.tiles[-1][0] == self.data_length:
+            self.tiles.pop()
+            rendered_start, _, rendered_step = self.rendered_range
+            self.rendered_range = (rendered_start, self.data_length, rendered_step)
+        else:
+            self.rendered_range = None
+        self.update()
+
+    def get_array(self, column, scale=1):
+        """获取列数据的float64数组，列不存在时返回None"""
+        key = (column, scale)
+        if key not in self.dict_arrays:
+            if column not in self.data.columns:
+                return None
+            values = to_float_array(self.data[column])
+            self.dict_arrays[key] = values / scale if scale != 1 else values
+        return self.dict_arrays[key][:self.data_length]
+
+    # ------------------------------------------------------------范围------------------------------------------------------------
+    def get_y_range(self, start=0):
+        """下标start及之后数据的纵坐标范围(y_min, y_max)，无有效数据时返回None"""
+        return None
+
+    def get_finite_range(self, *arrays, start=0):
+        """多个数组下标start及之后有效值的(min, max)"""
+        y_min, y_max = None, None
+        for values in arrays:
+            if values is None:
+                continue
+            values = values[start:]
+            finite = values[np.isfinite(values)]
+            if len(finite) == 0:
+                continue
+            y_min = finite.min() if y_min is None else min(y_min, finite.min())
+            y_max = finite.max() if y_max is None else max(y_max, finite.max())
+        if y_min is None:
+            return None
+        return float(y_min), float(y_max)
+
+    def _compute_bounds(self):
+        y_range = self.get_y_range() if self.data_length > 0 else None
+        if y_range is None:
+            return QtCore.QRectF()
+        y_min, y_max = y_range
+        return QtCore.QRectF(-1, y_min, self.data_length + 1, y_max - y_min)
+
+    def get_visible_range(self):
+        """
+        当前视图可见的数据下标范围及聚合步长
+
+        返回:
+            (start, end, step): 可见范围[start, end)，未加入视图时为全部数据
+        """
+        view_rect = self.viewRect()
+        if view_rect is None:
+            return 0, self.data_length, 1
+
+        start = min(max(int(math.floor(view_rect.left())), 0), self.data_length)
+        end = min(max(int(math.ceil(view_rect.right())) + 1, 0), self.data_length)
+
+        # x轴单位为k线根数，pixelWidth即每像素对应的k线数
+        return start, end, self.get_lod_step(self.pixelWidth())
+
+    def get_lod_step(self, bars_per_pixel):
+        """聚合步长：每像素k线数向上取2的幂，未超过阈值时不聚合"""
+        if bars_per_pixel > self.LOD_BARS_PER_PIXEL:
+            return 2 ** int(math.ceil(math.log2(bars_per_pixel)))
+        return 1
+
+    def need_render(self):
+        if self.rendered_range is None:
+            return True
+        start, end, step = self.get_visible_range()
+        rendered_start, rendered_end, rendered_step = self.rendered_range
+        return step != rendered_step or start < rendered_start or end > rendered_end
+
+    def viewRangeChanged(self):
+        # 视图范围变化（平移、缩放、窗口尺寸变化）时由ViewBox回调
+        if self.need_render():
+            self.update()
+
+    # ------------------------------------------------------------绘制------------------------------------------------------------
+    def generatePicture(self):
+        """生成可见范围及两侧余量内的QPicture"""
+        start, end, step = self.get_visible_range()
+        margin = int((end - start) * self.RENDER_MARGIN_RATIO) + step
+        start = max(start - margin, 0)
+        end = min(end + margin, self.data_length)
+        start -= start % step       # 组边界对齐到step的整数倍，平移时聚合结果保持稳定
+
+        self.picture = self.render_picture(start, end, step)
+        self.rendered_range = (start, end, step)
+        self.tiles = []
+
+    def render_picture(self, start, end, step):
+        picture = QtGui.QPicture()
+        p = QtGui.QPainter(picture)
+        if end > start:
+            self.draw_range(p, start, end, step)
+        p.end()
+        return picture
+
+    def draw_range(self, p, start, end, step):
+        pass
+
+    def get_line_start(self, start, step):
+        """折线的起始下标：未聚合时多取前一根，与相邻范围（图块）的折线相连"""
+        return max(start - 1, 0) if step == 1 else start
+
+    def draw_line(self, p, values, start, end, step, color, width=1):
+        """绘制折线，step > 1时绘制每组最小/最大值的包络"""
+        start = self.get_line_start(start, step)
+        if values is None or end - start < 2:
+            return
+        y = values[start:end]
+        if step == 1:
+            path = build_polyline_path(y, np.arange(start, end, dtype=np.float64))
+        else:
+            mins, maxs = aggregate_minmax(y, step)
+            path = build_envelope_path(get_bucket_centers(start, len(y), step), mins, maxs)
+        p.setPen(get_cached_pen(color, width))
+        p.setBrush(get_no_brush())      # 折线路径不闭合，残留画刷会填充出多余的区域
+        p.drawPath(path)
+
+    def paint(self, p, *args):
+        if self.need_render():
+            self.generatePicture()
+        p.drawPicture(0, 0, self.picture)
+        for _, tile in self.tiles:
+            p.drawPicture(0, 0, tile)
+
+    def boundingRect(self):
+        return QtCore.QRectF(self.bounds)
@@ -0,0 +1,251 @@
+from functools import lru_cache
+
+import pyqtgraph as pg
+from PyQt5 import QtGui
+import numpy as np
+
+'''
+    指标图元的向量化绘制工具
+    1. 所有坐标由NumPy一次性计算，通过pg.arrayToQPath批量生成QPainterPath，每组图形只需一次drawPath
+    2. 画笔、画刷按颜色缓存，避免每根k线重复调用pg.mkPen/pg.mkBrush
+    3. 缩小到每像素对应多根k线时，按step根一组聚合为最小/最大值包络（LOD），每个像素列只绘制一个图形
+'''
+
+@lru_cache(maxsize=128)
+def get_cached_pen(color, width=1):
+    """按颜色、线宽缓存画笔，color需为可哈希类型（颜色字符串或RGB元组）"""
+    return pg.mkPen(color, width=width)
+
+@lru_cache(maxsize=64)
+def get_cached_brush(color):
+    return pg.mkBrush(color)
+
+_empty_brush = QtGui.QBrush()   # 默认构造即为Qt.NoBrush
+
+def get_no_brush():
+    return _empty_brush
+
+def to_float_array(values):
+    """Series/list转为float64数组，不可转换的值为NaN"""
+    return np.asarray(values, dtype=np.float64)
+
+def build_polyline_path(y, x=None):
+    """
+    折线路径，NaN处断开（与逐段判断前后两点均有效后再连线的效果一致）
+
+    参数:
+        y: 纵坐标序列
+        x: 横坐标，默认为0..n-1
+    """
+    y = to_float_array(y)
+    if x is None:
+        x = np.arange(len(y), dtype=np.float64)
+    if len(y) < 2:
+        return QtGui.QPainterPath()
+    return pg.arrayToQPath(np.asarray(x, dtype=np.float64), y, connect='finite')
+
+def build_segments_path(x0, y0, x1, y1):
+    """一组互不相连的线段(x0, y0)-(x1, y1)"""
+    n = len(x0)
+    if n == 0:
+        return QtGui.QPainterPath()
+    x = np.empty(n * 2, dtype=np.float64)
+    y = np.empty(n * 2, dtype=np.float64)
+    x[0::2], x[1::2] = x0, x1
+    y[0::2], y[1::2] = y0, y1
+    return pg.arrayToQPath(x, y, connect='pairs')
+
+def build_rects_path(left, bottom, width, height):
+    """一组矩形（闭合子路径），可同时描边与填充"""
+    n = len(left)
+    if n == 0:
+        return QtGui.QPainterPath()
+    left = np.asarray(left, dtype=np.float64)
+    bottom = np.asarray(bottom, dtype=np.float64)
+    right = left + width
+    top = bottom + np.asarray(height, dtype=np.float64)
+
+    # 每个矩形5个点：左下、右下、右上、左上、回到左下，最后一个点不与下一个矩形相连
+    x = np.column_stack([left, right, right, left, left]).ravel()
+    y = np.column_stack([bottom, bottom, top, top, bottom]).ravel()
+    connect = np.ones(n * 5, dtype=np.int32)
+    connect[4::5] = 0
+    return pg.arrayToQPath(x, y, connect=connect)
+
+def build_band_path(x, upper, lower):
+    """上下两条边界之间的填充区域：上边界有效点 + 反转的下边界有效点组成的多边形"""
+    x = to_float_array(x)
+    upper = to_float_array(upper)
+    lower = to_float_array(lower)
+    upper_valid = np.isfinite(upper)
+    lower_valid = np.isfinite(lower)
+    band_x = np.concatenate([x[upper_valid], x[lower_valid][::-1]])
+    band_y = np.concatenate([upper[upper_valid], lower[lower_valid][::-1]])
+    if len(band_x) < 3:
+        return QtGui.QPainterPath()
+    path = pg.arrayToQPath(band_x, band_y, connect='all')
+    path.closeSubpath()
+    return path
+
+def compute_candle_geometry(open_values, high_values, low_values, close_values, x, half_width):
+    """
+    计算蜡烛图全部图形的坐标，按上涨、下跌分组
+
+    返回:
+        dict:
+            asc_wicks / desc_wicks: (x0, y0, x1, y1) 影线
+            asc_bodies / desc_bodies: (left, bottom, width, height) 实体
+            asc_doji: (x0, y0, x1, y1) 开盘价等于收盘价时的横线
+    """
+    o = to_float_array(open_values)
+    h = to_float_array(high_values)
+    l = to_float_array(low_values)
+    c = to_float_array(close_values)
+    x = to_float_array(x)
+
+    valid = np.isfinite(o) & np.isfinite(h) & np.isfinite(l) & np.isfinite(c)
+    desc = valid & (c < o)
+    asc = valid & ~desc
+
+    # 下跌：完整影线 + 实心实体
+    xd = x[desc]
+    desc_wicks = (xd, l[desc], xd, h[desc])
+    desc_bodies = (xd - half_width, o[desc], np.full(len(xd), half_width * 2), c[desc] - o[desc])
+
+    # 上涨：上下影线分开绘制（与实体重叠部分不画），空心实体
+    upper = asc & (h != c)
+    lower = asc & (l != o)
+    asc_wicks = (
+        np.concatenate([x[upper], x[lower]]),
+        np.concatenate([h[upper], o[lower]]),
+        np.concatenate([x[upper], x[lower]]),
+        np.concatenate([c[upper], l[lower]]),
+    )
+    body = asc & (c != o)
+    asc_bodies = (x[body] - half_width, o[body], np.full(int(body.sum()), half_width * 2), c[body] - o[body])
+    doji = asc & (c == o)
+    asc_doji = (x[doji] - half_width, o[doji], x[doji] + half_width, o[doji])
+
+    return {
+        'asc_wicks': asc_wicks,
+        'asc_bodies': asc_bodies,
+        'asc_doji': asc_doji,
+        'desc_wicks': desc_wicks,
+        'desc_bodies': desc_bodies,
+    }
+
+def draw_candles(p, geometry, asc_color, desc_color):
+    """按上涨、下跌两组批量绘制蜡烛，每组影线、实体各一次drawPath"""
+    # 下跌－绿色，实心
+    p.setPen(get_cached_pen(desc_color))
+    p.setBrush(get_no_brush())
+    p.drawPath(build_segments_path(*geometry['desc_wicks']))
+    p.setBrush(get_cached_brush(desc_color))
+    p.drawPath(build_rects_path(*geometry['desc_bodies']))
+
+    # 上涨－红色，空心
+    p.setPen(get_cached_pen(asc_color))
+    p.setBrush(get_no_brush())
+    p.drawPath(build_segments_path(*geometry['asc_wicks']))
+    p.drawPath(build_segments_path(*geometry['asc_doji']))
+    p.drawPath(build_rects_path(*geometry['asc_bodies']))
+
+def draw_bars(p, x, values, desc_mask, half_width, asc_color, desc_color, asc_filled=True):
+    """
+    以0为基线的柱状图（成交量、成交额、MACD），按涨跌分两组绘制
+
+    参数:
+        desc_mask: 为True的柱子使用desc_color、实心
+        asc_filled: 上涨柱是否实心，成交量、成交额为空心
+    """
+    x = to_float_array(x)
+    values = to_float_array(values)
+    valid = np.isfinite(values)
+    for mask, color, filled in ((valid & desc_mask, desc_color, True), (valid & ~desc_mask, asc_color, asc_filled)):
+        if not mask.any():
+            continue
+        count = int(mask.sum())
+        p.setPen(get_cached_pen(color))
+        p.setBrush(get_cached_brush(color) if filled else get_no_brush())
+        p.drawPath(build_rects_path(x[mask] - half_width, np.zeros(count), np.full(count, half_width * 2), values[mask]))
+
+# ------------------------------------------------------------LOD聚合------------------------------------------------------------
+def get_bucket_starts(length, step):
+    """长度为length的序列按step根一组时，每组起始下标"""
+    return np.arange(0, length, step)
+
+def get_bucket_centers(start, length, step):
+    """每组的中心横坐标，start为序列首个元素的横坐标，最后一组可能不足step根"""
+    starts = get_bucket_starts(length, step)
+    sizes = np.minimum(starts + step, length) - starts
+    return start + starts + (sizes - 1) / 2.0
+
+def aggregate_minmax(values, step):
+    """
+    按step根一组聚合，返回每组的最小值、最大值，全为NaN的组为NaN
+
+    返回:
+        (mins, maxs)
+    """
+    y = to_float_array(values)
+    if len(y) == 0:
+        return y, y
+    starts = get_bucket_starts(len(y), step)
+    # fmin/fmax忽略NaN
+    return np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts)
+
+def aggregate_ohlc(open_values, high_values, low_values, close_values, step):
+    """
+    将k线按step根一组合并：开盘价取首根、收盘价取末根，最高价取最大、最低价取最小
+
+    返回:
+        (open, high, low, close)
+    """
+    o = to_float_array(open_values)
+    c = to_float_array(close_values)
+    if len(o) == 0:
+        return o, o, o, o
+    starts = get_bucket_starts(len(o), step)
+    ends = np.minimum(starts + step, len(o)) - 1
+    _, high = aggregate_minmax(high_values, step)
+    low, _ = aggregate_minmax(low_values, step)
+    return o[starts], high, low, c[ends]
+
+def aggregate_desc_mask(open_values, close_values, step):
+    """按step根一组合并后各组是否下跌（末根收盘价低于首根开盘价）"""
+    o = to_float_array(open_values)
+    c = to_float_array(close_values)
+    starts = get_bucket_starts(len(o), step)
+    ends = np.minimum(starts + step, len(o)) - 1
+    return c[ends] < o[starts]
+
+def build_envelope_path(x, mins, maxs):
+    """
+    折线聚合后的包络路径：每组依次连接最小值、最大值两点，
+    组内形成一条竖线、组间首尾相连，形状与逐点绘制的折线在像素级别一致
+    """
+    x = to_float_array(x)
+    return build_polyline_path(np.column_stack([mins, maxs]).ravel(), np.repeat(x, 2))
+
+def draw_candle_envelopes(p, x, open_values, high_values, low_values, close_values, asc_color, desc_color):
+    """聚合后的蜡烛：每组一条最低价到最高价的竖线，颜色由组内首根开盘价、末根收盘价决定"""
+    x = to_float_array(x)
+    o, h, l, c = (to_float_array(v) for v in (open_values, high_values, low_values, close_values))
+    valid = np.isfinite(h) & np.isfinite(l)
+    desc = valid & (c < o)
+    asc = valid & ~desc
+    for mask, color in ((desc, desc_color), (asc, asc_color)):
+        if mask.any():
+            p.setPen(get_cached_pen(color))
+            p.drawPath(build_segments_path(x[mask], l[mask], x[mask], h[mask]))
+
+def draw_bar_envelopes(p, x, bottoms, tops, desc_mask, asc_color, desc_color):
+    """聚合后的柱状图：每组一条bottoms到tops的竖线"""
+    x = to_float_array(x)
+    bottoms = np.broadcast_to(to_float_array(bottoms), x.shape)
+    tops = to_float_array(tops)
+    valid = np.isfinite(bottoms) & np.isfinite(tops)
+    for mask, color in ((valid & desc_mask, desc_color), (valid & ~desc_mask, asc_color)):
+        if mask.any():
+            p.setPen(get_cached_pen(color))
+            p.drawPath(build_segments_path(x[mask], bottoms[mask], x[mask], tops[mask]))
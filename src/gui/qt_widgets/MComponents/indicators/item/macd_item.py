@@ -1,95 +1,45 @@
 # file: gui/qt_widgets/MComponents/macd_item.py
-import pyqtgraph as pg
-from PyQt5 import QtGui, QtCore
 import numpy as np
 
 from manager.indicators_config_manager import *
+from gui.qt_widgets.MComponents.indicators.item.item_render_utils import draw_bars, draw_bar_envelopes, aggregate_minmax, get_bucket_centers
+from gui.qt_widgets.MComponents.indicators.item.base_chart_item import BaseChartItem
 
-class MACDItem(pg.GraphicsObject):
+class MACDItem(BaseChartItem):
     """MACD指标绘制类"""
-    def __init__(self, data):
-        pg.GraphicsObject.__init__(self)
-
-        # 数据验证
-        required_columns = [IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value]
-        if not all(col in data.columns for col in required_columns):
-            raise ValueError(f"缺少必要的数据列，需要: {required_columns}")
-        
-        self.data = data
-        self.generatePicture()
-
-    def get_data(self):
-        return self.data
-    
-    def update_data(self, data):
-        # 数据验证
-        required_columns = [IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value]
-        if not all(col in data.columns for col in required_columns):
-            raise ValueError(f"缺少必要的数据列，需要: {required_columns}")
-
-        self.data = data
-        self.generatePicture()
-        self.prepareGeometryChange()  # 通知框架几何形状可能发生了变化
-        self.update()  # 触发重绘
-
-    def generatePicture(self):
-        """生成MACD图"""
-        self.picture = QtGui.QPicture()
-        p = QtGui.QPainter(self.picture)
-        pg.setConfigOptions(leftButtonPan=False, antialias=False)
-        w = 0.3
-
-        # 绘制MACD柱状图
-        for i in range(len(self.data)):
-            macd_value = self.data[IndicatrosEnum.MACD.value].iloc[i]
-            
-            if not np.isnan(macd_value):
-                if macd_value >= 0:
-                    # 正数 - 红色
-                    p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_ASC.value]))
-                    p.setBrush(pg.mkBrush(dict_kline_color[IndicatrosEnum.KLINE_ASC.value]))
-                else:
-                    # 负数 - 绿色
-                    p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
-                    p.setBrush(pg.mkBrush(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
-                
-                # 绘制柱状图
-                p.drawRect(QtCore.QRectF(i - w, 0, w * 2, macd_value))
+    def get_required_columns(self):
+        return [IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value]
 
+    def get_settings(self):
         dict_settings = get_indicator_config_manager().get_user_config_by_indicator_type(IndicatrosEnum.MACD.value)
         if dict_settings is None or len(dict_settings) < 2:
             dict_settings = get_indicator_config_manager().get_default_config_by_indicator_type(IndicatrosEnum.MACD.value)
+        return dict_settings
 
-        # 绘制DIFF线 (MACD线)
-        if dict_settings[0].visible:
-            diff_points = []
-            for i in range(len(self.data)):
-                diff_value = self.data[dict_settings[0].name].iloc[i]
-                if not np.isnan(diff_value):
-                    diff_points.append(QtCore.QPointF(i, diff_value))
-            
-            if len(diff_points) > 1:
-                p.setPen(pg.mkPen(dict_settings[0].color_hex, width=dict_settings[0].line_width))
-                for i in range(len(diff_points) - 1):
-                    p.drawLine(diff_points[i], diff_points[i + 1])
-
-        # 绘制DEA线 (信号线)
-        if dict_settings[1].visible:
-            dea_points = []
-            for i in range(len(self.data)):
-                dea_value = self.data[dict_settings[1].name].iloc[i]
-                if not np.isnan(dea_value):
-                    dea_points.append(QtCore.QPointF(i, dea_value))
-            
-            if len(dea_points) > 1:
-                p.setPen(pg.mkPen(dict_settings[1].color_hex, width=dict_settings[1].line_width))
-                for i in range(len(dea_points) - 1):
-                    p.drawLine(dea_points[i], dea_points[i + 1])
-
-        p.end()
+    def get_y_range(self, start=0):
+        y_range = self.get_finite_range(*(self.get_array(col) for col in self.get_required_columns()), start=start)
+        return (min(y_range[0], 0), max(y_range[1], 0)) if y_range else None
 
-    def paint(self, p, *args):
-        p.drawPicture(0, 0, self.picture)
-
-    def boundingRect(self):
-        return QtCore.QRectF(self.picture.boundingRect())
\ No newline at end of file
+    def draw_range(self, p, start, end, step):
+        """绘制MACD图"""
+        w = 0.3
+        asc_color, desc_color = dict_kline_color[IndicatrosEnum.KLINE_ASC.value], dict_kline_color[IndicatrosEnum.KLINE_DESC.value]
+
+        # 绘制MACD柱状图：正数 - 红色，负数 - 绿色
+        macd_values = self.get_array(IndicatrosEnum.MACD.value)[start:end]
+        if step == 1:
+            x = np.arange(start, end, dtype=np.float64)
+            draw_bars(p, x, macd_values, macd_values < 0, w, asc_color, desc_color)
+        else:
+            # 缩小时每组绘制正、负两部分的最大幅度
+            mins, maxs = aggregate_minmax(macd_values, step)
+            x = get_bucket_centers(start, end - start, step)
+            positive, negative = maxs > 0, mins < 0
+            draw_bar_envelopes(p, x[positive], 0.0, maxs[positive], np.zeros(int(positive.sum()), dtype=bool), asc_color, desc_color)
+            draw_bar_envelopes(p, x[negative], 0.0, mins[negative], np.ones(int(negative.sum()), dtype=bool), asc_color, desc_color)
+
+        # 绘制DIFF线 (MACD线)、DEA线 (信号线)
+        dict_settings = self.get_settings()
+        for setting in (dict_settings[0], dict_settings[1]):
+            if setting.visible:
+                self.draw_line(p, self.get_array(setting.name), start, end, step, setting.color_hex, setting.line_width)
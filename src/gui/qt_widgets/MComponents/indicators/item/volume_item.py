@@ -1,67 +1,33 @@
-import pyqtgraph as pg
-from PyQt5 import QtGui, QtCore
 import numpy as np
 
 from manager.indicators_config_manager import *
+from gui.qt_widgets.MComponents.indicators.item.item_render_utils import draw_bars, draw_bar_envelopes, aggregate_desc_mask, aggregate_minmax, get_bucket_centers
+from gui.qt_widgets.MComponents.indicators.item.base_chart_item import BaseChartItem
 
 
-class VolumeItem(pg.GraphicsObject):
+class VolumeItem(BaseChartItem):
     # …"交易量柱状图绘制类……
-    def __init__(self, data):
-        pg.GraphicsObject.__init__(self)
+    def get_required_columns(self):
+        return ['open', 'close', 'volume'] # , 'low', 'ma5', 'ma10', 'ma20', 'ma24', 'ma30', 'ma52', 'ma60'
 
-        # 数据验证
-        required_columns = ['open', 'close', 'volume'] # , 'low', 'ma5', 'ma10', 'ma20', 'ma24', 'ma30', 'ma52', 'ma60'
-        if not all(col in data.columns for col in required_columns):
-            raise ValueError(f"缺少必要的数据列，需要: {required_columns}")
-        
-        self.data = data
-        self.generatePicture()
+    def get_values(self):
+        return self.get_array('volume', 10000)     # 单位：万
 
-    def get_data(self):
-        return self.data
-    
-    def update_data(self, data):
-        # 数据验证
-        required_columns = ['open', 'close', 'volume'] 
-        if not all(col in data.columns for col in required_columns):
-            raise ValueError(f"缺少必要的数据列，需要: {required_columns}")
+    def get_y_range(self, start=0):
+        y_range = self.get_finite_range(self.get_values(), start=start)
+        return (min(y_range[0], 0), max(y_range[1], 0)) if y_range else None
 
-        self.data = data
-        self.generatePicture()
-        self.prepareGeometryChange()  # 通知框架几何形状可能发生了变化
-        self.update()  # 触发重绘
-
-    def generatePicture(self):
-        # …生成交易量柱状图?…
-        self.picture = QtGui.QPicture()
-        p = QtGui.QPainter(self.picture)
-        pg.setConfigOptions(leftButtonPan=False, antialias=False)
+    def draw_range(self, p, start, end, step):
         w = 0.25
-
-        for i in range(len(self.data['volume'])):
-            open_price = self.data['open'][i]
-            close_price = self.data['close'][i]
-            volume = self.data['volume'][i] / 10000     # 单位：万
-            
-            if close_price < open_price:
-                #下跌－ 绿色填充
-                p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
-                p.drawRect(QtCore.QRectF(i - w, 0, w * 2, volume))
-                p.setBrush(pg.mkBrush(dict_kline_color[IndicatrosEnum.KLINE_DESC.value]))
-            else:
-                #上涨－ 红色空心
-                p.setPen(pg.mkPen(dict_kline_color[IndicatrosEnum.KLINE_ASC.value]))
-                p.drawLines(
-                    QtCore.QLineF(QtCore.QPointF(i - w, 0), QtCore.QPointF(i - w, volume)),
-                    QtCore.QLineF(QtCore.QPointF(i - w, volume), QtCore.QPointF(i + w, volume)),
-                    QtCore.QLineF(QtCore.QPointF(i + w, volume), QtCore.QPointF(i + w, 0)),
-                    QtCore.QLineF(QtCore.QPointF(i + w, 0), QtCore.QPointF(i - w, 0))
-                )
-        p.end()
-
-    def paint(self, p, *args):
-        p.drawPicture(0, 0, self.picture)
-
-    def boundingRect(self):
-        return QtCore.QRectF(self.picture.boundingRect())
\ No newline at end of file
+        asc_color, desc_color = dict_kline_color[IndicatrosEnum.KLINE_ASC.value], dict_kline_color[IndicatrosEnum.KLINE_DESC.value]
+        open_values, close_values = self.get_array('open')[start:end], self.get_array('close')[start:end]
+        values = self.get_values()[start:end]
+        if step == 1:
+            #下跌－ 绿色填充，上涨－ 红色空心
+            x = np.arange(start, end, dtype=np.float64)
+            draw_bars(p, x, values, close_values < open_values, w, asc_color, desc_color, asc_filled=False)
+        else:
+            #缩小时每组取最大值绘制一条竖线，涨跌按组内首根开盘价、末根收盘价判断
+            _, maxs = aggregate_minmax(values, step)
+            x = get_bucket_centers(start, end - start, step)
+            draw_bar_envelopes(p, x, 0.0, maxs, aggregate_desc_mask(open_values, close_values, step), asc_color, desc_color)
@@ -15,6 +15,7 @@ from gui.qt_widgets.MComponents.indicators.setting.kline_indicator_setting_dialo
 from manager.indicators_config_manager import *
 from gui.qt_widgets.MComponents.indicators.kline_overview_widget import KLineOverviewWidget
 from indicators.stock_data_indicators import *
+from indicators.indicator_registry import get_indicator_registry
 
 class KLineWidget(BaseIndicatorWidget):
     def __init__(self, data, type, parent=None):
@@ -220,7 +221,7 @@ class KLineWidget(BaseIndicatorWidget):
         result = dlg.exec()
         if result == QDialog.Accepted:
             self.logger.info("更新k线设置")
-            auto_ma_calulate(self.df_data)
+            get_indicator_registry().ensure(self.df_data, IndicatrosEnum.MA.value)
             # 刷新K线图
             self.update_data(self.df_data)
 
@@ -283,7 +284,7 @@ class KLineWidget(BaseIndicatorWidget):
         }
         for id, ma_setting in dict_ma_settings.items():
             if id in self.dict_ma_label.keys() and ma_setting.name in self.df_data.columns:
-                self.dict_ma_label[id].setText(f"{ma_setting.name}:{self.df_data.iloc[closest_index][ma_setting.name]:.2f}")
+                self.dict_ma_label[id].setText(self.get_label_texts(ma_setting.name, f"{ma_setting.name}:")[closest_index])
                 self.dict_ma_label[id].setVisible(ma_setting.visible)
                 self.dict_ma_label[id].setStyleSheet(f"color: {ma_setting.color_hex}")
 
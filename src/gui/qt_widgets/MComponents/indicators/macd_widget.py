@@ -11,6 +11,7 @@ from gui.qt_widgets.MComponents.indicators.base_indicator_widget import BaseIndi
 from gui.qt_widgets.MComponents.indicators.item.macd_item import MACDItem
 from gui.qt_widgets.MComponents.indicators.setting.macd_setting_dialog import MacdSettingDialog
 from indicators.stock_data_indicators import *
+from indicators.indicator_registry import get_indicator_registry
 from manager.indicators_config_manager import *
 
 class MacdWidget(BaseIndicatorWidget):
@@ -99,7 +100,7 @@ class MacdWidget(BaseIndicatorWidget):
         result = dlg.exec()
         if result == QDialog.Accepted:
             self.logger.info("更新MACD设置")
-            auto_macd_calulate(self.df_data)
+            get_indicator_registry().ensure(self.df_data, IndicatrosEnum.MACD.value)
             self.update_data(self.df_data)
             self.auto_scale_to_latest(120)
 
@@ -134,7 +135,7 @@ class MacdWidget(BaseIndicatorWidget):
         if self.type != sender.type:
             # self.logger.info(f"不响应其他窗口的鼠标移动事件")
             return
-        macd = self.df_data.iloc[closest_index][IndicatrosEnum.MACD.value]          # 这里直接使用枚举值，是因为计算时就以枚举值固定命名
+        macd = self.get_column_values(IndicatrosEnum.MACD.value)[closest_index]          # 这里直接使用枚举值，是因为计算时就以枚举值固定命名
 
         if macd > 0:
             self.label_macd.setStyleSheet(f"color: {dict_kline_color_hex[IndicatrosEnum.KLINE_ASC.value]};")
@@ -155,7 +156,7 @@ class MacdWidget(BaseIndicatorWidget):
                 if id == 2:
                     continue
 
-                self.dict_macd_label[id].setText(f"{setting.name}:{self.df_data.iloc[closest_index][setting.name]:.2f}")
+                self.dict_macd_label[id].setText(self.get_label_texts(setting.name, f"{setting.name}:")[closest_index])
                 self.dict_macd_label[id].setVisible(setting.visible)
                 self.dict_macd_label[id].setStyleSheet(f"color: {setting.color_hex}")
 
@@ -13,6 +13,7 @@ from gui.qt_widgets.MComponents.indicators.setting.rsi_setting_dialog import Rsi
 
 from manager.indicators_config_manager import *
 from indicators.stock_data_indicators import *
+from indicators.indicator_registry import get_indicator_registry
 
 class RsiWidget(BaseIndicatorWidget):
     def __init__(self, data, type, parent=None):
@@ -124,7 +125,7 @@ class RsiWidget(BaseIndicatorWidget):
         result = dlg.exec()
         if result == QDialog.Accepted:
             self.logger.info("更新RSI设置")
-            auto_rsi_calulate(self.df_data)
+            get_indicator_registry().ensure(self.df_data, IndicatrosEnum.RSI.value)
             # 刷新K线图
             self.update_data(self.df_data)
             self.auto_scale_to_latest(120)
@@ -190,7 +191,7 @@ class RsiWidget(BaseIndicatorWidget):
         }
         for id, setting in dict_settings.items():
             if id in self.dict_label.keys() and setting.name in self.df_data.columns:
-                self.dict_label[id].setText(f"{setting.name}:{self.df_data.iloc[closest_index][setting.name]:.2f}")
+                self.dict_label[id].setText(self.get_label_texts(setting.name, f"{setting.name}:")[closest_index])
                 self.dict_label[id].setVisible(setting.visible)
                 self.dict_label[id].setStyleSheet(f"color: {setting.color_hex}")
 
@@ -169,10 +169,9 @@ class VolumeWidget(BaseIndicatorWidget):
             return
         
 
-        volume = self.df_data.iloc[closest_index]['volume'] / 10000
-        self.label_total_volume.setText(f"总量：{volume:.2f}万")
+        self.label_total_volume.setText(self.get_label_texts('volume', "总量：", "万", 10000)[closest_index])
 
-        change_percent = self.df_data.iloc[closest_index]['change_percent']
+        change_percent = self.get_column_values('change_percent')[closest_index]
         if change_percent > 0:
             self.label_total_volume.setStyleSheet(f"color: {dict_kline_color_hex[IndicatrosEnum.KLINE_ASC.value]};")
         else:
@@ -3,7 +3,7 @@ from PyQt5.QtWidgets import QWidget
 from PyQt5.QtCore import pyqtSignal, Qt
 
 from thread.base_task import TaskStatus
-from thread.baostock_data_fetch_task import BaostockDataFetchTask
+from thread.baostock_data_fetch_task import BaostockDataFetchTask, BaostockParallelFetchTask
 from thread.task_pool import get_default_task_pool
 
 from manager.logging_manager import get_logger
@@ -41,8 +41,8 @@ class MTaskProcessWidget(QWidget):
             self.task.task_completed.connect(self.slot_baostock_data_fetch_task_completed)
             self.task.task_progress.connect(self.slot_task_progress)
             self.task.task_cancelled.connect(self.slot_task_cancelled)
-            # 如果是BaostockDataFetchTask
-            if isinstance(self.task, BaostockDataFetchTask):
+            # 如果是BaostockDataFetchTask或BaostockParallelFetchTask
+            if isinstance(self.task, (BaostockDataFetchTask, BaostockParallelFetchTask)):
                 self.task.sig_progress_changed.connect(self.slot_progress_changed)
 
     def reset_ui(self):
@@ -121,12 +121,13 @@ class MTaskProcessWidget(QWidget):
         self.logger.info(f"task_id: {task_id}, progress: {progress}")
 
     def slot_progress_changed(self, completed_tasks, total_tasks):
-        if completed_tasks == 0:
-            self.horizontalSlider_process.setMinimum(completed_tasks)
+        # 断点续传时初始完成数可能不为0，总量以最新值为准
+        if self.horizontalSlider_process.maximum() != total_tasks:
+            self.horizontalSlider_process.setMinimum(0)
             self.horizontalSlider_process.setMaximum(total_tasks)
 
         self.horizontalSlider_process.setValue(completed_tasks)
-        self.label_process.setText(f"{completed_tasks}/{total_tasks}")
+        self.label_process.setText(f"{completed_tasks}/{total_tasks}（剩余{total_tasks - completed_tasks}）")
 
         # 更新detail ui
 
@@ -0,0 +1,223 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect, QSortFilterProxyModel
+from PyQt5.QtGui import QColor, QFont, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+import numpy as np
+import pandas as pd
+
+'''
+    行情股票列表（虚拟化）：模型 + 委托绘制，替代每只股票一个StockCardWidget
+    1. StockListModel：数据以列快照保存（code、name、close、change_percent等numpy数组），不为每只股票创建控件
+    2. StockCardDelegate：只绘制可见行，样式与StockCardWidget（market.qss）一致
+    3. 排序、过滤：QSortFilterProxyModel，排序按SortRole（数值列按数值），过滤按FilterRole（名称、代码）
+    4. 价格刷新：update_data按code对齐后只更新数值变化的行，按连续区间发送dataChanged
+
+    用法：
+        model = StockListModel()
+        proxy_model = create_stock_proxy_model(model)
+        list_view.setModel(proxy_model)
+        list_view.setItemDelegate(StockCardDelegate(list_view))
+        model.set_data(df_latest)       # 每只股票一行的DataFrame
+        model.update_data(df_latest)    # 股票不变时只刷新价格
+'''
+
+CodeRole = Qt.UserRole + 1
+NameRole = Qt.UserRole + 2
+CloseRole = Qt.UserRole + 3
+ChangePercentRole = Qt.UserRole + 4
+RowDataRole = Qt.UserRole + 5       # 该行的pandas Series（点击时传给图表）
+SortRole = Qt.UserRole + 6
+FilterRole = Qt.UserRole + 7
+
+DISPLAY_COLUMNS = ('close', 'change_percent')   # 刷新时比较的数值列
+
+class StockListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.df_data = pd.DataFrame()
+        self.codes = np.array([], dtype=object)
+        self.names = np.array([], dtype=object)
+        self.dict_values = {}       # {列名: float64数组}
+        self.dict_code_row = {}     # {code: 行号}
+        self.sort_column = None     # SortRole对应的列，None时按原顺序
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.codes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.codes):
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return f"{self.names[row]} - {self.codes[row]}"
+        if role == CodeRole:
+            return self.codes[row]
+        if role == NameRole:
+            return self.names[row]
+        if role == CloseRole:
+            return self.get_value('close', row)
+        if role == ChangePercentRole:
+            return self.get_value('change_percent', row)
+        if role == RowDataRole:
+            return self.get_row_data(row)
+        if role == SortRole:
+            if self.sort_column is None:
+                return row
+            if self.sort_column in ('code', 'name'):
+                return str(self.codes[row] if self.sort_column == 'code' else self.names[row])
+            value = self.get_value(self.sort_column, row)
+            return -np.inf if value is None else value
+        if role == FilterRole:
+            return f"{self.names[row]} {self.codes[row]}"
+        return None
+
+    def get_value(self, column, row):
+        values = self.dict_values.get(column)
+        if values is None:
+            return None
+        value = values[row]
+        return None if np.isnan(value) else float(value)
+
+    def get_row_data(self, row):
+        if not 0 <= row < len(self.df_data):
+            return None
+        return self.df_data.iloc[row]
+
+    def find_row(self, code):
+        '''code所在的行，不存在时返回-1'''
+        return self.dict_code_row.get(code, -1)
+
+    def _get_values(self, df_data, column):
+        if column not in df_data.columns:
+            return np.full(len(df_data), np.nan)
+        return pd.to_numeric(df_data[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def set_data(self, df_data):
+        '''整表替换（股票列表变化时）'''
+        self.beginResetModel()
+        self.df_data = df_data.reset_index(drop=True) if df_data is not None else pd.DataFrame()
+        self.codes = self.df_data['code'].to_numpy(dtype=object) if 'code' in self.df_data.columns else np.array([], dtype=object)
+        self.names = self.df_data['name'].to_numpy(dtype=object) if 'name' in self.df_data.columns else self.codes.copy()
+        self.dict_values = {column: self._get_values(self.df_data, column) for column in DISPLAY_COLUMNS}
+        self.dict_code_row = {code: row for row, code in enumerate(self.codes)}
+        self.endResetModel()
+
+    def update_data(self, df_data):
+        '''
+        刷新价格：股票集合与当前一致时，按code对齐后只更新有变化的行，按连续区间发送dataChanged；
+        股票集合变化时整表替换
+        返回:
+            int: 发生变化的行数
+        '''
+        if df_data is None or df_data.empty or len(df_data) != len(self.codes):
+            self.set_data(df_data)
+            return self.rowCount()
+
+        positions = pd.Index(df_data['code']).get_indexer(self.codes)
+        if (positions < 0).any():
+            self.set_data(df_data)
+            return self.rowCount()
+
+        df_aligned = df_data.iloc[positions].reset_index(drop=True)
+        changed = np.zeros(len(self.codes), dtype=bool)
+        dict_new_values = {}
+        for column in DISPLAY_COLUMNS:
+            old_values = self.dict_values[column]
+            new_values = self._get_values(df_aligned, column)
+            changed |= ~((old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values)))
+            dict_new_values[column] = new_values
+
+        self.df_data = df_aligned
+        self.dict_values = dict_new_values
+        rows = np.flatnonzero(changed)
+        if len(rows):
+            breaks = np.flatnonzero(np.diff(rows) > 1)
+            starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+            ends = np.concatenate((rows[breaks], [rows[-1]]))
+            for start, end in zip(starts, ends):
+                self.dataChanged.emit(self.index(int(start)), self.index(int(end)))
+        return len(rows)
+
+    def set_sort_column(self, column):
+        '''设置SortRole对应的列（'code'、'name'或数值列），None时恢复原顺序'''
+        self.sort_column = column
+
+
+def create_stock_proxy_model(source_model, parent=None):
+    proxy_model = QSortFilterProxyModel(parent)
+    proxy_model.setSourceModel(source_model)
+    proxy_model.setSortRole(SortRole)
+    proxy_model.setFilterRole(FilterRole)
+    proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    proxy_model.setDynamicSortFilter(True)
+    return proxy_model
+
+
+class StockCardDelegate(QStyledItemDelegate):
+    '''按StockCardWidget的布局绘制一行：左侧名称、代码，右侧价格、涨跌幅'''
+    ROW_HEIGHT = 60
+    MARGIN = 3
+    PRICE_WIDTH = 100
+
+    COLOR_UP = QColor(255, 0, 0)
+    COLOR_DOWN = QColor(21, 130, 42)
+    COLOR_FLAT = QColor(0, 0, 0)
+    COLOR_BORDER = QColor(0, 0, 0)
+    COLOR_SELECTED = QColor(220, 232, 252)
+    COLOR_HOVER = QColor(240, 240, 240)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font_name = QFont()
+        self.font_name.setPixelSize(20)
+        self.font_code = QFont()
+        self.font_code.setPixelSize(18)
+        self.font_price = QFont()
+        self.font_price.setPixelSize(20)
+        self.font_price.setBold(True)
+        self.font_change_percent = QFont()
+        self.font_change_percent.setPixelSize(18)
+
+    def sizeHint(self, option, index):
+        return QSize(200, self.ROW_HEIGHT)
+
+    def get_change_color(self, change_percent):
+        if change_percent is None or change_percent == 0:
+            return self.COLOR_FLAT
+        return self.COLOR_UP if change_percent > 0 else self.COLOR_DOWN
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(rect, self.COLOR_SELECTED)
+        elif option.state & QStyle.State_MouseOver:
+            painter.fillRect(rect, self.COLOR_HOVER)
+
+        content = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        half_height = content.height() // 2
+        left_width = content.width() - self.PRICE_WIDTH
+        top_left = QRect(content.left(), content.top(), left_width, half_height)
+        bottom_left = QRect(content.left(), content.top() + half_height, left_width, content.height() - half_height)
+        top_right = QRect(content.right() - self.PRICE_WIDTH, content.top(), self.PRICE_WIDTH, half_height)
+        bottom_right = QRect(content.right() - self.PRICE_WIDTH, content.top() + half_height, self.PRICE_WIDTH, content.height() - half_height)
+
+        painter.setPen(self.COLOR_FLAT)
+        painter.setFont(self.font_name)
+        painter.drawText(top_left, Qt.AlignLeft | Qt.AlignVCenter, str(index.data(NameRole)))
+        painter.setFont(self.font_code)
+        painter.drawText(bottom_left, Qt.AlignLeft | Qt.AlignVCenter, str(index.data(CodeRole)))
+
+        close = index.data(CloseRole)
+        change_percent = index.data(ChangePercentRole)
+        painter.setPen(self.get_change_color(change_percent))
+        painter.setFont(self.font_price)
+        painter.drawText(top_right, Qt.AlignRight | Qt.AlignVCenter, "N/A" if close is None else str(close))
+        painter.setFont(self.font_change_percent)
+        painter.drawText(bottom_right, Qt.AlignRight | Qt.AlignVCenter, "N/A" if change_percent is None else f"{change_percent:.2f}%")
+
+        painter.setPen(QPen(self.COLOR_BORDER, 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        painter.restore()
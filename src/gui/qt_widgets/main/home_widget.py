@@ -177,7 +177,10 @@ class HomeWidget(QWidget):
             if target_code != '':
                 self.logger.info(f"MinuteLevelSelectDialog--选择的股票: {target_code}")
                 # result = BaoStockProcessor().process_and_save_minute_level_stock_data(target_code, str(level_id))
-                result = BaoStockProcessor().process_minute_level_stock_data(target_code, str(level_id))
+                try:
+                    result = BaoStockProcessor().process_minute_level_stock_data(target_code, str(level_id))
+                except Exception as e:
+                    self.logger.error(f"获取{target_code}的{level_id}分钟级别数据失败: {e}")
                 # if result is not None and not result.empty:
                 #     sdi.default_indicators_auto_calculate(result)
             else:
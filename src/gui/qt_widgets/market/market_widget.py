@@ -14,13 +14,15 @@ import numpy as np
 import pyqtgraph as pg
 import time
 
-from gui.qt_widgets.MComponents.stock_card_widget import StockCardWidget
+from gui.qt_widgets.MComponents.stock_list_model import StockListModel, StockCardDelegate, CodeRole, RowDataRole, create_stock_proxy_model
 
 from gui.qt_widgets.MComponents.indicators.indicators_view_widget import IndicatorsViewWidget
 
 from manager.period_manager import TimePeriod
 from manager.bao_stock_data_manager import BaostockDataManager
 
+from thread.stock_prefetch_task import StockPrefetcher
+
 class MarketWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -32,11 +34,14 @@ class MarketWidget(QWidget):
     def init_para(self):
         self.logger = get_logger(__name__)
 
-        self.dict_lastest_1d_stock_data = None # {'code': DataFrame}
+        self.df_lastest_1d_stock_data = None # 每只股票一行的DataFrame
 
         self.set_current_dict_1d_stock_keys = None   # 用于检测数据更新
 
         self.option_to_code_map = {}  # name - code 映射字典
+
+        self.current_code = None    # 当前显示的股票
+        self.stock_prefetcher = StockPrefetcher()
     def init_ui(self):
         uic.loadUi('./src/gui/qt_widgets/market/MarketWidget.ui', self)
 
@@ -49,70 +54,91 @@ class MarketWidget(QWidget):
         self.indicators_view_widget = IndicatorsViewWidget()
         main_h_layout.addWidget(self.indicators_view_widget)
 
+        # 股票列表：模型 + 委托绘制，只绘制可见行
+        self.stock_list_model = StockListModel(self)
+        self.stock_proxy_model = create_stock_proxy_model(self.stock_list_model, self)
+        self.listView_card.setModel(self.stock_proxy_model)
+        self.listView_card.setItemDelegate(StockCardDelegate(self.listView_card))
+        self.listView_card.setUniformItemSizes(True)
+        self.listView_card.setMouseTracking(True)
+
     def init_stock_card_list(self):
-        if self.dict_lastest_1d_stock_data is None or self.dict_lastest_1d_stock_data == {}:
+        if self.df_lastest_1d_stock_data is None or self.df_lastest_1d_stock_data.empty:
             return
 
-        self.listWidget_card.clear()
-
-        first_item_data = None  # 保存第一个item的数据
-        search_option_list = []
-        for code, df_data in self.dict_lastest_1d_stock_data.items():
-            # 确保数据不为空
-            if df_data.empty:
-                continue
-
-            row = df_data.iloc[-1]
-            stock_card_widget = StockCardWidget(2)
-            stock_card_widget.set_data(row)
-            stock_card_widget.update_ui()
-
-            stock_card_widget.clicked.connect(self.slot_stock_card_clicked)
-            # stock_card_widget.hovered.connect(self.slot_stock_card_hovered)
-            # stock_card_widget.hoverLeft.connect(self.slot_stock_card_hover_left)
-            # stock_card_widget.doubleClicked.connect(self.slot_stock_card_double_clicked)
-
-            item = QtWidgets.QListWidgetItem()
-            # item.setSizeHint(stock_card_widget.sizeHint())
-            item.setSizeHint(QtCore.QSize(200, 60))
-            
-            self.listWidget_card.addItem(item)
+        self.stock_list_model.set_data(self.df_lastest_1d_stock_data)
 
-            self.listWidget_card.setItemWidget(item, stock_card_widget)
-
-            # self.logger.info(f"row的类型为：{type(row)}")
-            name = row['name']
-            option = f"{name} - {code}"
-            search_option_list.append(option)
-            self.option_to_code_map[option] = code  # 保存映射关系方便后续访问
-
-            # 保存第一个item的数据
-            if first_item_data is None:
-                first_item_data = row
+        codes = self.df_lastest_1d_stock_data['code'].astype(str)
+        search_option_list = (self.df_lastest_1d_stock_data['name'].astype(str) + " - " + codes).tolist()
+        self.option_to_code_map = dict(zip(search_option_list, codes))  # 保存映射关系方便后续访问
 
         self.lineEdit_search.set_options(search_option_list)
         # 如果有数据，自动选择第一个item（使用定时器延迟执行）
-        if first_item_data is not None:
+        if self.stock_proxy_model.rowCount() > 0:
             # 使用单次定时器确保UI完全初始化后再执行
-            QTimer.singleShot(100, lambda: self.select_first_item(first_item_data))
+            QTimer.singleShot(100, self.select_first_item)
 
     def init_connect(self):
         self.lineEdit_search.optionSelected.connect(self.slot_stock_card_selected)
+        # 点击、方向键切换当前行时均更新图表
+        self.listView_card.selectionModel().currentChanged.connect(self.slot_stock_list_current_changed)
+        self.indicators_view_widget.sig_chart_data_loaded.connect(self.slot_chart_data_loaded)
 
-    def select_first_item(self, first_item_data):
+    def select_first_item(self):
 
         """选择第一个item的独立方法"""
-        # 设置列表选中第一个
-        self.listWidget_card.setCurrentRow(0)
+        first_index = self.stock_proxy_model.index(0, 0)
+        if not first_index.isValid():
+            return
 
         self.indicators_view_widget.show_default_indicator()
 
-        # 调用槽函数
-        self.slot_stock_card_clicked(first_item_data)
-
-    def update_stock_data_dict(self, new_dict_lastest_1d_stock_data):
-        self.dict_lastest_1d_stock_data = new_dict_lastest_1d_stock_data
-        self.logger.info(f"成功获取股票数据，日线数据数量为：{len(self.dict_lastest_1d_stock_data)}，即将初始化行情股票列表")
+        # 设置列表选中第一个，由currentChanged更新图表
+        self.select_stock_index(first_index)
+
+    def select_stock_index(self, proxy_index):
+        '''选中列表中的股票并更新图表（已是当前行时直接更新）'''
+        if self.listView_card.currentIndex() == proxy_index:
+            self.slot_stock_card_clicked(proxy_index.data(RowDataRole))
+        else:
+            self.listView_card.setCurrentIndex(proxy_index)
+        self.listView_card.scrollTo(proxy_index)
+
+    def get_neighbor_codes(self, code):
+        '''当前列表顺序（排序、过滤后）中code前、后各neighbors只股票，近的优先'''
+        row = self.stock_list_model.find_row(code)
+        if row < 0:
+            return []
+        proxy_row = self.stock_proxy_model.mapFromSource(self.stock_list_model.index(row)).row()
+        if proxy_row < 0:
+            return []
+        list_codes = []
+        for offset in range(1, self.stock_prefetcher.neighbors + 1):
+            for neighbor_row in (proxy_row + offset, proxy_row - offset):
+                if 0 <= neighbor_row < self.stock_proxy_model.rowCount():
+                    list_codes.append(self.stock_proxy_model.index(neighbor_row, 0).data(CodeRole))
+        return list_codes
+
+    def prefetch_adjacent_stocks(self, code):
+        '''后台预取相邻股票的当前周期、当前股票的其他周期，浏览列表、切换周期时直接命中缓存'''
+        self.stock_prefetcher.prefetch(code, self.indicators_view_widget.get_current_period(),
+                                       self.get_neighbor_codes(code),
+                                       self.indicators_view_widget.get_enabled_periods(),
+                                       self.indicators_view_widget.get_visible_indicator_names())
+
+    def sort_stock_list(self, column=None, order=QtCore.Qt.DescendingOrder):
+        '''按列排序股票列表（如'change_percent'），column为None时恢复原顺序'''
+        self.stock_list_model.set_sort_column(column)
+        self.stock_proxy_model.invalidate()
+        self.stock_proxy_model.sort(0, order if column is not None else QtCore.Qt.AscendingOrder)
+
+    def filter_stock_list(self, text):
+        '''按名称、代码过滤股票列表，空字符串时显示全部'''
+        self.stock_proxy_model.setFilterFixedString(text)
+
+    def update_stock_data_dict(self, new_df_lastest_1d_stock_data):
+        self.df_lastest_1d_stock_data = new_df_lastest_1d_stock_data
+        self.logger.info(f"成功获取股票数据，日线数据数量为：{len(self.df_lastest_1d_stock_data)}，即将初始化行情股票列表")
         board_start_time = time.time()  # 记录开始时间
         self.init_stock_card_list()
         elapsed_time = time.time() - board_start_time  # 计算耗时
@@ -128,21 +154,27 @@ class MarketWidget(QWidget):
 
         # self.kline_widget.set_stock_name(data['code'])
         # self.update_chart(data)
-        self.indicators_view_widget.update_chart(data)
+        self.current_code = data['code']
+        self.stock_prefetcher.cancel()  # 让出线程给当前股票的加载，显示后再预取
+        self.indicators_view_widget.update_chart_async(data)
+
+    def slot_chart_data_loaded(self, code):
+        if code == self.current_code:
+            self.prefetch_adjacent_stocks(code)
         
     def slot_bao_stock_data_load_finished(self, succsess):
         # self.logger.info(f"Baostock股票数据加载完成，结果为：{succsess}")
         if succsess:
             bao_stock_data_manager = BaostockDataManager()
-            new_dict_lastest_1d_stock_data = bao_stock_data_manager.get_all_lastest_row_data_dict_by_period_auto()
+            new_df_lastest_1d_stock_data = bao_stock_data_manager.get_all_lastest_row_data_by_period_auto()
            
-            self.logger.info(f"成功获取股票数据，日线数据数量为：{len(new_dict_lastest_1d_stock_data)}")
+            self.logger.info(f"成功获取股票数据，日线数据数量为：{len(new_df_lastest_1d_stock_data)}")
 
-            new_set_lastest_1d_stock_keys = set(new_dict_lastest_1d_stock_data.keys())
+            new_set_lastest_1d_stock_keys = set(new_df_lastest_1d_stock_data['code']) if not new_df_lastest_1d_stock_data.empty else set()
 
             need_update = False
 
-            if (self.dict_lastest_1d_stock_data is None or self.dict_lastest_1d_stock_data == {} ):
+            if (self.df_lastest_1d_stock_data is None or self.df_lastest_1d_stock_data.empty):
                 need_update = True
                 self.logger.info("当前数据为空，需要更新")
             elif (self.set_current_dict_1d_stock_keys != new_set_lastest_1d_stock_keys):
@@ -151,10 +183,13 @@ class MarketWidget(QWidget):
 
             if need_update:
                 self.set_current_dict_1d_stock_keys = new_set_lastest_1d_stock_keys
-                self.update_stock_data_dict(new_dict_lastest_1d_stock_data)
+                self.update_stock_data_dict(new_df_lastest_1d_stock_data)
                 self.logger.info("成功加载股票K线指标图")
             else:
-                self.logger.info("数据未发生变化，不需要更新")
+                # 股票不变时只刷新价格，模型按变化的行发送dataChanged
+                self.df_lastest_1d_stock_data = new_df_lastest_1d_stock_data
+                changed_count = self.stock_list_model.update_data(new_df_lastest_1d_stock_data)
+                self.logger.info(f"股票列表未发生变化，刷新价格的股票数量：{changed_count}")
     def slot_bao_stock_data_load_progress(self, progress):
         self.logger.info(f"Baostock股票数据加载进度：{progress}")
         
@@ -168,10 +203,17 @@ class MarketWidget(QWidget):
         stock_code = self.option_to_code_map.get(selected_option)
         self.logger.info(f"对应的股票代码为：{stock_code}")
         
-        # 找到对应行业并选中
-        for i in range(self.listWidget_card.count()):
-            card_widget = self.listWidget_card.itemWidget(self.listWidget_card.item(i))
-            if card_widget and getattr(card_widget.data, 'code', '') == stock_code:
-                self.listWidget_card.setCurrentRow(i)
-                self.slot_stock_card_clicked(card_widget.data)
-                break
\ No newline at end of file
+        # 找到对应股票并选中
+        row = self.stock_list_model.find_row(stock_code)
+        if row < 0:
+            return
+        proxy_index = self.stock_proxy_model.mapFromSource(self.stock_list_model.index(row))
+        if proxy_index.isValid():
+            self.select_stock_index(proxy_index)
+        else:   # 被过滤隐藏
+            self.slot_stock_card_clicked(self.stock_list_model.get_row_data(row))
+
+    def slot_stock_list_current_changed(self, current, previous):
+        data = current.data(RowDataRole)
+        if data is not None and data['code'] != self.current_code:
+            self.slot_stock_card_clicked(data)
\ No newline at end of file
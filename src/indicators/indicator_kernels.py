@@ -0,0 +1,202 @@
+import numpy as np
+
+'''
+    指标计算的NumPy核函数
+    1. 全部沿axis 0（时间轴）计算，输入可为一维（单只股票）或二维矩阵（行：时间，列：股票），
+       只在比pandas快的场景使用：rolling_max/rolling_min用于stock_data_indicators和panel_indicators，wma用于stock_data_indicators，
+       rolling_mean_std只用于panel_indicators（二维矩阵；单只股票时慢于pandas，stock_data_indicators仍使用rolling().mean()/std()）
+    2. 输入中的inf与pandas窗口函数一致按NaN处理，窗口内有效值不足min_periods时结果为NaN
+    3. 各核函数：
+        rolling_max/rolling_min：按窗口分块的前缀、后缀累积（van Herk/Gil-Werman），O(n)，窗口内有NaN时为NaN（与rolling(window).max()/min()一致）
+        wma：线性加权移动平均，一维时为卷积，替代rolling().apply()逐窗口调用Python函数
+        rolling_mean/rolling_std/rolling_mean_std：一次遍历的前缀和，窗口和为两个前缀和之差
+            前缀和每BLOCK_SIZE行重新开始累加，且累加的是与块内参考值的差，量级、误差不随序列长度及价格漂移增长；
+            窗口内的有效值全部相同时均值直接取该值、标准差为0（与pandas的连续相同值修正一致），一字板等不产生浮点误差
+'''
+
+BLOCK_SIZE = 1024       # 前缀和分块累加的行数
+
+def to_float_values(values):
+    """转为float64数组（副本），inf视为NaN"""
+    values = np.array(values, dtype=np.float64)
+    values[np.isinf(values)] = np.nan
+    return values
+
+def _window_diff(prefix, window):
+    """前缀和转窗口和：下标i处为prefix[i] - prefix[i - window]，不足一个窗口时为prefix[i]"""
+    result = prefix.copy()
+    result[window:] = prefix[window:] - prefix[:-window]
+    return result
+
+def _to_blocks(values, block, fill):
+    """沿时间轴按block行分块（末尾用fill补齐），返回(块数, block, ...)的数组"""
+    rows = len(values)
+    blocks = -(-rows // block)
+    padded = np.full((blocks * block,) + values.shape[1:], fill, dtype=values.dtype)
+    padded[:rows] = values
+    return padded.reshape((blocks, block) + values.shape[1:])
+
+def _from_blocks(blocks, rows):
+    return blocks.reshape((-1,) + blocks.shape[2:])[:rows]
+
+def get_block_size(window):
+    return max(BLOCK_SIZE, int(window))
+
+# ------------------------------------------------------------极值------------------------------------------------------------
+def _rolling_accumulate(values, window, ufunc, fill):
+    """
+    van Herk/Gil-Werman：按window分块，块内做前缀、后缀累积，
+    窗口[i - window + 1, i]的结果为起点的块内后缀与终点的块内前缀的合并，O(n)
+    """
+    rows = len(values)
+    output = np.full_like(values, np.nan)
+    if rows < window:
+        return output
+    blocks = _to_blocks(values, window, fill)
+    prefix = _from_blocks(ufunc.accumulate(blocks, axis=1), rows)
+    suffix = _from_blocks(ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1], rows)
+    output[window - 1:] = ufunc(suffix[:rows - window + 1], prefix[window - 1:])
+    return output
+
+def rolling_max(values, window):
+    """与Series.rolling(window).max()一致，窗口内有NaN时为NaN"""
+    return _rolling_accumulate(to_float_values(values), int(window), np.maximum, -np.inf)
+
+def rolling_min(values, window):
+    """与Series.rolling(window).min()一致，窗口内有NaN时为NaN"""
+    return _rolling_accumulate(to_float_values(values), int(window), np.minimum, np.inf)
+
+# ------------------------------------------------------------加权平均------------------------------------------------------------
+def wma(values, window):
+    """线性加权移动平均（权重1..window，最新的k线权重最大），窗口内有NaN时为NaN"""
+    window = int(window)
+    values = to_float_values(values)
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    output = np.full_like(values, np.nan)
+    if len(values) >= window:
+        if values.ndim == 1:
+            weighted_sum = np.convolve(values, weights[::-1], mode='valid')
+        else:
+            weighted_sum = np.lib.stride_tricks.sliding_window_view(values, window, axis=0) @ weights
+        output[window - 1:] = weighted_sum / weights.sum()
+    return output
+
+# ------------------------------------------------------------均值、标准差------------------------------------------------------------
+def _block_refs(values, valid, block):
+    """
+    每个位置累加时使用的参考值：所在块中截至该位置的第一个有效值，块内尚无有效值时沿用上一块的参考值（初始为0）
+    返回:
+        (ref, prev_ref): 当前位置的参考值、上一块末尾的参考值
+    """
+    rows = len(values)
+    valid_blocks = _to_blocks(valid, block, False)
+    value_blocks = _to_blocks(values, block, np.nan)
+    first_index = valid_blocks.argmax(axis=1)
+    has_valid = valid_blocks.any(axis=1)
+    first_value = np.take_along_axis(value_blocks, first_index[:, None], axis=1)[:, 0]
+
+    # 各块末尾的参考值：有有效值的块取第一个有效值，否则沿用之前最近的块
+    block_index = np.arange(len(value_blocks)).reshape((-1,) + (1,) * (values.ndim - 1))
+    source = np.maximum.accumulate(np.where(has_valid, block_index, -1), axis=0)
+    end_ref = np.where(source >= 0, np.take_along_axis(first_value, np.maximum(source, 0), axis=0), 0.)
+    start_ref = np.zeros_like(end_ref)
+    start_ref[1:] = end_ref[:-1]
+
+    in_block_index = np.arange(block).reshape((1, -1) + (1,) * (values.ndim - 1))
+    started = has_valid[:, None] & (in_block_index >= first_index[:, None])
+    ref = _from_blocks(np.where(started, end_ref[:, None], start_ref[:, None]), rows)
+    prev_ref = _from_blocks(np.broadcast_to(start_ref[:, None], value_blocks.shape), rows)
+    return ref, prev_ref
+
+def _flat_windows(values, valid, total, count):
+    """
+    常数窗口：截至当前连续相同的有效值数量（跳过NaN）不少于窗口内的有效值数量，与pandas连续相同值的判断一致
+    返回:
+        (last_value, is_flat): 截至当前的最后一个有效值、是否为常数窗口
+    """
+    index = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    if valid.all():
+        last_value = values
+    else:
+        source = np.maximum.accumulate(np.where(valid, index, 0), axis=0)
+        last_value = np.take_along_axis(values, source, axis=0)
+    is_change = valid.copy()
+    is_change[1:] &= values[1:] != last_value[:-1]
+    last_change = np.maximum.accumulate(np.where(is_change, index, 0), axis=0)
+    same_count = total - np.take_along_axis(total, last_change, axis=0) + 1
+    return last_value, same_count >= count
+
+def rolling_moments(values, window, with_sum_xx=True):
+    """
+    一次遍历得到窗口统计量，供均值、标准差共用
+    每block行为一块，块内累加与参考值（块内第一个有效值）的差，前缀和的量级只取决于块内的波动；
+    窗口跨两个块时，上一块中的部分和按两块参考值的差平移后与当前块的前缀和相加
+
+    返回:
+        (count, sum_x, sum_xx, ref, flat_value, is_flat)
+            count: 窗口内有效值数量
+            sum_x、sum_xx: 窗口内(x - ref)的和、平方和（with_sum_xx为False时sum_xx为None）
+            ref: 当前位置的参考值
+            flat_value、is_flat: 窗口内有效值全部相同时为True，flat_value为该值
+    """
+    window = int(window)
+    values = to_float_values(values)
+    rows = len(values)
+    block = get_block_size(window)
+    valid = values == values
+
+    ref, prev_ref = _block_refs(values, valid, block)
+    dev = np.where(valid, values - ref, 0.)
+    total = np.cumsum(valid, axis=0)
+    count = _window_diff(total, window)
+    prefix_x = _from_blocks(np.cumsum(_to_blocks(dev, block, 0.), axis=1), rows)
+    prefix_xx = _from_blocks(np.cumsum(_to_blocks(dev * dev, block, 0.), axis=1), rows) if with_sum_xx else None
+
+    sum_x = _window_diff(prefix_x, window)
+    sum_xx = _window_diff(prefix_xx, window) if with_sum_xx else None
+    # 窗口起点在上一块的位置（每块的前window行）：上一块中属于窗口的部分(prefix[块末尾] - prefix[i - window])按参考值的差平移
+    cross = (np.arange(block, rows, block)[:, None] + np.arange(window)[None, :]).ravel()
+    cross = cross[cross < rows]
+    if len(cross):
+        start = cross - window
+        block_end = cross // block * block - 1
+        part_x = prefix_x[block_end] - prefix_x[start]
+        part_count = total[block_end] - total[start]
+        delta = prev_ref[cross] - ref[cross]
+        sum_x[cross] = prefix_x[cross] + (part_x + part_count * delta)
+        if with_sum_xx:
+            part_xx = prefix_xx[block_end] - prefix_xx[start]
+            sum_xx[cross] = prefix_xx[cross] + (part_xx + 2. * delta * part_x + part_count * delta * delta)
+
+    flat_value, is_flat = _flat_windows(values, valid, total, count)
+    return count, sum_x, sum_xx, ref, flat_value, is_flat
+
+def _mean_from_moments(moments, min_periods):
+    count, sum_x, _, ref, flat_value, is_flat = moments
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(is_flat, flat_value, ref + sum_x / count)
+    return np.where((count >= min_periods) & (count > 0), mean, np.nan)
+
+def _std_from_moments(moments, min_periods, ddof):
+    count, sum_x, sum_xx, _, _, is_flat = moments
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (sum_xx - sum_x * sum_x / count) / (count - ddof)
+        var = np.where(is_flat | (var < 0), 0., var)
+        std = np.sqrt(var)
+    return np.where((count >= min_periods) & (count > ddof), std, np.nan)
+
+def rolling_mean(values, window, min_periods=None):
+    """对应Series.rolling(window, min_periods).mean()"""
+    min_periods = int(window) if min_periods is None else int(min_periods)
+    return _mean_from_moments(rolling_moments(values, window, with_sum_xx=False), min_periods)
+
+def rolling_std(values, window, min_periods=None, ddof=1):
+    """对应Series.rolling(window, min_periods).std()"""
+    min_periods = int(window) if min_periods is None else int(min_periods)
+    return _std_from_moments(rolling_moments(values, window), min_periods, ddof)
+
+def rolling_mean_std(values, window, min_periods=None, ddof=1):
+    """一次遍历同时得到滚动均值与标准差（BOLL）"""
+    min_periods = int(window) if min_periods is None else int(min_periods)
+    moments = rolling_moments(values, window)
+    return _mean_from_moments(moments, min_periods), _std_from_moments(moments, min_periods, ddof)
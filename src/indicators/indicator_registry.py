@@ -0,0 +1,248 @@
+import threading
+
+import pandas as pd
+
+from manager.indicators_config_manager import IndicatrosEnum
+from indicators import stock_data_indicators as sdi
+
+'''
+    指标注册表与按需计算
+    1. 每个指标声明输入列、输出列（由参数决定，如均线列名来自用户配置）、参数及依赖的其他指标，
+       新增指标只需register一个IndicatorSpec，无需修改调用方
+    2. ensure只计算缺少输出列或参数已变化的指标（及其依赖），已计算的参数记录在DataFrame.attrs中，
+       参数修改后再次ensure时自动重新计算；数据源自带的列（如change_percent、turnover_rate）视为已计算
+    3. 惰性访问：df.indicators['k']首次访问时才计算KDJ，df.indicators.ensure('macd', 'boll')按指标名批量计算
+
+    用法：
+        registry = get_indicator_registry()
+        registry.ensure(df_data, ['macd', 'kdj'])         # 只计算可见面板需要的指标
+        registry.ensure_columns(df_data, ['ma24', 'diff']) # 按列名反查指标后计算（筛选条件）
+        df_data.indicators['rsi6']
+'''
+
+ATTRS_KEY = 'indicator_params'      # DataFrame.attrs中记录{指标名: 计算时的参数}
+
+# k线主图（均线、k线概览、提示信息）需要的指标，读取k线数据时默认计算
+DEFAULT_INDICATOR_NAMES = ['ma', 'volume_ratio', 'change_percent', 'turnover_rate']
+
+class IndicatorSpec():
+    def __init__(self, name, inputs, outputs, compute, param_key=None, default_params=None, depends=()):
+        '''
+        参数:
+            name: 指标名
+            inputs: 需要的k线数据列
+            outputs: 输出列，list或函数outputs(params) -> list
+            compute: 计算函数compute(stock_data, params)，在stock_data上原地添加输出列
+            param_key: get_indicator_params_by_config()中的参数键，为None时参数固定为default_params
+            default_params: 参数默认值
+            depends: 依赖的其他指标名，计算前先确保依赖已计算
+        '''
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = outputs
+        self.compute = compute
+        self.param_key = param_key
+        self.default_params = default_params
+        self.depends = tuple(depends)
+
+    def get_params(self, dict_params):
+        if self.param_key is None:
+            return self.default_params
+        return dict_params.get(self.param_key, self.default_params)
+
+    def get_output_columns(self, params):
+        if callable(self.outputs):
+            return list(self.outputs(params))
+        return list(self.outputs)
+
+
+class IndicatorRegistry():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dict_specs = {}
+
+    def register(self, spec):
+        with self.lock:
+            self.dict_specs[spec.name] = spec
+
+    def get_spec(self, name):
+        spec = self.dict_specs.get(name)
+        if spec is None:
+            raise KeyError(f"未注册的指标：{name}")
+        return spec
+
+    def get_names(self):
+        return list(self.dict_specs.keys())
+
+    def get_output_columns(self, name, dict_params=None):
+        if dict_params is None:
+            dict_params = sdi.get_indicator_params_by_config()
+        spec = self.get_spec(name)
+        return spec.get_output_columns(spec.get_params(dict_params))
+
+    def find_by_column(self, column, dict_params=None):
+        '''按输出列名反查指标名，找不到时返回None'''
+        if dict_params is None:
+            dict_params = sdi.get_indicator_params_by_config()
+        for name, spec in self.dict_specs.items():
+            if column in spec.get_output_columns(spec.get_params(dict_params)):
+                return name
+        return None
+
+    def is_computed(self, stock_data, name, dict_params=None):
+        if dict_params is None:
+            dict_params = sdi.get_indicator_params_by_config()
+        spec = self.get_spec(name)
+        params = spec.get_params(dict_params)
+        dict_computed = stock_data.attrs.get(ATTRS_KEY, {})
+        if name in dict_computed and dict_computed[name] != params:
+            return False
+        return all(column in stock_data.columns for column in spec.get_output_columns(params))
+
+    def ensure(self, stock_data, names=None, dict_params=None):
+        '''
+        计算stock_data中缺少的指标（含依赖），names为None时计算全部已注册的指标
+
+        返回:
+            list: 本次实际计算的指标名
+        '''
+        if stock_data is None or stock_data.empty:
+            return []
+        if dict_params is None:
+            dict_params = sdi.get_indicator_params_by_config()
+        if names is None:
+            names = self.get_names()
+        elif isinstance(names, str):
+            names = [names]
+
+        list_order = []
+        for name in names:
+            self._resolve(name, list_order, set())
+
+        dict_computed = dict(stock_data.attrs.get(ATTRS_KEY, {}))
+        list_computed = []
+        for name in list_order:
+            spec = self.get_spec(name)
+            # 依赖本次重新计算时（如MACD参数变化），依赖它的指标也需重新计算
+            if self.is_computed(stock_data, name, dict_params) and not any(depend in list_computed for depend in spec.depends):
+                continue
+            missing_inputs = [column for column in spec.inputs if column not in stock_data.columns]
+            if missing_inputs:
+                raise ValueError(f"指标{name}缺少必要的数据列：{', '.join(missing_inputs)}")
+            params = spec.get_params(dict_params)
+            # 数据源自带列的函数（如calc_change_percent）在列已存在时不重算，参数变化时先删除旧列
+            stock_data.drop(columns=[column for column in spec.get_output_columns(params) if column in stock_data.columns], inplace=True)
+            spec.compute(stock_data, params)
+            dict_computed[name] = params
+            list_computed.append(name)
+
+        if list_computed:
+            stock_data.attrs[ATTRS_KEY] = dict_computed
+        return list_computed
+
+    def ensure_columns(self, stock_data, columns, dict_params=None):
+        '''按列名计算：反查每列所属的指标后ensure，k线数据列及未知列忽略'''
+        if dict_params is None:
+            dict_params = sdi.get_indicator_params_by_config()
+        names = []
+        for column in columns:
+            if column in stock_data.columns and column not in self._get_output_column_set(dict_params):
+                continue
+            name = self.find_by_column(column, dict_params)
+            if name is not None and name not in names:
+                names.append(name)
+        return self.ensure(stock_data, names, dict_params)
+
+    def _get_output_column_set(self, dict_params):
+        set_columns = set()
+        for spec in self.dict_specs.values():
+            set_columns.update(spec.get_output_columns(spec.get_params(dict_params)))
+        return set_columns
+
+    def _resolve(self, name, list_order, set_visiting):
+        '''按依赖关系排序（依赖在前），检查循环依赖'''
+        if name in list_order:
+            return
+        if name in set_visiting:
+            raise ValueError(f"指标存在循环依赖：{name}")
+        set_visiting.add(name)
+        for depend in self.get_spec(name).depends:
+            self._resolve(depend, list_order, set_visiting)
+        set_visiting.discard(name)
+        list_order.append(name)
+
+
+def _compute_ma(stock_data, params):
+    for column, period in params:
+        sdi.ma(stock_data, column, period)
+
+def _compute_rsi(stock_data, params):
+    for period in params:
+        sdi.rsi(stock_data, period)
+
+def register_default_indicators(registry):
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.MACD.value, ['close'],
+        [IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value],
+        lambda stock_data, params: sdi.macd(stock_data, *params), param_key='macd', default_params=(12, 26, 9)))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.MA.value, ['close'], lambda params: [column for column, _ in params],
+        _compute_ma, param_key='ma', default_params=[]))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.KDJ.value, ['high', 'low', 'close'],
+        ['RSV', IndicatrosEnum.KDJ_K.value, IndicatrosEnum.KDJ_D.value, IndicatrosEnum.KDJ_J.value],
+        lambda stock_data, params: sdi.kdj(stock_data, *params), param_key='kdj', default_params=(9, 3, 3)))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.RSI.value, ['close'], lambda params: [f'{IndicatrosEnum.RSI.value}{period}' for period in params],
+        _compute_rsi, param_key='rsi', default_params=[]))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.BOLL.value, ['close'],
+        [IndicatrosEnum.BOLL_MID.value, IndicatrosEnum.BOLL_UPPER.value, IndicatrosEnum.BOLL_LOWER.value],
+        lambda stock_data, params: sdi.boll(stock_data, *params), param_key='boll', default_params=(20, 2)))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.VOLUME_RATIO.value, ['volume'], [IndicatrosEnum.VOLUME_RATIO.value],
+        lambda stock_data, params: sdi.quantity_ratio(stock_data, *params), default_params=(5,)))
+    registry.register(IndicatorSpec(
+        'macd_divergence', ['low', 'high', 'close'], ['macd_period', 'macd_divergence'],
+        lambda stock_data, params: sdi.macd_deviation(stock_data, *params),
+        default_params=(sdi.DEFAULT_DIFF_RATIO, sdi.DEFAULT_MA52_TOLERANCE), depends=[IndicatrosEnum.MACD.value]))
+    registry.register(IndicatorSpec(
+        'change_percent', ['close'], ['change_percent'],
+        lambda stock_data, params: sdi.calc_change_percent(stock_data)))
+    registry.register(IndicatorSpec(
+        IndicatrosEnum.TURNOVER_RATE.value, ['volume'], [IndicatrosEnum.TURNOVER_RATE.value],
+        lambda stock_data, params: sdi.calc_turnover_rate(stock_data)))
+
+
+@pd.api.extensions.register_dataframe_accessor('indicators')
+class IndicatorAccessor():
+    '''df.indicators[列名]：首次访问时计算该列所属的指标'''
+    def __init__(self, stock_data):
+        self.stock_data = stock_data
+
+    def __getitem__(self, column):
+        get_indicator_registry().ensure_columns(self.stock_data, [column])
+        return self.stock_data[column]
+
+    def ensure(self, *names):
+        return get_indicator_registry().ensure(self.stock_data, list(names) if names else None)
+
+    def columns(self, *names):
+        registry = get_indicator_registry()
+        return [column for name in names for column in registry.get_output_columns(name)]
+
+
+# 全局实例
+_indicator_registry = None
+_indicator_registry_lock = threading.Lock()
+
+def get_indicator_registry() -> IndicatorRegistry:
+    """获取指标注册表实例（已注册内置指标）"""
+    global _indicator_registry
+    if _indicator_registry is None:
+        with _indicator_registry_lock:
+            if _indicator_registry is None:
+                registry = IndicatorRegistry()
+                register_default_indicators(registry)
+                _indicator_registry = registry
+    return _indicator_registry
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+'''
+    MACD零轴下方单位调整周期与背离（向量化分段）
+    1. 下跌线段：diff下穿零轴（dea仍在零轴上方）或dea下穿零轴时开始，dea上穿零轴时结束；
+       dea未下穿零轴前diff重新上穿零轴视为线段未成立，提前结束
+    2. 单位调整周期：线段内从远离零轴到回到零轴的区间
+        开始：线段的第一根k线，或上一周期结束后第一根离开零轴的k线（diff < 0，且收盘价低于MA24、最高价未接近MA52）
+        结束（回到零轴）：diff >= 0，或 收盘价高于MA24（或最高价与MA52的差值小于ma52_tolerance）且diff回升到周期内最低diff的diff_ratio以内
+    3. 背离：与线段内的上一周期比较，当前周期最低diff高于上一周期最低diff时
+        最低价低于上一周期最低价 → 1：背离
+        最低价不低于上一周期最低价 → 2：下跌动能不足
+       当前周期的最低收盘价低于上一周期的最低价，且最低收盘价k线的diff低于上一周期最低价k线的diff时，上一周期失效（invalid）
+    4. 逐根k线的结果不使用未来数据：周期进行中只用截至当前的最低价、最低diff判断背离（1），周期结束时给出最终结果（1/2）
+
+    实现：
+        diff、dea的零轴穿越为符号变化，线段、周期编号为事件的累加和（前向填充），
+        周期内的最低价、最低diff为分组累积最小值与reduceat分组归约，全部k线一次计算；
+        周期的结束取决于周期内的最低diff，按“每条线段当前的周期”分轮计算，轮数为单条线段的最大周期数，每轮对全部股票向量运算
+        多只股票首尾相接（group_start为每只股票的起始行）时线段不跨股票，结果与逐只计算一致
+
+    用法：
+        dict_result, df_periods = detect_macd_divergence(low, high, close, diff, dea, ma24, ma52)
+'''
+
+DEFAULT_DIFF_RATIO = 0.3        # diff回升到周期内最低diff的比例以内视为回到零轴
+DEFAULT_MA52_TOLERANCE = 0.03   # 最高价与MA52的差值（相对MA52）小于该值视为回到零轴
+
+def _to_values(values):
+    return np.asarray(values, dtype=np.float64)
+
+def _shift(values, is_group_start, fill):
+    """后移一行，每只股票的第一行填充fill"""
+    result = np.empty_like(values)
+    result[1:] = values[:-1]
+    result[is_group_start] = fill
+    return result
+
+def _ffill_index(mask):
+    """截至每个位置最后一个mask为True的下标，之前没有时为-1"""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+def _segment_ranges(starts, stops):
+    """
+    多个区间[start, stop]的下标首尾相接
+    返回:
+        (index, labels, offsets): 各区间的下标、所属区间序号、每个区间在index中的起始位置
+    """
+    lengths = stops - starts + 1
+    offsets = np.cumsum(lengths) - lengths
+    labels = np.repeat(np.arange(len(starts)), lengths)
+    index = np.arange(lengths.sum()) - offsets[labels] + starts[labels]
+    return index, labels, offsets
+
+def _group_cummin(values, labels):
+    return pd.Series(values).groupby(labels).cummin().to_numpy()
+
+def _first_true(mask, index, labels, count):
+    """每个区间第一个mask为True的下标，没有时为-1"""
+    result = np.full(count, -1, dtype=np.int64)
+    positions = np.flatnonzero(mask)
+    unique_labels, first = np.unique(labels[positions], return_index=True)
+    result[unique_labels] = index[positions[first]]
+    return result
+
+def _find_legs(diff, dea, is_group_start):
+    """下跌线段：返回(每根k线所属线段序号（不在线段内为-1）, 各线段起始行, 各线段最后一行)"""
+    prev_diff = _shift(diff, is_group_start, np.nan)
+    prev_dea = _shift(dea, is_group_start, np.nan)
+    with np.errstate(invalid='ignore'):
+        diff_below, dea_below = diff < 0, dea < 0
+        prev_diff_below, prev_dea_below = prev_diff < 0, prev_dea < 0
+    start_event = (diff_below & ~prev_diff_below & ~prev_dea_below) | (dea_below & ~prev_dea_below)
+    end_event = (~dea_below & prev_dea_below) | (~diff_below & prev_diff_below & ~dea_below) | is_group_start
+
+    last_event = _ffill_index(start_event | end_event)
+    in_leg = (last_event >= 0) & start_event[np.maximum(last_event, 0)]
+    leg_start = in_leg & (is_group_start | ~_shift(in_leg, is_group_start, False))
+    leg_continue = np.zeros_like(in_leg)
+    leg_continue[:-1] = in_leg[1:] & ~is_group_start[1:]
+    leg_stop = in_leg & ~leg_continue
+
+    leg_id = np.where(in_leg, np.cumsum(leg_start) - 1, -1)
+    return leg_id, np.flatnonzero(leg_start), np.flatnonzero(leg_stop)
+
+def _find_periods(diff, price_back, leave, leg_starts, leg_stops, diff_ratio):
+    """单位调整周期：返回(起始行, 结束行（未结束为-1）, 所在线段的最后一行)，按起始行排序"""
+    leave_index = np.flatnonzero(leave)
+    list_starts, list_ends, list_stops = [], [], []
+    pending, pending_stop = leg_starts, leg_stops
+    while len(pending):
+        index, labels, _ = _segment_ranges(pending, pending_stop)
+        values = diff[index]
+        running_min = _group_cummin(values, labels)
+        with np.errstate(invalid='ignore'):
+            back = (values >= 0) | (price_back[index] & (values >= diff_ratio * running_min))
+        back &= index != pending[labels]       # 周期第一根k线不判断回到零轴
+        ends = _first_true(back, index, labels, len(pending))
+        list_starts.append(pending)
+        list_ends.append(ends)
+        list_stops.append(pending_stop)
+
+        # 下一周期：回到零轴后线段内第一根离开零轴的k线
+        finished = ends >= 0
+        ends, stops = ends[finished], pending_stop[finished]
+        positions = np.searchsorted(leave_index, ends, side='right')
+        has_next = positions < len(leave_index)
+        next_starts = np.full(len(ends), -1, dtype=np.int64)
+        next_starts[has_next] = leave_index[positions[has_next]]
+        has_next &= next_starts <= stops
+        pending, pending_stop = next_starts[has_next], stops[has_next]
+
+    starts = np.concatenate(list_starts)
+    order = np.argsort(starts, kind='stable')
+    return starts[order], np.concatenate(list_ends)[order], np.concatenate(list_stops)[order]
+
+def detect_macd_divergence(low, high, close, diff, dea, ma24, ma52, group_start=None,
+                           diff_ratio=DEFAULT_DIFF_RATIO, ma52_tolerance=DEFAULT_MA52_TOLERANCE):
+    """
+    计算全部k线的单位调整周期及背离
+
+    参数:
+        low/high/close/diff/dea/ma24/ma52: 一维数组，多只股票时按股票、时间排序首尾相接
+        group_start: 每只股票的起始行，None时视为一只股票
+    返回:
+        (dict_result, df_periods)
+            dict_result: {'macd_period': 所在周期是线段中的第几个周期（不在周期内为0）, 'macd_divergence': 0/1/2}
+            df_periods: 每个单位调整周期一行
+                leg: 线段序号，period: 线段中的第几个周期
+                start、end: 起止行（未结束时end为-1），completed: 是否已走完
+                low、low_index、low_diff: 最低价、最低价所在行、该k线的diff
+                min_diff、min_close: 周期内最低diff、最低收盘价，min_close_diff: 最低收盘价k线的diff
+                status: 0：未背离或下跌动能不足 1：背离 2：下跌动能不足
+                invalid: 是否被下一周期判定失效
+    """
+    low, high, close = _to_values(low), _to_values(high), _to_values(close)
+    diff, dea, ma24, ma52 = _to_values(diff), _to_values(dea), _to_values(ma24), _to_values(ma52)
+    rows = len(close)
+    is_group_start = np.zeros(rows, dtype=bool)
+    if rows:
+        is_group_start[0] = True
+    if group_start is not None:
+        is_group_start[np.asarray(group_start, dtype=np.int64)] = True
+
+    dict_result = {'macd_period': np.zeros(rows, dtype=np.int64), 'macd_divergence': np.zeros(rows, dtype=np.int64)}
+    leg_id, leg_starts, leg_stops = _find_legs(diff, dea, is_group_start)
+    if len(leg_starts) == 0:
+        return dict_result, make_periods_frame()
+
+    in_leg = leg_id >= 0
+    with np.errstate(invalid='ignore'):
+        price_back = (close > ma24) | (high >= ma52 * (1 - ma52_tolerance))
+        leave = in_leg & (diff < 0) & ~price_back
+    starts, ends, stops = _find_periods(diff, price_back, leave, leg_starts, leg_stops, diff_ratio)
+    count = len(starts)
+    period_leg = leg_id[starts]
+    period_number = np.arange(count) - np.searchsorted(period_leg, period_leg, side='left') + 1
+    completed = ends >= 0
+
+    # 周期内统计量：区间首尾相接后reduceat分组归约
+    index, labels, offsets = _segment_ranges(starts, np.where(completed, ends, stops))
+    min_low = np.fmin.reduceat(low[index], offsets)
+    min_close = np.fmin.reduceat(close[index], offsets)
+    min_diff = np.fmin.reduceat(diff[index], offsets)
+    low_index = _first_true(low[index] == min_low[labels], index, labels, count)
+    low_diff = np.where(low_index >= 0, diff[np.maximum(low_index, 0)], np.nan)
+    close_index = _first_true(close[index] == min_close[labels], index, labels, count)
+    min_close_diff = np.where(close_index >= 0, diff[np.maximum(close_index, 0)], np.nan)
+
+    # 与线段内的上一周期比较
+    has_prev = period_number >= 2
+    prev = np.maximum(np.arange(count) - 1, 0)
+    prev_min_low, prev_min_diff, prev_low_diff = min_low[prev], min_diff[prev], low_diff[prev]
+    with np.errstate(invalid='ignore'):
+        higher_diff = has_prev & (min_diff > prev_min_diff)
+        status = np.where(higher_diff, np.where(min_low < prev_min_low, 1, 2), 0)
+        invalid = np.zeros(count, dtype=bool)
+        invalid[:-1] = (has_prev & (min_close < prev_min_low) & (min_close_diff < prev_low_diff))[1:]
+
+    # 逐根k线：周期开始后的k线（含结束后至下一周期开始前）归属该周期
+    marker = np.full(rows, -1, dtype=np.int64)
+    marker[starts] = np.arange(count)
+    period_id = np.where(in_leg, np.maximum.accumulate(marker), -1)
+    bar_index = np.flatnonzero(period_id >= 0)
+    bar_period = period_id[bar_index]
+    running_low = _group_cummin(low[bar_index], bar_period)
+    running_diff = _group_cummin(diff[bar_index], bar_period)
+    with np.errstate(invalid='ignore'):
+        running_status = np.where(has_prev[bar_period] & (running_diff > prev_min_diff[bar_period])
+                                  & (running_low < prev_min_low[bar_period]), 1, 0)
+    bar_completed = completed[bar_period] & (bar_index >= ends[bar_period])
+    dict_result['macd_period'][bar_index] = period_number[bar_period]
+    dict_result['macd_divergence'][bar_index] = np.where(bar_completed, status[bar_period], running_status)
+
+    df_periods = make_periods_frame(period_leg, period_number, starts, ends, completed, min_low, low_index, low_diff,
+                                     min_diff, min_close, min_close_diff, status, invalid)
+    return dict_result, df_periods
+
+def make_periods_frame(*columns):
+    names = ['leg', 'period', 'start', 'end', 'completed', 'low', 'low_index', 'low_diff', 'min_diff', 'min_close',
+             'min_close_diff', 'status', 'invalid']
+    if not columns:
+        return pd.DataFrame(columns=names)
+    return pd.DataFrame(dict(zip(names, columns)))
@@ -0,0 +1,349 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from manager.indicators_config_manager import IndicatrosEnum
+from manager.logging_manager import get_logger
+from indicators.stock_data_indicators import get_indicator_params_by_config
+from indicators.indicator_kernels import to_float_values, rolling_max, rolling_min, rolling_mean_std
+from indicators import macd_divergence
+from indicators.macd_divergence import DEFAULT_DIFF_RATIO, DEFAULT_MA52_TOLERANCE
+
+'''
+    全市场（面板）指标计算
+    1. 输入为二维矩阵（行：时间，列：股票），一次计算全部股票的MA、MACD、KDJ、RSI、BOLL
+    2. ewm沿时间轴逐行推进，每一行对全部股票做向量运算，按pandas ewm（adjust=False）的递推实现
+    3. KDJ的rolling min/max、BOLL的rolling mean/std使用indicator_kernels中沿时间轴计算的核函数（二维时快于DataFrame.rolling），
+       MA、量比的rolling mean使用DataFrame.rolling（核函数更慢）
+       每一列的结果与stock_data_indicators一致，BOLL的误差在浮点舍入范围内（约1e-6），其余逐位一致
+    4. 长表（code, date）输入时每只股票的k线按各自的顺序左对齐排列，末尾不足的部分补NaN，
+       结果与逐只调用stock_data_indicators一致（停牌、上市时间不同不影响）；股票较多时按列分块计算，限制内存占用
+
+    用法：
+        dict_result = calculate_panel_indicators(close, high, low)        # {列名: 二维矩阵}
+        calculate_market_indicators(df_market)                           # 长表，指标列写入df_market
+        df_periods = calculate_market_macd_divergence(df_market)         # 长表，全市场MACD背离
+        calculate_market_columns(df_market, ['ma52', 'volume_ratio'])     # 长表，只计算指定的指标列
+'''
+
+logger = get_logger(__name__)
+
+PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3     # pandas 3中com为1时新值权重随old_wt变化
+
+MACD_COLUMNS = (IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value)
+KDJ_COLUMNS = ('RSV', IndicatrosEnum.KDJ_K.value, IndicatrosEnum.KDJ_D.value, IndicatrosEnum.KDJ_J.value)
+BOLL_COLUMNS = (IndicatrosEnum.BOLL_MID.value, IndicatrosEnum.BOLL_UPPER.value, IndicatrosEnum.BOLL_LOWER.value)
+MA_COLUMN_PATTERN = re.compile(rf'{IndicatrosEnum.MA.value}(\d+)')
+RSI_COLUMN_PATTERN = re.compile(rf'{IndicatrosEnum.RSI.value}(\d+)')
+
+# ------------------------------------------------------------ewm------------------------------------------------------------
+def panel_ewm(values, span=None, alpha=None, min_periods=0):
+    """逐列计算Series.ewm(span=/alpha=, min_periods=, adjust=False).mean()"""
+    if span is not None:
+        com = float((span - 1) / 2)
+    elif alpha is not None:
+        com = float((1 - alpha) / alpha)
+    else:
+        raise ValueError("span、alpha需指定一个")
+    alpha = 1. / (1. + com)
+    old_wt_factor = 1. - alpha
+    update_new_wt = PANDAS_3 and com == 1
+    min_periods = max(int(min_periods), 1)
+
+    values = to_float_values(values)
+    rows, cols = values.shape
+    output = np.empty_like(values)
+    weighted = np.full(cols, np.nan)
+    old_wt = np.ones(cols)
+    new_wt = np.full(cols, alpha)
+    nobs = np.zeros(cols, dtype=np.int64)
+    for i in range(rows):
+        cur = values[i]
+        is_observation = cur == cur
+        nobs += is_observation
+        has_weighted = weighted == weighted
+        old_wt = np.where(has_weighted, old_wt * old_wt_factor, old_wt)
+        observed = has_weighted & is_observation
+        changed = observed & (weighted != cur)
+        if update_new_wt:
+            new_wt = np.where(changed, 1. - old_wt, new_wt)
+        weighted = np.where(changed, (old_wt * weighted + new_wt * cur) / (old_wt + new_wt), weighted)
+        old_wt = np.where(observed, 1., old_wt)
+        weighted = np.where(~has_weighted & is_observation, cur, weighted)
+        output[i] = np.where(nobs >= min_periods, weighted, np.nan)
+    return output
+
+# ------------------------------------------------------------指标------------------------------------------------------------
+def panel_macd(close, diff_period=12, dea_period=26, ma_period=9):
+    dif = panel_ewm(close, span=diff_period) - panel_ewm(close, span=dea_period)
+    dea = panel_ewm(dif, span=ma_period)
+    return {
+        IndicatrosEnum.MACD_DIFF.value: dif,
+        IndicatrosEnum.MACD_DEA.value: dea,
+        IndicatrosEnum.MACD.value: 2 * (dif - dea),
+    }
+
+def panel_kdj(high, low, close, n=9, m1=3, m2=3):
+    low_min = rolling_min(low, n)
+    high_max = rolling_max(high, n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsv = (np.asarray(close, dtype=np.float64) - low_min) / (high_max - low_min) * 100
+    k = panel_ewm(rsv, alpha=1/m1)
+    d = panel_ewm(k, alpha=1/m2)
+    return {
+        'RSV': rsv,
+        IndicatrosEnum.KDJ_K.value: k,
+        IndicatrosEnum.KDJ_D.value: d,
+        IndicatrosEnum.KDJ_J.value: 3 * k - 2 * d,
+    }
+
+def panel_rsi(close, period=14):
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.)
+        loss = -np.where(delta < 0, delta, 0.)
+    avg_gain = panel_ewm(gain, span=period, min_periods=period)
+    avg_loss = panel_ewm(loss, span=period, min_periods=period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return {f'{IndicatrosEnum.RSI.value}{period}': rsi}
+
+def panel_boll(close, n=20, m=2):
+    mid, std = rolling_mean_std(close, n)
+    return {
+        IndicatrosEnum.BOLL_MID.value: mid,
+        IndicatrosEnum.BOLL_UPPER.value: mid + m * std,
+        IndicatrosEnum.BOLL_LOWER.value: mid - m * std,
+    }
+
+def panel_ma(close, column='ma5', cycle=5):
+    return {column: pd.DataFrame(close).rolling(window=cycle, min_periods=1).mean().to_numpy()}
+
+def calculate_panel_indicators(close, high=None, low=None, dict_params=None):
+    """
+    计算全部股票的指标，参数默认取用户指标配置（与auto_xxx_calulate一致）
+
+    参数:
+        close/high/low: 二维矩阵（行：时间，列：股票），未提供high、low时不计算KDJ
+        dict_params: 指标参数，格式见stock_data_indicators.get_indicator_params_by_config
+    返回:
+        dict: {列名: 与close形状相同的矩阵}
+    """
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+    close = np.asarray(close, dtype=np.float64)
+    if close.ndim != 2:
+        raise ValueError(f"close需为二维矩阵（时间 x 股票），当前维度: {close.ndim}")
+
+    dict_result = {}
+    dict_result.update(panel_macd(close, *dict_params['macd']))
+    for column, period in dict_params['ma']:
+        dict_result.update(panel_ma(close, column, period))
+    if high is not None and low is not None:
+        dict_result.update(panel_kdj(high, low, close, *dict_params['kdj']))
+    for period in dict_params['rsi']:
+        dict_result.update(panel_rsi(close, period))
+    dict_result.update(panel_boll(close, *dict_params['boll']))
+    return dict_result
+
+def panel_volume_ratio(volume, cycle=5):
+    volume = np.asarray(volume, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {IndicatrosEnum.VOLUME_RATIO.value: volume / pd.DataFrame(volume).rolling(window=cycle, min_periods=1).mean().to_numpy()}
+
+def get_panel_column_inputs(columns):
+    """计算columns需要的k线数据列；无法计算的列抛出ValueError"""
+    set_inputs = {'close'}
+    for column in columns:
+        if column in KDJ_COLUMNS:
+            set_inputs.update(('high', 'low'))
+        elif column == IndicatrosEnum.VOLUME_RATIO.value:
+            set_inputs.add('volume')
+        elif column not in MACD_COLUMNS and column not in BOLL_COLUMNS and not MA_COLUMN_PATTERN.fullmatch(column) \
+                and not RSI_COLUMN_PATTERN.fullmatch(column):
+            raise ValueError(f"无法计算的指标列：{column}")
+    return sorted(set_inputs)
+
+def calculate_panel_columns(dict_matrix, columns, dict_params=None):
+    """
+    只计算得到columns所需的指标（选股等只用到少数指标列时），MA、RSI按列名中的周期计算（不要求在用户配置中）
+
+    参数:
+        dict_matrix: {k线数据列: 二维矩阵}，需含get_panel_column_inputs(columns)返回的列
+    返回:
+        dict: {列名: 矩阵}，只含columns中的列
+    """
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+    close = dict_matrix['close']
+    set_columns = set(columns)
+    dict_result = {}
+    if set_columns & set(MACD_COLUMNS):
+        dict_result.update(panel_macd(close, *dict_params['macd']))
+    if set_columns & set(KDJ_COLUMNS):
+        dict_result.update(panel_kdj(dict_matrix['high'], dict_matrix['low'], close, *dict_params['kdj']))
+    if set_columns & set(BOLL_COLUMNS):
+        dict_result.update(panel_boll(close, *dict_params['boll']))
+    if IndicatrosEnum.VOLUME_RATIO.value in set_columns:
+        dict_result.update(panel_volume_ratio(dict_matrix['volume']))
+    for column in set_columns:
+        ma_match = MA_COLUMN_PATTERN.fullmatch(column)
+        rsi_match = RSI_COLUMN_PATTERN.fullmatch(column)
+        if ma_match:
+            dict_result.update(panel_ma(close, column, int(ma_match.group(1))))
+        elif rsi_match:
+            dict_result.update(panel_rsi(close, int(rsi_match.group(1))))
+    return {column: values for column, values in dict_result.items() if column in set_columns}
+
+# ------------------------------------------------------------长表------------------------------------------------------------
+def get_market_order(df_market):
+    """
+    长表按股票、日期排序的行顺序
+
+    返回:
+        (order, sorted_code_index, counts, starts, codes)
+            order: 排序后第i行对应df_market的第order[i]行
+            sorted_code_index: 排序后每行的股票序号
+            counts、starts: 每只股票的k线数量、排序后的起始行
+    """
+    # 字符串列先编码为整数（哈希，比对字符串排序快），再按股票、日期排序
+    code_index, codes = pd.factorize(df_market['code'], sort=True)
+    date_index, _ = pd.factorize(df_market['date'], sort=True)
+    order = np.lexsort((date_index, code_index))
+    sorted_code_index = code_index[order]
+    counts = np.bincount(sorted_code_index, minlength=len(codes))
+    starts = np.cumsum(counts) - counts
+    return order, sorted_code_index, counts, starts, codes
+
+def apply_market_panel(df_market, calculate, input_columns, chunk_size=2000, market_order=None):
+    """
+    长表转为面板矩阵（每只股票的k线在矩阵中按顺序左对齐）后按列分块调用calculate(dict_matrix) -> {列名: 矩阵}
+    market_order: get_market_order的结果，调用方已排序时传入避免重复排序
+
+    返回:
+        dict: {列名: 与df_market行顺序一致的一维数组}
+    """
+    if market_order is None:
+        market_order = get_market_order(df_market)
+    order, sorted_code_index, counts, starts, codes = market_order
+    positions = np.arange(len(order)) - starts[sorted_code_index]
+
+    dict_inputs = {column: df_market[column].to_numpy(dtype=np.float64)[order] for column in input_columns}
+    dict_outputs = {}
+
+    for chunk_start in range(0, len(codes), chunk_size):
+        chunk_end = min(chunk_start + chunk_size, len(codes))
+        row_start, row_end = starts[chunk_start], starts[chunk_end - 1] + counts[chunk_end - 1]
+        rows = positions[row_start:row_end]
+        cols = sorted_code_index[row_start:row_end] - chunk_start
+        shape = (counts[chunk_start:chunk_end].max(), chunk_end - chunk_start)
+
+        dict_matrix = {}
+        for column, values in dict_inputs.items():
+            matrix = np.full(shape, np.nan)
+            matrix[rows, cols] = values[row_start:row_end]
+            dict_matrix[column] = matrix
+
+        for column, matrix in calculate(dict_matrix).items():
+            if column not in dict_outputs:
+                dict_outputs[column] = np.empty(len(order))
+            dict_outputs[column][row_start:row_end] = matrix[rows, cols]
+
+    dict_result = {}
+    for column, values in dict_outputs.items():
+        result = np.empty(len(order))
+        result[order] = values
+        dict_result[column] = result
+    return dict_result
+
+def calculate_market_indicators(df_market, dict_params=None, chunk_size=2000):
+    """
+    计算长表（每行一只股票一根k线）中全部股票的指标，指标列写入df_market
+
+    参数:
+        df_market: 含code、date、close（及high、low）列的DataFrame，行顺序任意
+        chunk_size: 每次计算的股票数量，限制中间矩阵的内存占用
+    返回:
+        df_market
+    """
+    if df_market is None or df_market.empty:
+        return df_market
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+
+    has_high_low = 'high' in df_market.columns and 'low' in df_market.columns
+    input_columns = ('close', 'high', 'low') if has_high_low else ('close',)
+    calculate = lambda dict_matrix: calculate_panel_indicators(dict_matrix['close'], dict_matrix.get('high'), dict_matrix.get('low'), dict_params)
+    for column, values in apply_market_panel(df_market, calculate, input_columns, chunk_size).items():
+        df_market[column] = values
+
+    logger.info(f"全市场指标计算完成，股票数: {df_market['code'].nunique()}，k线数: {len(df_market)}")
+    return df_market
+
+def calculate_market_columns(df_market, columns, dict_params=None, chunk_size=2000, market_order=None):
+    """计算长表中缺少的指标列（只计算columns需要的指标），写入df_market"""
+    if df_market is None or df_market.empty:
+        return df_market
+    columns = [column for column in dict.fromkeys(columns) if column not in df_market.columns]
+    if not columns:
+        return df_market
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+    calculate = lambda dict_matrix: calculate_panel_columns(dict_matrix, columns, dict_params)
+    dict_values = apply_market_panel(df_market, calculate, get_panel_column_inputs(columns), chunk_size, market_order)
+    for column in columns:
+        df_market[column] = dict_values[column]
+    return df_market
+
+def calculate_market_macd_divergence(df_market, dict_params=None, diff_ratio=DEFAULT_DIFF_RATIO,
+                                     ma52_tolerance=DEFAULT_MA52_TOLERANCE, chunk_size=2000):
+    """
+    全市场MACD零轴下方单位调整周期及背离（见stock_data_indicators.macd_deviation），macd_period、macd_divergence列写入df_market
+    缺少diff、dea列时按用户MACD参数以面板方式计算，MA24、MA52与逐只计算一致
+
+    返回:
+        DataFrame: 全部股票的单位调整周期，含code列，start、end、low_index为df_market的行号（index）
+    """
+    if df_market is None or df_market.empty:
+        return macd_divergence.make_periods_frame()
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+
+    has_macd = IndicatrosEnum.MACD_DIFF.value in df_market.columns and IndicatrosEnum.MACD_DEA.value in df_market.columns
+    def calculate(dict_matrix):
+        close = dict_matrix['close']
+        dict_result = {} if has_macd else panel_macd(close, *dict_params['macd'])
+        dict_result.update(panel_ma(close, 'ma24', 24))
+        dict_result.update(panel_ma(close, 'ma52', 52))
+        return dict_result
+    market_order = get_market_order(df_market)
+    dict_values = apply_market_panel(df_market, calculate, ('close',), chunk_size, market_order)
+    if not has_macd:
+        for column in (IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value):
+            df_market[column] = dict_values[column]
+
+    order, _, _, starts, codes = market_order
+    def sorted_values(column):
+        return df_market[column].to_numpy(dtype=np.float64)[order]
+    dict_result, df_periods = macd_divergence.detect_macd_divergence(
+        sorted_values('low'), sorted_values('high'), sorted_values('close'),
+        sorted_values(IndicatrosEnum.MACD_DIFF.value), sorted_values(IndicatrosEnum.MACD_DEA.value),
+        dict_values['ma24'][order], dict_values['ma52'][order], group_start=starts,
+        diff_ratio=diff_ratio, ma52_tolerance=ma52_tolerance)
+    for column, values in dict_result.items():
+        result = np.empty(len(order), dtype=values.dtype)
+        result[order] = values
+        df_market[column] = result
+
+    if not df_periods.empty:
+        df_periods.insert(0, 'code', codes[np.searchsorted(starts, df_periods['start'].to_numpy(), side='right') - 1])
+        index = df_market.index.to_numpy()
+        for column in ('start', 'end', 'low_index'):
+            positions = df_periods[column].to_numpy()
+            df_periods[column] = np.where(positions >= 0, index[order[np.maximum(positions, 0)]], -1)
+    logger.info(f"全市场MACD背离计算完成，股票数: {len(codes)}，单位调整周期数: {len(df_periods)}")
+    return df_periods
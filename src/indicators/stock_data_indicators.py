@@ -1,5 +1,10 @@
+import hashlib
+
+import numpy as np
 import pandas as pd
 from manager.indicators_config_manager import get_kline_half_width, IndicatrosEnum, get_indicator_config_manager
+from indicators.indicator_kernels import rolling_max, rolling_min, wma
+from indicators.macd_divergence import detect_macd_divergence, DEFAULT_DIFF_RATIO, DEFAULT_MA52_TOLERANCE
 
 '''
     指标计算
@@ -45,8 +50,8 @@ def kdj(data, n=9, m1=3, m2=3):
         raise ValueError("缺少必要的数据列：high, low, close")
     
     # 计算未成熟随机值RSV
-    low_min = data['low'].rolling(window=n).min()
-    high_max = data['high'].rolling(window=n).max()
+    low_min = rolling_min(data['low'], n)
+    high_max = rolling_max(data['high'], n)
     data['RSV'] = (data['close'] - low_min) / (high_max - low_min) * 100
     
     # TODO: 清除旧的数据
@@ -141,11 +146,8 @@ def ma_corrected(stock_data, column='5', cycle=5, ma_type='EMA'):
         # 修正算法：指数移动平均 (更可能匹配同花顺)
         stock_data[column] = close.ewm(span=cycle, min_periods=cycle, adjust=False).mean()
     elif ma_type.upper() == 'WMA':
-        # 另一种算法：加权移动平均
-        weights = np.arange(1, cycle+1)  # 生成线性权重 [1, 2, ..., cycle]
-        def wma_func(x):
-            return np.dot(x, weights) / weights.sum()
-        stock_data[column] = close.rolling(window=cycle, min_periods=cycle).apply(wma_func, raw=True)
+        # 另一种算法：加权移动平均，线性权重 [1, 2, ..., cycle]
+        stock_data[column] = wma(close, cycle)
     else:
         raise ValueError("ma_type 参数应为 'SMA', 'EMA' 或 'WMA'")
     
@@ -158,7 +160,7 @@ def quantity_ratio(stock_data, cycle=5):
     stock_data['volume_ratio'] = volume / volume_ma
 
 
-def macd_deviation(stock_data):
+def macd_deviation(stock_data, diff_ratio=DEFAULT_DIFF_RATIO, ma52_tolerance=DEFAULT_MA52_TOLERANCE):
     '''
         零轴下方MACD单位调整周期背离筛选
         零轴下方定义：日线dea第一次下穿零轴到第一次上穿零轴的区间为零轴下方
@@ -170,73 +172,42 @@ def macd_deviation(stock_data):
 
         背离定义：存在至少2个单位调整周期，当前单位调整周期最小的diff小于上一个周期的最低diff，若价格同时低于上个单位调整周期内的最低价格，则判断为背离，若价格高于上个单位调整周期的最低价格，则判断为下跌动能不足。
 
-        单位调整周期结构定义：
-            类型：零轴上方或下方。  0：零轴下方 1：零轴上方
-            周期内的最低价k线。
-            周期内最低价格k线对应的diff值。
-            周期是否已走完。        0：未完成 1：完成
-            当前周期属于下跌线段中的第几个周期。    
-            当前周期是否与上个周期形成背离或下跌动能不足形态。  0：未背离或下跌动能不足 1：背离 2：下跌动能不足
-
-
-        初始化及每日更新：
-            1. 判断当前日线dea是否大于0。
-            2. 往前找到dea下穿零轴的k线。
-            3. 从dea下穿零轴k线再往前找到diff下穿零轴的k线。
-            4. 从diff第一次下穿零轴k线开始到当前k线，计算中间的单位调整周期。
-            5. 判断调整调整周期间是否背离或下跌动能不足。
-    '''
-    df = stock_data.copy()
-    first_dea_down_cross_zero_index = -1
-    first_diff_down_cross_zero_index = -1
-    cur_index = -1
-    for index, row in df.iloc[::-1].iterrows():
-        if cur_index == -1:
-            cur_index = index
-
-        cur_dea = row[IndicatrosEnum.MACD_DEA.value]
-        cur_diff = row[IndicatrosEnum.MACD_DIFF.value]
-        if cur_dea > 0:
-            return
-
-        if cur_dea > 0 and first_dea_down_cross_zero_index == -1:
-            first_dea_down_cross_zero_index = index + 1
-
-        if cur_diff > 0 and first_diff_down_cross_zero_index == -1:
-            first_diff_down_cross_zero_index = index
-            break
-
-    
-    # 当前线段区间：[first_diff_down_cross_zero_index, cur_index]
-    lowest_price = 9999
-    lowset_diff = 99
-
-
+        实现对上述规则的理解（与原文字面不同处，见macd_divergence模块说明）：
+            1. 零轴下方的diff为负值，“diff最大值的0.3”按绝对值理解：diff回升到周期内最低diff的0.3（diff_ratio）以内
+            2. “收盘价（或最高价）”取最高价（最高价不低于收盘价，包含收盘价接近MA52的情况），差值相对MA52（ma52_tolerance）
+            3. 背离（底背离）指价格新低而下跌动能减弱，“最小的diff小于上一个周期”按绝对值理解：最低diff高于（绝对值小于）上一周期的最低diff
+            4. 区间从dea下穿前diff下穿零轴的k线开始；diff上穿零轴时周期直接结束；周期结束后收盘价重新跌破MA24（diff < 0）时开始下一个周期
 
-    selected_rows = df.iloc[first_diff_down_cross_zero_index:cur_index+1]
-    for index, row in selected_rows.iterrows():
-        cur_lowest_price = row['low']
-        cur_diff = row[IndicatrosEnum.MACD_DIFF.value]
-        cur_close_price = row['close']
-        cur_top_price = row['high']
+        单位调整周期结构（返回的DataFrame，每个周期一行，见macd_divergence.detect_macd_divergence）：
+            周期内的最低价k线及其diff值、最低diff、是否已走完、属于下跌线段中的第几个周期、
+            与上个周期是否形成背离或下跌动能不足形态（0：未背离或下跌动能不足 1：背离 2：下跌动能不足）、是否失效
 
-        # 更新周期内的最低价和最低diff
-        if cur_lowest_price < lowest_price:
-            lowest_price = cur_lowest_price
+        逐根k线的结果写入stock_data（不使用未来数据，可用于历史回测、筛选）：
+            macd_period: 所在周期是下跌线段中的第几个周期，0为不在周期内
+            macd_divergence: 0/1/2，周期进行中只判断背离，周期走完时给出最终结果
 
-        if cur_diff < lowset_diff:
-            lowset_diff = cur_diff
-
-        # 判断周期是否走完
-        ma24_price = row['ma24']
-        ma52_price = row['ma52']
+        返回:
+            DataFrame: 单位调整周期，start、end、low_index为行号，另附对应的日期（时间）
+    '''
+    if IndicatrosEnum.MACD_DIFF.value not in stock_data.columns or IndicatrosEnum.MACD_DEA.value not in stock_data.columns:
+        auto_macd_calulate(stock_data)
+    close = stock_data['close']
+    dict_result, df_periods = detect_macd_divergence(
+        stock_data['low'], stock_data['high'], close,
+        stock_data[IndicatrosEnum.MACD_DIFF.value], stock_data[IndicatrosEnum.MACD_DEA.value],
+        close.rolling(window=24, min_periods=1).mean(), close.rolling(window=52, min_periods=1).mean(),
+        diff_ratio=diff_ratio, ma52_tolerance=ma52_tolerance)
+    for column, values in dict_result.items():
+        stock_data[column] = values
+
+    time_column = 'time' if 'time' in stock_data.columns else 'date'
+    if time_column in stock_data.columns and not df_periods.empty:
+        times = stock_data[time_column].to_numpy()
+        for column in ('start', 'end', 'low_index'):
+            positions = df_periods[column].to_numpy()
+            df_periods[f'{column}_{time_column}'] = np.where(positions >= 0, times[np.maximum(positions, 0)], None)
+    return df_periods
 
-        if cur_diff >= lowest_price * 0.03:
-            # lowest_price = 9999
-            # lowset_diff = 99
-            if cur_close_price < ma24_price:
-                return True
-            
 def calc_change_percent(stock_data):
     """
     计算涨跌幅百分比
@@ -345,23 +316,55 @@ def auto_boll_calulate(stock_data):
         m = dict_boll_settings[1].period
         boll(stock_data, n, m)
 
-def default_indicators_auto_calculate(stock_data):
-    if stock_data is None or stock_data.empty:
-        raise ValueError("数据为空，无法计算指标")
+def get_indicator_params_by_config():
+    """
+    按用户指标配置获取各指标的参数，与上面auto_xxx_calulate的取值规则一致，供增量计算、全市场计算使用
 
-    auto_macd_calulate(stock_data)
+    返回:
+        dict:
+            macd: (diff_period, dea_period, ma_period)
+            ma: [(列名, 周期)]
+            kdj: (n, m1, m2)
+            rsi: [周期]
+            boll: (n, m)
+    """
+    config_manager = get_indicator_config_manager()
+    dict_params = {}
+
+    dict_macd_settings = config_manager.get_user_config_by_indicator_type(IndicatrosEnum.MACD.value)
+    if len(dict_macd_settings) != 3:
+        dict_params['macd'] = (12, 26, 9)
+    else:
+        dict_params['macd'] = (dict_macd_settings[0].period, dict_macd_settings[1].period, dict_macd_settings[2].period)
 
-    auto_ma_calulate(stock_data)
+    dict_ma_settings = config_manager.get_user_config_by_indicator_type(IndicatrosEnum.MA.value)
+    dict_params['ma'] = [(ma_setting.name, ma_setting.period) for ma_setting in dict_ma_settings.values()]
 
-    quantity_ratio(stock_data)
+    dict_kdj_settings = config_manager.get_user_config_by_indicator_type(IndicatrosEnum.KDJ.value)
+    if len(dict_kdj_settings) != 3:
+        dict_params['kdj'] = (9, 3, 3)
+    else:
+        dict_params['kdj'] = (dict_kdj_settings[0].period, dict_kdj_settings[1].period, dict_kdj_settings[2].period)
 
-    auto_kdj_calulate
+    dict_rsi_settings = config_manager.get_user_config_by_indicator_type(IndicatrosEnum.RSI.value)
+    dict_params['rsi'] = [rsi_setting.period for rsi_setting in dict_rsi_settings.values()]
 
-    auto_rsi_calulate(stock_data)
+    dict_boll_settings = config_manager.get_user_config_by_indicator_type(IndicatrosEnum.BOLL.value)
+    if len(dict_boll_settings) < 2:
+        dict_params['boll'] = (20, 2)
+    else:
+        dict_params['boll'] = (dict_boll_settings[0].period, dict_boll_settings[1].period)
 
-    auto_boll_calulate(stock_data)
+    return dict_params
 
-    calc_change_percent(stock_data)
-    calc_turnover_rate(stock_data)
+def get_indicator_params_hash():
+    """当前指标参数的摘要，用作指标结果缓存的键，参数变化后旧的缓存不再命中"""
+    return hashlib.md5(repr(get_indicator_params_by_config()).encode('utf-8')).hexdigest()[:16]
 
+def default_indicators_auto_calculate(stock_data):
+    """计算全部已注册的指标；只需部分指标时使用indicator_registry.get_indicator_registry().ensure(stock_data, 指标名)"""
+    if stock_data is None or stock_data.empty:
+        raise ValueError("数据为空，无法计算指标")
 
+    from indicators.indicator_registry import get_indicator_registry
+    get_indicator_registry().ensure(stock_data)
@@ -0,0 +1,627 @@
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from manager.indicators_config_manager import IndicatrosEnum
+from manager.logging_manager import get_logger
+from indicators.stock_data_indicators import get_indicator_params_by_config
+
+'''
+    增量（流式）指标计算
+    1. 每个指标保存自身的递推状态（EMA累加值、滚动窗口、BOLL方差的滚动和），每追加一根k线O(1)更新
+    2. 计算结果与stock_data_indicators中的批量计算（pandas ewm/rolling）逐位一致：
+        ewm：按pandas的方式由span/alpha换算质心com，adjust=False的加权递推，值相同时不做运算
+        rolling mean：Kahan求和，加入、移出分别补偿，连续相同值、全正/全负时的修正
+        rolling std：Welford + Kahan求方差，负数方差开方为0
+        rolling min/max：单调队列
+        输入中的inf与pandas一致按NaN处理
+        pandas 3.0起ewm(com=1)的权重、rolling var的相同值修正改为数值不稳定时重算窗口，按当前pandas版本选择对应算法
+    3. 支持状态快照与恢复：复盘回退、修改最后一根k线时恢复到之前的快照再重新追加，无需全量重算
+    4. 下载追加k线后由streaming_indicator_manager调用，只计算新增k线的指标（见该模块）
+
+    用法：
+        engine = StreamingIndicatorEngine()                               # 全部指标，参数取用户指标配置
+        engine = StreamingIndicatorEngine(create_indicators(['macd', 'ma'], dict_params))
+        engine.calculate(df)            # 全量计算并写入指标列，同时建立状态
+        engine.append(df)               # df新增一行后调用，只计算最后一行
+        engine.replace_last(df)         # 最后一行数据变化（盘中实时更新）后调用
+        engine.seek(df, length)         # 回退到前length根k线的状态（复盘回退）
+'''
+
+NAN = float('nan')
+PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3
+VAR_INV_COND_TOL = float(np.finfo(np.float64).eps) * 1e3     # pandas 3 rolling var判断数值不稳定的阈值
+
+def _to_input(value):
+    """与pandas窗口函数的输入预处理一致：转为float，inf视为NaN"""
+    value = float(value)
+    return value if math.isfinite(value) else NAN
+
+def _divide(a, b):
+    """与NumPy浮点除法一致：除数为0时得到±inf或NaN，而不是抛出异常"""
+    if b == 0:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1., b)
+    return a / b
+
+
+# ------------------------------------------------------------递推状态------------------------------------------------------------
+class EwmState():
+    """与Series.ewm(span=/alpha=, min_periods=, adjust=False).mean()一致的递推状态"""
+    def __init__(self, span=None, alpha=None, min_periods=0):
+        if span is not None:
+            com = float((span - 1) / 2)
+        elif alpha is not None:
+            com = float((1 - alpha) / alpha)
+        else:
+            raise ValueError("span、alpha需指定一个")
+        alpha = 1. / (1. + com)
+        self.alpha = alpha
+        self.old_wt_factor = 1. - alpha
+        self.update_new_wt = PANDAS_3 and com == 1     # pandas 3中com为1时新值权重随old_wt变化
+        self.min_periods = max(int(min_periods), 1)
+        self.reset()
+
+    def reset(self):
+        self.weighted = NAN
+        self.old_wt = 1.
+        self.new_wt = self.alpha
+        self.nobs = 0
+
+    def update(self, value):
+        cur = _to_input(value)
+        is_observation = cur == cur
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                # 值相同时不做运算，避免常数序列产生浮点误差
+                if self.weighted != cur:
+                    if self.update_new_wt:
+                        self.new_wt = 1. - self.old_wt
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * cur) / (self.old_wt + self.new_wt)
+                self.old_wt = 1.
+        elif is_observation:
+            self.weighted = cur
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+    def get_state(self):
+        return (self.weighted, self.old_wt, self.new_wt, self.nobs)
+
+    def set_state(self, state):
+        self.weighted, self.old_wt, self.new_wt, self.nobs = state
+
+
+class RollingMeanState():
+    """与Series.rolling(window, min_periods).mean()一致的递推状态"""
+    def __init__(self, window, min_periods=None):
+        self.window = int(window)
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self.reset()
+
+    def reset(self):
+        self.values = deque()       # 窗口内的输入值（含NaN），移出时使用
+        self.count = 0              # 已输入的数量
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.nobs = 0
+        self.neg_ct = 0
+        self.prev_value = NAN
+        self.num_consecutive_same_value = 0
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1., val) < 0:
+                self.neg_ct += 1
+            # 记录连续相同值的数量，去除浮点误差
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = - val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1., val) < 0:
+                self.neg_ct -= 1
+
+    def _push(self, val):
+        """窗口右移一位，返回是否重新开始累加（与pandas在窗口不重叠时重置累加值一致）"""
+        if self.count == 0 or self.window == 1:
+            self.values.clear()
+            self.values.append(val)
+            self.count += 1
+            self.sum_x = self.compensation_add = self.compensation_remove = 0.
+            self.nobs = self.neg_ct = 0
+            self.prev_value = val
+            self.num_consecutive_same_value = 0
+            return True
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self.count += 1
+        return False
+
+    def update(self, value):
+        val = _to_input(value)
+        self._push(val)
+        self._add(val)
+        return self.get_mean()
+
+    def get_mean(self):
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.
+            return result
+        return NAN
+
+    def get_state(self):
+        return (tuple(self.values), self.count, self.sum_x, self.compensation_add, self.compensation_remove,
+                self.nobs, self.neg_ct, self.prev_value, self.num_consecutive_same_value)
+
+    def set_state(self, state):
+        values, self.count, self.sum_x, self.compensation_add, self.compensation_remove, \
+            self.nobs, self.neg_ct, self.prev_value, self.num_consecutive_same_value = state
+        self.values = deque(values)
+
+
+class RollingStdState(RollingMeanState):
+    """
+    与Series.rolling(window, min_periods).std()（ddof=1）一致的递推状态
+    pandas 2：方差由连续相同值修正为0；pandas 3：加入、移出后方差骤减（可能出现灾难性抵消）时重算整个窗口
+    """
+    def __init__(self, window, min_periods=None, ddof=1):
+        self.ddof = ddof
+        super().__init__(window, min_periods)
+        self.min_periods = max(self.min_periods, 1)
+
+    def reset(self):
+        super().reset()
+        self.mean_x = 0.
+        self.ssqdm_x = 0.
+        self.numerically_unstable = False
+
+    def _add(self, val):
+        if val != val:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs += 1
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+        # Welford在线方差 + Kahan求和
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+        if prev_m2 * VAR_INV_COND_TOL > self.ssqdm_x:
+            self.numerically_unstable = True
+
+    def _remove(self, val):
+        if val != val:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = val - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            if prev_m2 * VAR_INV_COND_TOL > self.ssqdm_x:
+                self.numerically_unstable = True
+        else:
+            self.mean_x = 0.
+            self.ssqdm_x = 0.
+            self.numerically_unstable = False
+
+    def _recompute(self):
+        """pandas 3：从窗口内的数据重新累加"""
+        self.mean_x = self.ssqdm_x = 0.
+        self.nobs = 0
+        self.compensation_add = self.compensation_remove = 0.
+        for val in self.values:
+            self._add(val)
+        self.numerically_unstable = False
+
+    def update(self, value):
+        val = _to_input(value)
+        if self._push(val):
+            self.mean_x = self.ssqdm_x = 0.
+            self._add(val)
+            self.numerically_unstable = False
+        else:
+            self._add(val)
+            if PANDAS_3 and self.numerically_unstable:
+                self._recompute()
+        return self.get_std()
+
+    def get_std(self):
+        if self.nobs >= self.min_periods and self.nobs > self.ddof:
+            if not PANDAS_3 and (self.nobs == 1 or self.num_consecutive_same_value >= self.nobs):
+                return 0.
+            var = self.ssqdm_x / (self.nobs - self.ddof)
+            return 0. if var < 0 else math.sqrt(var)
+        return NAN
+
+    def get_state(self):
+        return super().get_state() + (self.mean_x, self.ssqdm_x, self.numerically_unstable)
+
+    def set_state(self, state):
+        super().set_state(state[:-3])
+        self.mean_x, self.ssqdm_x, self.numerically_unstable = state[-3:]
+
+
+class RollingExtremeState():
+    """与Series.rolling(window).min()/max()一致的递推状态（单调队列）"""
+    def __init__(self, window, is_max=True, min_periods=None):
+        self.window = int(window)
+        self.is_max = is_max
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.nan_indexes = deque()      # 窗口内NaN的下标
+        self.candidates = deque()       # 窗口内可能成为极值的(下标, 值)，值单调
+
+    def update(self, value):
+        val = _to_input(value)
+        index = self.count
+        self.count += 1
+        window_start = index - self.window + 1
+        while self.nan_indexes and self.nan_indexes[0] < window_start:
+            self.nan_indexes.popleft()
+        while self.candidates and self.candidates[0][0] < window_start:
+            self.candidates.popleft()
+
+        if val != val:
+            self.nan_indexes.append(index)
+        else:
+            if self.is_max:
+                while self.candidates and self.candidates[-1][1] <= val:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= val:
+                    self.candidates.pop()
+            self.candidates.append((index, val))
+
+        nobs = min(self.count, self.window) - len(self.nan_indexes)
+        if nobs >= max(self.min_periods, 1) and self.candidates:
+            return self.candidates[0][1]
+        return NAN
+
+    def get_state(self):
+        return (self.count, tuple(self.nan_indexes), tuple(self.candidates))
+
+    def set_state(self, state):
+        self.count, nan_indexes, candidates = state
+        self.nan_indexes = deque(nan_indexes)
+        self.candidates = deque(candidates)
+
+
+# ------------------------------------------------------------指标------------------------------------------------------------
+class StreamingIndicator():
+    """流式指标基类：update(bar)输入一根k线（含close等字段的映射），返回{列名: 值}"""
+    def get_states(self):
+        return []
+
+    def get_columns(self):
+        return []
+
+    def update(self, bar):
+        return {}
+
+    def reset(self):
+        for state in self.get_states():
+            state.reset()
+
+    def get_state(self):
+        return tuple(state.get_state() for state in self.get_states())
+
+    def set_state(self, state):
+        for sub_state, saved in zip(self.get_states(), state):
+            sub_state.set_state(saved)
+
+
+class StreamingMacd(StreamingIndicator):
+    """对应stock_data_indicators.macd"""
+    def __init__(self, diff_period=12, dea_period=26, ma_period=9):
+        self.ema_fast = EwmState(span=diff_period)
+        self.ema_slow = EwmState(span=dea_period)
+        self.ema_dea = EwmState(span=ma_period)
+
+    def get_states(self):
+        return [self.ema_fast, self.ema_slow, self.ema_dea]
+
+    def get_columns(self):
+        return [IndicatrosEnum.MACD_DIFF.value, IndicatrosEnum.MACD_DEA.value, IndicatrosEnum.MACD.value]
+
+    def update(self, bar):
+        close = bar['close']
+        dif = self.ema_fast.update(close) - self.ema_slow.update(close)
+        dea = self.ema_dea.update(dif)
+        return {
+            IndicatrosEnum.MACD_DIFF.value: dif,
+            IndicatrosEnum.MACD_DEA.value: dea,
+            IndicatrosEnum.MACD.value: 2 * (dif - dea),
+        }
+
+
+class StreamingKdj(StreamingIndicator):
+    """对应stock_data_indicators.kdj，同样输出RSV列"""
+    def __init__(self, n=9, m1=3, m2=3):
+        self.low_min = RollingExtremeState(n, is_max=False)
+        self.high_max = RollingExtremeState(n, is_max=True)
+        self.ema_k = EwmState(alpha=1/m1)
+        self.ema_d = EwmState(alpha=1/m2)
+
+    def get_states(self):
+        return [self.low_min, self.high_max, self.ema_k, self.ema_d]
+
+    def get_columns(self):
+        return ['RSV', IndicatrosEnum.KDJ_K.value, IndicatrosEnum.KDJ_D.value, IndicatrosEnum.KDJ_J.value]
+
+    def update(self, bar):
+        low_min = self.low_min.update(bar['low'])
+        high_max = self.high_max.update(bar['high'])
+        rsv = _divide(float(bar['close']) - low_min, high_max - low_min) * 100
+        k = self.ema_k.update(rsv)
+        d = self.ema_d.update(k)
+        return {
+            'RSV': rsv,
+            IndicatrosEnum.KDJ_K.value: k,
+            IndicatrosEnum.KDJ_D.value: d,
+            IndicatrosEnum.KDJ_J.value: 3 * k - 2 * d,
+        }
+
+
+class StreamingRsi(StreamingIndicator):
+    """对应stock_data_indicators.rsi"""
+    def __init__(self, period=14):
+        self.column = f'{IndicatrosEnum.RSI.value}{period}'
+        self.avg_gain = EwmState(span=period, min_periods=period)
+        self.avg_loss = EwmState(span=period, min_periods=period)
+        self.prev_close = NAN
+
+    def get_states(self):
+        return [self.avg_gain, self.avg_loss]
+
+    def get_columns(self):
+        return [self.column]
+
+    def reset(self):
+        super().reset()
+        self.prev_close = NAN
+
+    def update(self, bar):
+        close = float(bar['close'])
+        delta = close - self.prev_close
+        self.prev_close = close
+        # 与Series.where一致：条件不成立（含NaN）时取0
+        gain = delta if delta > 0 else 0.
+        loss = -(delta if delta < 0 else 0.)
+        rs = _divide(self.avg_gain.update(gain), self.avg_loss.update(loss))
+        return {self.column: 100 - _divide(100, 1 + rs)}
+
+    def get_state(self):
+        return super().get_state() + (self.prev_close,)
+
+    def set_state(self, state):
+        super().set_state(state[:-1])
+        self.prev_close = state[-1]
+
+
+class StreamingBoll(StreamingIndicator):
+    """对应stock_data_indicators.boll"""
+    def __init__(self, n=20, m=2):
+        self.m = m
+        self.mean = RollingMeanState(n)
+        self.std = RollingStdState(n)
+
+    def get_states(self):
+        return [self.mean, self.std]
+
+    def get_columns(self):
+        return [IndicatrosEnum.BOLL_MID.value, IndicatrosEnum.BOLL_UPPER.value, IndicatrosEnum.BOLL_LOWER.value]
+
+    def update(self, bar):
+        close = bar['close']
+        mid = self.mean.update(close)
+        std = self.std.update(close)
+        return {
+            IndicatrosEnum.BOLL_MID.value: mid,
+            IndicatrosEnum.BOLL_UPPER.value: mid + self.m * std,
+            IndicatrosEnum.BOLL_LOWER.value: mid - self.m * std,
+        }
+
+
+class StreamingMa(StreamingIndicator):
+    """对应stock_data_indicators.ma"""
+    def __init__(self, column='ma5', cycle=5):
+        self.column = column
+        self.mean = RollingMeanState(cycle, min_periods=1)
+
+    def get_states(self):
+        return [self.mean]
+
+    def get_columns(self):
+        return [self.column]
+
+    def update(self, bar):
+        return {self.column: self.mean.update(bar['close'])}
+
+
+# indicator_registry中的指标名 -> 由参数创建流式指标（参数格式见stock_data_indicators.get_indicator_params_by_config）
+STREAMING_INDICATOR_FACTORIES = {
+    IndicatrosEnum.MACD.value: lambda params: [StreamingMacd(*params)],
+    IndicatrosEnum.MA.value: lambda params: [StreamingMa(column, period) for column, period in params],
+    IndicatrosEnum.KDJ.value: lambda params: [StreamingKdj(*params)],
+    IndicatrosEnum.RSI.value: lambda params: [StreamingRsi(period) for period in params],
+    IndicatrosEnum.BOLL.value: lambda params: [StreamingBoll(*params)],
+}
+
+def create_indicators(names=None, dict_params=None):
+    """
+    按指标名创建流式指标，不支持增量计算的指标名忽略
+
+    参数:
+        names: indicator_registry中的指标名，为None时创建全部支持的指标
+        dict_params: 指标参数，为None时取用户指标配置（与auto_xxx_calulate一致）
+    """
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+    if names is None:
+        names = STREAMING_INDICATOR_FACTORIES.keys()
+    list_indicators = []
+    for name in names:
+        factory = STREAMING_INDICATOR_FACTORIES.get(name)
+        if factory is not None:
+            list_indicators.extend(factory(dict_params[name]))
+    return list_indicators
+
+def create_indicators_by_config():
+    """按用户指标配置创建全部流式指标"""
+    return create_indicators()
+
+
+# ------------------------------------------------------------引擎------------------------------------------------------------
+IndicatorSnapshot = namedtuple('IndicatorSnapshot', ['length', 'states'])
+
+class StreamingIndicatorEngine():
+    CHECKPOINT_INTERVAL = 100       # 每追加多少根k线自动保存一个快照，供seek回退使用
+
+    def __init__(self, list_indicators=None):
+        self.logger = get_logger(__name__)
+        self.list_indicators = create_indicators_by_config() if list_indicators is None else list_indicators
+        self.reset()
+
+    def reset(self):
+        for indicator in self.list_indicators:
+            indicator.reset()
+        self.length = 0                 # 已输入的k线数量
+        self.dict_checkpoints = {}      # length -> IndicatorSnapshot
+        self.last_snapshot = None       # 最后一根k线输入前的快照，replace_last使用
+
+    def get_columns(self):
+        return [column for indicator in self.list_indicators for column in indicator.get_columns()]
+
+    def update(self, bar):
+        """
+        输入下一根k线，返回该k线的全部指标值
+
+        参数:
+            bar: 含open/high/low/close等字段的映射（dict、Series均可）
+        返回:
+            dict: {列名: 值}
+        """
+        if self.length % self.CHECKPOINT_INTERVAL == 0:
+            self.dict_checkpoints[self.length] = self.snapshot()
+
+        dict_values = {}
+        for indicator in self.list_indicators:
+            dict_values.update(indicator.update(bar))
+        self.length += 1
+        return dict_values
+
+    def calculate(self, stock_data):
+        """从头计算全部k线的指标并写入stock_data，同时建立递推状态"""
+        self.reset()
+        columns = self.get_columns()
+        result = np.full((len(stock_data), len(columns)), np.nan)
+        for i, bar in enumerate(self.iter_bars(stock_data, 0, len(stock_data))):
+            if i == len(stock_data) - 1:
+                self.last_snapshot = self.snapshot()
+            dict_values = self.update(bar)
+            result[i] = [dict_values[column] for column in columns]
+        for i, column in enumerate(columns):
+            stock_data[column] = result[:, i]
+        return stock_data
+
+    def append(self, stock_data):
+        """
+        stock_data比已输入的数据多出若干行（通常为一行）时调用，只计算新增行的指标并写入
+        行数少于已输入数量时按seek回退
+        """
+        if len(stock_data) < self.length:
+            self.seek(stock_data, len(stock_data))
+            return stock_data
+        if any(column not in stock_data.columns for column in self.get_columns()):
+            self.logger.info(f"指标列不完整，全量计算")
+            return self.calculate(stock_data)
+
+        for position, bar in enumerate(self.iter_bars(stock_data, self.length, len(stock_data)), self.length):
+            if position == len(stock_data) - 1:
+                self.last_snapshot = self.snapshot()
+            self._write_row(stock_data, position, self.update(bar))
+        return stock_data
+
+    def replace_last(self, stock_data):
+        """最后一根k线的数据发生变化（如盘中实时更新）时调用，恢复到该k线输入前的状态后重新计算"""
+        if self.last_snapshot is None or len(stock_data) != self.length:
+            self.logger.info(f"没有可用的快照，全量计算")
+            return self.calculate(stock_data)
+
+        self.restore(self.last_snapshot)
+        return self.append(stock_data)
+
+    def seek(self, stock_data, length):
+        """回退（或前进）到只输入了前length根k线的状态，从不晚于length的最近一个快照开始补算"""
+        length = max(min(length, len(stock_data)), 0)
+        checkpoint_length = max((key for key in self.dict_checkpoints if key <= length), default=None)
+        if checkpoint_length is None:
+            self.reset()
+        else:
+            self.restore(self.dict_checkpoints[checkpoint_length])
+
+        for position, bar in enumerate(self.iter_bars(stock_data, self.length, length), self.length):
+            if position == length - 1:
+                self.last_snapshot = self.snapshot()
+            self.update(bar)
+
+    def snapshot(self):
+        """当前全部指标状态的快照，快照不随之后的计算变化"""
+        return IndicatorSnapshot(self.length, tuple(indicator.get_state() for indicator in self.list_indicators))
+
+    def restore(self, snapshot):
+        for indicator, state in zip(self.list_indicators, snapshot.states):
+            indicator.set_state(state)
+        self.length = snapshot.length
+        self.last_snapshot = None
+        # 之后的快照基于被丢弃的数据，不再有效
+        self.dict_checkpoints = {key: value for key, value in self.dict_checkpoints.items() if key <= self.length}
+
+    def iter_bars(self, stock_data, start, end):
+        dict_columns = {column: stock_data[column].to_numpy(dtype=np.float64)[start:end]
+                        for column in ('high', 'low', 'close') if column in stock_data.columns}
+        for i in range(end - start):
+            yield {column: values[i] for column, values in dict_columns.items()}
+
+    def _write_row(self, stock_data, position, dict_values):
+        index = stock_data.index[position]
+        for column, value in dict_values.items():
+            stock_data.at[index, column] = value
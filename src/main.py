@@ -3,6 +3,7 @@ import os
 from PyQt5.QtCore import QFile, QCoreApplication, Qt
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
+import pyqtgraph as pg
 
 from resources import resources_rc
 
@@ -79,6 +80,9 @@ def main():
     app = QApplication(sys.argv)  # 创建应用程序对象
     app.setWindowIcon(QIcon(":/app.svg"))
 
+    # pyqtgraph全局配置，创建图表前设置一次（图表项绘制时不再重复设置）
+    pg.setConfigOptions(leftButtonPan=False, antialias=False)
+
     logger.info(f"Screen scale factor: {app.devicePixelRatio()}")
 
     qssFile = QFile(":/theme/default/main.qss")
@@ -2,8 +2,15 @@
 from PyQt5.QtCore import QObject, pyqtSignal
 from db_base.stock_info_db_base import StockInfoDBBasePool
 from db_base.stock_db_base import StockDbBase
+from db_base.stock_column_store import StockColumnStore
+from manager.config_manager import ConfigManager
 from indicators import stock_data_indicators as sdi
+from indicators import panel_indicators
+from indicators.indicator_registry import get_indicator_registry, DEFAULT_INDICATOR_NAMES
 from manager.logging_manager import get_logger
+from manager.indicator_cache_manager import get_indicator_cache_manager
+from manager.streaming_indicator_manager import get_streaming_indicator_manager
+from processor import kline_resampler
 from common.common_api import *
 
 from manager.period_manager import TimePeriod
@@ -44,13 +51,39 @@ class BaostockDataManager(QObject):
 
         self.dict_stocks_info = {}  # {'board': pd.DataFrame()}, 示例：{'sh_main' : pd.DataFrame()}
         # self.dict_stock_data = {}   # {'TimePeriod': {'code': DataFrame}}，示例：{'TimePeriod.Day': {'sh.600000': pd.DataFrame()}}
-        self.dict_lastest_1d_stock_data = {}  # {code : pd.DataFrame}, 仅缓存最后一行数据用于快速加载股票list列表
+        self.df_lastest_1d_stock_data = pd.DataFrame()  # 每只股票一行，仅缓存最后一行数据用于快速加载股票list列表
+        self.dict_lastest_1d_stock_data = {}  # {code : pd.DataFrame}, 由df_lastest_1d_stock_data按需拆分，兼容旧接口
+        self.dict_watermarks = {}   # {table_name: {code: 'YYYY-MM-DD'}}，各周期本地数据的最后日期，用于增量更新
 
         self.stock_info_db_base = StockInfoDBBasePool().get_manager(1)
         self.stock_db_base = StockDbBase("./data/database/stocks/db/baostock")
+        self.column_store = self.init_column_store()     # 可选的列式存储，未启用时为None
 
         self.get_all_stocks_from_db()
 
+    def init_column_store(self):
+        '''
+            根据配置初始化列式存储：
+            [Storage]
+            backend = parquet
+            parquet_dir = ./data/database/stocks/parquet/baostock
+        '''
+        backend = ConfigManager().get('Storage', 'backend', 'sqlite')
+        if backend != 'parquet':
+            return None
+
+        if not StockColumnStore.is_available():
+            self.logger.warning("配置启用了parquet存储，但未安装pyarrow，继续使用SQLite存储")
+            return None
+
+        column_store = StockColumnStore(ConfigManager().get('Storage', 'parquet_dir', None) or StockColumnStore.DEFAULT_ROOT_DIR)
+        self.logger.info(f"已启用列式存储：{column_store.root_dir}")
+        return column_store
+
+    def is_column_store_enabled(self, period=TimePeriod.DAY):
+        '''列式存储已启用且该周期已迁移'''
+        return self.column_store is not None and self.column_store.has_period(period.get_table_name())
+
     def get_stock_info_dict(self):
         with self.lock:
             return MappingProxyType(self.dict_stocks_info)
@@ -61,8 +94,18 @@ class BaostockDataManager(QObject):
             return: dict, {code : DataFrame}
         '''
         with self.lock:
+            if not self.dict_lastest_1d_stock_data and not self.df_lastest_1d_stock_data.empty:
+                self.dict_lastest_1d_stock_data = self.split_lastest_rows_by_code(self.df_lastest_1d_stock_data)
             return MappingProxyType(self.dict_lastest_1d_stock_data)
 
+    def get_lastest_1d_stock_data_from_cache(self):
+        '''
+            返回缓存中的最后一天（行）的股票数据
+            return: DataFrame, 每只股票一行
+        '''
+        with self.lock:
+            return self.df_lastest_1d_stock_data
+
 
     # ----------------------stock_info相关接口-----------------------------------------
     def get_all_stocks_from_db(self):
@@ -144,7 +187,7 @@ class BaostockDataManager(QObject):
         """
         加载日线股票数据
         """
-        self.get_all_lastest_row_data_dict_by_period(TimePeriod.DAY)
+        self.get_all_lastest_row_data_by_period(TimePeriod.DAY)
         return True
         total_count = 0
 
@@ -208,13 +251,59 @@ class BaostockDataManager(QObject):
         self.logger.info(f"总共处理了 {total_count} 只股票")
         return True  
 
+    def has_stored_period(self, code, period=TimePeriod.DAY):
+        '''本地是否存储了该股票该周期的k线数据'''
+        if self.is_column_store_enabled(period):
+            return True
+        return self.check_table_exists(code, period)
+
+    def get_resample_source_period(self, code, period=TimePeriod.DAY):
+        '''本地没有该周期数据、但可由已存储的较细周期合成时返回源周期，否则返回None（手动下载的5分钟k线存在时也作为源周期）'''
+        list_sources = kline_resampler.get_resample_sources(period, include_optional=True)
+        if not list_sources or self.has_stored_period(code, period):
+            return None
+        for source_period in list_sources:
+            if self.has_stored_period(code, source_period):
+                return source_period
+        return None
+
+    def get_resampled_stock_data(self, code, period, source_period, start_date=None, end_date=None):
+        '''
+            由本地较细周期数据合成period周期的k线（见kline_resampler），不发起网络请求
+            结果按源数据最后一根k线时间缓存（内存 + 磁盘），源数据更新后键随之变化
+        '''
+        indicator_cache = get_indicator_cache_manager()
+        last_bar_time = self.get_stock_data_last_bar_time(code, source_period)
+        cache_key = None
+        if last_bar_time is not None:
+            cache_key = indicator_cache.make_key(code, period.get_table_name(), last_bar_time, start_date, end_date,
+                                                 f"resample_{source_period.value}")
+            df_cached = indicator_cache.get(cache_key)
+            if df_cached is not None:
+                return df_cached
+
+        # 从起始日期所在区间的第一天读取，第一根k线完整
+        source_start_date = kline_resampler.get_bucket_start_date(period, start_date) if start_date else None
+        df_source = self.get_stock_data_from_db_by_period(code, source_period, source_start_date, end_date)
+        df_data = kline_resampler.resample_kline(df_source, period, start_date)
+        if cache_key is not None:
+            indicator_cache.put(cache_key, df_data)
+        return df_data
+
     def get_stock_data_from_db_by_period(self, code, period=TimePeriod.DAY, start_date=None, end_date=None):
-        '''从数据中获取股票指定周期的k线数据(原始数据库数据，未处理指标)'''
+        '''从数据中获取股票指定周期的k线数据(原始数据库数据，未处理指标)；本地没有的周期由较细周期合成'''
+        source_period = self.get_resample_source_period(code, period)
+        if source_period is not None:
+            return self.get_resampled_stock_data(code, period, source_period, start_date, end_date)
+
         table_name = period.get_table_name()
         # self.logger.info(f"处理股票: {code}, 表名：{table_name}")
 
-        with self.lock:
-            df_data = self.stock_db_base.get_bao_stock_data(code, table_name, start_date, end_date)
+        if self.is_column_store_enabled(period):
+            df_data = self.column_store.read_stock(code, table_name, start_date, end_date)
+        else:
+            with self.lock:
+                df_data = self.stock_db_base.get_bao_stock_data(code, table_name, start_date, end_date)
 
         df_data = df_data.dropna()
 
@@ -222,90 +311,235 @@ class BaostockDataManager(QObject):
             return pd.DataFrame()
         
         return df_data
-    
-    def get_stock_data_from_db_by_period_with_indicators_auto(self, code, period=TimePeriod.DAY, start_date=None, end_date=None):
+
+    def get_market_data_by_period(self, period=TimePeriod.DAY, start_date=None, end_date=None, boards=None):
+        '''
+            一次性读取全市场指定周期的k线数据（长表格式，按code、date排序），用于选股等横截面计算
+            启用列式存储时为一次批量读取，否则逐只读取SQLite后合并
+        '''
+        if self.is_column_store_enabled(period):
+            return self.column_store.read(period.get_table_name(), boards=boards, start_date=start_date, end_date=end_date)
+
+        with self.lock:
+            dict_stocks_info = self.dict_stocks_info
+
+        list_df = []
+        for board_name, board_data in dict_stocks_info.items():
+            if boards and board_name not in boards:
+                continue
+            if board_data.empty:
+                continue
+            for code in board_data['证券代码']:
+                df_data = self.get_stock_data_from_db_by_period(code, period, start_date, end_date)
+                if not df_data.empty:
+                    list_df.append(df_data)
+
+        if not list_df:
+            return pd.DataFrame()
+        return pd.concat(list_df, ignore_index=True)
+
+    def get_market_data_by_period_with_indicators(self, period=TimePeriod.DAY, start_date=None, end_date=None, boards=None):
+        '''读取全市场指定周期的k线数据，并按面板方式一次计算全部股票的指标（结果与逐只计算一致）'''
+        df_market = self.get_market_data_by_period(period, start_date, end_date, boards)
+        if df_market.empty:
+            return df_market
+        start_time = time.time()
+        panel_indicators.calculate_market_indicators(df_market)
+        self.logger.info(f"全市场指标计算耗时: {time.time() - start_time:.2f}s")
+        return df_market
+
+    def get_stock_data_from_db_by_period_with_indicators_auto(self, code, period=TimePeriod.DAY, start_date=None, end_date=None, indicators=None):
         # 不再加载完整日线数据到内存
-        return self.get_stock_data_from_db_by_period_with_indicators(code, period, start_date, end_date)
+        return self.get_stock_data_from_db_by_period_with_indicators(code, period, start_date, end_date, indicators)
+
+    def get_stock_data_from_db_by_period_with_indicators(self, code, period=TimePeriod.DAY, start_date=None, end_date=None, indicators=None):
+        '''
+            从数据中获取股票指定周期的k线数据，并计算指标
+            indicators: 需要计算的指标名（见indicator_registry），为None时只计算k线主图需要的指标，其余指标由图表、筛选按需计算
+            结果按(最后一根k线时间, 指标参数)缓存，切换回最近查看的股票、周期时不再重新读取、计算；
+            命中的缓存缺少本次需要的指标时补算后更新缓存
+        '''
+        if indicators is None:
+            indicators = DEFAULT_INDICATOR_NAMES
+        indicator_registry = get_indicator_registry()
+        indicator_cache = get_indicator_cache_manager()
+        last_bar_time = self.get_stock_data_last_bar_time(code, period)
+        cache_key = None
+        if last_bar_time is not None:
+            cache_key = indicator_cache.make_key(code, period.get_table_name(), last_bar_time, start_date, end_date,
+                                                 sdi.get_indicator_params_hash())
+            df_cached = indicator_cache.get(cache_key)
+            if df_cached is not None:
+                if indicator_registry.ensure(df_cached, indicators):
+                    indicator_cache.put(cache_key, df_cached)
+                self.track_streaming_indicators(code, period, cache_key, end_date)
+                return df_cached
 
-    def get_stock_data_from_db_by_period_with_indicators(self, code, period=TimePeriod.DAY, start_date=None, end_date=None):
-        '''从数据中获取股票指定周期的k线数据，并计算指标'''
         df_data = self.get_stock_data_from_db_by_period(code, period, start_date, end_date)
+        if df_data is None or df_data.empty:
+            return df_data
         # self.data_type_conversion(df_data)
         stock_name = self.get_stock_name_by_code(code)
         if stock_name is None:
             stock_name = "未知"
         df_data = df_data.assign(name=stock_name)
-        sdi.default_indicators_auto_calculate(df_data)
+        indicator_registry.ensure(df_data, indicators)
+
+        if cache_key is not None:
+            indicator_cache.put(cache_key, df_data)
+            self.track_streaming_indicators(code, period, cache_key, end_date)
         return df_data
+
+    def track_streaming_indicators(self, code, period, cache_key, end_date=None):
+        '''登记最近读取的带指标数据，下载追加新k线后增量计算指标（见streaming_indicator_manager），合成周期、截止日期固定时不登记'''
+        if end_date is not None or self.get_resample_source_period(code, period) is not None:
+            return
+        get_streaming_indicator_manager().track(code, period.get_table_name(), cache_key)
+
+    def extend_streaming_indicators(self, code, df_cached, df_new, period=TimePeriod.DAY):
+        '''
+            追加写入新k线后，在登记的指标缓存结果后增量计算新k线的指标，按新的最后一根k线时间写入缓存
+            df_cached: 写入前登记的缓存结果，为None时不处理
+        '''
+        if df_cached is None:
+            return
+        streaming_manager = get_streaming_indicator_manager()
+        table_name = period.get_table_name()
+        cache_key = streaming_manager.get_cache_key(code, table_name)
+        last_bar_time = self.get_stock_data_last_bar_time(code, period)
+        if cache_key is None or last_bar_time is None or cache_key[-1] != sdi.get_indicator_params_hash():
+            streaming_manager.untrack(code, table_name)
+            return
+
+        indicator_cache = get_indicator_cache_manager()
+        new_cache_key = indicator_cache.make_key(code, table_name, last_bar_time, *cache_key[3:])
+        try:
+            df_extended = streaming_manager.extend(code, table_name, df_cached, df_new, new_cache_key)
+        except Exception as e:
+            self.logger.warning(f"{code} 增量计算指标失败，下次读取时全量计算: {e}")
+            streaming_manager.untrack(code, table_name)
+            return
+        if df_extended is not None:
+            indicator_cache.put(new_cache_key, df_extended)
     
     def get_all_lastest_row_data_dict_by_period_auto(self, period=TimePeriod.DAY):
-        if self.dict_lastest_1d_stock_data:
+        if self.dict_lastest_1d_stock_data or not self.df_lastest_1d_stock_data.empty:
             self.logger.info(f"返回缓存的最后一天（行数据）")
             return self.get_lastest_1d_stock_data_dict_from_cache()
         else:
             return self.get_all_lastest_row_data_dict_by_period(period)
     def get_all_lastest_row_data_dict_by_period(self, period=TimePeriod.DAY):
         '''获取所有股票的指定周期k线数据的最后一行数据，通常用于初始化list列表，不需要计算指标'''
-        dict_result = {}    # {'code': DataFrame}
-        table_name = period.get_table_name()
+        df_latest = self.get_all_lastest_row_data_by_period(period)
+        dict_result = self.split_lastest_rows_by_code(df_latest)
 
-        # 遍历所有板块
-        board_index = 0
-        total_count = 0
-        self.logger.info(f"开始读取本地数据库日线、周线股票的最后一天（行）数据...")
+        if period == TimePeriod.DAY:
+            with self.lock:
+                self.dict_lastest_1d_stock_data = dict_result
+
+        return dict_result
+
+    def get_all_lastest_row_data_by_period_auto(self, period=TimePeriod.DAY):
+        with self.lock:
+            df_cache = self.df_lastest_1d_stock_data
+        if period == TimePeriod.DAY and not df_cache.empty:
+            self.logger.info(f"返回缓存的最后一天（行数据）")
+            return df_cache
+        return self.get_all_lastest_row_data_by_period(period)
+
+    def get_all_lastest_row_data_by_period(self, period=TimePeriod.DAY):
+        '''
+            获取所有股票的指定周期k线数据的最后一行数据，通常用于初始化list列表，不需要计算指标
+            从stocks.db的latest_bars快照表一次读取，快照中缺失的股票再逐只读取单股数据库并回填快照
+            return: DataFrame, 每只股票一行，包含name列，按股票列表顺序排列
+        '''
+        table_name = period.get_table_name()
+        self.logger.info(f"开始读取本地数据库{table_name}股票的最后一天（行）数据...")
         start_time = time.time()  # 记录开始时间
 
         with self.lock:
             dict_stocks_info = self.dict_stocks_info
+            df_latest = self.stock_info_db_base.get_latest_bars(table_name)
+
+        # 与原逐只读取逻辑保持一致，只加载沪、深主板
+        dict_name = {}
+        for board_name in list(dict_stocks_info.keys())[:2]:
+            board_data = dict_stocks_info[board_name]
+            if not board_data.empty:
+                dict_name.update(zip(board_data['证券代码'], board_data['证券名称']))
+
+        if not df_latest.empty:
+            df_latest = df_latest[df_latest['code'].isin(dict_name.keys())]
+        self.logger.info(f"快照表读取完成，共{len(df_latest)}只股票，耗时: {time.time() - start_time:.2f}秒")
+
+        # 快照表缺失的股票（首次升级、快照建立前下载的数据）从列式存储或单股数据库补齐
+        set_missing_codes = set(dict_name.keys()) - set(df_latest['code'] if not df_latest.empty else [])
+        if set_missing_codes:
+            list_missing_codes = [code for code in dict_name.keys() if code in set_missing_codes]
+            df_missing = self.get_lastest_row_data_from_stock_db(list_missing_codes, period)
+            if not df_missing.empty:
+                with self.lock:
+                    self.stock_info_db_base.save_latest_bars(df_missing, table_name)
+                df_latest = pd.concat([df_latest, df_missing], ignore_index=True) if not df_latest.empty else df_missing
 
-        for board_name, board_data in dict_stocks_info.items():
-            if board_index > 1:
-                break
-            board_index += 1
+        if df_latest.empty:
+            return pd.DataFrame()
 
-            self.logger.info(f"读取 {board_name} 板块...")
-            board_start_time = time.time()  # 记录开始时间
-            
-            # 遍历该板块的每一行数据
-            for index, row in board_data.iterrows():
-                # if index > 100:
-                #     break
+        # 按股票列表顺序排列，并补充名称
+        dict_order = {code: i for i, code in enumerate(dict_name.keys())}
+        df_latest = df_latest.assign(name=df_latest['code'].map(dict_name))
+        df_latest = df_latest.iloc[df_latest['code'].map(dict_order).argsort()].reset_index(drop=True)
 
-                try:
-                    code = row['证券代码']
-                    name = row['证券名称'] if '证券名称' in row else '未知'
-                    
-                    with self.lock:
-                        lastest_1d_data = self.stock_db_base.get_lastest_stock_data(code, table_name)     
-
-                    if lastest_1d_data is None or lastest_1d_data.empty:
-                        self.logger.debug(f"股票 {code} 日线数据为空，跳过指标计算")
-                        continue 
-
-                    # 只对非空数据进行指标计算
-                    # self.data_type_conversion(lastest_1d_data)
-                    lastest_1d_data['name'] = name
-                    # sdi.default_indicators_auto_calculate(lastest_1d_data)
-                    dict_result[code] = lastest_1d_data
-                    total_count += 1
-                    
-                except Exception as e:
-                    self.logger.error(f"处理股票 {code} 时发生错误: {str(e)}")
-                    self.logger.error(traceback.format_exc())
-                    # 继续处理下一个股票
+        all_read_elapsed_time = time.time() - start_time  # 计算耗时
+        self.logger.info(f"读取完成，共读取{len(df_latest)}只股票，总耗时: {all_read_elapsed_time:.2f}秒，即{all_read_elapsed_time/60:.2f}分钟")
+
+        if period == TimePeriod.DAY:
+            with self.lock:
+                self.df_lastest_1d_stock_data = df_latest
+                self.dict_lastest_1d_stock_data = {}
+
+        return df_latest
+
+    def get_lastest_row_data_from_stock_db(self, code_list, period=TimePeriod.DAY):
+        '''逐只读取指定股票的最后一根k线，用于快照表缺失时补齐'''
+        table_name = period.get_table_name()
+        start_time = time.time()
+
+        if self.is_column_store_enabled(period):
+            df_result = self.column_store.read_latest_rows(table_name, count=1, boards=list({identify_stock_board(code) for code in code_list}))
+            if not df_result.empty:
+                return df_result[df_result['code'].isin(code_list)].reset_index(drop=True)
+            return df_result
+
+        list_df = []
+        for code in code_list:
+            try:
+                with self.lock:
+                    lastest_data = self.stock_db_base.get_lastest_stock_data(code, table_name)
+
+                if lastest_data is None or lastest_data.empty:
+                    self.logger.debug(f"股票 {code} {table_name}数据为空，跳过")
                     continue
 
-            board_read_elapsed_time = time.time() - board_start_time  # 计算耗时
-            self.logger.info(f"读取完成，共读取{total_count}只股票，耗时: {board_read_elapsed_time:.2f}秒，即{board_read_elapsed_time/60:.2f}分钟")
+                list_df.append(lastest_data.iloc[[-1]])
+            except Exception as e:
+                self.logger.error(f"处理股票 {code} 时发生错误: {str(e)}")
+                self.logger.error(traceback.format_exc())
+                # 继续处理下一个股票
+                continue
 
-        
-        all_read_elapsed_time = time.time() - start_time  # 计算耗时
-        self.logger.info(f"读取完成，总耗时: {all_read_elapsed_time:.2f}秒，即{all_read_elapsed_time/60:.2f}分钟")
+        elapsed_time = time.time() - start_time
+        self.logger.info(f"逐只读取{len(code_list)}只股票的最后一行数据，有效{len(list_df)}只，耗时: {elapsed_time:.2f}秒")
 
-        with self.lock:
-            self.dict_lastest_1d_stock_data = dict_result
+        if not list_df:
+            return pd.DataFrame()
+        return pd.concat(list_df, ignore_index=True)
 
-        return dict_result
+    def split_lastest_rows_by_code(self, df_latest):
+        '''将每只股票一行的DataFrame拆分为{code: DataFrame}，兼容旧接口'''
+        if df_latest is None or df_latest.empty:
+            return {}
+        return {code: df_latest.iloc[[i]].reset_index(drop=True) for i, code in enumerate(df_latest['code'])}
     
     def get_lastest_row_data_dict_by_code_list_auto(self, code_list=[], period=TimePeriod.DAY):
         '''优先从缓存中获取：指定列表中的股票代码指定周期的最后一天股票数据'''
@@ -315,8 +549,7 @@ class BaostockDataManager(QObject):
         
         dict_result = {}
 
-        with self.lock:
-            dict_lastest_1d_stock_data = self.dict_lastest_1d_stock_data
+        dict_lastest_1d_stock_data = self.get_lastest_1d_stock_data_dict_from_cache()
         if dict_lastest_1d_stock_data:
             self.logger.info(f"返回缓存的指定code列表的最后一天（行数据）")
             for code in code_list:
@@ -357,8 +590,7 @@ class BaostockDataManager(QObject):
     
     def get_lastest_stock_data_date(self, code, period=TimePeriod.DAY):
         '''获取指定股票的指定周期的股票数据最后一天的日期'''
-        with self.lock:
-            dict_lastest_1d_stock_data = self.dict_lastest_1d_stock_data
+        dict_lastest_1d_stock_data = self.get_lastest_1d_stock_data_dict_from_cache()
         if dict_lastest_1d_stock_data:
             s_return = dict_lastest_1d_stock_data[code].iloc[0]['date'] if code in dict_lastest_1d_stock_data else None 
             self.logger.info(f"返回缓存的最后一天（行数据）的日期： {s_return}")
@@ -369,12 +601,112 @@ class BaostockDataManager(QObject):
                 lastest_data = self.stock_db_base.get_lastest_stock_data(code, table_name) 
             return lastest_data.iloc[0]['date'] if lastest_data is not None and not lastest_data.empty else None
 
+    def get_stock_data_watermark(self, code, period=TimePeriod.DAY):
+        '''
+            获取本地数据库中指定股票指定周期数据的最后日期（水位线），不加载历史数据
+            首次访问某周期时从latest_bars快照表一次加载全部股票的水位线，快照中缺失的股票再查询MAX(date)
+            return: str, YYYY-MM-DD；无数据时返回None
+        '''
+        table_name = period.get_table_name()
+        with self.lock:
+            dict_table = self.dict_watermarks.get(table_name)
+            if dict_table is None:
+                df_latest = self.stock_info_db_base.get_latest_bars(table_name)
+                dict_table = {}
+                if not df_latest.empty:
+                    dict_table = dict(zip(df_latest['code'], df_latest['date'].astype(str).str.slice(0, 10)))
+                self.dict_watermarks[table_name] = dict_table
+
+            if code in dict_table:
+                return dict_table[code]
+
+            watermark = self.stock_db_base.get_max_date(code, table_name)
+            if watermark is not None:
+                dict_table[code] = watermark
+            return watermark
+
+    def get_stock_data_last_bar_time(self, code, period=TimePeriod.DAY):
+        '''
+            获取本地数据最后一根k线的时间，用作指标缓存的键
+            日线及以上级别为水位线日期；分钟级别同一天内会新增k线，附加latest_bars快照表中的时间
+            由较细周期合成的周期取源周期的时间
+            return: str；无数据时返回None
+        '''
+        source_period = self.get_resample_source_period(code, period)
+        if source_period is not None:
+            return self.get_stock_data_last_bar_time(code, source_period)
+
+        watermark = self.get_stock_data_watermark(code, period)
+        if watermark is None or not TimePeriod.is_minute_level(period):
+            return watermark
+
+        with self.lock:
+            df_latest = self.stock_info_db_base.get_latest_bars(period.get_table_name(), [code])
+        if df_latest.empty or 'time' not in df_latest.columns:
+            return watermark
+        return f"{watermark} {df_latest['time'].iloc[0]}"
+
+    def update_stock_data_watermark(self, code, df_data, writeWay="replace", period=TimePeriod.DAY):
+        '''写入数据后同步更新水位线缓存'''
+        if df_data is None or df_data.empty or 'date' not in df_data.columns:
+            return
+
+        new_watermark = str(df_data['date'].max())[:10]
+        table_name = period.get_table_name()
+        with self.lock:
+            dict_table = self.dict_watermarks.get(table_name)
+            if dict_table is None:
+                # 尚未加载该周期的水位线，首次访问时再从快照表加载
+                return
+            old_watermark = dict_table.get(code)
+            if writeWay == "replace" or old_watermark is None or new_watermark > old_watermark:
+                dict_table[code] = new_watermark
+
     def save_stock_data_to_db(self, code, df_data, writeWay="replace", period=TimePeriod.DAY):
         '''保存k线数据到指定周期数据库'''
         table_name = period.get_table_name()
         # self.logger.info(f"保存股票 {code} 数据到数据库 {table_name}")
         with self.lock:
             self.stock_db_base.save_bao_stock_data_to_db(code, df_data, writeWay, table_name)
+            # 同步更新latest_bars快照表，全量替换时无条件覆盖
+            self.stock_info_db_base.save_latest_bars(df_data, table_name, force=(writeWay == "replace"))
+
+        self.update_stock_data_watermark(code, df_data, writeWay, period)
+        # 追加时取出最近读取的带指标数据，清除缓存后只对新k线增量计算指标
+        df_streaming_cached = None
+        if writeWay == "append":
+            streaming_cache_key = get_streaming_indicator_manager().get_cache_key(code, table_name)
+            if streaming_cache_key is not None:
+                df_streaming_cached = get_indicator_cache_manager().get(streaming_cache_key)
+        else:
+            get_streaming_indicator_manager().untrack(code, table_name)
+        # 最后一根k线可能被覆盖（如盘中更新当天数据），时间不变时缓存键不变，需主动清除
+        get_indicator_cache_manager().invalidate(code, table_name)
+        for target_period in kline_resampler.get_resample_targets(period):
+            get_indicator_cache_manager().invalidate(code, target_period.get_table_name())
+        self.extend_streaming_indicators(code, df_streaming_cached, df_data, period)
+
+        # 列式存储同步写入
+        if self.is_column_store_enabled(period):
+            if writeWay == "replace":
+                self.column_store.delete_stock(code, table_name)
+            self.column_store.write_dataframe(df_data, table_name)
+
+    # ----------------------下载日志：断点续传-----------------------------------------
+    def get_fetch_journal_done_codes(self, period=TimePeriod.DAY, target_date=None):
+        '''获取指定周期本轮更新（目标交易日为target_date）中已完成的股票代码集合'''
+        return self.stock_info_db_base.get_fetch_journal_done_codes(period.get_table_name(), target_date)
+
+    def record_fetch_journal(self, period, records):
+        '''
+            批量记录下载状态
+            records: [(code, target_date, status, watermark, error), ...]
+        '''
+        return self.stock_info_db_base.save_fetch_journal(period.get_table_name(), records)
+
+    def clear_fetch_journal(self, period=None):
+        '''清空下载日志，下次更新时重新检查所有股票'''
+        return self.stock_info_db_base.delete_fetch_journal(period.get_table_name() if period else None)
 
 
     def data_type_conversion(self, result):
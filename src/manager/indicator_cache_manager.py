@@ -0,0 +1,247 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from manager.config_manager import ConfigManager, get_user_config_dir
+from manager.logging_manager import get_logger
+
+'''
+    指标结果缓存（进程内LRU + 可选的本地磁盘缓存）
+    键：(code, 周期表名, 最后一根k线时间, 起止日期, 指标参数摘要)
+        k线数据追加、指标参数修改后键随之变化，旧结果不再命中，由LRU淘汰
+        同一根k线的数据被覆盖（盘中更新当天数据）时由写入方调用invalidate清除
+    内存：按DataFrame实际占用的字节数限制总量，超出后淘汰最久未使用的结果
+    磁盘：以pickle文件保存，重启后切换最近查看的股票也无需重新读取、计算；按文件修改时间淘汰，命中时刷新修改时间
+        默认目录位于用户配置目录（与config.ini相同）下的cache/indicators，不写入项目数据目录
+        首次使用时扫描一次目录建立索引（文件 -> 修改时间、大小，(code, 周期表名) -> 文件），之后清除、淘汰只查索引
+
+    配置：
+        [IndicatorCache]
+        memory_mb = 256
+        disk_enabled = 1
+        disk_dir =          # 为空时使用<用户配置目录>/cache/indicators
+        disk_mb = 1024
+
+    读取、写入时均复制DataFrame，调用方修改返回的数据不影响缓存
+'''
+
+class IndicatorCacheManager():
+    DEFAULT_MEMORY_MB = 256
+    DEFAULT_DISK_MB = 1024
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+        self.lock = threading.Lock()
+
+        config_manager = ConfigManager()
+        self.memory_limit = config_manager.getint('IndicatorCache', 'memory_mb', self.DEFAULT_MEMORY_MB) * 1024 * 1024
+        self.disk_limit = config_manager.getint('IndicatorCache', 'disk_mb', self.DEFAULT_DISK_MB) * 1024 * 1024
+        self.disk_enabled = config_manager.getbool('IndicatorCache', 'disk_enabled', True)
+        self.disk_dir = Path(config_manager.get('IndicatorCache', 'disk_dir', None) or get_user_config_dir() / 'cache' / 'indicators')
+        self.dict_disk_files = None         # {文件路径: [修改时间, 字节数]}，首次使用磁盘缓存时建立
+        self.dict_disk_keys = {}            # {(code, 周期表名): set(文件路径)}
+        self.disk_size = 0
+
+        self.dict_cache = OrderedDict()     # {key: (DataFrame, 字节数)}，按最近使用排序，末尾为最近使用
+        self.memory_size = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+    @staticmethod
+    def make_key(code, table_name, last_bar_time, start_date=None, end_date=None, params_hash=None):
+        return (code, table_name, str(last_bar_time), start_date, end_date, params_hash)
+
+    def get(self, key):
+        """返回缓存的DataFrame副本，未命中时返回None"""
+        with self.lock:
+            item = self.dict_cache.get(key)
+            if item is not None:
+                self.dict_cache.move_to_end(key)
+                self.hit_count += 1
+                return item[0].copy()
+
+        df_data = self.read_disk(key)
+        if df_data is None:
+            with self.lock:
+                self.miss_count += 1
+            return None
+
+        self.put_memory(key, df_data)
+        with self.lock:
+            self.hit_count += 1
+        return df_data.copy()
+
+    def put(self, key, df_data):
+        if df_data is None or df_data.empty:
+            return
+        df_data = df_data.copy()
+        self.put_memory(key, df_data)
+        self.write_disk(key, df_data)
+
+    def put_memory(self, key, df_data):
+        size = int(df_data.memory_usage(index=True, deep=True).sum())
+        if size > self.memory_limit:
+            return
+        with self.lock:
+            old_item = self.dict_cache.pop(key, None)
+            if old_item is not None:
+                self.memory_size -= old_item[1]
+            self.dict_cache[key] = (df_data, size)
+            self.memory_size += size
+            while self.memory_size > self.memory_limit:
+                _, (_, evicted_size) = self.dict_cache.popitem(last=False)
+                self.memory_size -= evicted_size
+
+    def invalidate(self, code, table_name=None):
+        """清除指定股票（指定周期）的全部缓存，覆盖写入k线数据后调用"""
+        with self.lock:
+            for key in [key for key in self.dict_cache if key[0] == code and (table_name is None or key[1] == table_name)]:
+                self.memory_size -= self.dict_cache.pop(key)[1]
+
+        if not self.disk_enabled:
+            return
+        with self.lock:
+            self.load_disk_index()
+            list_index_keys = [(code, table_name)] if table_name else [key for key in self.dict_disk_keys if key[0] == code]
+            list_files = [file_path for index_key in list_index_keys for file_path in self.dict_disk_keys.get(index_key, ())]
+        for file_path in list_files:
+            self.remove_file(file_path)
+
+    def clear(self):
+        with self.lock:
+            self.dict_cache.clear()
+            self.memory_size = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {'count': len(self.dict_cache), 'memory_size': self.memory_size,
+                    'hit_count': self.hit_count, 'miss_count': self.miss_count}
+
+    # ------------------------------------------------------------磁盘------------------------------------------------------------
+    def get_disk_path(self, key):
+        code, table_name = key[0], key[1]
+        digest = hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+        return self.disk_dir / table_name / f"{code}_{digest}.pkl"
+
+    @staticmethod
+    def get_index_key(file_path):
+        """文件路径对应的(code, 周期表名)"""
+        return file_path.name.rsplit('_', 1)[0], file_path.parent.name
+
+    def load_disk_index(self):
+        """扫描一次磁盘缓存目录建立索引（调用方持有self.lock）"""
+        if self.dict_disk_files is not None:
+            return
+        self.dict_disk_files = {}
+        self.dict_disk_keys = {}
+        self.disk_size = 0
+        for file_path in self.disk_dir.glob('*/*.pkl'):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            self.add_index_file(file_path, stat.st_mtime, stat.st_size)
+
+    def add_index_file(self, file_path, mtime, size):
+        old_item = self.dict_disk_files.get(file_path)
+        if old_item is not None:
+            self.disk_size -= old_item[1]
+        self.dict_disk_files[file_path] = [mtime, size]
+        self.dict_disk_keys.setdefault(self.get_index_key(file_path), set()).add(file_path)
+        self.disk_size += size
+
+    def remove_index_file(self, file_path):
+        item = self.dict_disk_files.pop(file_path, None)
+        if item is None:
+            return
+        self.disk_size -= item[1]
+        index_key = self.get_index_key(file_path)
+        set_files = self.dict_disk_keys.get(index_key)
+        if set_files is not None:
+            set_files.discard(file_path)
+            if not set_files:
+                del self.dict_disk_keys[index_key]
+
+    def read_disk(self, key):
+        if not self.disk_enabled:
+            return None
+        file_path = self.get_disk_path(key)
+        with self.lock:
+            self.load_disk_index()
+            if file_path not in self.dict_disk_files:
+                return None
+        try:
+            df_data = pd.read_pickle(file_path)
+            os.utime(file_path)     # 刷新修改时间，淘汰时按最近使用排序
+        except Exception as e:
+            self.logger.warning(f"读取指标磁盘缓存失败，已删除: {file_path}, {e}")
+            self.remove_file(file_path)
+            return None
+        with self.lock:
+            item = self.dict_disk_files.get(file_path)
+            if item is not None:
+                item[0] = time.time()
+        return df_data
+
+    def write_disk(self, key, df_data):
+        if not self.disk_enabled:
+            return
+        file_path = self.get_disk_path(key)
+        tmp_path = file_path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            df_data.to_pickle(tmp_path)
+            os.replace(tmp_path, file_path)     # 先写临时文件再替换，读取方不会读到写了一半的文件
+            size = file_path.stat().st_size
+        except Exception as e:
+            self.logger.warning(f"写入指标磁盘缓存失败: {file_path}, {e}")
+            self.remove_file(tmp_path)
+            return
+        with self.lock:
+            self.load_disk_index()
+            self.add_index_file(file_path, time.time(), size)
+        self.prune_disk()
+
+    def prune_disk(self):
+        """磁盘缓存超出上限时按修改时间删除最旧的文件"""
+        with self.lock:
+            if self.dict_disk_files is None or self.disk_size <= self.disk_limit:
+                return
+            list_files = sorted(self.dict_disk_files.items(), key=lambda item: item[1][0])
+            total_size = self.disk_size
+            list_removed = []
+            for file_path, (_, size) in list_files:
+                if total_size <= self.disk_limit:
+                    break
+                list_removed.append(file_path)
+                total_size -= size
+        for file_path in list_removed:
+            self.remove_file(file_path)
+
+    def remove_file(self, file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        if self.dict_disk_files is not None:
+            with self.lock:
+                self.remove_index_file(file_path)
+
+
+# 全局实例
+_indicator_cache_manager = None
+_indicator_cache_manager_lock = threading.Lock()
+
+def get_indicator_cache_manager() -> IndicatorCacheManager:
+    """获取指标缓存管理器实例"""
+    global _indicator_cache_manager
+    if _indicator_cache_manager is None:
+        with _indicator_cache_manager_lock:
+            if _indicator_cache_manager is None:
+                _indicator_cache_manager = IndicatorCacheManager()
+    return _indicator_cache_manager
@@ -0,0 +1,208 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from manager.period_manager import TimePeriod
+from manager.logging_manager import get_logger
+from processor.kline_resampler import get_period_minutes, get_minute_buckets, get_calendar_buckets, to_datetime64
+
+'''
+    多周期k线索引映射（图表联动、复盘回放切换周期、模拟交易共用）
+    1. 每根k线按较粗周期的区间编号归属（分钟级按交易时段分段，与kline_resampler一致；日线按日期；周、月、季、年按日历），
+       较细周期的k线i属于较粗周期中区间编号相同的k线，较粗周期的k线j包含较细周期中区间编号相同的连续k线
+    2. 加载周期数据时与已加载的其他周期两两计算映射数组（searchsorted，每对周期一次），
+       之后任意周期、任意k线的对应索引均为数组下标访问
+    3. 按股票缓存，周期数据未变化（长度、最后一根k线相同）时不重新计算
+
+    映射数组：
+        parent[(细周期, 粗周期)][i]: 细周期第i根k线所属的粗周期k线，粗周期无对应k线时为-1
+        first_child / last_child[(粗周期, 细周期)][j]: 粗周期第j根k线包含的第一根、最后一根细周期k线，无则为-1
+        before_day[(源周期, 目标周期)][i]: 目标周期中日期早于源周期第i根k线日期的最后一根k线，无则为-1
+
+    用法：
+        alignment = get_period_alignment_manager().get_alignment(code)
+        alignment.set_period_data(TimePeriod.DAY, df_day)
+        alignment.set_period_data(TimePeriod.MINUTE_30, df_30m)
+        index_30m = alignment.map_index(TimePeriod.DAY, index_day, TimePeriod.MINUTE_30)   # 当天最后一根30分钟k线
+'''
+
+class PeriodAlignment():
+    def __init__(self, code):
+        self.code = code
+        self.dict_signature = {}    # {TimePeriod: (k线数量, 最后一根k线的date, time)}，用于判断数据是否变化
+        self.dict_days = {}         # {TimePeriod: datetime64[D]数组} 每根k线的日期
+        self.dict_times = {}        # {TimePeriod: datetime64数组} 分钟级k线的时间（区间结束时间）
+        self.dict_bucket_ids = {}   # {(周期, 归属周期): 区间编号数组}
+        self.dict_parent = {}
+        self.dict_first_child = {}
+        self.dict_last_child = {}
+        self.dict_before_day = {}
+
+    def get_periods(self):
+        return list(self.dict_days.keys())
+
+    def has_period(self, period):
+        return period in self.dict_days
+
+    def get_bar_count(self, period):
+        days = self.dict_days.get(period)
+        return 0 if days is None else len(days)
+
+    def set_period_data(self, period, df_data):
+        """
+        登记周期数据并计算与其他已登记周期的映射，数据未变化时直接返回
+        返回:
+            bool: 是否重新计算
+        """
+        if df_data is None or df_data.empty:
+            self.remove_period(period)
+            return False
+
+        is_minute = TimePeriod.is_minute_level(period)
+        signature = (len(df_data), str(df_data['date'].iloc[-1]), str(df_data['time'].iloc[-1]) if is_minute else None)
+        if self.dict_signature.get(period) == signature:
+            return False
+
+        self.remove_period(period)
+        self.dict_signature[period] = signature
+        self.dict_days[period] = to_datetime64(df_data['date']).astype('datetime64[D]')
+        if is_minute:
+            self.dict_times[period] = to_datetime64(df_data['time'])
+        for other_period in self.get_periods():
+            if other_period == period:
+                continue
+            fine_period, coarse_period = min(period, other_period), max(period, other_period)
+            self._build_pair(fine_period, coarse_period)
+            self.dict_before_day[(period, other_period)] = self._get_before_day(period, other_period)
+            self.dict_before_day[(other_period, period)] = self._get_before_day(other_period, period)
+        return True
+
+    def remove_period(self, period):
+        self.dict_signature.pop(period, None)
+        self.dict_days.pop(period, None)
+        self.dict_times.pop(period, None)
+        for dict_map in (self.dict_bucket_ids, self.dict_parent, self.dict_first_child, self.dict_last_child, self.dict_before_day):
+            for key in [key for key in dict_map if period in key]:
+                del dict_map[key]
+
+    def _get_bucket_ids(self, period, coarse_period):
+        '''period的每根k线在coarse_period中的区间编号'''
+        key = (period, coarse_period)
+        bucket_ids = self.dict_bucket_ids.get(key)
+        if bucket_ids is None:
+            if TimePeriod.is_minute_level(coarse_period):
+                bucket_ids = get_minute_buckets(self.dict_times[period], get_period_minutes(coarse_period))[0]
+            elif coarse_period == TimePeriod.DAY:
+                bucket_ids = self.dict_days[period].astype(np.int64)
+            else:
+                bucket_ids = get_calendar_buckets(self.dict_days[period], coarse_period)
+            self.dict_bucket_ids[key] = bucket_ids
+        return bucket_ids
+
+    def _build_pair(self, fine_period, coarse_period):
+        fine_ids = self._get_bucket_ids(fine_period, coarse_period)
+        coarse_ids = self._get_bucket_ids(coarse_period, coarse_period)
+
+        parent = np.searchsorted(coarse_ids, fine_ids, side='left')
+        found = parent < len(coarse_ids)
+        found[found] = coarse_ids[parent[found]] == fine_ids[found]
+        self.dict_parent[(fine_period, coarse_period)] = np.where(found, parent, -1)
+
+        first_child = np.searchsorted(fine_ids, coarse_ids, side='left')
+        last_child = np.searchsorted(fine_ids, coarse_ids, side='right') - 1
+        empty = first_child > last_child
+        self.dict_first_child[(coarse_period, fine_period)] = np.where(empty, -1, first_child)
+        self.dict_last_child[(coarse_period, fine_period)] = np.where(empty, -1, last_child)
+
+    def _get_before_day(self, source_period, target_period):
+        return np.searchsorted(self.dict_days[target_period], self.dict_days[source_period], side='left') - 1
+
+    @staticmethod
+    def _lookup(array, index):
+        if array is None or index is None or not 0 <= index < len(array):
+            return -1
+        return int(array[index])
+
+    def get_parent_index(self, period, index, coarse_period):
+        '''period第index根k线所属的coarse_period k线索引，无则返回-1'''
+        return self._lookup(self.dict_parent.get((period, coarse_period)), index)
+
+    def get_child_range(self, period, index, fine_period):
+        '''period第index根k线包含的fine_period k线索引范围(first, last)，无则返回(-1, -1)'''
+        return (self._lookup(self.dict_first_child.get((period, fine_period)), index),
+                self._lookup(self.dict_last_child.get((period, fine_period)), index))
+
+    def get_before_day_index(self, period, index, target_period):
+        '''target_period中日期早于period第index根k线日期的最后一根k线索引，无则返回-1'''
+        return self._lookup(self.dict_before_day.get((period, target_period)), index)
+
+    def map_index(self, period, index, target_period):
+        '''
+        period第index根k线在target_period中对应的k线索引，无则返回-1
+            目标周期较粗：所属的k线
+            目标周期较细：包含的最后一根k线（回放中已走完的最后一根）
+        '''
+        if period == target_period:
+            return index if 0 <= index < self.get_bar_count(period) else -1
+        if target_period > period:
+            return self.get_parent_index(period, index, target_period)
+        return self.get_child_range(period, index, target_period)[1]
+
+    def find_last_index_by_date(self, period, date):
+        '''period中日期不晚于date的最后一根k线索引，无则返回-1'''
+        days = self.dict_days.get(period)
+        if days is None:
+            return -1
+        return int(np.searchsorted(days, np.datetime64(pd.Timestamp(str(date)), 'D'), side='right')) - 1
+
+
+class PeriodAlignmentManager():
+    DEFAULT_MAX_CODES = 32
+
+    def __init__(self, max_codes=DEFAULT_MAX_CODES):
+        self.logger = get_logger(__name__)
+        self.lock = threading.Lock()
+        self.max_codes = max_codes
+        self.dict_alignment = OrderedDict()     # {code: PeriodAlignment}，末尾为最近使用
+
+    def get_alignment(self, code) -> PeriodAlignment:
+        with self.lock:
+            alignment = self.dict_alignment.get(code)
+            if alignment is None:
+                alignment = PeriodAlignment(code)
+                self.dict_alignment[code] = alignment
+                while len(self.dict_alignment) > self.max_codes:
+                    self.dict_alignment.popitem(last=False)
+            else:
+                self.dict_alignment.move_to_end(code)
+            return alignment
+
+    def invalidate(self, code=None, period=None):
+        '''清除映射：code为None时清除全部，period为None时清除该股票的全部周期'''
+        with self.lock:
+            if code is None:
+                self.dict_alignment.clear()
+                return
+            alignment = self.dict_alignment.get(code)
+            if alignment is None:
+                return
+            if period is None:
+                del self.dict_alignment[code]
+            else:
+                alignment.remove_period(period)
+
+
+# 全局实例
+_period_alignment_manager = None
+_period_alignment_manager_lock = threading.Lock()
+
+def get_period_alignment_manager() -> PeriodAlignmentManager:
+    """获取多周期k线索引映射管理器实例"""
+    global _period_alignment_manager
+    if _period_alignment_manager is None:
+        with _period_alignment_manager_lock:
+            if _period_alignment_manager is None:
+                _period_alignment_manager = PeriodAlignmentManager()
+    return _period_alignment_manager
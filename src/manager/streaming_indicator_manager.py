@@ -0,0 +1,154 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from manager.logging_manager import get_logger
+from indicators.indicator_registry import get_indicator_registry, ATTRS_KEY
+from indicators.streaming_indicators import StreamingIndicatorEngine, STREAMING_INDICATOR_FACTORIES, create_indicators
+from indicators.stock_data_indicators import get_indicator_params_by_config
+
+'''
+    追加k线后增量更新已计算的指标（下载的日线、周线、分钟线追加写入数据库时）
+    1. 读取带指标的k线数据（图表加载）时登记(code, 周期表名) -> 指标缓存键，只保留最近查看的股票（LRU）
+    2. 新k线追加写入后，由登记的缓存结果extend：
+        MACD、MA、KDJ、RSI、BOLL由StreamingIndicatorEngine只计算新增的k线（与批量计算逐位一致），
+        其他已计算的指标（量比、MACD背离等）对追加后的数据重新批量计算；
+       调用方将结果按新的最后一根k线时间写入指标缓存，再次查看该股票时直接命中缓存，无需重新读取、计算
+    3. 引擎的递推状态按股票、周期保留：首次追加时按缓存中已有的k线逐根递推建立一次状态（在下载线程中进行），
+       之后每次追加只计算新增的k线
+    4. 新k线与已有数据重叠（覆盖当天数据）、列不一致时返回None，由调用方清除缓存，下次读取时全量计算
+
+    用法：
+        manager = get_streaming_indicator_manager()
+        manager.track(code, table_name, cache_key)                      # 读取带指标的数据后
+        df_extended = manager.extend(code, table_name, df_cached, df_new) # 追加写入新k线后
+'''
+
+class StreamingEntry():
+    def __init__(self, cache_key):
+        self.cache_key = cache_key      # 指标缓存键（见IndicatorCacheManager.make_key）
+        self.engine = None              # 已输入缓存中全部k线的引擎，首次追加时建立
+        self.names = ()                 # 引擎包含的指标名
+
+
+class StreamingIndicatorManager():
+    DEFAULT_MAX_CODES = 16
+
+    def __init__(self, max_codes=DEFAULT_MAX_CODES):
+        self.logger = get_logger(__name__)
+        self.lock = threading.Lock()
+        self.max_codes = max_codes
+        self.dict_entries = OrderedDict()   # {(code, 周期表名): StreamingEntry}，末尾为最近使用
+
+    def track(self, code, table_name, cache_key):
+        '''登记最近读取的带指标数据的缓存键，缓存键变化（数据被其他方式更新）时丢弃旧的引擎状态'''
+        key = (code, table_name)
+        with self.lock:
+            entry = self.dict_entries.get(key)
+            if entry is None or entry.cache_key != cache_key:
+                self.dict_entries[key] = StreamingEntry(cache_key)
+            self.dict_entries.move_to_end(key)
+            while len(self.dict_entries) > self.max_codes:
+                self.dict_entries.popitem(last=False)
+
+    def get_cache_key(self, code, table_name):
+        with self.lock:
+            entry = self.dict_entries.get((code, table_name))
+            return None if entry is None else entry.cache_key
+
+    def untrack(self, code, table_name=None):
+        with self.lock:
+            for key in [key for key in self.dict_entries if key[0] == code and (table_name is None or key[1] == table_name)]:
+                del self.dict_entries[key]
+
+    def extend(self, code, table_name, df_cached, df_new, new_cache_key=None, dict_params=None):
+        """
+        在已计算指标的数据后追加新k线，只计算新增k线的指标
+
+        参数:
+            df_cached: 登记的缓存键对应的数据（含指标列及DataFrame.attrs中的已计算指标）
+            df_new: 追加写入的k线，时间需晚于df_cached的最后一根k线
+            new_cache_key: 追加后数据的缓存键，不为None时替换登记的缓存键
+            dict_params: 指标参数，为None时取用户指标配置
+        返回:
+            DataFrame: 追加后的数据（含指标），不能增量更新时返回None
+        """
+        key = (code, table_name)
+        with self.lock:
+            entry = self.dict_entries.get(key)
+        if entry is None or df_cached is None or df_cached.empty or df_new is None or df_new.empty:
+            return None
+        if dict_params is None:
+            dict_params = get_indicator_params_by_config()
+
+        df_rows = self.get_new_rows(df_cached, df_new)
+        if df_rows is None:
+            self.untrack(code, table_name)
+            return None
+
+        registry = get_indicator_registry()
+        dict_computed = dict(df_cached.attrs.get(ATTRS_KEY, {}))
+        names = tuple(name for name in dict_computed if name in STREAMING_INDICATOR_FACTORIES)
+        engine = entry.engine
+        if engine is None or entry.names != names or engine.length != len(df_cached):
+            engine = StreamingIndicatorEngine(create_indicators(names, dict_params))
+            engine.seek(df_cached, len(df_cached))
+
+        df_extended = pd.concat([df_cached, df_rows], ignore_index=True)
+        df_extended.attrs[ATTRS_KEY] = {name: params for name, params in dict_computed.items() if name in names}
+        engine.append(df_extended)
+
+        # 不支持增量计算的指标对追加后的数据重新计算（批量计算，量比、MACD背离等均较快）
+        list_batch_names = [name for name in dict_computed if name not in names]
+        if list_batch_names:
+            for name in list_batch_names:
+                df_extended.drop(columns=[column for column in registry.get_output_columns(name, dict_params)
+                                          if column in df_extended.columns and column not in df_new.columns], inplace=True)
+            registry.ensure(df_extended, list_batch_names, dict_params)
+
+        with self.lock:
+            entry.engine = engine
+            entry.names = names
+            if new_cache_key is not None:
+                entry.cache_key = new_cache_key
+        return df_extended
+
+    @staticmethod
+    def get_new_rows(df_cached, df_new):
+        '''df_new按df_cached的k线数据列整理，新k线与已有数据重叠或缺少列时返回None'''
+        time_column = 'time' if 'time' in df_cached.columns else 'date'
+        if time_column not in df_new.columns:
+            return None
+        df_new = df_new.sort_values(time_column)
+        if str(df_new[time_column].iloc[0]) <= str(df_cached[time_column].iloc[-1]):
+            return None
+
+        set_computed_columns = set()
+        registry = get_indicator_registry()
+        for name, params in df_cached.attrs.get(ATTRS_KEY, {}).items():
+            spec = registry.get_spec(name)
+            set_computed_columns.update(spec.get_output_columns(params))
+        # 数据源自带的列（change_percent等）由新k线提供，其余缺少的列只允许是计算得到的指标列、名称列
+        list_missing = [column for column in df_cached.columns
+                        if column not in df_new.columns and column not in set_computed_columns and column != 'name']
+        if list_missing:
+            return None
+        df_rows = df_new.reindex(columns=df_cached.columns)
+        if 'name' in df_cached.columns:
+            df_rows['name'] = df_cached['name'].iloc[-1]
+        return df_rows
+
+
+# 全局实例
+_streaming_indicator_manager = None
+_streaming_indicator_manager_lock = threading.Lock()
+
+def get_streaming_indicator_manager() -> StreamingIndicatorManager:
+    """获取增量指标计算管理器实例"""
+    global _streaming_indicator_manager
+    if _streaming_indicator_manager is None:
+        with _streaming_indicator_manager_lock:
+            if _streaming_indicator_manager is None:
+                _streaming_indicator_manager = StreamingIndicatorManager()
+    return _streaming_indicator_manager
@@ -0,0 +1,482 @@
+import os
+import csv
+import math
+import time
+import zlib
+import random
+import datetime
+from abc import ABC, abstractmethod
+
+'''
+    Baostock数据源抽象，BaoStockProcessor与多进程下载工作进程统一通过数据源访问行情接口
+    1. BaostockLiveDataSource：转发到baostock在线接口
+    2. LocalReplayDataSource：离线数据源，回放录制的CSV数据，缺失时按股票代码与日期确定性地生成模拟k线，
+       返回与baostock ResultData一致的分页结果集，可配置请求延迟与错误注入，用于离线压测下载入库流程
+    配置文件：
+        [DataSource]
+        provider = baostock     # baostock / local
+        replay_dir =            # 录制数据目录，结构见LocalReplayDataSource
+        seed = 0                # 随机种子，相同种子下错误注入序列一致
+        latency = 0             # 每次请求的固定延迟（秒）
+        page_latency = 0        # 每翻一页的额外延迟（秒）
+        error_rate = 0          # 请求及翻页失败的概率，0~1
+        page_size = 10000       # 每页行数，与baostock一致
+        stock_count = 50        # 模拟股票列表中每个板块的股票数量
+    本模块只依赖标准库（在线数据源按需导入baostock），可在下载工作进程中使用
+'''
+
+DATA_SOURCE_BAOSTOCK = 'baostock'
+DATA_SOURCE_LOCAL = 'local'
+
+# 模拟的baostock错误码
+ERROR_CODE_SUCCESS = '0'
+ERROR_CODE_NOT_LOGIN = '10001001'
+ERROR_CODE_NETWORK = '10002007'
+
+DEFAULT_DATA_SOURCE_SETTINGS = {
+    'provider': DATA_SOURCE_BAOSTOCK,
+    'replay_dir': '',
+    'seed': 0,
+    'latency': 0.0,
+    'page_latency': 0.0,
+    'error_rate': 0.0,
+    'page_size': 10000,
+    'stock_count': 50,
+}
+
+
+class BaostockQueryError(Exception):
+    """请求或翻页失败（error_code不为'0'）"""
+    def __init__(self, error_code, error_msg=''):
+        super().__init__(f"{error_code}: {error_msg}")
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+
+def read_result_rows(rs):
+    """
+    逐页读取结果集的全部行
+    请求或翻页失败时抛出BaostockQueryError，避免把失败的请求当成"没有新数据"处理（下载日志会据此记为完成）
+    """
+    rows = []
+    while (rs.error_code == ERROR_CODE_SUCCESS) & rs.next():
+        rows.append(rs.get_row_data())
+    if rs.error_code != ERROR_CODE_SUCCESS:
+        raise BaostockQueryError(rs.error_code, rs.error_msg)
+    return rows
+
+
+class BaostockDataSource(ABC):
+    """
+    数据源接口，方法签名与baostock模块保持一致，返回值均为带error_code、error_msg的结果对象
+    子类必须实现全部接口方法，缺少实现时创建实例即报错
+    """
+    name = ''
+
+    @abstractmethod
+    def login(self):
+        pass
+
+    @abstractmethod
+    def logout(self):
+        pass
+
+    @abstractmethod
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None, frequency='d', adjustflag='3'):
+        pass
+
+    @abstractmethod
+    def query_trade_dates(self, start_date=None, end_date=None):
+        pass
+
+    @abstractmethod
+    def query_all_stock(self, day=None):
+        pass
+
+
+class BaostockLiveDataSource(BaostockDataSource):
+    """
+    在线数据源，直接调用baostock
+    """
+    name = DATA_SOURCE_BAOSTOCK
+
+    def __init__(self):
+        import baostock as bs
+        self.bs = bs
+
+    def login(self):
+        return self.bs.login()
+
+    def logout(self):
+        return self.bs.logout()
+
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None, frequency='d', adjustflag='3'):
+        return self.bs.query_history_k_data_plus(code, fields, start_date=start_date, end_date=end_date,
+                                                 frequency=frequency, adjustflag=adjustflag)
+
+    def query_trade_dates(self, start_date=None, end_date=None):
+        return self.bs.query_trade_dates(start_date=start_date, end_date=end_date)
+
+    def query_all_stock(self, day=None):
+        return self.bs.query_all_stock(day)
+
+
+class LocalResponse:
+    """login、logout等无数据接口的返回结果"""
+    def __init__(self, error_code=ERROR_CODE_SUCCESS, error_msg='success'):
+        self.error_code = error_code
+        self.error_msg = error_msg
+
+
+class LocalResultData:
+    """
+    模拟baostock ResultData的分页结果集：next()逐行迭代，当前页读完后再"请求"下一页，
+    每次翻页按page_latency休眠，并可按错误率中断
+    """
+    def __init__(self, fields, rows, page_size=10000, page_latency=0.0, fail_page=None,
+                 error_code=ERROR_CODE_SUCCESS, error_msg='success'):
+        self.fields = list(fields)
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self._rows = rows
+        self._page_size = max(1, int(page_size))
+        self._page_latency = page_latency
+        self._fail_page = fail_page      # 第几页（从1开始）翻页失败，None表示不失败
+        self._page_count = 0
+        self._cursor = -1
+        self.data = []
+        if error_code == ERROR_CODE_SUCCESS:
+            self._load_page()
+
+    def _load_page(self):
+        start = self._page_count * self._page_size
+        self.data = self._rows[start:start + self._page_size]
+        self._page_count += 1
+        self._cursor = -1
+
+    def next(self):
+        """移动到下一行，与baostock一致，之后通过get_row_data()读取当前行"""
+        if self.error_code != ERROR_CODE_SUCCESS:
+            return False
+        if self._cursor + 1 < len(self.data):
+            self._cursor += 1
+            return True
+        # 当前页已读完，不足一页说明没有后续数据
+        if len(self.data) < self._page_size:
+            return False
+        if self._page_latency > 0:
+            time.sleep(self._page_latency)
+        if self._fail_page is not None and self._page_count >= self._fail_page:
+            self.error_code = ERROR_CODE_NETWORK
+            self.error_msg = '网络接收错误（模拟）'
+            return False
+        self._load_page()
+        if self._cursor + 1 < len(self.data):
+            self._cursor += 1
+            return True
+        return False
+
+    def get_row_data(self):
+        return self.data[self._cursor]
+
+
+class LocalReplayDataSource(BaostockDataSource):
+    """
+    确定性的离线数据源
+    录制数据目录结构（均为baostock字段名作表头的UTF-8 CSV，文件缺失时使用模拟数据）：
+        <replay_dir>/trade_dates.csv            calendar_date,is_trading_day
+        <replay_dir>/all_stock.csv              code,tradeStatus,code_name
+        <replay_dir>/<frequency>/<code>.csv     如d/sh.600000.csv、30/sh.600000.csv
+    模拟k线只由股票代码与日期决定，与查询区间无关，同一日期多次获取结果一致
+    """
+    name = DATA_SOURCE_LOCAL
+
+    # 模拟股票列表：板块代码前缀与起始编号
+    SYNTHETIC_BOARDS = [('sh.', 600000), ('sz.', 1), ('sz.', 300001), ('sh.', 688001), ('bj.', 830001)]
+
+    def __init__(self, replay_dir='', seed=0, latency=0.0, page_latency=0.0, error_rate=0.0, page_size=10000, stock_count=50):
+        self.replay_dir = replay_dir or ''
+        self.seed = int(seed)
+        self.latency = float(latency)
+        self.page_latency = float(page_latency)
+        self.error_rate = float(error_rate)
+        self.page_size = int(page_size)
+        self.stock_count = int(stock_count)
+        self._rng = random.Random(self.seed)
+        self._logged_in = False
+        self._replay_cache = {}
+
+    # ------------------------------------------------------------登录------------------------------------------------------------
+    def login(self):
+        self._logged_in = True
+        return LocalResponse(error_msg='login success!')
+
+    def logout(self):
+        self._logged_in = False
+        return LocalResponse(error_msg='logout success!')
+
+    # ------------------------------------------------------------查询接口------------------------------------------------------------
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None, frequency='d', adjustflag='3'):
+        list_fields = [field.strip() for field in fields.split(',')]
+        start_date, end_date = self._normalize_date_range(start_date, end_date)
+        return self._make_result(list_fields, lambda: self._get_k_data_rows(code, list_fields, start_date, end_date, frequency))
+
+    def query_trade_dates(self, start_date=None, end_date=None):
+        start_date, end_date = self._normalize_date_range(start_date, end_date)
+        fields = ['calendar_date', 'is_trading_day']
+        return self._make_result(fields, lambda: self._get_trade_date_rows(start_date, end_date))
+
+    def query_all_stock(self, day=None):
+        fields = ['code', 'tradeStatus', 'code_name']
+        return self._make_result(fields, self._get_all_stock_rows)
+
+    def _make_result(self, fields, rows_func):
+        """统一处理登录状态、请求延迟与错误注入"""
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if not self._logged_in:
+            return LocalResultData(fields, [], error_code=ERROR_CODE_NOT_LOGIN, error_msg='用户未登录')
+        if self._should_fail():
+            return LocalResultData(fields, [], error_code=ERROR_CODE_NETWORK, error_msg='网络接收错误（模拟）')
+
+        rows = rows_func()
+        page_count = max(1, math.ceil(len(rows) / max(1, self.page_size)))
+        # 多页结果的每次翻页同样按错误率失败
+        fail_page = None
+        for page in range(1, page_count):
+            if self._should_fail():
+                fail_page = page
+                break
+        return LocalResultData(fields, rows, self.page_size, self.page_latency, fail_page)
+
+    def _should_fail(self):
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    # ------------------------------------------------------------回放数据------------------------------------------------------------
+    def _read_replay_csv(self, *path_parts):
+        """读取录制的CSV，返回list[dict]；文件不存在返回None"""
+        if not self.replay_dir:
+            return None
+        file_path = os.path.join(self.replay_dir, *path_parts)
+        if file_path in self._replay_cache:
+            return self._replay_cache[file_path]
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self._replay_cache[file_path] = rows
+        return rows
+
+    def _get_k_data_rows(self, code, fields, start_date, end_date, frequency):
+        replay_rows = self._read_replay_csv(frequency, f"{code}.csv")
+        if replay_rows is not None:
+            return [[row.get(field, '') for field in fields] for row in replay_rows
+                    if start_date <= row.get('date', '') <= end_date]
+
+        if frequency == 'd':
+            bars = self._synthetic_daily_bars(code, start_date, end_date)
+        elif frequency == 'w':
+            bars = self._synthetic_weekly_bars(code, start_date, end_date)
+        elif frequency.isdigit():
+            bars = self._synthetic_minute_bars(code, start_date, end_date, int(frequency))
+        else:
+            bars = []
+        return [[bar.get(field, '') for field in fields] for bar in bars]
+
+    def _get_trade_date_rows(self, start_date, end_date):
+        replay_rows = self._read_replay_csv('trade_dates.csv')
+        if replay_rows is not None:
+            return [[row['calendar_date'], row['is_trading_day']] for row in replay_rows
+                    if start_date <= row['calendar_date'] <= end_date]
+
+        rows = []
+        for day in self._iter_days(start_date, end_date):
+            rows.append([day.strftime('%Y-%m-%d'), '1' if self._is_trading_day(day) else '0'])
+        return rows
+
+    def _get_all_stock_rows(self):
+        replay_rows = self._read_replay_csv('all_stock.csv')
+        if replay_rows is not None:
+            return [[row['code'], row['tradeStatus'], row['code_name']] for row in replay_rows]
+
+        rows = []
+        for prefix, start_number in self.SYNTHETIC_BOARDS:
+            for i in range(self.stock_count):
+                code = f"{prefix}{start_number + i:06d}"
+                rows.append([code, '1', f"模拟{code[3:]}"])
+        return rows
+
+    # ------------------------------------------------------------模拟数据------------------------------------------------------------
+    @staticmethod
+    def _normalize_date_range(start_date, end_date):
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        return (start_date or '2015-01-01'), (end_date or today)
+
+    @staticmethod
+    def _iter_days(start_date, end_date):
+        day = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+        while day <= last_day:
+            yield day
+            day += datetime.timedelta(days=1)
+
+    @staticmethod
+    def _is_trading_day(day):
+        return day.weekday() < 5
+
+    def _previous_trading_day(self, day):
+        day -= datetime.timedelta(days=1)
+        while not self._is_trading_day(day):
+            day -= datetime.timedelta(days=1)
+        return day
+
+    @staticmethod
+    def _code_seed(code):
+        return zlib.crc32(code.encode('utf-8'))
+
+    def _synthetic_close(self, code, day):
+        """收盘价只由股票代码与日期决定"""
+        code_seed = self._code_seed(code)
+        ordinal = day.toordinal()
+        base_price = 5 + code_seed % 50
+        phase = (code_seed % 628) / 100
+        noise = random.Random(code_seed * 1000003 + ordinal).random() - 0.5
+        return round(base_price * (1 + 0.3 * math.sin(ordinal / 40 + phase)) * (1 + 0.04 * noise), 2)
+
+    def _synthetic_daily_bar(self, code, day):
+        close = self._synthetic_close(code, day)
+        preclose = self._synthetic_close(code, self._previous_trading_day(day))
+        rng = random.Random(self._code_seed(code) * 7919 + day.toordinal())
+        open_price = round(preclose * (1 + rng.uniform(-0.02, 0.02)), 2)
+        high = round(max(open_price, close) * (1 + rng.uniform(0, 0.02)), 2)
+        low = round(min(open_price, close) * (1 - rng.uniform(0, 0.02)), 2)
+        volume = rng.randint(100000, 20000000)
+        return {
+            'date': day.strftime('%Y-%m-%d'),
+            'code': code,
+            'open': f"{open_price:.4f}",
+            'high': f"{high:.4f}",
+            'low': f"{low:.4f}",
+            'close': f"{close:.4f}",
+            'preclose': f"{preclose:.4f}",
+            'volume': str(volume),
+            'amount': f"{volume * (high + low) / 2:.4f}",
+            'adjustflag': '2',
+            'turn': f"{rng.uniform(0.1, 8):.6f}",
+            'tradestatus': '1',
+            'pctChg': f"{(close / preclose - 1) * 100:.6f}",
+            'isST': '0',
+        }
+
+    def _synthetic_daily_bars(self, code, start_date, end_date):
+        return [self._synthetic_daily_bar(code, day) for day in self._iter_days(start_date, end_date) if self._is_trading_day(day)]
+
+    def _synthetic_weekly_bars(self, code, start_date, end_date):
+        """按自然周聚合日线，日期为区间内该周最后一个交易日"""
+        weekly_bars = []
+        week_bars = []
+        for bar in self._synthetic_daily_bars(code, start_date, end_date):
+            day = datetime.datetime.strptime(bar['date'], '%Y-%m-%d').date()
+            if week_bars and day.isocalendar()[:2] != datetime.datetime.strptime(week_bars[-1]['date'], '%Y-%m-%d').date().isocalendar()[:2]:
+                weekly_bars.append(self._merge_week(week_bars))
+                week_bars = []
+            week_bars.append(bar)
+        if week_bars:
+            weekly_bars.append(self._merge_week(week_bars))
+        return weekly_bars
+
+    @staticmethod
+    def _merge_week(week_bars):
+        first_bar, last_bar = week_bars[0], week_bars[-1]
+        preclose = float(first_bar['preclose'])
+        close = float(last_bar['close'])
+        volume = sum(int(bar['volume']) for bar in week_bars)
+        bar = dict(last_bar)
+        bar.update({
+            'open': first_bar['open'],
+            'high': f"{max(float(b['high']) for b in week_bars):.4f}",
+            'low': f"{min(float(b['low']) for b in week_bars):.4f}",
+            'volume': str(volume),
+            'amount': f"{sum(float(b['amount']) for b in week_bars):.4f}",
+            'turn': f"{sum(float(b['turn']) for b in week_bars):.6f}",
+            'pctChg': f"{(close / preclose - 1) * 100:.6f}",
+        })
+        return bar
+
+    @staticmethod
+    def _session_bar_times(frequency):
+        """A股交易时段内的k线结束时间（分钟数），上午9:30-11:30，下午13:00-15:00"""
+        bar_times = []
+        for session_start, session_end in ((9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60)):
+            minute = session_start + frequency
+            while minute <= session_end:
+                bar_times.append(minute)
+                minute += frequency
+            if not bar_times or bar_times[-1] != session_end:
+                bar_times.append(session_end)
+        return bar_times
+
+    def _synthetic_minute_bars(self, code, start_date, end_date, frequency):
+        bar_times = self._session_bar_times(frequency)
+        bars = []
+        for day in self._iter_days(start_date, end_date):
+            if not self._is_trading_day(day):
+                continue
+            daily_bar = self._synthetic_daily_bar(code, day)
+            open_price, close = float(daily_bar['open']), float(daily_bar['close'])
+            bar_volume = int(daily_bar['volume']) // len(bar_times)
+            rng = random.Random(self._code_seed(code) * 104729 + day.toordinal() * 1000 + frequency)
+            prev_price = open_price
+            for i, minute in enumerate(bar_times, 1):
+                price = round(open_price + (close - open_price) * i / len(bar_times) + rng.uniform(-0.01, 0.01) * open_price, 2)
+                high = max(prev_price, price) * (1 + rng.uniform(0, 0.003))
+                low = min(prev_price, price) * (1 - rng.uniform(0, 0.003))
+                bars.append({
+                    'date': daily_bar['date'],
+                    'time': f"{day.strftime('%Y%m%d')}{minute // 60:02d}{minute % 60:02d}00000",
+                    'code': code,
+                    'open': f"{prev_price:.4f}",
+                    'high': f"{high:.4f}",
+                    'low': f"{low:.4f}",
+                    'close': f"{price:.4f}",
+                    'volume': str(bar_volume),
+                    'amount': f"{bar_volume * price:.4f}",
+                    'adjustflag': '2',
+                })
+                prev_price = price
+        return bars
+
+
+def create_data_source(settings=None, salt=0):
+    """
+    根据配置创建数据源
+
+    参数:
+        settings (dict, optional): 见DEFAULT_DATA_SOURCE_SETTINGS，None表示在线数据源
+        salt (int): 与seed组合，使多个工作进程的错误注入序列互不相同且可复现
+    """
+    settings = dict(DEFAULT_DATA_SOURCE_SETTINGS, **(settings or {}))
+    if settings['provider'] == DATA_SOURCE_LOCAL:
+        return LocalReplayDataSource(
+            replay_dir=settings['replay_dir'],
+            seed=int(settings['seed']) + int(salt),
+            latency=settings['latency'],
+            page_latency=settings['page_latency'],
+            error_rate=settings['error_rate'],
+            page_size=settings['page_size'],
+            stock_count=settings['stock_count'])
+    return BaostockLiveDataSource()
+
+
+def load_data_source_settings():
+    """从配置文件[DataSource]读取数据源配置"""
+    from manager.config_manager import ConfigManager
+
+    config_manager = ConfigManager()
+    settings = dict(DEFAULT_DATA_SOURCE_SETTINGS)
+    for key, default in DEFAULT_DATA_SOURCE_SETTINGS.items():
+        value = config_manager.get('DataSource', key, None)
+        if value in (None, ''):
+            continue
+        settings[key] = type(default)(value)
+    return settings
@@ -0,0 +1,267 @@
+import time
+import queue
+import multiprocessing
+
+import pandas as pd
+
+from manager.config_manager import ConfigManager
+from manager.logging_manager import get_logger
+from manager.bao_stock_data_manager import BaostockDataManager
+from manager.period_manager import TimePeriod
+from db_base.stock_info_db_base import StockInfoDBBase
+from processor.baostock_download_worker import SharedTokenBucket, download_worker_main, BAOSTOCK_COLUMN_RENAME
+from processor.baostock_data_source import load_data_source_settings
+
+'''
+    Baostock多进程并行下载引擎
+    1. 主进程根据下载日志与本地水位线规划(code, period, start_date, end_date)任务，放入共享任务队列
+    2. N个工作进程各自登录Baostock，经全局令牌桶限流后请求数据，失败按指数退避重试
+    3. 主进程作为唯一写入者，按批从结果队列取出数据写入数据库，避免多进程争用SQLite
+    配置文件：
+        [Download]
+        workers = 1             # 工作进程数，大于1时一键更新使用并行下载引擎
+        rate_limit = 20         # 全局每秒请求数上限，0表示不限流
+        burst = 4               # 允许的突发请求数
+        max_retries = 3         # 单个任务最大重试次数
+        backoff_base = 1.0      # 重试退避基数（秒）
+        write_batch_size = 50   # 每批写入的任务结果数
+'''
+
+class BaostockDownloadEngine:
+    """
+    Baostock多进程并行下载引擎
+    """
+    DEFAULT_WORKERS = 1     # 与config.ini一致，未配置时不启用并行下载
+
+    def __init__(self, workers=None, rate_limit=None, burst=None, max_retries=None, backoff_base=None, write_batch_size=None, data_source_settings=None):
+        self.logger = get_logger(__name__)
+        # 工作进程使用的数据源配置，默认读取配置文件[DataSource]
+        self.data_source_settings = data_source_settings if data_source_settings is not None else load_data_source_settings()
+
+        config_manager = ConfigManager()
+        self.workers = workers if workers else config_manager.getint('Download', 'workers', self.DEFAULT_WORKERS)
+        self.rate_limit = rate_limit if rate_limit is not None else float(config_manager.get('Download', 'rate_limit', 20) or 0)
+        self.burst = burst if burst else config_manager.getint('Download', 'burst', 4)
+        self.max_retries = max_retries if max_retries is not None else config_manager.getint('Download', 'max_retries', 3)
+        self.backoff_base = backoff_base if backoff_base is not None else float(config_manager.get('Download', 'backoff_base', 1.0) or 1.0)
+        self.write_batch_size = write_batch_size if write_batch_size else config_manager.getint('Download', 'write_batch_size', 50)
+
+        self.workers = max(1, int(self.workers))
+        self.target_date = None     # 本轮更新的目标交易日，build_jobs时确定
+        self.skipped_count = 0      # 本轮已完成或已是最新、无需下载的任务数
+
+    # ------------------------------------------------------------任务规划------------------------------------------------------------
+    def build_jobs(self, board_names, periods, task=None):
+        """
+        根据本地数据库状态生成下载任务，已是最新数据的股票不生成任务
+
+        参数:
+            board_names (list): 板块名称，如['sh_main', 'sz_main']
+            periods (list[TimePeriod]): 需要下载的周期
+        返回:
+            list[dict]: 任务列表
+        """
+        from processor.baostock_processor import BaoStockProcessor
+
+        processor = BaoStockProcessor()
+        manager = BaostockDataManager()
+        dict_stock_info = manager.get_stock_info_dict()
+        # 下载日志中本轮已完成的股票直接跳过，不再打开单股数据库
+        self.target_date = processor.get_fetch_target_date()
+        self.skipped_count = 0
+        jobs = []
+        for board_name in board_names:
+            df_board = dict_stock_info.get(board_name)
+            if df_board is None or df_board.empty:
+                self.logger.info(f"{board_name} 无股票信息，跳过")
+                continue
+
+            for period in periods:
+                done_codes = manager.get_fetch_journal_done_codes(period, self.target_date)
+                up_to_date_records = []
+                for code in df_board['证券代码']:
+                    if task and task.is_cancelled():
+                        manager.record_fetch_journal(period, up_to_date_records)
+                        return jobs
+                    if code in done_codes:
+                        self.skipped_count += 1
+                        continue
+                    job = processor.plan_fetch_job(code, period)
+                    if job is not None:
+                        job['target_date'] = self.target_date
+                        jobs.append(job)
+                    else:
+                        self.skipped_count += 1
+                        up_to_date_records.append((code, self.target_date, StockInfoDBBase.FETCH_JOURNAL_DONE,
+                                                   manager.get_stock_data_watermark(code, period), None))
+                manager.record_fetch_journal(period, up_to_date_records)
+        return jobs
+
+    # ------------------------------------------------------------执行------------------------------------------------------------
+    def run(self, jobs, task=None, progress_callback=None):
+        """
+        并行执行下载任务，阻塞直至全部完成或任务被取消
+
+        参数:
+            jobs (list[dict]): build_jobs生成的任务
+            task (BaseTask, optional): 所属任务，用于响应暂停、取消
+            progress_callback (callable, optional): progress_callback(completed, total)
+        返回:
+            dict: 执行结果统计
+        """
+        total = len(jobs)
+        summary = {'total': total, 'processed': 0, 'completed': 0, 'failed': [], 'rows': 0, 'cancelled': False, 'elapsed': 0.0}
+        if progress_callback:
+            progress_callback(0, total)
+        if total == 0:
+            return summary
+
+        start_time = time.time()
+        worker_count = min(self.workers, total)
+        # spawn启动方式避免子进程继承Qt及SQLite连接状态
+        ctx = multiprocessing.get_context('spawn')
+        job_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        run_event = ctx.Event()
+        stop_event = ctx.Event()
+        run_event.set()
+        rate_limiter = SharedTokenBucket(ctx, self.rate_limit, self.burst)
+
+        for job in jobs:
+            job_queue.put(job)
+        for _ in range(worker_count):
+            job_queue.put(None)     # 结束标记
+
+        processes = []
+        for worker_id in range(worker_count):
+            process = ctx.Process(target=download_worker_main,
+                args=(worker_id, job_queue, result_queue, rate_limiter, run_event, stop_event, self.max_retries, self.backoff_base, self.data_source_settings),
+                name=f"BaostockDownloadWorker-{worker_id}", daemon=True)
+            process.start()
+            processes.append(process)
+        self.logger.info(f"启动 {worker_count} 个下载进程，共 {total} 个任务，限流 {self.rate_limit}次/秒")
+
+        batch = []
+        received = 0
+        try:
+            while received < total:
+                if task:
+                    if task.is_cancelled():
+                        summary['cancelled'] = True
+                        stop_event.set()
+                        break
+
+                    # 暂停时工作进程完成当前任务后不再取新任务，主进程继续写入已返回的结果
+                    if task.is_paused():
+                        if run_event.is_set():
+                            run_event.clear()
+                            self.logger.info("下载任务已暂停")
+                    elif not run_event.is_set():
+                        run_event.set()
+                        self.logger.info("下载任务已恢复")
+
+                try:
+                    result = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    if batch:
+                        self._flush(batch, summary)
+                        batch = []
+                        if progress_callback:
+                            progress_callback(summary['processed'], total)
+                    if not any(process.is_alive() for process in processes):
+                        self.logger.info("下载进程已全部退出，提前结束")
+                        break
+                    continue
+
+                received += 1
+                batch.append(result)
+                if len(batch) >= self.write_batch_size:
+                    self._flush(batch, summary)
+                    batch = []
+                    if progress_callback:
+                        progress_callback(summary['processed'], total)
+        finally:
+            stop_event.set()
+            run_event.set()
+            batch.extend(self._shutdown(processes, result_queue))
+            if batch:
+                self._flush(batch, summary)
+            if progress_callback:
+                progress_callback(summary['processed'], total)
+
+        summary['elapsed'] = time.time() - start_time
+        self.logger.info(f"并行下载结束，完成 {summary['completed']}/{total}，失败 {len(summary['failed'])}，"
+                         f"写入 {summary['rows']} 行，耗时: {summary['elapsed']:.2f}秒")
+        return summary
+
+    def _shutdown(self, processes, result_queue):
+        """等待工作进程退出，期间持续取出结果，避免子进程因队列未清空而无法退出"""
+        remaining = []
+        deadline = time.time() + 30
+        while any(process.is_alive() for process in processes) and time.time() < deadline:
+            try:
+                remaining.append(result_queue.get(timeout=0.2))
+            except queue.Empty:
+                pass
+
+        for process in processes:
+            if process.is_alive():
+                self.logger.info(f"{process.name} 未能按时退出，强制结束")
+                process.terminate()
+            process.join(1)
+
+        while True:
+            try:
+                remaining.append(result_queue.get_nowait())
+            except queue.Empty:
+                break
+        return remaining
+
+    # ------------------------------------------------------------写入------------------------------------------------------------
+    def build_dataframe(self, result):
+        """将工作进程返回的原始数据转换为与串行下载一致的DataFrame"""
+        if not result['rows']:
+            return pd.DataFrame()
+
+        df_data = pd.DataFrame(result['rows'], columns=result['fields'])
+        df_data.rename(columns=BAOSTOCK_COLUMN_RENAME, inplace=True)
+        BaostockDataManager().data_type_conversion(df_data)
+        return df_data.dropna()
+
+    def _flush(self, batch, summary):
+        """单一写入者：将一批任务结果依次写入各股票数据库"""
+        manager = BaostockDataManager()
+        dict_journal_records = {}
+        for result in batch:
+            job = result['job']
+            period = TimePeriod(job['period'])
+            summary['processed'] += 1
+            if result['error']:
+                if result['error'] != "cancelled":
+                    self.logger.info(f"{job['code']} {job['period']} 下载失败: {result['error']}")
+                    summary['failed'].append(job)
+                    dict_journal_records.setdefault(period, []).append(
+                        (job['code'], job.get('target_date'), StockInfoDBBase.FETCH_JOURNAL_FAILED, None, result['error']))
+                continue
+
+            try:
+                df_data = self.build_dataframe(result)
+                if not df_data.empty:
+                    manager.save_stock_data_to_db(job['code'], df_data, job['write_way'], period)
+                    summary['rows'] += len(df_data)
+                    watermark = str(df_data['date'].max())[:10]
+                else:
+                    watermark = manager.get_stock_data_watermark(job['code'], period)
+                summary['completed'] += 1
+                dict_journal_records.setdefault(period, []).append(
+                    (job['code'], job.get('target_date'), StockInfoDBBase.FETCH_JOURNAL_DONE, watermark, None))
+            except Exception as e:
+                self.logger.info(f"{job['code']} {job['period']} 写入失败: {e}")
+                summary['failed'].append(job)
+                dict_journal_records.setdefault(period, []).append(
+                    (job['code'], job.get('target_date'), StockInfoDBBase.FETCH_JOURNAL_FAILED, None, str(e)))
+
+        # 每批写入后记录下载日志，中断后重新执行时跳过已完成的任务；未经build_jobs规划的任务无目标交易日，不记录
+        for period, records in dict_journal_records.items():
+            records = [record for record in records if record[1]]
+            manager.record_fetch_journal(period, records)
@@ -0,0 +1,149 @@
+import time
+import random
+import queue
+import logging
+
+from processor.baostock_data_source import create_data_source, read_result_rows, BaostockQueryError
+
+'''
+    Baostock多进程下载的工作进程部分
+    每个工作进程单独登录Baostock，从共享任务队列中取出(code, period, start_date, end_date)任务，
+    经全局令牌桶限流后请求数据，原始结果放入结果队列，由主进程中的单一写入者统一入库。
+    本模块只依赖数据源模块与标准库，避免子进程导入Qt及数据库相关模块。
+'''
+
+# 各周期请求的字段与Baostock频率参数
+PERIOD_QUERY_CONFIG = {
+    '1d': ("date,code,open,high,low,close,volume,amount,pctChg,turn,adjustflag", "d"),
+    '1w': ("date,code,open,high,low,close,volume,amount,pctChg,turn,adjustflag", "w"),
+}
+MINUTE_LEVEL_FIELDS = "date,time,code,open,high,low,close,volume,amount,adjustflag"
+
+# Baostock返回字段与本地数据库列名的对应关系
+BAOSTOCK_COLUMN_RENAME = {
+    'pctChg': 'change_percent',
+    'turn': 'turnover_rate',
+}
+
+# 未登录（会话失效）错误码，需重新登录后重试
+RELOGIN_ERROR_CODES = ('10001001',)
+
+
+def get_query_config(period):
+    """返回(fields, frequency)，分钟级别的period形如'30m'"""
+    if period in PERIOD_QUERY_CONFIG:
+        return PERIOD_QUERY_CONFIG[period]
+    return MINUTE_LEVEL_FIELDS, period.rstrip('m')
+
+
+class SharedTokenBucket:
+    """
+    跨进程共享的令牌桶限流器（GCRA实现）
+    只在共享内存中保存下一次可用时间，令牌按rate匀速补充，最多允许burst个请求突发
+    """
+    def __init__(self, mp_context, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._next_time = mp_context.Value('d', 0.0, lock=False)
+        self._lock = mp_context.Lock()
+
+    def acquire(self, stop_event=None):
+        """获取一个令牌，必要时休眠等待；rate<=0表示不限流"""
+        if self.rate <= 0:
+            return True
+
+        interval = 1.0 / self.rate
+        with self._lock:
+            now = time.monotonic()
+            # 空闲期间最多累积burst个令牌
+            start = max(self._next_time.value, now - (self.burst - 1) * interval)
+            self._next_time.value = start + interval
+        wait_time = start - now
+        if wait_time > 0:
+            if stop_event is not None:
+                return not stop_event.wait(wait_time)
+            time.sleep(wait_time)
+        return True
+
+
+def query_history_k_data(data_source, job, max_retries=3, backoff_base=1.0, rate_limiter=None, stop_event=None):
+    """
+    请求单个任务的k线数据，失败时按指数退避重试
+
+    返回:
+        (fields, rows, error_msg): 成功时error_msg为None
+    """
+    fields, frequency = get_query_config(job['period'])
+    error_msg = None
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None and not rate_limiter.acquire(stop_event):
+            return fields.split(','), [], "cancelled"
+
+        try:
+            rs = data_source.query_history_k_data_plus(job['code'], fields,
+                start_date=job['start_date'], end_date=job['end_date'],
+                frequency=frequency, adjustflag="2")
+
+            return fields.split(','), read_result_rows(rs), None
+        except Exception as e:
+            # 网络异常、未登录等，重新登录后重试
+            error_msg = str(e)
+            if not isinstance(e, BaostockQueryError) or e.error_code in RELOGIN_ERROR_CODES:
+                try:
+                    data_source.login()
+                except Exception:
+                    pass
+
+        if attempt < max_retries:
+            backoff = backoff_base * (2 ** attempt) + random.uniform(0, backoff_base)
+            if stop_event is not None and stop_event.wait(backoff):
+                return fields.split(','), [], "cancelled"
+            elif stop_event is None:
+                time.sleep(backoff)
+
+    return fields.split(','), [], error_msg
+
+
+def download_worker_main(worker_id, job_queue, result_queue, rate_limiter, run_event, stop_event, max_retries, backoff_base, data_source_settings=None):
+    """
+    工作进程入口
+        data_source_settings: 数据源配置，由主进程读取后传入，None表示在线Baostock
+        run_event: 清除时暂停取任务（暂停语义）
+        stop_event: 置位后处理完当前任务即退出（取消语义）
+        任务队列中的None为结束标记
+    """
+    logger = logging.getLogger(f"{__name__}.worker{worker_id}")
+    data_source = create_data_source(data_source_settings, salt=worker_id)
+    lg = data_source.login()
+    if lg.error_code != '0':
+        logger.warning(f"工作进程{worker_id}登录Baostock失败: {lg.error_msg}")
+
+    try:
+        while not stop_event.is_set():
+            # 暂停时阻塞在此，定期检查取消状态
+            if not run_event.wait(0.5):
+                continue
+
+            try:
+                job = job_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if job is None:
+                break
+
+            start_time = time.time()
+            fields, rows, error_msg = query_history_k_data(data_source, job, max_retries, backoff_base, rate_limiter, stop_event)
+            result_queue.put({
+                'job': job,
+                'fields': fields,
+                'rows': rows,
+                'error': error_msg,
+                'worker_id': worker_id,
+                'elapsed': time.time() - start_time,
+            })
+    finally:
+        try:
+            data_source.logout()
+        except Exception:
+            pass
@@ -1,7 +1,6 @@
-import baostock as bs
 import pandas as pd
 import numpy as np
-from db_base.stock_info_db_base import StockInfoDBBasePool
+from db_base.stock_info_db_base import StockInfoDBBasePool, StockInfoDBBase
 from db_base.stock_db_base import StockDbBase
 from indicators import stock_data_indicators as sdi
 import random
@@ -25,6 +24,7 @@ import json
 
 from manager.bao_stock_data_manager import BaostockDataManager
 from manager.period_manager import TimePeriod
+from processor.baostock_data_source import create_data_source, load_data_source_settings, read_result_rows, BaostockQueryError
 
 from thread.task_pool import get_default_task_pool
 
@@ -63,6 +63,10 @@ class BaoStockProcessor(QObject):
         self.lock = threading.Lock()  
         self._is_initialized = False # 初始化状态标志
 
+        # 行情数据源，默认为在线Baostock，可通过配置[DataSource] provider = local切换为离线数据源
+        self.data_source_settings = load_data_source_settings()
+        self.data_source = create_data_source(self.data_source_settings)
+
     def initialize(self) -> bool:
         """显式登录Baostock系统。应在程序开始时调用。"""
         try:
@@ -79,8 +83,8 @@ class BaoStockProcessor(QObject):
         pass
 
     def init_baostock_login(self):
-        self.logger.info("登录Baostock系统")
-        lg = bs.login()
+        self.logger.info(f"登录Baostock系统，数据源: {self.data_source.name}")
+        lg = self.data_source.login()
         # 显示登陆返回信息
         self.logger.info('login respond error_code:'+lg.error_code)
         self.logger.info('login respond  error_msg:'+lg.error_msg)
@@ -89,7 +93,11 @@ class BaoStockProcessor(QObject):
             self._is_initialized = True
             self.logger.info("Baostock login successful.")
 
-            self.df_trade_dates = self.get_current_trade_dates()
+            try:
+                self.df_trade_dates = self.get_current_trade_dates()
+            except BaostockQueryError as e:
+                self.logger.error(f"获取交易日信息失败: {e}")
+                self.df_trade_dates = pd.DataFrame(columns=['calendar_date', 'is_trading_day'])
             if self.is_trading_day_today():
                 self.logger.info("今天是交易日")
                 # self.can_update_today_data()
@@ -105,7 +113,7 @@ class BaoStockProcessor(QObject):
         """显式登出Baostock系统。应在程序结束时调用。"""
         if self._is_initialized:
             try:
-                bs.logout()
+                self.data_source.logout()
                 self.logger.info("Baostock logged out successfully.")
             except Exception as e:
                 # 此时发生异常可能由于解释器正在关闭，记录警告即可
@@ -153,15 +161,12 @@ class BaoStockProcessor(QObject):
 
         #### 获取交易日信息 ####
         start_date, end_date = self.get_current_year_dates()
-        rs = bs.query_trade_dates(start_date=start_date, end_date=end_date)
+        rs = self.data_source.query_trade_dates(start_date=start_date, end_date=end_date)
         self.logger.info('query_trade_dates respond error_code:'+rs.error_code)
         self.logger.info('query_trade_dates respond  error_msg:'+rs.error_msg)
 
         #### 打印结果集 ####
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            # 获取一条记录，将记录合并在一起
-            data_list.append(rs.get_row_data())
+        data_list = read_result_rows(rs)
         result = pd.DataFrame(data_list, columns=rs.fields)
 
         #### 结果集输出到csv文件 ####   
@@ -282,7 +287,7 @@ class BaoStockProcessor(QObject):
         # time.sleep(sleep_time)
 
         with self.lock:
-            rs = bs.query_history_k_data_plus(code,
+            rs = self.data_source.query_history_k_data_plus(code,
                 "date,code,open,high,low,close,volume,amount,pctChg,turn,adjustflag",
                 start_date=start_date, end_date=end_date,
                 frequency="d", adjustflag="2")
@@ -290,11 +295,8 @@ class BaoStockProcessor(QObject):
         # self.logger.info(rs.error_msg)       # success
         # self.logger.info("rs的类型：", type(rs))       # <class 'baostock.data.resultset.ResultData'>
 
-        # 获取具体的信息
-        result_list = []
-        while (rs.error_code == '0') & rs.next():
-            # 分页查询，将每页信息合并在一起
-            result_list.append(rs.get_row_data())
+        # 获取具体的信息（分页查询，请求失败时抛出BaostockQueryError，由调用方记为失败）
+        result_list = read_result_rows(rs)
 
         # self.logger.info("result_list的类型：", type(result_list))     # <class 'list'>
         new_columns = ['date', 'code', 'open', 'high', 'low', 'close', 'volume', 'amount', 'change_percent', 'turnover_rate', 'adjustflag']
@@ -319,123 +321,69 @@ class BaoStockProcessor(QObject):
                 BaostockDataManager().save_stock_data_to_db(code, result, 'replace', TimePeriod.DAY)
         else:
             # self.logger.info(f"{code}.db 存在，即将从本地数据库更新")
-            result, data_to_save = self.update_daily_stock_data(code)
-            if data_to_save is not None and not data_to_save.empty:
-                BaostockDataManager().save_stock_data_to_db(code, data_to_save, "append",TimePeriod.DAY)
+            result = self.update_daily_stock_data(code)
+            if not result.empty:
+                BaostockDataManager().save_stock_data_to_db(code, result, "append",TimePeriod.DAY)
 
         # sleep_time = random.uniform(0.1, 0.3)
         # time.sleep(sleep_time)
         
         return result
        
-    # 增量维护，收盘后调用
-    def update_daily_stock_data(self, code):
-        day_stock_data = pd.DataFrame()
-        data_to_save = pd.DataFrame()
-        if not BaostockDataManager().check_stock_db_exists(code):
-            self.logger.info(f"{code}.db 不存在", code)
-            return day_stock_data, data_to_save
-
-        # 步骤一：得到当前数据库中的股票数据
-        day_stock_data = BaostockDataManager().get_stock_data_from_db_by_period(code, TimePeriod.DAY)
-        # self.logger.info("code: ", code)
-        # self.logger.info("day_stock_data的类型：", type(day_stock_data))
-        # self.logger.info(day_stock_data.tail(1))
-        if day_stock_data is None or day_stock_data.empty:
-            self.logger.info("day_stock_data为空")
-            return day_stock_data, data_to_save
-
-        # 判断是否存在空值
-        if day_stock_data.isnull().values.any():
-            # self.logger.info("存在空值")
-            # 获取所有包含空值的行
-            rows_with_nulls = day_stock_data[day_stock_data.isnull().any(axis=1)]
-            # self.logger.info("\n所有包含空值的行:")
-            # self.logger.info(rows_with_nulls)
-            
-            # 提取第一个包含空值的行（按索引顺序）
-            first_row_with_null = rows_with_nulls.iloc[0]
-            # self.logger.info("\n第一个包含空值的行:")
-            # self.logger.info(first_row_with_null)
-
-            null_data_code = first_row_with_null['code']
-            # self.logger.info(f"第一个包含空值行的股票代码: {null_data_code}")
-            first_null_date = first_row_with_null['date']
-            # self.logger.info("第一个包含空值的行日期类型是: ", type(first_null_date))  # <class 'str'>
-            # self.logger.info(f"第一个包含空值的行日期是: {first_null_date}")
-    
+    def get_incremental_date_range(self, last_date):
+        '''
+            根据本地数据的最后日期（水位线）计算需增量获取的日期范围
+            return: (start_date, end_date)，已是最新数据时返回(None, None)
+        '''
         now_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        if now_date in day_stock_data['date'].values:
-            # self.logger.info("已是最新日线数据")
-            return day_stock_data, data_to_save
-        
-        last_date = None
-        if day_stock_data.empty or day_stock_data is None:
-            self.logger.info("数据库表为空，默认获取近3年股票数据")
-            last_date = (datetime.datetime.now() - datetime.timedelta(days=365*3)).strftime("%Y-%m-%d")
-        else:
-            last_date = day_stock_data['date'].iloc[-1]
-        # self.logger.info("最后日期（方法2）:", last_date) 
+        if last_date >= now_date:
+            # self.logger.info("已是最新数据")
+            return None, None
 
         parsed_date = datetime.datetime.strptime(last_date, "%Y-%m-%d")  # 解析为日期对象
-        last_date = parsed_date + datetime.timedelta(days=1)
+        start_date = (parsed_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")    # Baostock要求的日期格式
+        end_date = now_date
 
-        # 获取数据库中最后日期至今的股票数据
-        start_date = last_date.strftime("%Y-%m-%d")               # Baostock要求的日期格式
-        end_date = (datetime.datetime.now()).strftime("%Y-%m-%d")   #  + datetime.timedelta(days=1)
-        # self.logger.info(f"获取股票 {code} 数据，时间范围：{start_date} 至 {end_date}")
-        
         # 判断数据库最后日期至今有无交易日数据需更新
         if self.is_trading_day_today():
             # 交易日18:00后才能更新当天数据
             if not self.can_update_today_data():
-                # self.logger.info("今天不是交易日，未到数据更新时间，请稍后再试")
-                # return day_stock_data, data_to_save
-
                 # 判断昨日数据是否已存在，不存在则更新昨日数据
                 yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-                if yesterday in day_stock_data['date'].values:
-                    # self.logger.info("昨日及之前数据已存在，直接返回现有数据")
-                    return day_stock_data, data_to_save
+                if last_date >= yesterday:
+                    # self.logger.info("昨日及之前数据已存在")
+                    return None, None
         else:
-            # self.logger.info("今天不是交易日，判断数据库中是否是最新数据")
             trading_day_count = self.count_trading_days(start_date, end_date)
-            # self.logger.info(f"交易日数量：{trading_day_count}")
             if trading_day_count == 0:
-                # self.logger.info("数据库中已是最新数据，直接返回现有数据")
-                return day_stock_data, data_to_save
+                # self.logger.info("数据库中已是最新数据")
+                return None, None
 
-        
-        df_new_stock_data = self.process_daily_stock_data(code, start_date, end_date)
-        # 判断获取到的数据是否存在空值
-        # if df_new_stock_data.isnull().values.any():
-        #     self.logger.info(f"股票 {code} 的数据存在空值")
-        #     return day_stock_data, data_to_save
-        # if df_new_stock_data.empty:
-        #     self.logger.info("process_daily_stock_data执行结果为空！")
-        #     return day_stock_data, data_to_save
-        
-        # self.logger.info("获取到的新数据：")
-        # self.logger.info(df_new_stock_data)
+        return start_date, end_date
 
-        df_new_stock_data = df_new_stock_data.dropna()
+    # 增量维护，收盘后调用
+    def update_daily_stock_data(self, code):
+        '''
+            只读取本地数据的最后日期（水位线），获取并返回缺失区间的日线数据，不加载完整历史数据
+            return: DataFrame, 需要追加的新数据，已是最新时为空
+        '''
+        df_new_stock_data = pd.DataFrame()
+        if not BaostockDataManager().check_stock_db_exists(code):
+            self.logger.info(f"{code}.db 不存在")
+            return df_new_stock_data
 
-        if not df_new_stock_data.empty:
-            # 处理空 DataFrame 的情况
-            if day_stock_data.empty:
-                combined_df = df_new_stock_data.copy()
-                self.logger.info("原数据为空，直接使用新获取的数据")
-            else:
-                # BaostockDataManager().data_type_conversion(df_new_stock_data)
-                # 合并计算指标
-                combined_df = pd.concat([day_stock_data, df_new_stock_data], axis=0, ignore_index=True)
+        last_date = BaostockDataManager().get_stock_data_watermark(code, TimePeriod.DAY)
+        if last_date is None:
+            self.logger.info(f"{code} 日线数据为空")
+            return df_new_stock_data
 
-            # 指标数据不再入库
-            data_to_save = combined_df.tail(len(df_new_stock_data))
+        start_date, end_date = self.get_incremental_date_range(last_date)
+        if start_date is None:
+            return df_new_stock_data
+        # self.logger.info(f"获取股票 {code} 数据，时间范围：{start_date} 至 {end_date}")
 
-            return combined_df, data_to_save
-        
-        return day_stock_data, data_to_save
+        df_new_stock_data = self.process_daily_stock_data(code, start_date, end_date)
+        return df_new_stock_data.dropna()
 
 
     # 空值修复，暂无用
@@ -456,7 +404,7 @@ class BaoStockProcessor(QObject):
         # time.sleep(sleep_time)
 
         with self.lock:
-            rs = bs.query_history_k_data_plus(code,
+            rs = self.data_source.query_history_k_data_plus(code,
                 "date,code,open,high,low,close,volume,amount,pctChg,turn,adjustflag",
                 start_date=start_date, end_date=end_date,
                 frequency="w", adjustflag="2")
@@ -464,11 +412,8 @@ class BaoStockProcessor(QObject):
         # self.logger.info(rs.error_msg)       # success
         # self.logger.info("rs的类型：", type(rs))       # <class 'baostock.data.resultset.ResultData'>
 
-        # 获取具体的信息
-        result_list = []
-        while (rs.error_code == '0') & rs.next():
-            # 分页查询，将每页信息合并在一起
-            result_list.append(rs.get_row_data())
+        # 获取具体的信息（分页查询，请求失败时抛出BaostockQueryError，由调用方记为失败）
+        result_list = read_result_rows(rs)
 
         # self.logger.info("result_list的类型：", type(result_list))     # <class 'list'>
         chinese_columns = ['date', 'code', 'open', 'high', 'low', 'close', 'volume', 'amount', 'change_percent', 'turnover_rate', 'adjustflag']
@@ -493,52 +438,26 @@ class BaoStockProcessor(QObject):
                 BaostockDataManager().save_stock_data_to_db(code, result, 'replace', TimePeriod.WEEK)
         else:
             # self.logger.info(f"周线 {code}.db 存在，即将从本地数据库更新")
-            result, data_to_save = self.update_weekly_stock_data(code)
-            if data_to_save is not None and not data_to_save.empty:
-                BaostockDataManager().save_stock_data_to_db(code, data_to_save, "append", TimePeriod.WEEK)
+            result = self.update_weekly_stock_data(code)
+            if not result.empty:
+                BaostockDataManager().save_stock_data_to_db(code, result, "append", TimePeriod.WEEK)
 
         # sleep_time = random.uniform(0.1, 0.3)
         # time.sleep(sleep_time)
         return result
 
-    # 增量维护，周线数据不好增量维护，追加后原表中还会存在周中数据。建议：每周末（或本周收盘后）调用一次更新本周周线数据
-    # 例如：周二第一次update，表中会存在周二时的周线数据，当周线再update时，周二数据（已过时）依旧会在表中。
-    # 补充：周线接口只能每周最后一个交易日才可以获取，月线每月最后一个交易日才可以获取。
-    def update_weekly_stock_data(self, code):
-        week_stock_data = pd.DataFrame()
-        data_to_save = pd.DataFrame()
-        if not BaostockDataManager().check_stock_db_exists(code):
-            self.logger.info(f"{code}.db 不存在")
-            return week_stock_data, data_to_save
-
-        # 步骤一：得到当前数据库中的股票数据
-        week_stock_data = BaostockDataManager().get_stock_data_from_db_by_period(code, TimePeriod.WEEK)
-
-        # self.logger.info(f"获取到的周线数据长度：{len(week_stock_data)}")
-        week_stock_data = week_stock_data.dropna()
-        # self.logger.info(f"dropna后的周线数据长度：{len(week_stock_data)}")
-        # 手动检查可疑数据
-        # for col in week_stock_data.columns:
-        #     if week_stock_data[col].isnull().any():
-        #         self.logger.info(f"列 {col} 包含空值")
-        #         self.logger.info(f"空值位置: {week_stock_data[col].isnull()}")
-
-        if week_stock_data is None or week_stock_data.empty:
-            self.logger.info(f"{code}.db 中无周线数据")
-            return week_stock_data, data_to_save
-        
+    def get_weekly_incremental_date_range(self, last_date):
+        '''
+            根据本地周线数据的最后日期（水位线）计算需增量获取的日期范围
+            return: (start_date, end_date)，已是最新数据时返回(None, None)
+        '''
         # 最后一行数据日期 + 1，至今有几个周五？一个也没有说明是最新数据，无需更新。
-        # now_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        # if now_date in week_stock_data['date'].values:
-        #     self.logger.info("已是最新数据")
-        #     return week_stock_data, data_to_save
-        last_date = week_stock_data['date'].iloc[-1]
         parsed_date = datetime.datetime.strptime(last_date, "%Y-%m-%d")  # 解析为日期对象
         last_date = parsed_date + datetime.timedelta(days=1)
         num_fridays = self.count_fridays_since(last_date.strftime("%Y-%m-%d"))
         if not num_fridays > 0:
             # self.logger.info("已是最新周线数据")
-            return week_stock_data, data_to_save
+            return None, None
         
         # 判断今天是否周五，数据库最后日期到今天有周五存在，但今天不是周五，则可以获取之前的周数据
         current_date = datetime.datetime.now()
@@ -548,34 +467,37 @@ class BaoStockProcessor(QObject):
             # 交易日17:30后才能更新当天数据
             if not self.can_update_today_data():
                 self.logger.info("交易日18:00后才能更新数据！")
-                return week_stock_data, data_to_save
-        
-        last_date = week_stock_data['date'].iloc[-1]
-        # self.logger.info("最后周线日期:", last_date) 
+                return None, None
 
-        parsed_date = datetime.datetime.strptime(last_date, "%Y-%m-%d")  # 解析为日期对象
-        last_date = parsed_date + datetime.timedelta(days=1)
-        # self.logger.info(last_date.strftime("%Y-%m-%d"))
-
-        # 步骤二：获取数据库中最后日期至今的股票数据
+        # 获取数据库中最后日期至今的股票数据
         start_date = last_date.strftime("%Y-%m-%d")               # Baostock要求的日期格式
         end_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        return start_date, end_date
 
-        df_new_weekly_stock_data = self.process_weekly_stock_data(code, start_date, end_date)
+    # 增量维护，周线数据不好增量维护，追加后原表中还会存在周中数据。建议：每周末（或本周收盘后）调用一次更新本周周线数据
+    # 例如：周二第一次update，表中会存在周二时的周线数据，当周线再update时，周二数据（已过时）依旧会在表中。
+    # 补充：周线接口只能每周最后一个交易日才可以获取，月线每月最后一个交易日才可以获取。
+    def update_weekly_stock_data(self, code):
+        '''
+            只读取本地数据的最后日期（水位线），获取并返回缺失区间的周线数据
+            return: DataFrame, 需要追加的新数据，已是最新时为空
+        '''
+        df_new_weekly_stock_data = pd.DataFrame()
+        if not BaostockDataManager().check_stock_db_exists(code):
+            self.logger.info(f"{code}.db 不存在")
+            return df_new_weekly_stock_data
 
-        df_new_weekly_stock_data = df_new_weekly_stock_data.dropna()
+        last_date = BaostockDataManager().get_stock_data_watermark(code, TimePeriod.WEEK)
+        if last_date is None:
+            self.logger.info(f"{code}.db 中无周线数据")
+            return df_new_weekly_stock_data
 
-        if df_new_weekly_stock_data is not None and not df_new_weekly_stock_data.empty:
-            if not week_stock_data.empty:
-                # 合并计算指标
-                combined_df = pd.concat([week_stock_data, df_new_weekly_stock_data], axis=0, ignore_index=True)
-            else:
-                combined_df = df_new_weekly_stock_data.copy()
-                self.logger.info("原数据为空，直接使用新获取的数据")
+        start_date, end_date = self.get_weekly_incremental_date_range(last_date)
+        if start_date is None:
+            return df_new_weekly_stock_data
 
-            data_to_save = combined_df.tail(len(df_new_weekly_stock_data))
-        
-        return week_stock_data, data_to_save
+        df_new_weekly_stock_data = self.process_weekly_stock_data(code, start_date, end_date)
+        return df_new_weekly_stock_data.dropna()
     
     # 分钟级数据获取接口
     def process_and_save_minute_level_stock_data(self, code, level='30'):
@@ -596,9 +518,9 @@ class BaoStockProcessor(QObject):
                 BaostockDataManager().save_stock_data_to_db(code, result, 'replace', time_period)
         else:
             # self.logger.info(f"分钟级 {code}.db 存在，即将从本地数据库更新")
-            result, data_to_save = self.update_minute_level_stock_data(code, level)
-            if data_to_save is not None and not data_to_save.empty:
-                BaostockDataManager().save_stock_data_to_db(code, data_to_save, "append", time_period)
+            result = self.update_minute_level_stock_data(code, level)
+            if not result.empty:
+                BaostockDataManager().save_stock_data_to_db(code, result, "append", time_period)
 
         return result
 
@@ -627,16 +549,13 @@ class BaoStockProcessor(QObject):
         # time.sleep(sleep_time)
 
         with self.lock:
-            rs = bs.query_history_k_data_plus(code,
+            rs = self.data_source.query_history_k_data_plus(code,
                 "date,time,code,open,high,low,close,volume,amount,adjustflag",
                 start_date=start_date, end_date=end_date,
                 frequency=level, adjustflag="2")
 
 
-        result_list = []
-        while (rs.error_code == '0') & rs.next():
-
-            result_list.append(rs.get_row_data())
+        result_list = read_result_rows(rs)
 
         if result_list is None or result_list == []:
             return result
@@ -662,97 +581,113 @@ class BaoStockProcessor(QObject):
         return result
     
     def update_minute_level_stock_data(self, code, level='30'):
-        result = pd.DataFrame()
-        data_to_save = pd.DataFrame()
+        '''
+            只读取本地数据的最后日期（水位线），获取并返回缺失区间的分钟级数据
+            分钟级数据只能按天获取，因此水位线只需精确到日期
+            return: DataFrame, 需要追加的新数据，已是最新时为空
+        '''
+        df_new_stock_data = pd.DataFrame()
         if not BaostockDataManager().check_stock_db_exists(code):
-            self.logger.info("{stock_code}.db 不存在", code)
-            return result, data_to_save
+            self.logger.info(f"{code}.db 不存在")
+            return df_new_stock_data
         
         allowed_levels = ['1', '3', '5', '10', '15', '30', '45', '60', '90', '120']
         if level not in allowed_levels:
-            return result, data_to_save
+            return df_new_stock_data
         
         time_period = TimePeriod.from_minute_number_label(level)
 
-        # 步骤一：得到当前数据库中的股票数据
-        minute_stock_data = BaostockDataManager().get_stock_data_from_db_by_period(code, time_period)
-        if minute_stock_data is None or minute_stock_data.empty:
-            self.logger.info("minute_stock_data为空")
-            return result, data_to_save
+        last_date = BaostockDataManager().get_stock_data_watermark(code, time_period)
+        if last_date is None:
+            self.logger.info(f"{code} {level}分钟级别数据为空")
+            return df_new_stock_data
 
-        # 判断是否存在空值
-        if minute_stock_data.isnull().values.any():
-            self.logger.info("存在空值")
-            # minute_stock_data = minute_stock_data.dropna()
-        
+        start_date, end_date = self.get_incremental_date_range(last_date)
+        if start_date is None:
+            return df_new_stock_data
+        # self.logger.info(f"获取股票 {code} 数据，时间范围：{start_date} 至 {end_date}")
 
-        # 因为分钟级也只能按天获取，因此不用小时、分级的判断
-        now_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        if now_date in minute_stock_data['date'].values:
-            # self.logger.info("已是最新日线数据")
-            return minute_stock_data, data_to_save
-        
-        last_date = None
-        if minute_stock_data.empty or minute_stock_data is None:
-            # self.logger.info("数据库表为空，默认获取近1年股票数据")
-            if level == '1':
-                last_date = (datetime.datetime.now() - datetime.timedelta(days=3*30)).strftime("%Y-%m-%d")
-            else:
-                # last_date = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime("%Y-%m-%d")
-                current_year = datetime.datetime.now().year
-                last_date = f"{current_year}-01-01"
+        df_new_stock_data = self.process_minute_level_stock_data(code, level, start_date, end_date)
+        return df_new_stock_data.dropna()
+
+    # ------------------------------------------并行下载任务规划--------------------------------------------
+    def get_default_date_range(self, period):
+        '''
+            全量获取时的默认日期范围
+            日线、周线：近3年；1分钟：近3个月；其他分钟级别：今年1月1日至今
+        '''
+        now = datetime.datetime.now()
+        end_date = now.strftime("%Y-%m-%d")
+        if period == TimePeriod.MINUTE_1:
+            start_date = (now - datetime.timedelta(days=3*30)).strftime("%Y-%m-%d")
+        elif TimePeriod.is_minute_level(period):
+            start_date = f"{now.year}-01-01"
         else:
-            last_date = minute_stock_data['date'].iloc[-1]
-        # self.logger.info("最后日期（方法2）:", last_date) 
+            start_date = (now - datetime.timedelta(days=365*3)).strftime("%Y-%m-%d")
+        return start_date, end_date
 
-        parsed_date = datetime.datetime.strptime(last_date, "%Y-%m-%d")  # 解析为日期对象
-        last_date = parsed_date + datetime.timedelta(days=1)
+    def plan_fetch_job(self, code, period):
+        '''
+            根据本地数据库状态与水位线生成单只股票单个周期的下载任务，供并行下载引擎使用
+            return: dict(code, period, start_date, end_date, write_way)，已是最新数据时返回None
+        '''
+        manager = BaostockDataManager()
+        if not manager.check_stock_db_exists(code) or not manager.check_table_exists(code, period):
+            start_date, end_date = self.get_default_date_range(period)
+            write_way = 'replace'
+        else:
+            last_date = manager.get_stock_data_watermark(code, period)
+            if last_date is None:
+                start_date, end_date = self.get_default_date_range(period)
+                write_way = 'replace'
+            else:
+                if period == TimePeriod.WEEK:
+                    start_date, end_date = self.get_weekly_incremental_date_range(last_date)
+                else:
+                    start_date, end_date = self.get_incremental_date_range(last_date)
+                if start_date is None:
+                    return None
+                write_way = 'append'
 
-        # 获取数据库中最后日期至今的股票数据
-        start_date = last_date.strftime("%Y-%m-%d")               # Baostock要求的日期格式
-        end_date = (datetime.datetime.now()).strftime("%Y-%m-%d")   
-        # self.logger.info(f"获取股票 {code} 数据，时间范围：{start_date} 至 {end_date}")
-        
-        # 判断数据库最后日期至今有无交易日数据需更新
-        if self.is_trading_day_today():
-            # 交易日18:00后才能更新当天数据
-            if not self.can_update_today_data():
-                # self.logger.info("今天不是交易日，未到数据更新时间，请稍后再试")
-                # return minute_stock_data, data_to_save
+        return {
+            'code': code,
+            'period': period.value,
+            'start_date': start_date,
+            'end_date': end_date,
+            'write_way': write_way,
+        }
 
-                # 判断昨日数据是否已存在，不存在则更新昨日数据
-                yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-                if yesterday in minute_stock_data['date'].values:
-                    # self.logger.info("昨日及之前数据已存在，直接返回现有数据")
-                    return minute_stock_data, data_to_save
+    # ------------------------------------------下载日志（断点续传）--------------------------------------------
+    def get_fetch_target_date(self):
+        '''
+            本轮更新的目标交易日：当前可获取到数据的最近一个交易日
+            交易日18:00前当天数据尚不可获取，目标为上一交易日
+        '''
+        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+        if not hasattr(self, 'df_trade_dates') or self.df_trade_dates is None or self.df_trade_dates.empty:
+            return today_str
+
+        df_trading = self.df_trade_dates[self.df_trade_dates['is_trading_day'] == '1']
+        if self.is_trading_day_today() and not self.can_update_today_data():
+            df_trading = df_trading[df_trading['calendar_date'] < today_str]
         else:
-            # self.logger.info("今天不是交易日，判断数据库中是否是最新数据")
-            trading_day_count = self.count_trading_days(start_date, end_date)
-            # self.logger.info(f"交易日数量：{trading_day_count}")
-            if trading_day_count == 0:
-                # self.logger.info("数据库中已是最新数据，直接返回现有数据")
-                return minute_stock_data, data_to_save
+            df_trading = df_trading[df_trading['calendar_date'] <= today_str]
 
-        
-        df_new_stock_data = self.process_minute_level_stock_data(code, level, start_date, end_date)
+        if df_trading.empty:
+            return today_str
+        return df_trading['calendar_date'].max()
 
-        df_new_stock_data = df_new_stock_data.dropna()
-        
-        if df_new_stock_data is not None and not df_new_stock_data.empty:
-            # 处理空 DataFrame 的情况
-            if minute_stock_data.empty:
-                combined_df = df_new_stock_data.copy()
-                self.logger.info("原数据为空，直接使用新获取的数据")
+    def record_fetch_journal(self, code, time_period, target_date, result=None, error=None):
+        '''记录单只股票单个周期的处理结果，水位线优先取本次写入数据的最后日期，避免再次打开单股数据库'''
+        if error is not None:
+            record = (code, target_date, StockInfoDBBase.FETCH_JOURNAL_FAILED, None, str(error))
+        else:
+            if result is not None and not result.empty and 'date' in result.columns:
+                watermark = str(result['date'].max())[:10]
             else:
-                BaostockDataManager().data_type_conversion(df_new_stock_data)
-                # 合并计算指标
-                combined_df = pd.concat([minute_stock_data, df_new_stock_data], axis=0, ignore_index=True)
-
-            data_to_save = combined_df.tail(len(df_new_stock_data))
-
-            return combined_df, data_to_save
-
-        return minute_stock_data, data_to_save
+                watermark = BaostockDataManager().get_stock_data_watermark(code, time_period)
+            record = (code, target_date, StockInfoDBBase.FETCH_JOURNAL_DONE, watermark, None)
+        BaostockDataManager().record_fetch_journal(time_period, [record])
 
     # ------------------------------------------数据更新接口--------------------------------------------
     def get_chinese_board_name(self, board_name):
@@ -776,11 +711,17 @@ class BaoStockProcessor(QObject):
             return
 
         i = 1
+        skipped_count = 0
+        time_period = TimePeriod
         board_name_chinese = self.get_chinese_board_name(board_name)
         time_period_name_chinese = TimePeriod.get_chinese_label(TimePeriod)
         self.logger.info(f"开始处理 {board_name_chinese} {time_period_name_chinese} 股票数据...")
         start_time = time.time()  # 记录开始时间
 
+        # 读取下载日志，本轮已完成的股票直接跳过，不再打开单股数据库
+        target_date = self.get_fetch_target_date()
+        done_codes = BaostockDataManager().get_fetch_journal_done_codes(time_period, target_date)
+
         dict_stock_info = BaostockDataManager().get_stock_info_dict()
         for index, row in dict_stock_info[board_name].iterrows():
             if task:
@@ -795,15 +736,25 @@ class BaoStockProcessor(QObject):
             stock_name = row['证券名称'] if '证券名称' in row else '未知'
             # self.logger.info(f"获取第 {i} 只{board_name_chinese}股票 {value} 【{time_period_name_chinese}】数据")
 
+            if value in done_codes:
+                skipped_count += 1
+                continue
+
             result = None
-            if TimePeriod == TimePeriod.DAY:
-                result = self.process_and_save_daily_stock_data(value)
-            elif TimePeriod == TimePeriod.WEEK:
-                result = self.process_and_save_weekly_stock_data(value)
+            try:
+                if time_period == TimePeriod.DAY:
+                    result = self.process_and_save_daily_stock_data(value)
+                elif time_period == TimePeriod.WEEK:
+                    result = self.process_and_save_weekly_stock_data(value)
+                self.record_fetch_journal(value, time_period, target_date, result)
+            except Exception as e:
+                self.logger.info(f"处理 {value} 【{time_period_name_chinese}】数据出错: {e}")
+                self.record_fetch_journal(value, time_period, target_date, error=e)
 
-            if result is None or result.empty:
-                # self.logger.info(f"股票 {value} 数据获取失败")
-                continue
+            if task and hasattr(task, 'on_stock_processed'):
+                task.on_stock_processed()
+
+            # result仅包含本次写入的数据，已是最新的股票同样计入处理数量
 
             # if i > 3:
             #     self.logger.info(f"已获取到所有{board_name_chinese}股票{time_period_name_chinese}数据, i: {i}")
@@ -818,7 +769,7 @@ class BaoStockProcessor(QObject):
             del result
 
         process_elapsed_time = time.time() - start_time  # 计算耗时
-        self.logger.info(f"{board_name_chinese} {time_period_name_chinese}股票数据处理完成，共处理{i}只股票，耗时: {process_elapsed_time:.2f}秒，即{process_elapsed_time/60:.2f}分钟")
+        self.logger.info(f"{board_name_chinese} {time_period_name_chinese}股票数据处理完成，共处理{i}只股票，跳过本轮已完成的{skipped_count}只，耗时: {process_elapsed_time:.2f}秒，即{process_elapsed_time/60:.2f}分钟")
 
         # 批处理完成后强制垃圾回收
         gc.collect()
@@ -826,8 +777,13 @@ class BaoStockProcessor(QObject):
     
     def auto_process_all_stock_data(self):
         # 一键自动 获取/更新 沪、深主板 日线、周线、15、30、60分钟k线数据
-        from thread.baostock_data_fetch_task import BaostockDataFetchTask
-        baostock_data_fetch_task = BaostockDataFetchTask()
+        from thread.baostock_data_fetch_task import BaostockDataFetchTask, BaostockParallelFetchTask
+        from processor.baostock_download_engine import BaostockDownloadEngine
+        if ConfigManager().getint('Download', 'workers', BaostockDownloadEngine.DEFAULT_WORKERS) > 1:
+            # 配置了多个下载进程时使用并行下载引擎
+            baostock_data_fetch_task = BaostockParallelFetchTask()
+        else:
+            baostock_data_fetch_task = BaostockDataFetchTask()
         baostock_data_fetch_task.task_completed.connect(self.slot_baostock_data_fetch_task_completed)
         task_id = get_default_task_pool().submit(baostock_data_fetch_task)
 
@@ -970,10 +926,16 @@ class BaoStockProcessor(QObject):
             return
         
         i = 1
+        skipped_count = 0
+        time_period = TimePeriod.from_minute_number_label(level)
 
         self.logger.info(f"开始处理{board_type}股票{level}分钟级别数据...")
         start_time = time.time()  # 记录开始时间
 
+        # 读取下载日志，本轮已完成的股票直接跳过，不再打开单股数据库
+        target_date = self.get_fetch_target_date()
+        done_codes = BaostockDataManager().get_fetch_journal_done_codes(time_period, target_date)
+
         dict_stock_info = BaostockDataManager().get_stock_info_dict()
         for index, row in dict_stock_info[board_type].iterrows():
             if task:
@@ -987,15 +949,26 @@ class BaoStockProcessor(QObject):
             value = row['证券代码']
             stock_name = row['证券名称'] if '证券名称' in row else '未知'
             # self.logger.info(f"获取第 {i} 只{board_type}股票 {value} {level}分钟级别数据")
-            
-            result = self.process_and_save_minute_level_stock_data(value, level)
+
+            if value in done_codes:
+                skipped_count += 1
+                continue
+
+            result = None
+            try:
+                result = self.process_and_save_minute_level_stock_data(value, level)
+                self.record_fetch_journal(value, time_period, target_date, result)
+            except Exception as e:
+                self.logger.info(f"处理 {value} 【{level}分钟级别】数据出错: {e}")
+                self.record_fetch_journal(value, time_period, target_date, error=e)
+
+            if task and hasattr(task, 'on_stock_processed'):
+                task.on_stock_processed()
 
             # 测试
             # result = self.process_minute_level_stock_data(value, level)
 
-            if result is None or result.empty:
-                # self.logger.info(f"股票 {value} 数据获取失败")
-                continue
+            # result仅包含本次写入的数据，已是最新的股票同样计入处理数量
             
             # 测试
             # if i > 3:
@@ -1010,7 +983,7 @@ class BaoStockProcessor(QObject):
             del result  # 及时删除避免内存泄漏
 
         process_elapsed_time = time.time() - start_time  # 计算耗时
-        self.logger.info(f"获取{board_type}股票{level}分钟级别数据完成，共处理{i}只股票，耗时: {process_elapsed_time:.2f}秒，即{process_elapsed_time/60:.2f}分钟")
+        self.logger.info(f"获取{board_type}股票{level}分钟级别数据完成，共处理{i}只股票，跳过本轮已完成的{skipped_count}只，耗时: {process_elapsed_time:.2f}秒，即{process_elapsed_time/60:.2f}分钟")
 
         self.logger.info(f"{board_type}股票{level}分钟级别数据获取完成")
 
@@ -1026,15 +999,17 @@ class BaoStockProcessor(QObject):
 
         #### 获取证券信息 ####
         query_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        rs = bs.query_all_stock(query_date)
+        rs = self.data_source.query_all_stock(query_date)
         self.logger.info('query_all_stock respond error_code:'+rs.error_code)
         self.logger.info('query_all_stock respond  error_msg:'+rs.error_msg)
 
         #### 打印结果集 ####
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            # 获取一条记录，将记录合并在一起
-            data_list.append(rs.get_row_data())
+        try:
+            data_list = read_result_rows(rs)
+        except BaostockQueryError as e:
+            # 请求失败时不覆盖本地股票列表
+            self.logger.error(f"获取所有股票数据失败: {e}")
+            return
 
         chinese_columns = ['证券代码', '交易状态', '证券名称']
         result = pd.DataFrame(data_list, columns=chinese_columns)
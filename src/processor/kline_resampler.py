@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from manager.period_manager import TimePeriod
+
+'''
+    k线周期合成：由本地已存储的较细周期数据生成较粗周期，无需单独下载
+    1. 分钟级：按A股交易时段（09:30-11:30、13:00-15:00）分段，每段从开始时间起每N分钟一根，不跨越时段边界，
+       与IndicatorsViewWidget.get_time_intervals_for_period一致（如45分钟：09:30-10:15、10:15-11:00、11:00-11:30）；
+       time为区间结束时间（与Baostock分钟数据一致），源周期需整除目标周期
+    2. 日线以上：周（周一至周日）、月、季、年由日线合成，date为区间内最后一个交易日
+    3. 实现：先向量计算每根源k线所属的区间编号（日期、时段序号），按股票、时间排序后同一区间连续，
+       open、close取区间首尾，high、low、volume、amount、turnover_rate以reduceat分组归约；
+       change_percent按上一区间收盘价重新计算，第一个区间的前收盘价由第一根源k线的涨跌幅反推
+    4. 源周期优先取能整除目标周期的最粗周期（结果相同，数据量最少）
+    5. 自动更新只下载15、30、60分钟k线；5分钟k线只能在分钟级别数据对话框中手动下载，
+       include_optional=True时才作为源周期（10分钟只能由5分钟合成），调用方需确认本地存储了源周期的表
+
+    用法：
+        source_period = get_resample_sources(TimePeriod.MINUTE_120)[0]    # TimePeriod.MINUTE_60
+        df_120m = resample_kline(df_60m, TimePeriod.MINUTE_120)
+'''
+
+MORNING_START, MORNING_END = 9 * 60 + 30, 11 * 60 + 30      # 交易时段（当天的分钟数）
+AFTERNOON_START, AFTERNOON_END = 13 * 60, 15 * 60
+SESSION_MINUTES = MORNING_END - MORNING_START
+
+STORED_MINUTE_PERIODS = [TimePeriod.MINUTE_15, TimePeriod.MINUTE_30, TimePeriod.MINUTE_60]     # 自动更新下载的分钟周期
+OPTIONAL_MINUTE_PERIODS = [TimePeriod.MINUTE_5]     # 只能手动下载，本地存储了该周期的表时才作为源周期
+CALENDAR_PERIODS = [TimePeriod.WEEK, TimePeriod.MONTH, TimePeriod.QUARTER, TimePeriod.YEAR]
+
+SUM_COLUMNS = ('volume', 'amount', 'turnover_rate')
+
+def get_period_minutes(period):
+    return int(period.value[:-1])
+
+def get_resample_sources(period, include_optional=False):
+    '''可合成period的源周期，优先级从高到低；不能合成时为空列表。include_optional为True时包含手动下载的周期'''
+    if period in CALENDAR_PERIODS:
+        return [TimePeriod.DAY]
+    if TimePeriod.is_minute_level(period):
+        minutes = get_period_minutes(period)
+        minute_periods = STORED_MINUTE_PERIODS + OPTIONAL_MINUTE_PERIODS if include_optional else STORED_MINUTE_PERIODS
+        return [source for source in sorted(minute_periods, key=get_period_minutes, reverse=True)
+                if get_period_minutes(source) < minutes and minutes % get_period_minutes(source) == 0]
+    return []
+
+def get_resample_targets(source_period):
+    '''可由source_period合成的周期（含手动下载的源周期）'''
+    return [period for period in TimePeriod if source_period in get_resample_sources(period, include_optional=True)]
+
+def get_bucket_start_date(period, date):
+    '''date所在区间的第一天，按起始日期读取源数据时需从区间开始读取，避免第一根k线不完整'''
+    date = pd.Timestamp(date)
+    if period == TimePeriod.WEEK:
+        date = date - pd.Timedelta(days=date.weekday())
+    elif period == TimePeriod.MONTH:
+        date = date.replace(day=1)
+    elif period == TimePeriod.QUARTER:
+        date = date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+    elif period == TimePeriod.YEAR:
+        date = date.replace(month=1, day=1)
+    return date.strftime('%Y-%m-%d')
+
+def to_datetime64(values):
+    '''日期、时间列转为datetime64，兼容'YYYY-MM-DD HH:MM:SS'、Baostock紧凑格式（YYYYMMDDHHMMSSsss）及datetime'''
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype='datetime64[ns]')
+    text = series.astype(str)
+    if text.str.fullmatch(r'\d{14,17}').all():
+        return pd.to_datetime(text.str.slice(0, 14), format='%Y%m%d%H%M%S').to_numpy(dtype='datetime64[ns]')
+    return pd.to_datetime(text).to_numpy(dtype='datetime64[ns]')
+
+def _format_like(times, values):
+    '''区间结束时间按源数据time列的格式输出'''
+    sample = pd.Series(values).iloc[0] if len(values) else None
+    series = pd.Series(times)
+    if isinstance(sample, str):
+        if sample.isdigit():
+            return (series.dt.strftime('%Y%m%d%H%M%S') + '000').to_numpy()
+        return series.dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    return series.to_numpy()
+
+def get_minute_buckets(times, minutes):
+    '''
+    分钟k线所属区间
+    返回:
+        (bucket_ids, end_times): 区间编号（天数 * 100 + 当天的区间序号）、区间结束时间
+    '''
+    times = to_datetime64(times)
+    days = times.astype('datetime64[D]')
+    minute_of_day = ((times - days) // np.timedelta64(1, 'm')).astype(np.int64)
+
+    morning_count = -(-SESSION_MINUTES // minutes)
+    is_morning = minute_of_day <= MORNING_END
+    session_start = np.where(is_morning, MORNING_START, AFTERNOON_START)
+    session_end = np.where(is_morning, MORNING_END, AFTERNOON_END)
+    # k线时间为结束时间，落在(开始, 开始 + N]的k线属于第一个区间
+    slot = (np.maximum(minute_of_day - session_start, 1) - 1) // minutes
+    end_minutes = np.minimum(session_start + (slot + 1) * minutes, session_end)
+
+    bucket_ids = days.astype(np.int64) * 100 + np.where(is_morning, slot, morning_count + slot)
+    end_times = days + end_minutes.astype('timedelta64[m]')
+    return bucket_ids, end_times
+
+def get_calendar_buckets(dates, period):
+    '''日线所属的周、月、季、年区间编号'''
+    days = to_datetime64(dates).astype('datetime64[D]')
+    if period == TimePeriod.WEEK:
+        day_numbers = days.astype(np.int64)
+        return day_numbers - (day_numbers + 3) % 7     # 1970-01-01为周四，减去星期几得到周一
+    months = days.astype('datetime64[M]').astype(np.int64)
+    if period == TimePeriod.MONTH:
+        return months
+    if period == TimePeriod.QUARTER:
+        return months // 3
+    return days.astype('datetime64[Y]').astype(np.int64)
+
+def resample_kline(df_data, period, start_date=None):
+    """
+    由较细周期的k线合成period周期的k线
+
+    参数:
+        df_data: 源k线（可含多只股票），日线以上需date列，分钟级需time列
+        period: 目标周期
+        start_date: 只返回该日期之后结束的k线
+    返回:
+        DataFrame: 列与源数据一致，按code、时间排序
+    """
+    if df_data is None or df_data.empty:
+        return pd.DataFrame()
+    is_minute = TimePeriod.is_minute_level(period)
+
+    sort_columns = (['code'] if 'code' in df_data.columns else []) + (['date', 'time'] if 'time' in df_data.columns else ['date'])
+    df_data = df_data.sort_values(sort_columns, kind='stable').reset_index(drop=True)
+    if is_minute:
+        bucket_ids, end_times = get_minute_buckets(df_data['time'], get_period_minutes(period))
+    else:
+        bucket_ids = get_calendar_buckets(df_data['date'], period)
+
+    rows = len(df_data)
+    is_start = np.ones(rows, dtype=bool)
+    is_start[1:] = bucket_ids[1:] != bucket_ids[:-1]
+    if 'code' in df_data.columns:
+        code_index, _ = pd.factorize(df_data['code'])
+        is_start[1:] |= code_index[1:] != code_index[:-1]
+    starts = np.flatnonzero(is_start)
+    ends = np.append(starts[1:], rows) - 1
+
+    # 其他列（code、date、adjustflag等）取区间最后一根k线，open取第一根
+    df_result = df_data.iloc[ends].reset_index(drop=True)
+    if 'open' in df_data.columns:
+        df_result['open'] = df_data['open'].to_numpy()[starts]
+    for column, ufunc in (('high', np.fmax), ('low', np.fmin)):
+        if column in df_data.columns:
+            df_result[column] = ufunc.reduceat(df_data[column].to_numpy(dtype=np.float64, na_value=np.nan), starts)
+    for column in SUM_COLUMNS:
+        if column in df_data.columns:
+            values = df_data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            df_result[column] = np.add.reduceat(np.nan_to_num(values), starts)
+    if 'volume' in df_data.columns:
+        df_result['volume'] = df_result['volume'].astype(df_data['volume'].dtype)
+
+    if 'change_percent' in df_data.columns:
+        close = df_data['close'].to_numpy(dtype=np.float64, na_value=np.nan)
+        change_percent = df_data['change_percent'].to_numpy(dtype=np.float64, na_value=np.nan)
+        prev_close = np.empty(len(starts))
+        prev_close[1:] = close[ends[:-1]]
+        # 每只股票的第一个区间：由第一根源k线的涨跌幅反推前收盘价
+        is_first = np.ones(len(starts), dtype=bool)
+        if 'code' in df_data.columns:
+            is_first[1:] = code_index[starts[1:]] != code_index[starts[:-1]]
+        prev_close[is_first] = close[starts[is_first]] / (1 + change_percent[starts[is_first]] / 100)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df_result['change_percent'] = (close[ends] / prev_close - 1) * 100
+
+    if is_minute:
+        df_result['time'] = _format_like(end_times[ends], df_data['time'])
+    if start_date:
+        df_result = df_result[to_datetime64(df_result['date']) >= np.datetime64(pd.Timestamp(start_date))].reset_index(drop=True)
+    return df_result
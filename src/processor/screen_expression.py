@@ -0,0 +1,357 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+
+from manager.indicators_config_manager import IndicatrosEnum
+from indicators.panel_indicators import get_panel_column_inputs, MA_COLUMN_PATTERN, RSI_COLUMN_PATTERN, MACD_COLUMNS, KDJ_COLUMNS, BOLL_COLUMNS
+
+'''
+    选股筛选表达式
+    1. 语法（关键字不区分大小写）：
+        close > ma52 and volume_ratio > 1.5 and turnover_rate between 3 and 10
+        ma52 < close < ma24                     # 连续比较
+        close > ma24[1] or not (diff < 0)       # 列名[n]：倒数第n + 1根k线（[1]为上一根）
+        abs(close / ma52 - 1) < 0.05            # 函数：abs、min、max
+       运算符：+ - * /，比较：> >= < <= == !=（= 等同 ==），逻辑：and（&&）、or（||）、not
+       列名为k线数据列（close、volume、turnover_rate等）或可计算的指标列（maN、rsiN、diff、dea、macd、k、d、j、boll、volume_ratio等）
+    2. 表达式只解析一次，编译为执行计划（常量折叠后的语法树 + 用到的列、最大偏移），按文本缓存；
+       执行时每个节点对全部股票做一次NumPy向量运算，列值由ScreenContext按(列, 偏移)缓存，重复引用不重复读取
+    3. 缺少的指标列由选股引擎在执行前按面板方式计算
+
+    用法：
+        expression = compile_expression('close > ma52 and volume_ratio > 1.5')
+        expression.columns      # ('close', 'ma52', 'volume_ratio')
+        mask = expression.evaluate(ctx)
+'''
+
+KEYWORDS = ('and', 'or', 'not', 'between')
+COMPARE_OPERATORS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal, '==': np.equal, '!=': np.not_equal}
+ARITH_OPERATORS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+FUNCTIONS = {       # 函数名: (最少参数数, 最多参数数（None不限）, 向量函数)
+    'abs': (1, 1, lambda values: np.abs(values[0])),
+    'min': (2, None, lambda values: reduce(np.minimum, values)),
+    'max': (2, None, lambda values: reduce(np.maximum, values)),
+}
+OPERATOR_ALIASES = {'=': '==', '<>': '!=', '&&': 'and', '||': 'or'}
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(?P<number>\d+\.?\d*|\.\d+)|(?P<name>[A-Za-z_][A-Za-z_0-9]*)|(?P<op>>=|<=|==|!=|<>|&&|\|\||[<>=+\-*/()\[\],]))')
+
+class ScreenExpression():
+    def __init__(self, text, tree, kind, columns, max_offset):
+        '''
+        参数:
+            text: 表达式文本
+            tree: 执行计划（语法树），节点为元组，第一个元素为节点类型
+            kind: 'bool'（条件）或'number'（数值，可作为排序得分）
+            columns: 用到的列（按出现顺序去重）
+            max_offset: 列的最大偏移（需要的额外k线数量）
+        '''
+        self.text = text
+        self.tree = tree
+        self.kind = kind
+        self.columns = tuple(columns)
+        self.max_offset = max_offset
+
+    def evaluate(self, ctx):
+        '''对ScreenContext中的全部股票求值，返回每只股票一个值的数组'''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = _evaluate(self.tree, ctx)
+        return np.broadcast_to(values, (len(ctx.codes),))
+
+    def get_min_bars(self, dict_params):
+        '''表达式需要的最少k线数量（指标预热 + 偏移）'''
+        return max([get_column_min_bars(column, dict_params) for column in self.columns] + [1]) + self.max_offset
+
+
+def get_column_min_bars(column, dict_params):
+    '''指标列需要的预热k线数量，EMA类指标取若干倍周期使结果与长序列一致'''
+    ma_match = MA_COLUMN_PATTERN.fullmatch(column)
+    rsi_match = RSI_COLUMN_PATTERN.fullmatch(column)
+    if ma_match:
+        return int(ma_match.group(1))
+    if rsi_match:
+        return int(rsi_match.group(1)) * 4
+    if column in MACD_COLUMNS:
+        diff_period, dea_period, ma_period = dict_params['macd']
+        return (max(diff_period, dea_period) + ma_period) * 3
+    if column in KDJ_COLUMNS:
+        n, m1, m2 = dict_params['kdj']
+        return n + (m1 + m2) * 4
+    if column in BOLL_COLUMNS:
+        return dict_params['boll'][0]
+    if column == IndicatrosEnum.VOLUME_RATIO.value:
+        return 5
+    return 1
+
+# ------------------------------------------------------------解析------------------------------------------------------------
+def _tokenize(text):
+    '''返回[(类型, 值, 位置)]，以('end', None, len(text))结尾'''
+    tokens = []
+    position = 0
+    text_length = len(text.rstrip())
+    while position < text_length:
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            position += len(text[position:]) - len(text[position:].lstrip())     # 指向空白之后的字符
+            raise ValueError(f"筛选表达式错误（第{position + 1}个字符）：无法识别的字符\n{text}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'op', value.lower()
+        elif kind == 'op':
+            value = OPERATOR_ALIASES.get(value, value)
+        tokens.append((kind, value, start))
+        position = match.end()
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+def _node_kind(node):
+    return 'bool' if node[0] in ('compare', 'between', 'and', 'or', 'not') else 'number'
+
+class _Parser():
+    '''递归下降：or > and > not > 比较（含between、连续比较） > 加减 > 乘除 > 负号 > 数值、列、函数、括号'''
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.index = 0
+        self.columns = []
+        self.max_offset = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def next(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, value):
+        kind, token_value, _ = self.peek()
+        if kind == 'op' and token_value == value:
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, value):
+        if not self.accept(value):
+            self.error(f"缺少'{value}'")
+
+    def error(self, message, token=None):
+        position = (token or self.peek())[2]
+        raise ValueError(f"筛选表达式错误（第{position + 1}个字符）：{message}\n{self.text}")
+
+    def check(self, node, kind, token):
+        if _node_kind(node) != kind:
+            self.error("此处需要条件表达式" if kind == 'bool' else "此处需要数值表达式", token)
+        return node
+
+    def parse(self):
+        token = self.peek()
+        if token[0] == 'end':
+            self.error("表达式为空")
+        node = self.parse_or()
+        if self.peek()[0] != 'end':
+            self.error("无法识别的内容")
+        return node
+
+    def parse_logical(self, operator, parse_operand):
+        token = self.peek()
+        nodes = [parse_operand()]
+        while self.accept(operator):
+            operand_token = self.peek()
+            nodes.append(self.check(parse_operand(), 'bool', operand_token))
+        if len(nodes) == 1:
+            return nodes[0]
+        self.check(nodes[0], 'bool', token)
+        return (operator, tuple(nodes))
+
+    def parse_or(self):
+        return self.parse_logical('or', self.parse_and)
+
+    def parse_and(self):
+        return self.parse_logical('and', self.parse_not)
+
+    def parse_not(self):
+        token = self.peek()
+        if self.accept('not'):
+            return ('not', self.check(self.parse_not(), 'bool', token))
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        token = self.peek()
+        left = self.parse_sum()
+        if self.accept('between'):
+            self.check(left, 'number', token)
+            low = self.check(self.parse_sum(), 'number', token)
+            self.expect('and')
+            high = self.check(self.parse_sum(), 'number', token)
+            return ('between', left, low, high)
+
+        list_compare = []
+        while self.peek()[0] == 'op' and self.peek()[1] in COMPARE_OPERATORS:
+            operator_token = self.next()
+            self.check(left, 'number', operator_token)
+            right_token = self.peek()
+            right = self.check(self.parse_sum(), 'number', right_token)
+            list_compare.append(('compare', operator_token[1], left, right))
+            left = right
+        if not list_compare:
+            return left
+        return list_compare[0] if len(list_compare) == 1 else ('and', tuple(list_compare))
+
+    def parse_binary(self, operators, parse_operand):
+        node = parse_operand()
+        while self.peek()[0] == 'op' and self.peek()[1] in operators:
+            operator_token = self.next()
+            self.check(node, 'number', operator_token)
+            right = self.check(parse_operand(), 'number', operator_token)
+            node = _fold(('arith', operator_token[1], node, right))
+        return node
+
+    def parse_sum(self):
+        return self.parse_binary(('+', '-'), self.parse_product)
+
+    def parse_product(self):
+        return self.parse_binary(('*', '/'), self.parse_unary)
+
+    def parse_unary(self):
+        token = self.peek()
+        if self.accept('-'):
+            return _fold(('negative', self.check(self.parse_unary(), 'number', token)))
+        if self.accept('+'):
+            return self.check(self.parse_unary(), 'number', token)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.next()
+        kind, value, _ = token
+        if kind == 'number':
+            return ('number', value)
+        if kind == 'op' and value == '(':
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        if kind != 'name':
+            self.error("此处需要数值、列名或括号", token)
+
+        if self.accept('('):
+            return self.parse_call(token)
+        offset = 0
+        if self.accept('['):
+            offset_token = self.next()
+            if offset_token[0] != 'number' or offset_token[1] != int(offset_token[1]):
+                self.error("偏移需为非负整数", offset_token)
+            offset = int(offset_token[1])
+            self.expect(']')
+        self.add_column(token)
+        self.max_offset = max(self.max_offset, offset)
+        return ('column', value, offset)
+
+    def parse_call(self, token):
+        name = token[1].lower()
+        if name not in FUNCTIONS:
+            self.error(f"未知函数：{token[1]}", token)
+        args = []
+        if not self.accept(')'):
+            while True:
+                arg_token = self.peek()
+                args.append(self.check(self.parse_sum(), 'number', arg_token))
+                if self.accept(')'):
+                    break
+                self.expect(',')
+        min_count, max_count, _ = FUNCTIONS[name]
+        if len(args) < min_count or (max_count is not None and len(args) > max_count):
+            self.error(f"函数{name}的参数数量不正确", token)
+        return ('call', name, tuple(args))
+
+    def add_column(self, token):
+        column = token[1]
+        if column in self.columns:
+            return
+        if column not in DATA_COLUMNS:
+            try:
+                get_panel_column_inputs([column])
+            except ValueError:
+                self.error(f"未知的列：{column}", token)
+        self.columns.append(column)
+
+
+DATA_COLUMNS = ('open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turnover_rate', 'change_percent')
+
+def _fold(node):
+    '''常量折叠：操作数全部为常数的算术节点在编译时求值'''
+    if node[0] == 'arith' and node[2][0] == 'number' and node[3][0] == 'number':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return ('number', float(ARITH_OPERATORS[node[1]](node[2][1], node[3][1])))
+    if node[0] == 'negative' and node[1][0] == 'number':
+        return ('number', -node[1][1])
+    return node
+
+# ------------------------------------------------------------执行------------------------------------------------------------
+def _evaluate(node, ctx):
+    kind = node[0]
+    if kind == 'column':
+        return ctx.get(node[1], node[2])
+    if kind == 'number':
+        return node[1]
+    if kind == 'arith':
+        return ARITH_OPERATORS[node[1]](_evaluate(node[2], ctx), _evaluate(node[3], ctx))
+    if kind == 'negative':
+        return np.negative(_evaluate(node[1], ctx))
+    if kind == 'call':
+        return FUNCTIONS[node[1]][2]([_evaluate(arg, ctx) for arg in node[2]])
+    if kind == 'compare':
+        return COMPARE_OPERATORS[node[1]](_evaluate(node[2], ctx), _evaluate(node[3], ctx))
+    if kind == 'between':
+        values = _evaluate(node[1], ctx)
+        return (values >= _evaluate(node[2], ctx)) & (values <= _evaluate(node[3], ctx))
+    if kind == 'and':
+        return reduce(np.logical_and, [_evaluate(child, ctx) for child in node[1]])
+    if kind == 'or':
+        return reduce(np.logical_or, [_evaluate(child, ctx) for child in node[1]])
+    if kind == 'not':
+        return np.logical_not(_evaluate(node[1], ctx))
+    raise ValueError(f"未知的执行计划节点：{kind}")
+
+# ------------------------------------------------------------编译缓存------------------------------------------------------------
+_expression_cache = OrderedDict()
+_expression_cache_lock = threading.Lock()
+EXPRESSION_CACHE_SIZE = 256
+
+def normalize_expression(text):
+    return ' '.join(str(text).split())
+
+def compile_expression(text):
+    """
+    编译筛选表达式（按规范化后的文本缓存，LRU）
+
+    返回:
+        ScreenExpression
+    异常:
+        ValueError: 语法错误、未知的列或函数，错误信息含出错位置
+    """
+    text = normalize_expression(text)
+    with _expression_cache_lock:
+        expression = _expression_cache.get(text)
+        if expression is not None:
+            _expression_cache.move_to_end(text)
+            return expression
+
+    parser = _Parser(text)
+    tree = parser.parse()
+    expression = ScreenExpression(text, tree, _node_kind(tree), parser.columns, parser.max_offset)
+    with _expression_cache_lock:
+        _expression_cache[text] = expression
+        while len(_expression_cache) > EXPRESSION_CACHE_SIZE:
+            _expression_cache.popitem(last=False)
+    return expression
+
+def evaluate_expression(ctx, text):
+    '''按文本取编译缓存后求值，作为ScreenRule的condition、score（可pickle，工作进程中各自编译一次）'''
+    return compile_expression(text).evaluate(ctx)
@@ -0,0 +1,387 @@
+import os
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from manager.config_manager import ConfigManager
+from manager.logging_manager import get_logger
+from manager.period_manager import TimePeriod
+from manager.indicators_config_manager import IndicatrosEnum
+from db_base.stock_db_base import StockDbBase
+from db_base.stock_column_store import StockColumnStore
+from indicators.stock_data_indicators import get_indicator_params_by_config
+from indicators.panel_indicators import get_market_order, calculate_market_columns
+from processor.screen_expression import compile_expression, evaluate_expression
+
+'''
+    全市场选股引擎
+    1. 一次读取全部股票最近N根k线（列式存储为一次批量读取，SQLite为每只股票一条LIMIT查询），组成长表
+    2. 规则需要的指标列按面板方式一次计算全部股票（只计算用到的列，结果与逐只计算一致）
+    3. 每条规则对全部股票的最后一根k线做向量运算得到布尔掩码，全部规则同时满足的股票入选，按第一条有score的规则排序
+    4. 股票数 × k线数超过单进程预算时按股票分块，多进程（spawn）分别读取、计算，主进程合并排序
+    配置文件：
+        [Screener]
+        bars = 120                  # 每只股票读取的最近k线数量，规则需要更长的预热时取规则的min_bars
+        workers = 0                 # 进程数，0表示CPU核数，1表示不使用多进程
+        process_budget = 1000000    # 单进程处理的k线数量上限
+    策略配置[PolicyFilter]（policy=True时生效）：
+        turn：换手率下限，lb：量比下限，less_than_ma5：收盘价低于MA5，filter_date：截止日期，target_code：只筛选该股票
+        expression：筛选表达式（见screen_expression），如 close > ma52 and turnover_rate between 3 and 10
+        weekly_condition暂不支持
+
+    用法：
+        engine = StockScreenerEngine()
+        df_result = engine.screen(['daily_up_ma52'], boards=['sh_main'])
+        df_result = engine.screen('close > ma52 and volume_ratio > 1.5')     # 非内置规则名的字符串按筛选表达式编译
+        df_result = engine.screen(make_expression_rule('ma52 < close < ma24', score='close / ma52'))
+'''
+
+# ------------------------------------------------------------规则------------------------------------------------------------
+class ScreenRule():
+    def __init__(self, name, label, condition, columns, score=None, ascending=True, min_bars=0):
+        '''
+        参数:
+            name: 规则名
+            label: 显示名称
+            condition: condition(ctx) -> 每只股票一个bool的数组
+            columns: 规则用到的列，缺少的指标列在执行前计算
+            score: score(ctx) -> 每只股票一个float的数组，用于排序，为None时不参与排序
+            ascending: score是否升序排列（越小越靠前）
+            min_bars: 规则需要的最少k线数量（指标预热）
+        多进程执行时规则需可pickle，condition、score使用模块级函数（或其partial），不使用lambda
+        '''
+        self.name = name
+        self.label = label
+        self.condition = condition
+        self.columns = tuple(columns)
+        self.score = score
+        self.ascending = ascending
+        self.min_bars = int(min_bars)
+
+
+class ScreenContext():
+    '''
+    规则的计算上下文：长表按股票、日期排序后，取每只股票最后一根k线（或之前第offset根）的列值，
+    规则对全部股票做向量运算，结果为每只股票一个值
+    '''
+    def __init__(self, df_bars, market_order=None):
+        if market_order is None:
+            market_order = get_market_order(df_bars)
+        self.df_bars = df_bars
+        self.order, _, self.counts, self.starts, self.codes = market_order
+        self.last_rows = self.starts + self.counts - 1
+        self.dict_values = {}
+
+    def get(self, column, offset=0):
+        '''每只股票倒数第offset + 1根k线的column值，k线数量不足时为NaN'''
+        key = (column, offset)
+        if key not in self.dict_values:
+            rows = self.order[np.maximum(self.last_rows - offset, self.starts)]
+            values = self.df_bars[column].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+            self.dict_values[key] = np.where(offset < self.counts, values, np.nan)
+        return self.dict_values[key]
+
+    def get_latest(self):
+        '''每只股票最后一根k线，顺序与get返回的数组一致'''
+        return self.df_bars.iloc[self.order[self.last_rows]].reset_index(drop=True)
+
+
+def _above_rising_ma(ctx, column):
+    '''收盘价在均线上方且均线向上（不低于上一根k线）'''
+    ma = ctx.get(column)
+    return (ctx.get('close') > ma) & (ma >= ctx.get(column, 1))
+
+def _distance_to_ma(ctx, column):
+    '''收盘价偏离均线的比例，越小越贴近均线'''
+    return ctx.get('close') / ctx.get(column) - 1
+
+def _between_ma(ctx, lower, upper):
+    '''收盘价在两条均线之间'''
+    close = ctx.get('close')
+    return (close > ctx.get(lower)) & (close < ctx.get(upper))
+
+def _position_between_ma(ctx, lower, upper):
+    '''收盘价在两条均线之间的位置，0为下方均线，1为上方均线'''
+    lower_values = ctx.get(lower)
+    return (ctx.get('close') - lower_values) / (ctx.get(upper) - lower_values)
+
+def _at_least(ctx, column, threshold):
+    return ctx.get(column) >= threshold
+
+def _close_below(ctx, column):
+    return ctx.get('close') < ctx.get(column)
+
+def _make_up_ma_rule(period):
+    column = f'{IndicatrosEnum.MA.value}{period}'
+    return ScreenRule(f'daily_up_{column}', f'日线{column.upper()}上方', partial(_above_rising_ma, column=column),
+                      ['close', column], score=partial(_distance_to_ma, column=column), min_bars=period + 1)
+
+def _make_down_between_ma_rule(upper_period, lower_period):
+    upper, lower = f'{IndicatrosEnum.MA.value}{upper_period}', f'{IndicatrosEnum.MA.value}{lower_period}'
+    return ScreenRule(f'daily_down_between_{upper}_{lower}', f'日线{upper.upper()}与{lower.upper()}之间',
+                      partial(_between_ma, lower=lower, upper=upper), ['close', upper, lower],
+                      score=partial(_position_between_ma, lower=lower, upper=upper), min_bars=max(upper_period, lower_period))
+
+BUILTIN_RULES = {rule.name: rule for rule in [
+    _make_up_ma_rule(52),
+    _make_up_ma_rule(24),
+    _make_up_ma_rule(10),
+    _make_down_between_ma_rule(24, 52),
+    _make_down_between_ma_rule(5, 52),
+]}
+
+def get_screen_rule(name):
+    rule = BUILTIN_RULES.get(name)
+    if rule is None:
+        raise KeyError(f"未定义的选股规则：{name}")
+    return rule
+
+def make_expression_rule(text, score=None, ascending=True, name=None, dict_params=None):
+    '''
+    由筛选表达式生成规则，表达式编译一次后缓存
+
+    参数:
+        text: 条件表达式
+        score: 数值表达式，作为排序得分
+    '''
+    if dict_params is None:
+        dict_params = get_indicator_params_by_config()
+    expression = compile_expression(text)
+    if expression.kind != 'bool':
+        raise ValueError(f"筛选表达式需为条件：{expression.text}")
+    columns = list(expression.columns)
+    min_bars = expression.get_min_bars(dict_params)
+
+    score_function = None
+    if score:
+        score_expression = compile_expression(score)
+        if score_expression.kind != 'number':
+            raise ValueError(f"排序表达式需为数值：{score_expression.text}")
+        columns += score_expression.columns
+        min_bars = max(min_bars, score_expression.get_min_bars(dict_params))
+        score_function = partial(evaluate_expression, text=score_expression.text)
+    return ScreenRule(name or expression.text, expression.text, partial(evaluate_expression, text=expression.text), columns,
+                      score=score_function, ascending=ascending, min_bars=min_bars)
+
+def get_policy_rules(period=TimePeriod.DAY):
+    '''[PolicyFilter]中的换手率、量比、MA5条件及筛选表达式'''
+    config_manager = ConfigManager()
+    turn = float(config_manager.get('PolicyFilter', 'turn', 0) or 0)
+    lb = float(config_manager.get('PolicyFilter', 'lb', 0) or 0)
+    less_than_ma5 = config_manager.getint('PolicyFilter', 'less_than_ma5', 0)
+
+    rules = []
+    # 分钟级数据没有换手率
+    if turn > 0 and not TimePeriod.is_minute_level(period):
+        column = IndicatrosEnum.TURNOVER_RATE.value
+        rules.append(ScreenRule('policy_turn', f'换手率不低于{turn}', partial(_at_least, column=column, threshold=turn), [column]))
+    if lb > 0:
+        column = IndicatrosEnum.VOLUME_RATIO.value
+        rules.append(ScreenRule('policy_lb', f'量比不低于{lb}', partial(_at_least, column=column, threshold=lb), [column], min_bars=5))
+    if less_than_ma5:
+        column = f'{IndicatrosEnum.MA.value}5'
+        rules.append(ScreenRule('policy_less_than_ma5', '收盘价低于MA5', partial(_close_below, column=column), ['close', column], min_bars=5))
+    expression = config_manager.get('PolicyFilter', 'expression', None)
+    if expression:
+        rules.append(make_expression_rule(expression, name='policy_expression'))
+    return rules
+
+# ------------------------------------------------------------读取、计算------------------------------------------------------------
+def estimate_start_date(period, bars, end_date=None):
+    '''按周期估算最近bars根k线的起始日期（含节假日、停牌的余量），用于列式存储的分区裁剪'''
+    end = pd.Timestamp(end_date) if end_date else pd.Timestamp.today()
+    if TimePeriod.is_minute_level(period):
+        bars_per_day = max(240 // int(period.value[:-1]), 1)
+        days = bars / bars_per_day * 1.5 + 10
+    else:
+        days_per_bar = {TimePeriod.DAY: 1.5, TimePeriod.WEEK: 7.5, TimePeriod.MONTH: 31, TimePeriod.QUARTER: 92, TimePeriod.YEAR: 366}
+        days = bars * days_per_bar.get(period, 1.5) + 30
+    return (end - pd.Timedelta(days=math.ceil(days))).strftime('%Y-%m-%d')
+
+def create_storage(storage_settings):
+    '''storage_settings: ('parquet', 列式存储目录)或('sqlite', 数据库目录)，工作进程据此创建自己的存储实例'''
+    backend, root_dir = storage_settings
+    if backend == 'parquet':
+        return StockColumnStore(root_dir)
+    return StockDbBase(root_dir)
+
+def load_latest_bars(storage, codes, table_name, bars, end_date=None, start_date=None):
+    '''读取codes中每只股票截至end_date的最近bars根k线，返回长表'''
+    if isinstance(storage, StockColumnStore):
+        df_bars = storage.read(table_name, codes=codes, start_date=start_date, end_date=end_date)
+        if df_bars.empty and start_date:
+            # 本地数据较旧时估算的起始日期之后没有数据，改为全量读取
+            df_bars = storage.read(table_name, codes=codes, end_date=end_date)
+        if df_bars.empty:
+            return df_bars
+        df_bars = df_bars.groupby('code', sort=False).tail(bars)
+    else:
+        list_df = [storage.get_latest_data(code, bars, table_name, end_date) for code in codes]
+        list_df = [df_data for df_data in list_df if not df_data.empty]
+        if not list_df:
+            return pd.DataFrame()
+        df_bars = pd.concat(list_df, ignore_index=True)
+    # 只丢弃k线数据缺失的行，其他列（如复权方式）为空时不影响选股
+    price_columns = [column for column in ('open', 'high', 'low', 'close', 'volume') if column in df_bars.columns]
+    return df_bars.dropna(subset=price_columns).reset_index(drop=True)
+
+def screen_frame(df_bars, rules, dict_params=None, chunk_size=2000):
+    '''
+    对长表执行选股规则（全部规则同时满足）
+
+    返回:
+        DataFrame: 入选股票的最后一根k线数据，score列为第一条有score的规则的得分
+    '''
+    if df_bars is None or df_bars.empty:
+        return pd.DataFrame()
+    market_order = get_market_order(df_bars)
+    calculate_market_columns(df_bars, [column for rule in rules for column in rule.columns], dict_params, chunk_size, market_order)
+
+    ctx = ScreenContext(df_bars, market_order)
+    mask = np.ones(len(ctx.codes), dtype=bool)
+    score = np.zeros(len(ctx.codes))
+    score_rule = get_score_rule(rules)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for rule in rules:
+            mask &= np.asarray(rule.condition(ctx), dtype=bool)
+        if score_rule is not None:
+            score = np.asarray(score_rule.score(ctx), dtype=np.float64)
+
+    df_latest = ctx.get_latest()
+    df_latest['score'] = score
+    return df_latest[mask].reset_index(drop=True)
+
+def get_score_rule(rules):
+    return next((rule for rule in rules if rule.score is not None), None)
+
+def screen_codes(storage, codes, table_name, bars, rules, end_date=None, start_date=None, dict_params=None):
+    df_bars = load_latest_bars(storage, codes, table_name, bars, end_date, start_date)
+    return screen_frame(df_bars, rules, dict_params)
+
+def _screen_worker(storage_settings, codes, table_name, bars, rules, end_date, start_date, dict_params):
+    '''工作进程入口：自行创建存储实例读取数据'''
+    return screen_codes(create_storage(storage_settings), codes, table_name, bars, rules, end_date, start_date, dict_params)
+
+def rank_results(list_df, rules, top=None):
+    '''合并各分块的结果，只保留最新k线日期（停牌股票不参与），按score排序并添加rank列'''
+    list_df = [df_data for df_data in list_df if df_data is not None and not df_data.empty]
+    if not list_df:
+        return pd.DataFrame()
+    df_result = pd.concat(list_df, ignore_index=True)
+    latest_column = 'time' if 'time' in df_result.columns else 'date'
+    df_result = df_result[df_result[latest_column] == df_result[latest_column].max()]
+
+    score_rule = get_score_rule(rules)
+    if score_rule is not None:
+        df_result = df_result.sort_values(['score', 'code'], ascending=[score_rule.ascending, True], kind='stable')
+    else:
+        df_result = df_result.sort_values('code', kind='stable')
+    df_result = df_result.reset_index(drop=True)
+    if top:
+        df_result = df_result.head(top)
+    df_result.insert(0, 'rank', np.arange(1, len(df_result) + 1))
+    return df_result
+
+# ------------------------------------------------------------引擎------------------------------------------------------------
+class StockScreenerEngine():
+    """
+    全市场选股引擎
+    """
+    def __init__(self, bars=None, workers=None, process_budget=None):
+        self.logger = get_logger(__name__)
+        config_manager = ConfigManager()
+        self.bars = bars if bars else config_manager.getint('Screener', 'bars', 120)
+        self.workers = workers if workers else config_manager.getint('Screener', 'workers', 0)
+        self.process_budget = process_budget if process_budget else config_manager.getint('Screener', 'process_budget', 1000000)
+        if self.workers <= 0:
+            self.workers = os.cpu_count() or 1
+
+    def resolve_rules(self, rules):
+        if isinstance(rules, (str, ScreenRule)):
+            rules = [rules]
+        # 字符串为内置规则名或筛选表达式
+        return [rule if isinstance(rule, ScreenRule) else get_screen_rule(rule) if rule in BUILTIN_RULES else make_expression_rule(rule)
+                for rule in rules]
+
+    def get_codes(self, manager, boards=None):
+        dict_stocks_info = manager.get_stock_info_dict()
+        codes, dict_names = [], {}
+        for board_name, df_board in dict_stocks_info.items():
+            if boards and board_name not in boards:
+                continue
+            if df_board is None or df_board.empty:
+                continue
+            codes.extend(df_board['证券代码'].tolist())
+            if '证券名称' in df_board.columns:
+                dict_names.update(zip(df_board['证券代码'], df_board['证券名称']))
+        return list(dict.fromkeys(codes)), dict_names
+
+    def split_codes(self, codes, bars):
+        '''总k线数超过单进程预算时按股票分块，块数不少于进程数'''
+        total = len(codes) * bars
+        if self.workers <= 1 or total <= self.process_budget:
+            return [codes]
+        count = min(len(codes), max(self.workers, math.ceil(total / self.process_budget)))
+        return [chunk.tolist() for chunk in np.array_split(np.asarray(codes, dtype=object), count)]
+
+    def screen(self, rules, period=TimePeriod.DAY, boards=None, codes=None, end_date=None, policy=True, top=None):
+        """
+        全市场选股
+
+        参数:
+            rules: 内置规则名、筛选表达式或ScreenRule（及其列表），全部同时满足
+            boards: 板块名称，None为全部板块
+            codes: 指定股票代码，优先于boards
+            end_date: 截止日期（含），None为最新
+            policy: 是否叠加[PolicyFilter]中的条件
+            top: 只返回排名前top的股票
+        返回:
+            DataFrame: 入选股票最后一根k线的数据，含rank、score、name列，按rank排序
+        """
+        from manager.bao_stock_data_manager import BaostockDataManager
+
+        rules = self.resolve_rules(rules)
+        config_manager = ConfigManager()
+        if policy:
+            rules = rules + get_policy_rules(period)
+            end_date = end_date or config_manager.get('PolicyFilter', 'filter_date', None) or None
+            target_code = config_manager.get('PolicyFilter', 'target_code', None)
+            if target_code and not codes:
+                codes = [target_code]
+
+        manager = BaostockDataManager()
+        all_codes, dict_names = self.get_codes(manager, boards)
+        if codes is None:
+            codes = all_codes
+        if not codes:
+            self.logger.info("无股票信息，跳过选股")
+            return pd.DataFrame()
+
+        bars = max([self.bars] + [rule.min_bars for rule in rules])
+        table_name = period.get_table_name()
+        start_date = estimate_start_date(period, bars, end_date)
+        dict_params = get_indicator_params_by_config()
+        if manager.is_column_store_enabled(period):
+            storage, storage_settings = manager.column_store, ('parquet', str(manager.column_store.root_dir))
+        else:
+            storage, storage_settings = manager.stock_db_base, ('sqlite', str(manager.stock_db_base.db_dir))
+
+        chunks = self.split_codes(codes, bars)
+        self.logger.info(f"选股开始，规则: {[rule.name for rule in rules]}，股票数: {len(codes)}，k线数: {bars}，分块数: {len(chunks)}")
+        if len(chunks) == 1:
+            list_df = [screen_codes(storage, codes, table_name, bars, rules, end_date, start_date, dict_params)]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(_screen_worker, storage_settings, chunk, table_name, bars, rules, end_date, start_date, dict_params)
+                           for chunk in chunks]
+                list_df = [future.result() for future in futures]
+
+        df_result = rank_results(list_df, rules, top)
+        if not df_result.empty:
+            df_result.insert(df_result.columns.get_loc('code') + 1, 'name', df_result['code'].map(dict_names))
+        self.logger.info(f"选股完成，入选股票数: {len(df_result)}")
+        return df_result
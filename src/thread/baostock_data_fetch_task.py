@@ -5,6 +5,7 @@ import time
 from PyQt5.QtCore import QObject, pyqtSignal
 
 from manager.period_manager import TimePeriod
+from manager.bao_stock_data_manager import BaostockDataManager
 
 class BaostockDataFetchTask(BaseTask):
     sig_progress_changed = pyqtSignal(int, int)
@@ -22,7 +23,9 @@ class BaostockDataFetchTask(BaseTask):
         
         total_tasks = len(board_types) * len(levels)
         completed_tasks = 0
-        self.sig_progress_changed.emit(0, total_tasks)
+
+        # 以股票为单位统计总工作量，下载日志中本轮已完成的股票计入已完成数量
+        self._init_stock_progress(board_types, levels)
 
         # BaoStockProcessor().process_sh_main_stock_data()
 
@@ -59,7 +62,6 @@ class BaostockDataFetchTask(BaseTask):
                 
                 completed_tasks += 1
                 progress = int((completed_tasks / total_tasks) * 100)
-                self.sig_progress_changed.emit(completed_tasks, total_tasks)
                 self.set_progress(progress)
         
         # 校验更新结果
@@ -70,17 +72,95 @@ class BaostockDataFetchTask(BaseTask):
             "total_tasks": total_tasks
         }
 
+    def _init_stock_progress(self, board_types, levels):
+        processor = BaoStockProcessor()
+        manager = BaostockDataManager()
+        target_date = processor.get_fetch_target_date()
+        dict_stock_info = manager.get_stock_info_dict()
+
+        self._total_stocks = 0
+        self._current_stock_index = 0
+        for board_type in board_types:
+            df_board = dict_stock_info.get(board_type)
+            if df_board is None or df_board.empty:
+                continue
+            board_codes = set(df_board['证券代码'])
+            for level in levels:
+                done_codes = manager.get_fetch_journal_done_codes(TimePeriod.from_minute_number_label(level), target_date)
+                self._total_stocks += len(board_codes)
+                self._current_stock_index += len(board_codes & done_codes)
+
+        self.sig_progress_changed.emit(self._current_stock_index, self._total_stocks)
+
+    def on_stock_processed(self):
+        """处理完一只股票后由BaoStockProcessor回调，更新进度"""
+        self._current_stock_index += 1
+        self.sig_progress_changed.emit(self._current_stock_index, self._total_stocks)
+
     def get_task_status_info(self):
         """获取任务详细状态信息"""
         return {
             "current_board_type": self._current_board_type,
             "current_level": self._current_level,
+            "completed_stocks": self._current_stock_index,
+            "total_stocks": self._total_stocks,
             "is_paused": self.is_paused(),
             "is_cancelled": self.is_cancelled(),
             "status": self.status.value
         }
     
 
+class BaostockParallelFetchTask(BaseTask):
+    """多进程并行获取沪、深主板日线、周线、15、30、60分钟k线数据"""
+    sig_progress_changed = pyqtSignal(int, int)
+    def __init__(self, board_types=None, periods=None, **kwargs):
+        super().__init__(**kwargs)
+        self.board_types = board_types if board_types else ['sh_main', 'sz_main']
+        self.periods = periods if periods else [TimePeriod.DAY, TimePeriod.WEEK, TimePeriod.MINUTE_15, TimePeriod.MINUTE_30, TimePeriod.MINUTE_60]
+        self._completed_jobs = 0
+        self._total_jobs = 0
+
+    def execute(self):
+        """执行任务的主要方法"""
+        from processor.baostock_download_engine import BaostockDownloadEngine
+
+        engine = BaostockDownloadEngine()
+        jobs = engine.build_jobs(self.board_types, self.periods, self)
+        if self.is_cancelled():
+            return {"status": "cancelled", "message": "Task was cancelled"}
+
+        # 下载日志中本轮已完成的任务计入已完成数量，进度显示全部工作量中的剩余部分
+        skipped_count = engine.skipped_count
+        summary = engine.run(jobs, self, lambda completed_jobs, total_jobs: self._on_progress(skipped_count + completed_jobs, skipped_count + total_jobs))
+        if summary['cancelled']:
+            return {"status": "cancelled", "message": "Task was cancelled"}
+
+        return {
+            "status": "completed",
+            "message": f"Successfully processed all data for {self.board_types} with periods {[period.value for period in self.periods]}",
+            "completed_tasks": summary['completed'],
+            "total_tasks": summary['total'],
+            "failed_tasks": len(summary['failed'])
+        }
+
+    def _on_progress(self, completed_jobs, total_jobs):
+        self._completed_jobs = completed_jobs
+        self._total_jobs = total_jobs
+        self.sig_progress_changed.emit(completed_jobs, total_jobs)
+        if total_jobs > 0:
+            self.set_progress(int((completed_jobs / total_jobs) * 100))
+
+    def get_task_status_info(self):
+        """获取任务详细状态信息"""
+        return {
+            "completed_jobs": self._completed_jobs,
+            "total_jobs": self._total_jobs,
+            "is_paused": self.is_paused(),
+            "is_cancelled": self.is_cancelled(),
+            "status": self.status.value
+        }
+
+
 class BaostockDataFetchTask2(BaseTask):
     sig_progress_changed = pyqtSignal(int, int)
     def __init__(self, code=None, start_date=None, end_date=None, period=None, **kwargs):
@@ -0,0 +1,28 @@
+from thread.base_task import BaseTask
+
+from manager.bao_stock_data_manager import BaostockDataManager
+
+'''
+    后台读取一只股票指定周期的k线并计算指标（图表异步加载）
+    结果通过BaseTask.task_completed发送，连接到界面控件的槽函数时由Qt排队到界面线程执行；
+    任务被取消时不发送结果，界面再按request_id丢弃已过期（用户已选择其他股票）的结果
+'''
+
+class StockDataLoadTask(BaseTask):
+    def __init__(self, request_id, code, period, indicators=None, **kwargs):
+        super().__init__(**kwargs)
+        self.request_id = request_id
+        self.code = code
+        self.period = period
+        self.indicators = indicators
+
+    def execute(self):
+        df_data = None
+        if not self.is_cancelled():
+            df_data = BaostockDataManager().get_stock_data_from_db_by_period_with_indicators_auto(self.code, self.period, indicators=self.indicators)
+        return {
+            "request_id": self.request_id,
+            "code": self.code,
+            "period": self.period,
+            "data": df_data
+        }
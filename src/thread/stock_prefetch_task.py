@@ -0,0 +1,82 @@
+from thread.base_task import BaseTask
+from thread.task_pool import get_default_task_pool
+
+from manager.config_manager import ConfigManager
+from manager.logging_manager import get_logger
+from manager.bao_stock_data_manager import BaostockDataManager
+
+'''
+    预取相邻股票、其他周期的k线及指标（后台线程）
+    1. StockPrefetchTask：在TaskPool中依次读取本地数据并计算指标，结果写入指标缓存（IndicatorCacheManager），
+       界面线程随后读取同一股票、周期时直接命中缓存；只读取本地数据，无本地数据时跳过，不从数据源下载
+    2. StockPrefetcher：每次选中股票后提交新的预取任务，并取消尚未完成的上一次预取（用户已离开那只股票）
+
+    配置：
+        [Prefetch]
+        enabled = 1
+        neighbors = 1       # 预取列表中前、后各几只股票
+'''
+
+class StockPrefetchTask(BaseTask):
+    def __init__(self, jobs, indicators=None, **kwargs):
+        '''
+        jobs: [(code, TimePeriod), ...]，按优先级排列
+        indicators: 需要计算的指标名（见indicator_registry），为None时只计算k线主图需要的指标
+        '''
+        super().__init__(**kwargs)
+        self.jobs = list(jobs)
+        self.indicators = indicators
+        self.logger = get_logger(__name__)
+
+    def execute(self):
+        bao_stock_data_manager = BaostockDataManager()
+        loaded_count = 0
+        for code, period in self.jobs:
+            if self.is_cancelled():
+                break
+            try:
+                df_data = bao_stock_data_manager.get_stock_data_from_db_by_period_with_indicators(code, period, indicators=self.indicators)
+                if df_data is not None and not df_data.empty:
+                    loaded_count += 1
+            except Exception as e:
+                self.logger.warning(f"预取{code}的{period.value}数据失败：{e}")
+        return {"loaded": loaded_count, "total": len(self.jobs)}
+
+
+class StockPrefetcher():
+    DEFAULT_NEIGHBORS = 1
+
+    def __init__(self, task_pool=None):
+        self.logger = get_logger(__name__)
+        self.task_pool = task_pool if task_pool is not None else get_default_task_pool()
+        config_manager = ConfigManager()
+        self.enabled = config_manager.getbool('Prefetch', 'enabled', True)
+        self.neighbors = config_manager.getint('Prefetch', 'neighbors', self.DEFAULT_NEIGHBORS)
+        self.current_task_id = None
+
+    def get_jobs(self, code, period, neighbor_codes, other_periods):
+        '''预取顺序：相邻股票的当前周期（继续浏览列表）优先，其次选中股票的其他周期'''
+        jobs = [(neighbor_code, period) for neighbor_code in neighbor_codes if neighbor_code != code]
+        jobs.extend((code, other_period) for other_period in other_periods if other_period != period)
+        return list(dict.fromkeys(jobs))
+
+    def prefetch(self, code, period, neighbor_codes=(), other_periods=(), indicators=None):
+        '''
+        选中code后提交预取任务
+        返回:
+            str: 任务ID，未启用或无需预取时返回None
+        '''
+        self.cancel()
+        if not self.enabled:
+            return None
+        jobs = self.get_jobs(code, period, neighbor_codes, other_periods)
+        if not jobs:
+            return None
+        task = StockPrefetchTask(jobs, indicators)
+        self.current_task_id = self.task_pool.submit(task)
+        return self.current_task_id
+
+    def cancel(self):
+        if self.current_task_id is not None:
+            self.task_pool.cancel_task(self.current_task_id)
+            self.current_task_id = None
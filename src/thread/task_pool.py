@@ -94,10 +94,17 @@ class TaskPool(QObject):
         """任务进度回调"""
         print(f"Task {task_id} progress: {progress}%")
     
+    def _release_task(self, task_id: str) -> Optional[BaseTask]:
+        """任务结束后移出任务表并释放结果（结果已随task_completed信号发送给接收方），避免已结束的任务及其数据一直占用内存"""
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            task.result = None
+        return task
+
     @pyqtSlot(str, object)
     def _on_task_completed(self, task_id: str, result: Any):
         """任务完成回调"""
-        task = self._tasks.get(task_id)
+        task = self._release_task(task_id)
         if task and task in self._running_tasks:  # 添加检查任务是否在运行列表中
             self._running_tasks.remove(task)
             self.task_finished.emit(task_id)
@@ -106,7 +113,7 @@ class TaskPool(QObject):
     @pyqtSlot(str, str)
     def _on_task_error(self, task_id: str, error: str):
         """任务错误回调"""
-        task = self._tasks.get(task_id)
+        task = self._release_task(task_id)
         if task and task in self._running_tasks:  # 添加检查任务是否在运行列表中
             self._running_tasks.remove(task)
             self.task_finished.emit(task_id)
@@ -115,19 +122,19 @@ class TaskPool(QObject):
     @pyqtSlot(str)
     def _on_task_cancelled(self, task_id: str):
         """任务取消回调"""
-        task = self._tasks.get(task_id)
+        task = self._release_task(task_id)
         if task and task in self._running_tasks:  # 添加检查任务是否在运行列表中
             self._running_tasks.remove(task)
             self.task_finished.emit(task_id)
             self._try_start_task()  # 尝试启动新任务
     
     def get_task_status(self, task_id: str) -> Optional[TaskStatus]:
-        """获取任务状态"""
+        """获取任务状态（已结束的任务不再保留，返回None）"""
         task = self._tasks.get(task_id)
         return task.status if task else None
     
     def get_task_result(self, task_id: str) -> Any:
-        """获取任务结果"""
+        """获取任务结果（结果通过task_completed信号获取，已结束的任务不再保留，返回None）"""
         task = self._tasks.get(task_id)
         return task.result if task else None
     
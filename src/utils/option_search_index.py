@@ -0,0 +1,213 @@
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # pypinyin为可选依赖，未安装时按GB2312编码区间取一级汉字的拼音首字母（多音字见PINYIN_INITIAL_OVERRIDES）
+    lazy_pinyin = None
+    Style = None
+
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+'''
+    选项搜索索引（"名称 - 代码"形式的选项，如"浦发银行 - sh.600000"）
+    1. 前缀索引：代码（sh.600000）、纯数字代码（600000）、名称、名称拼音首字母（pfyh）分别按键排序，
+       前缀查询为二分定位的连续区间（等价于前缀树中该前缀的子树）
+    2. 双字倒排索引：选项全文（小写）的相邻两字索引，子串查询取各双字集合的交集后再校验，与原逐项子串匹配结果一致；
+       单字查询直接逐项匹配
+    3. 排序：代码完全匹配 > 代码前缀 > 名称前缀 > 拼音首字母前缀 > 其他子串（按匹配位置），同级按原顺序；返回数量有上限
+    4. 增量：输入在上一次查询后追加字符时，只在上一次的完整匹配集合中过滤，不再查询索引
+
+    用法：
+        search_index = OptionSearchIndex(["浦发银行 - sh.600000", "平安银行 - sz.000001"])
+        search_index.search("pf")       # ["浦发银行 - sh.600000"]
+'''
+
+OPTION_SEPARATOR = " - "
+DEFAULT_MAX_RESULTS = 100
+
+# GB2312一级汉字按拼音排序，各首字母的起始编码（区位码 高字节 * 256 + 低字节）
+GB2312_INITIAL_CODES = [45217, 45253, 45761, 46318, 46826, 47010, 47297, 47614, 48119, 49062, 49324, 49896,
+                        50371, 50614, 50622, 50906, 51387, 51446, 52218, 52698, 52980, 53689, 54481]
+GB2312_INITIALS = "abcdefghjklmnopqrstwxyz"
+GB2312_LEVEL1_END = 55289
+
+# GB2312按多音字的第一个读音排序，未安装pypinyin时按股票名称中的常用读音修正（银行、长江、重庆、西藏、朝阳）
+PINYIN_INITIAL_OVERRIDES = {'行': 'h', '长': 'c', '重': 'c', '藏': 'z', '朝': 'z'}
+# 修正后读音不对的词（中国重工、中国重汽等）
+PINYIN_PHRASE_OVERRIDES = {'重工': 'zg', '重汽': 'zq', '重机': 'zj', '重型': 'zx', '重装': 'zz'}
+
+@lru_cache(maxsize=None)
+def get_char_initial(char):
+    '''单个字符的拼音首字母（字母、数字返回小写自身，无法识别时返回空字符串）'''
+    if char.isascii():
+        return char.lower() if char.isalnum() else ""
+    if char in PINYIN_INITIAL_OVERRIDES:
+        return PINYIN_INITIAL_OVERRIDES[char]
+    try:
+        encoded = char.encode('gb2312')
+    except UnicodeEncodeError:
+        return ""
+    if len(encoded) != 2:
+        return ""
+    code = encoded[0] * 256 + encoded[1]
+    if code < GB2312_INITIAL_CODES[0] or code > GB2312_LEVEL1_END:
+        return ""
+    return GB2312_INITIALS[bisect_right(GB2312_INITIAL_CODES, code) - 1]
+
+def get_fallback_initials(text):
+    '''未安装pypinyin时的拼音首字母：先匹配PINYIN_PHRASE_OVERRIDES中的词，其余逐字取首字母'''
+    list_initials = []
+    i = 0
+    while i < len(text):
+        phrase_initials = PINYIN_PHRASE_OVERRIDES.get(text[i:i + 2])
+        if phrase_initials is not None:
+            list_initials.append(phrase_initials)
+            i += 2
+        else:
+            list_initials.append(get_char_initial(text[i]))
+            i += 1
+    return "".join(list_initials)
+
+def get_pinyin_initials(text):
+    '''名称的拼音首字母，如"浦发银行" -> "pfyh"，"重庆啤酒" -> "cqpj"，"*ST国华" -> "stgh"'''
+    if lazy_pinyin is not None:
+        initials = lazy_pinyin(text, style=Style.FIRST_LETTER, errors=lambda chars: [get_char_initial(char) for char in chars])
+        return "".join(initial.lower() for initial in initials if initial.isascii() and initial.isalnum())
+    return get_fallback_initials(text)
+
+def split_option(option):
+    '''"名称 - 代码" -> (名称, 代码)，无分隔符时代码为空字符串'''
+    name, separator, code = option.rpartition(OPTION_SEPARATOR)
+    if not separator:
+        return option, ""
+    return name, code
+
+
+class PrefixIndex():
+    '''按键排序的(键, 选项编号)，前缀相同的键连续'''
+    def __init__(self, items=()):
+        items = sorted(items)
+        self.keys = [key for key, _ in items]
+        self.ids = [option_id for _, option_id in items]
+
+    def find(self, prefix):
+        '''键以prefix开头的选项编号集合'''
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", start)
+        return set(self.ids[start:end])
+
+
+class OptionSearchIndex():
+    def __init__(self, options=None, max_results=DEFAULT_MAX_RESULTS):
+        self.max_results = max_results
+        self.set_options(options or [])
+
+    def set_options(self, options):
+        self.options = list(options)
+        self.texts = [option.lower() for option in self.options]
+        self.names = []
+        self.codes = []
+        self.code_numbers = []
+        self.initials = []
+        self.dict_bigram_ids = {}   # {相邻两字: 选项编号列表}
+
+        code_items = []
+        name_items = []
+        initials_items = []
+        for option_id, option in enumerate(self.options):
+            name, code = split_option(option)
+            name, code = name.lower(), code.lower()
+            code_number = code.rpartition('.')[2]
+            initials = get_pinyin_initials(name)
+            self.names.append(name)
+            self.codes.append(code)
+            self.code_numbers.append(code_number)
+            self.initials.append(initials)
+
+            code_items.append((code, option_id))
+            if code_number != code:
+                code_items.append((code_number, option_id))
+            name_items.append((name, option_id))
+            initials_items.append((initials, option_id))
+
+            text = self.texts[option_id]
+            for bigram in {text[i:i + 2] for i in range(len(text) - 1)}:
+                ids = self.dict_bigram_ids.get(bigram)
+                if ids is None:
+                    self.dict_bigram_ids[bigram] = [option_id]
+                else:
+                    ids.append(option_id)
+
+        self.code_index = PrefixIndex(code_items)
+        self.name_index = PrefixIndex(name_items)
+        self.initials_index = PrefixIndex(initials_items)
+        self.last_query = None
+        self.last_match_ids = None
+
+    def is_match(self, option_id, query):
+        return query in self.texts[option_id] or self.initials[option_id].startswith(query)
+
+    def find_match_ids(self, query):
+        '''全部匹配的选项编号（升序）'''
+        if self.last_query and query.startswith(self.last_query) and self.last_match_ids is not None:
+            # 在上一次的匹配集合中过滤：子串、拼音首字母前缀匹配随输入变长只会减少
+            return [option_id for option_id in self.last_match_ids if self.is_match(option_id, query)]
+
+        if len(query) == 1:
+            candidate_ids = {option_id for option_id, text in enumerate(self.texts) if query in text}
+        else:
+            list_ids = sorted((self.dict_bigram_ids.get(query[i:i + 2], []) for i in range(len(query) - 1)), key=len)
+            candidate_ids = set(list_ids[0])
+            for ids in list_ids[1:]:
+                if not candidate_ids:
+                    break
+                candidate_ids.intersection_update(ids)
+            candidate_ids = {option_id for option_id in candidate_ids if query in self.texts[option_id]}
+        return sorted(candidate_ids | self.initials_index.find(query))
+
+    def rank_match_ids(self, match_ids, query, limit):
+        '''按匹配类型分级，同级按原顺序（其他子串按匹配位置），取前limit个'''
+        code_ids = self.code_index.find(query)
+        name_ids = self.name_index.find(query)
+        initials_ids = self.initials_index.find(query)
+        list_tiers = [[], [], [], [], []]
+        for option_id in match_ids:
+            if option_id in code_ids:
+                tier = 0 if query == self.codes[option_id] or query == self.code_numbers[option_id] else 1
+            elif option_id in name_ids:
+                tier = 2
+            elif option_id in initials_ids:
+                tier = 3
+            else:
+                tier = 4
+            list_tiers[tier].append(option_id)
+
+        ranked_ids = []
+        for tier, ids in enumerate(list_tiers):
+            if len(ranked_ids) >= limit:
+                break
+            if tier == 4:
+                ids = sorted(ids, key=lambda option_id: self.texts[option_id].find(query))
+            ranked_ids.extend(ids[:limit - len(ranked_ids)])
+        return ranked_ids
+
+    def search(self, text, limit=None):
+        '''
+        按输入查找选项
+        参数:
+            text: 输入文本，为空时返回全部选项（原顺序）
+            limit: 最多返回的数量，None时使用max_results
+        返回:
+            list: 排序后的选项
+        '''
+        query = text.strip().lower() if text else ""
+        if not query:
+            self.last_query = None
+            self.last_match_ids = None
+            return self.options[:]
+
+        match_ids = self.find_match_ids(query)
+        self.last_query = query
+        self.last_match_ids = match_ids
+
+        limit = self.max_results if limit is None else limit
+        return [self.options[option_id] for option_id in self.rank_match_ids(match_ids, query, limit)]
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(PROJECT_ROOT, 'src')
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+
+@pytest.fixture(scope='session')
+def data_work_dir(tmp_path_factory):
+    '''
+        数据库相关测试的工作目录：各管理器按相对路径（./data/...）创建数据库，
+        切换到临时目录后不会读写项目中的数据库
+    '''
+    work_dir = tmp_path_factory.mktemp('work')
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    yield work_dir
+    os.chdir(old_cwd)
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from processor.baostock_data_source import (BaostockDataSource, LocalReplayDataSource, LocalResultData,
+                                            BaostockQueryError, read_result_rows, ERROR_CODE_NETWORK, ERROR_CODE_SUCCESS)
+from processor.baostock_download_worker import query_history_k_data
+
+FIELDS = "date,code,open,high,low,close,volume,amount,pctChg,turn,adjustflag".split(',')
+ROWS = [["2024-01-0%d" % day, "sh.600000", "10", "11", "9", "10.5", "100", "1000", "1.0", "0.1", "2"] for day in range(2, 7)]
+
+
+class FailingDataSource:
+    '''请求失败（error_code不为0）或第fail_page页翻页失败的数据源'''
+    name = 'failing'
+
+    def __init__(self, fail_page=None):
+        self.fail_page = fail_page
+        self.login_count = 0
+
+    def login(self):
+        self.login_count += 1
+
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None, frequency='d', adjustflag='3'):
+        if self.fail_page is None:
+            return LocalResultData(FIELDS, [], error_code=ERROR_CODE_NETWORK, error_msg='网络接收错误（模拟）')
+        return LocalResultData(FIELDS, ROWS, page_size=2, fail_page=self.fail_page)
+
+
+def test_read_result_rows_raises_on_error():
+    with pytest.raises(BaostockQueryError):
+        read_result_rows(LocalResultData(FIELDS, [], error_code=ERROR_CODE_NETWORK))
+    # 翻页中途失败同样视为失败，不返回不完整的数据
+    with pytest.raises(BaostockQueryError):
+        read_result_rows(LocalResultData(FIELDS, ROWS, page_size=2, fail_page=1))
+    assert read_result_rows(LocalResultData(FIELDS, ROWS, page_size=2)) == ROWS
+
+
+def test_incomplete_data_source_cannot_be_created():
+    class IncompleteDataSource(BaostockDataSource):
+        def login(self):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteDataSource()
+    assert isinstance(LocalReplayDataSource(), BaostockDataSource)
+
+
+def test_worker_query_returns_error():
+    job = {'code': 'sh.600000', 'period': '1d', 'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+    _, rows, error_msg = query_history_k_data(FailingDataSource(fail_page=1), job, max_retries=1, backoff_base=0)
+    assert rows == []
+    assert error_msg is not None and error_msg.startswith(ERROR_CODE_NETWORK)
+
+
+@pytest.mark.parametrize('fail_page', [None, 1])
+def test_failed_download_is_journaled_as_failed(data_work_dir, monkeypatch, fail_page):
+    import processor.baostock_processor as baostock_processor
+    from processor.baostock_processor import BaoStockProcessor
+    from manager.bao_stock_data_manager import BaostockDataManager
+    from manager.period_manager import TimePeriod
+    from db_base.stock_info_db_base import StockInfoDBBase
+
+    # 不创建在线数据源（无需安装baostock、不访问网络）
+    monkeypatch.setattr(baostock_processor, 'create_data_source', lambda settings=None, salt=0: FailingDataSource(fail_page))
+    processor = BaoStockProcessor()
+    manager = BaostockDataManager()
+    monkeypatch.setattr(processor, 'data_source', FailingDataSource(fail_page))
+    monkeypatch.setattr(processor, 'df_trade_dates', None, raising=False)
+    monkeypatch.setattr(manager, 'get_stock_info_dict', lambda: {'sh_main': pd.DataFrame({'证券代码': ['sh.600000']})})
+    manager.clear_fetch_journal(TimePeriod.DAY)
+
+    processor.process_stock_data('sh_main', TimePeriod.DAY)
+
+    with sqlite3.connect(manager.stock_info_db_base.db_path) as conn:
+        rows = conn.execute("SELECT code, status, error FROM fetch_journal WHERE period = ?",
+                            (TimePeriod.DAY.get_table_name(),)).fetchall()
+    assert rows == [('sh.600000', StockInfoDBBase.FETCH_JOURNAL_FAILED, rows[0][2])]
+    assert ERROR_CODE_NETWORK in rows[0][2]
+    # 失败的股票不计入本轮已完成，断点续传时会重新下载
+    assert 'sh.600000' not in manager.get_fetch_journal_done_codes(TimePeriod.DAY, processor.get_fetch_target_date())
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators.indicator_kernels import rolling_max, rolling_min, wma, rolling_mean, rolling_std, rolling_mean_std
+
+
+def make_values(rows=300, cols=None, seed=0):
+    '''随机价格序列，混入NaN（停牌）'''
+    rng = np.random.default_rng(seed)
+    shape = (rows,) if cols is None else (rows, cols)
+    values = 10 + np.cumsum(rng.standard_normal(shape) * 0.1, axis=0)
+    values[rng.random(shape) < 0.03] = np.nan
+    return values
+
+
+@pytest.mark.parametrize('window', [1, 3, 9, 20])
+def test_rolling_max_min_match_pandas(window):
+    values = make_values(cols=5)
+    df = pd.DataFrame(values)
+    np.testing.assert_array_equal(rolling_max(values, window), df.rolling(window).max().to_numpy())
+    np.testing.assert_array_equal(rolling_min(values, window), df.rolling(window).min().to_numpy())
+    series = pd.Series(values[:, 0])
+    np.testing.assert_array_equal(rolling_max(series, window), series.rolling(window).max().to_numpy())
+
+
+@pytest.mark.parametrize('window', [1, 5, 10])
+def test_wma_matches_rolling_apply(window):
+    values = make_values()
+    weights = np.arange(1, window + 1)
+    expected = pd.Series(values).rolling(window).apply(lambda x: np.dot(x, weights) / weights.sum(), raw=True)
+    np.testing.assert_allclose(wma(values, window), expected.to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('window, min_periods', [(5, None), (20, None), (20, 1)])
+def test_rolling_mean_std_match_pandas(window, min_periods):
+    values = make_values(cols=4)
+    rolling = pd.DataFrame(values).rolling(window, min_periods=min_periods)
+    expected_mean = rolling.mean().to_numpy()
+    expected_std = rolling.std().to_numpy()
+
+    np.testing.assert_allclose(rolling_mean(values, window, min_periods), expected_mean, atol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(rolling_std(values, window, min_periods), expected_std, atol=1e-6, equal_nan=True)
+    mean, std = rolling_mean_std(values, window, min_periods)
+    np.testing.assert_allclose(mean, expected_mean, atol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(std, expected_std, atol=1e-6, equal_nan=True)
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from manager.period_manager import TimePeriod
+from processor.kline_resampler import (get_resample_sources, get_resample_targets, get_bucket_start_date, resample_kline)
+
+SESSIONS = ((9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60))
+
+
+def get_intervals(minutes):
+    '''逐段列出区间(开始, 结束]，不跨越交易时段'''
+    list_intervals = []
+    for session_start, session_end in SESSIONS:
+        start = session_start
+        while start < session_end:
+            end = min(start + minutes, session_end)
+            list_intervals.append((start, end))
+            start = end
+    return list_intervals
+
+
+def get_interval_end(minute_of_day, minutes):
+    for start, end in get_intervals(minutes):
+        if start < minute_of_day <= end:
+            return end
+    raise AssertionError(f'{minute_of_day}不在交易时段内')
+
+
+def add_price_columns(df, rng):
+    rows = len(df)
+    close = 10 + np.cumsum(rng.standard_normal(rows) * 0.05)
+    df['open'] = close + rng.standard_normal(rows) * 0.02
+    df['high'] = np.maximum(df['open'], close) + rng.random(rows) * 0.05
+    df['low'] = np.minimum(df['open'], close) - rng.random(rows) * 0.05
+    df['close'] = close
+    df['volume'] = rng.integers(100, 10000, rows)
+    df['amount'] = df['volume'] * close
+    df['turnover_rate'] = rng.random(rows)
+    df['change_percent'] = rng.standard_normal(rows)
+    df['adjustflag'] = '3'
+    return df
+
+
+def make_minute_data(source_minutes, codes=('sh.600000', 'sz.000001'), days=6, seed=0):
+    '''源分钟k线（time为结束时间，Baostock紧凑格式），随机缺少部分k线，行顺序打乱'''
+    rng = np.random.default_rng(seed)
+    list_rows = []
+    for code in codes:
+        for day in pd.bdate_range('2024-03-01', periods=days):
+            for start, end in get_intervals(source_minutes):
+                if rng.random() < 0.1:
+                    continue
+                time = day + pd.Timedelta(minutes=end)
+                list_rows.append({'code': code, 'date': day.strftime('%Y-%m-%d'), 'time': time.strftime('%Y%m%d%H%M%S') + '000'})
+    df = add_price_columns(pd.DataFrame(list_rows), rng)
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def make_day_data(codes=('sh.600000', 'sz.000001'), days=700, seed=0):
+    rng = np.random.default_rng(seed)
+    list_df = []
+    for code in codes:
+        dates = pd.bdate_range('2021-06-01', periods=days)
+        dates = dates[rng.random(days) > 0.05]
+        list_df.append(pd.DataFrame({'code': code, 'date': dates.strftime('%Y-%m-%d')}))
+    return add_price_columns(pd.concat(list_df, ignore_index=True), rng)
+
+
+def brute_force_resample(df, bucket_column):
+    '''按(code, 区间)分组聚合的参照实现'''
+    list_rows = []
+    for code, df_code in df.groupby('code', sort=True):
+        prev_close = None
+        for _, df_bucket in df_code.groupby(bucket_column, sort=True):
+            first, last = df_bucket.iloc[0], df_bucket.iloc[-1]
+            if prev_close is None:
+                prev_close = first['close'] / (1 + first['change_percent'] / 100)
+            row = last.drop(bucket_column).to_dict()
+            row.update({
+                'open': first['open'], 'high': df_bucket['high'].max(), 'low': df_bucket['low'].min(),
+                'volume': df_bucket['volume'].sum(), 'amount': df_bucket['amount'].sum(),
+                'turnover_rate': df_bucket['turnover_rate'].sum(),
+                'change_percent': (last['close'] / prev_close - 1) * 100,
+            })
+            list_rows.append(row)
+            prev_close = last['close']
+    return pd.DataFrame(list_rows)
+
+
+def assert_frame_matches(df_result, df_expected):
+    assert list(df_result.columns) == list(df_expected.columns)
+    assert len(df_result) == len(df_expected)
+    for column in df_expected.columns:
+        if pd.api.types.is_float_dtype(df_expected[column]):
+            np.testing.assert_allclose(df_result[column].to_numpy(dtype=np.float64), df_expected[column].to_numpy(dtype=np.float64),
+                                       rtol=1e-12, err_msg=column)
+        else:
+            assert df_result[column].tolist() == df_expected[column].tolist(), column
+
+
+@pytest.mark.parametrize('source_minutes, period', [
+    (5, TimePeriod.MINUTE_10), (15, TimePeriod.MINUTE_45), (30, TimePeriod.MINUTE_90), (60, TimePeriod.MINUTE_120),
+])
+def test_minute_resample_matches_brute_force(source_minutes, period):
+    df_source = make_minute_data(source_minutes)
+    minutes = int(period.value[:-1])
+
+    df_sorted = df_source.sort_values(['code', 'date', 'time']).reset_index(drop=True)
+    times = pd.to_datetime(df_sorted['time'].str.slice(0, 14), format='%Y%m%d%H%M%S')
+    minute_of_day = times.dt.hour * 60 + times.dt.minute
+    end_minutes = [get_interval_end(minute, minutes) for minute in minute_of_day]
+    end_times = times.dt.normalize() + pd.to_timedelta(end_minutes, unit='m')
+    df_sorted['bucket'] = end_times.dt.strftime('%Y%m%d%H%M%S') + '000'
+    df_expected = brute_force_resample(df_sorted, 'bucket')
+    df_expected['time'] = df_sorted.groupby(['code', 'bucket'], sort=True)['bucket'].first().to_numpy()
+
+    assert_frame_matches(resample_kline(df_source, period), df_expected)
+
+
+def test_minute_resample_keeps_time_format():
+    df_source = make_minute_data(30, codes=('sh.600000',), days=1)
+    df_source['time'] = pd.to_datetime(df_source['time'].str.slice(0, 14), format='%Y%m%d%H%M%S').dt.strftime('%Y-%m-%d %H:%M:%S')
+    df_result = resample_kline(df_source, TimePeriod.MINUTE_60)
+    assert set(df_result['time'].str.slice(11)) <= {'10:30:00', '11:30:00', '14:00:00', '15:00:00'}
+
+
+@pytest.mark.parametrize('period, freq', [
+    (TimePeriod.WEEK, 'W-SUN'), (TimePeriod.MONTH, 'M'), (TimePeriod.QUARTER, 'Q'), (TimePeriod.YEAR, 'Y'),
+])
+def test_calendar_resample_matches_brute_force(period, freq):
+    df_source = make_day_data()
+    df_sorted = df_source.sort_values(['code', 'date']).reset_index(drop=True)
+    df_sorted['bucket'] = pd.to_datetime(df_sorted['date']).dt.to_period(freq)
+    df_expected = brute_force_resample(df_sorted, 'bucket')
+
+    assert_frame_matches(resample_kline(df_source.sample(frac=1, random_state=1), period), df_expected)
+
+
+def test_resample_start_date():
+    df_source = make_day_data(codes=('sh.600000',))
+    start_date = get_bucket_start_date(TimePeriod.MONTH, '2022-05-18')
+    assert start_date == '2022-05-01'
+    df_all = resample_kline(df_source, TimePeriod.MONTH)
+    df_part = resample_kline(df_source[df_source['date'] >= start_date], TimePeriod.MONTH, start_date)
+    df_all = df_all[df_all['date'] >= start_date].reset_index(drop=True)
+    # 区间完整时除第一根的涨跌幅外均一致
+    assert_frame_matches(df_part.drop(columns='change_percent'), df_all.drop(columns='change_percent'))
+    np.testing.assert_allclose(df_part['change_percent'][1:], df_all['change_percent'][1:], rtol=1e-12)
+
+
+def test_resample_sources():
+    assert get_resample_sources(TimePeriod.MINUTE_120) == [TimePeriod.MINUTE_60, TimePeriod.MINUTE_30, TimePeriod.MINUTE_15]
+    assert get_resample_sources(TimePeriod.MINUTE_45) == [TimePeriod.MINUTE_15]
+    # 10分钟只能由手动下载的5分钟合成
+    assert get_resample_sources(TimePeriod.MINUTE_10) == []
+    assert get_resample_sources(TimePeriod.MINUTE_10, include_optional=True) == [TimePeriod.MINUTE_5]
+    assert get_resample_sources(TimePeriod.WEEK) == [TimePeriod.DAY]
+    assert get_resample_sources(TimePeriod.DAY) == []
+    assert TimePeriod.MINUTE_10 in get_resample_targets(TimePeriod.MINUTE_5)
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import stock_data_indicators as sdi
+from indicators.macd_divergence import DEFAULT_DIFF_RATIO, DEFAULT_MA52_TOLERANCE, detect_macd_divergence
+from manager.indicators_config_manager import IndicatrosEnum
+
+PERIOD_COLUMNS = ('start', 'end', 'low_index', 'status', 'invalid')
+
+
+def is_below(value):
+    return not np.isnan(value) and value < 0
+
+
+def reference_macd_divergence(low, high, close, diff, dea, ma24, ma52,
+                              diff_ratio=DEFAULT_DIFF_RATIO, ma52_tolerance=DEFAULT_MA52_TOLERANCE):
+    '''逐根k线循环的参考实现（同scripts/benchmark_macd_divergence.py），返回逐根结果与周期列表'''
+    rows = len(close)
+    macd_period = np.zeros(rows, dtype=np.int64)
+    macd_divergence = np.zeros(rows, dtype=np.int64)
+    list_periods = []
+    in_leg = False
+    leg_periods = []
+    period = None
+    for i in range(rows):
+        diff_below, dea_below = is_below(diff[i]), is_below(dea[i])
+        prev_diff_below = i > 0 and is_below(diff[i - 1])
+        prev_dea_below = i > 0 and is_below(dea[i - 1])
+        start_event = (diff_below and not prev_diff_below and not prev_dea_below) or (dea_below and not prev_dea_below)
+        end_event = i == 0 or (not dea_below and prev_dea_below) or (not diff_below and prev_diff_below and not dea_below)
+        was_in_leg = in_leg
+        if start_event:
+            in_leg = True
+        elif end_event:
+            in_leg = False
+        if not in_leg:
+            period = None
+            continue
+        if not was_in_leg:
+            leg_periods = []
+            period = None
+
+        price_back = close[i] > ma24[i] or high[i] >= ma52[i] * (1 - ma52_tolerance)
+        if period is None or (period['end'] >= 0 and not price_back and diff[i] < 0):
+            period = {'start': i, 'end': -1, 'number': len(leg_periods) + 1,
+                      'prev': leg_periods[-1] if leg_periods else None,
+                      'low': np.nan, 'low_index': -1, 'low_diff': np.nan, 'min_diff': np.nan,
+                      'min_close': np.nan, 'min_close_diff': np.nan, 'status': 0, 'invalid': False}
+            leg_periods.append(period)
+            list_periods.append(period)
+            prev = period['prev']
+            running_low = running_diff = np.nan
+        if period['end'] < 0:
+            if low[i] < period['low'] or np.isnan(period['low']):
+                if not np.isnan(low[i]):
+                    period['low'], period['low_index'], period['low_diff'] = low[i], i, diff[i]
+            if close[i] < period['min_close'] or (np.isnan(period['min_close']) and not np.isnan(close[i])):
+                period['min_close'], period['min_close_diff'] = close[i], diff[i]
+            period['min_diff'] = np.fmin(period['min_diff'], diff[i])
+            running_low = np.fmin(running_low, low[i])
+            running_diff = np.fmin(running_diff, diff[i])
+            if i != period['start'] and (diff[i] >= 0 or (price_back and diff[i] >= diff_ratio * period['min_diff'])):
+                period['end'] = i
+                set_period_status(period)
+
+        macd_period[i] = period['number']
+        if period['end'] >= 0:
+            macd_divergence[i] = period['status']
+        elif prev is not None and not np.isnan(low[i]) and not np.isnan(diff[i]) \
+                and running_diff > prev['min_diff'] and running_low < prev['low']:
+            macd_divergence[i] = 1
+    for period in list_periods:
+        if period['end'] < 0:
+            set_period_status(period)
+    return macd_period, macd_divergence, list_periods
+
+
+def set_period_status(period):
+    '''与线段内的上一周期比较：背离、下跌动能不足，及上一周期是否失效'''
+    prev = period['prev']
+    if prev is None:
+        return
+    if period['min_diff'] > prev['min_diff']:
+        period['status'] = 1 if period['low'] < prev['low'] else 2
+    if period['min_close'] < prev['low'] and period['min_close_diff'] < prev['low_diff']:
+        prev['invalid'] = True
+
+
+def make_stock_data(bars, seed):
+    '''随机k线，含一字板'''
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.standard_normal(bars) * 0.1)
+    open_price = close + rng.standard_normal(bars) * 0.05
+    high = np.maximum(open_price, close) + rng.random(bars) * 0.2
+    low = np.minimum(open_price, close) - rng.random(bars) * 0.2
+    flat = rng.random(bars) < 0.02
+    open_price[flat] = high[flat] = low[flat] = close[flat]
+    stock_data = pd.DataFrame({'open': open_price, 'high': high, 'low': low, 'close': close})
+    sdi.macd(stock_data, 12, 26, 9)
+    return stock_data
+
+
+def get_inputs(stock_data):
+    close = stock_data['close']
+    return (stock_data['low'].to_numpy(), stock_data['high'].to_numpy(), close.to_numpy(),
+            stock_data[IndicatrosEnum.MACD_DIFF.value].to_numpy(), stock_data[IndicatrosEnum.MACD_DEA.value].to_numpy(),
+            close.rolling(window=24, min_periods=1).mean().to_numpy(), close.rolling(window=52, min_periods=1).mean().to_numpy())
+
+
+def assert_same_as_reference(dict_result, df_periods, inputs, offset=0):
+    macd_period, macd_divergence, list_periods = reference_macd_divergence(*inputs)
+    np.testing.assert_array_equal(dict_result['macd_period'], macd_period)
+    np.testing.assert_array_equal(dict_result['macd_divergence'], macd_divergence)
+
+    df_expected = pd.DataFrame(list_periods, columns=PERIOD_COLUMNS)
+    assert len(df_periods) == len(df_expected)
+    for column in PERIOD_COLUMNS:
+        values = df_periods[column].to_numpy().astype(np.int64)
+        if column in ('start', 'end', 'low_index'):
+            values = np.where(values >= 0, values - offset, -1)
+        np.testing.assert_array_equal(values, df_expected[column].to_numpy().astype(np.int64), err_msg=column)
+    np.testing.assert_array_equal(df_periods['completed'].to_numpy(), df_expected['end'].to_numpy() >= 0)
+    return df_expected
+
+
+def test_detect_macd_divergence_matches_reference():
+    '''逐根结果、周期表与逐根k线循环一致，且样本中出现背离、下跌动能不足、失效'''
+    list_status = []
+    invalid = 0
+    for seed in range(20):
+        inputs = get_inputs(make_stock_data(750, seed))
+        dict_result, df_periods = detect_macd_divergence(*inputs)
+        df_expected = assert_same_as_reference(dict_result, df_periods, inputs)
+        list_status.extend(df_expected['status'])
+        invalid += int(df_expected['invalid'].sum())
+    assert {1, 2} <= set(list_status)
+    assert invalid > 0
+
+
+@pytest.mark.parametrize('diff_ratio, ma52_tolerance', [(0.5, 0.), (0.1, 0.05)])
+def test_detect_macd_divergence_params(diff_ratio, ma52_tolerance):
+    inputs = get_inputs(make_stock_data(500, 1))
+    dict_result, df_periods = detect_macd_divergence(*inputs, diff_ratio=diff_ratio, ma52_tolerance=ma52_tolerance)
+    macd_period, macd_divergence, list_periods = reference_macd_divergence(
+        *inputs, diff_ratio=diff_ratio, ma52_tolerance=ma52_tolerance)
+    np.testing.assert_array_equal(dict_result['macd_period'], macd_period)
+    np.testing.assert_array_equal(dict_result['macd_divergence'], macd_divergence)
+    assert df_periods['start'].tolist() == [period['start'] for period in list_periods]
+
+
+def test_detect_macd_divergence_group_start():
+    '''多只股票首尾相接时线段不跨股票，结果与逐只计算一致'''
+    list_inputs = [get_inputs(make_stock_data(bars, seed)) for seed, bars in enumerate([300, 120, 450])]
+    lengths = [len(inputs[0]) for inputs in list_inputs]
+    group_start = np.cumsum([0] + lengths[:-1])
+    dict_result, df_periods = detect_macd_divergence(*[np.concatenate(values) for values in zip(*list_inputs)],
+                                                     group_start=group_start)
+    for inputs, start, length in zip(list_inputs, group_start, lengths):
+        df_stock_periods = df_periods[(df_periods['start'] >= start) & (df_periods['start'] < start + length)]
+        dict_stock = {column: values[start:start + length] for column, values in dict_result.items()}
+        assert_same_as_reference(dict_stock, df_stock_periods, inputs, offset=start)
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from utils.option_search_index import OptionSearchIndex, get_fallback_initials, get_pinyin_initials, split_option
+
+OPTIONS = [
+    "浦发银行 - sh.600000", "白云机场 - sh.600004", "东风汽车 - sh.600006", "中国国贸 - sh.600007",
+    "首创环保 - sh.600008", "上海机场 - sh.600009", "包钢股份 - sh.600010", "华能国际 - sh.600011",
+    "皖通高速 - sh.600012", "华夏银行 - sh.600015", "民生银行 - sh.600016", "日照港 - sh.600017",
+    "上港集团 - sh.600018", "宝钢股份 - sh.600019", "中国重工 - sh.601989", "重庆啤酒 - sh.600132",
+    "长江电力 - sh.600900", "平安银行 - sz.000001", "万科A - sz.000002", "国农科技 - sz.000004",
+    "*ST国华 - sz.000004", "深振业A - sz.000006", "全新好 - sz.000007", "神州高铁 - sz.000008",
+    "中国宝安 - sz.000009", "美丽生态 - sz.000010", "深物业A - sz.000011", "南玻A - sz.000012",
+    "沙河股份 - sz.000014", "深康佳A - sz.000016", "西藏旅游 - sh.600749", "朝阳科技 - sz.002981",
+]
+
+
+def brute_force_search(options, query, limit):
+    '''逐项匹配并分级的参照实现'''
+    list_tiers = [[], [], [], [], []]
+    for option in options:
+        name, code = (text.lower() for text in split_option(option))
+        initials = get_pinyin_initials(name)
+        code_number = code.rpartition('.')[2]
+        text = option.lower()
+        if query not in text and not initials.startswith(query):
+            continue
+        if query in (code, code_number):
+            tier = 0
+        elif code.startswith(query) or code_number.startswith(query):
+            tier = 1
+        elif name.startswith(query):
+            tier = 2
+        elif initials.startswith(query):
+            tier = 3
+        else:
+            tier = 4
+        list_tiers[tier].append(option)
+    list_tiers[4].sort(key=lambda option: option.lower().find(query))
+    return [option for options in list_tiers for option in options][:limit]
+
+
+def test_search_ranking():
+    search_index = OptionSearchIndex(OPTIONS)
+    assert search_index.search("600000")[0] == "浦发银行 - sh.600000"
+    assert search_index.search("sh.600000") == ["浦发银行 - sh.600000"]
+    # 代码完全匹配 > 代码前缀 > 其他子串
+    assert search_index.search("60001")[:3] == ["包钢股份 - sh.600010", "华能国际 - sh.600011", "皖通高速 - sh.600012"]
+    # 名称前缀 > 其他子串（按位置）
+    assert search_index.search("中国") == ["中国国贸 - sh.600007", "中国重工 - sh.601989", "中国宝安 - sz.000009"]
+    assert search_index.search("银行") == ["浦发银行 - sh.600000", "华夏银行 - sh.600015", "民生银行 - sh.600016", "平安银行 - sz.000001"]
+    # 拼音首字母
+    assert search_index.search("pfyh") == ["浦发银行 - sh.600000"]
+    assert search_index.search("bggf") == ["包钢股份 - sh.600010", "宝钢股份 - sh.600019"]
+    assert search_index.search("PFYH ") == ["浦发银行 - sh.600000"]
+    assert search_index.search("") == OPTIONS
+    assert search_index.search("不存在") == []
+    assert len(search_index.search("s", limit=3)) == 3
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_search_matches_brute_force(seed):
+    rng = random.Random(seed)
+    search_index = OptionSearchIndex(OPTIONS, max_results=10)
+    list_queries = []
+    for _ in range(200):
+        option = rng.choice(OPTIONS).lower()
+        name = split_option(option)[0]
+        source = rng.choice([option, get_pinyin_initials(name)])
+        start = rng.randrange(len(source))
+        query = source[start:start + rng.randint(1, 4)]
+        if query.strip():
+            list_queries.append(query)
+    # 逐字输入：验证在上一次结果中增量过滤
+    list_queries += ["6", "60", "600", "6000", "60000", "600000", "6000", "z", "zg", "zgz", "zgzg"]
+
+    for query in list_queries:
+        assert search_index.search(query) == brute_force_search(OPTIONS, query.strip().lower(), 10), query
+
+
+def test_fallback_initials():
+    assert get_fallback_initials("浦发银行") == "pfyh"
+    assert get_fallback_initials("重庆啤酒") == "cqpj"
+    assert get_fallback_initials("中国重工") == "zgzg"
+    assert get_fallback_initials("长江电力") == "cjdl"
+    assert get_fallback_initials("西藏旅游") == "xzly"
+    assert get_fallback_initials("*ST国华") == "stgh"
+    assert get_fallback_initials("万科A") == "wka"
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from indicators import stock_data_indicators as sdi
+from indicators.panel_indicators import BOLL_COLUMNS, calculate_market_indicators
+
+# 显式传入参数，不依赖用户指标配置
+DICT_PARAMS = {
+    'macd': (12, 26, 9),
+    'ma': [('ma5', 5), ('ma24', 24), ('ma52', 52)],
+    'kdj': (9, 3, 3),
+    'rsi': [6, 12, 24],
+    'boll': (20, 2),
+}
+
+
+def make_market_data(stocks=30, bars=200, seed=0):
+    '''长表：上市时间不同、有停牌、一字板，行顺序打乱'''
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=bars, freq='B').strftime('%Y-%m-%d').to_numpy()
+    list_df = []
+    for index in range(stocks):
+        length = int(rng.integers(bars // 10, bars + 1))
+        keep = rng.random(length) > 0.02
+        close = 10 + np.cumsum(rng.standard_normal(length) * 0.1)
+        open_price = close + rng.standard_normal(length) * 0.05
+        high = np.maximum(open_price, close) + rng.random(length) * 0.2
+        low = np.minimum(open_price, close) - rng.random(length) * 0.2
+        flat = rng.random(length) < 0.02
+        open_price[flat] = high[flat] = low[flat] = close[flat]
+        list_df.append(pd.DataFrame({
+            'code': f'sh.{600000 + index}', 'date': dates[bars - length:][keep],
+            'open': open_price[keep], 'high': high[keep], 'low': low[keep], 'close': close[keep],
+        }))
+    df_market = pd.concat(list_df, ignore_index=True)
+    return df_market.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def calculate_stock(stock_data):
+    '''逐只计算（参照实现）'''
+    sdi.macd(stock_data, *DICT_PARAMS['macd'])
+    for column, period in DICT_PARAMS['ma']:
+        sdi.ma(stock_data, column, period)
+    sdi.kdj(stock_data, *DICT_PARAMS['kdj'])
+    for period in DICT_PARAMS['rsi']:
+        sdi.rsi(stock_data, period)
+    sdi.boll(stock_data, *DICT_PARAMS['boll'])
+    return stock_data
+
+
+def test_market_indicators_match_per_stock():
+    df_market = make_market_data()
+    input_columns = list(df_market.columns)
+    calculate_market_indicators(df_market, DICT_PARAMS)
+    indicator_columns = [column for column in df_market.columns if column not in input_columns]
+    assert set(BOLL_COLUMNS) <= set(indicator_columns)
+
+    for code, df_stock in df_market.groupby('code'):
+        df_stock = df_stock.sort_values('date')
+        expected = calculate_stock(df_stock[input_columns].reset_index(drop=True))
+        for column in indicator_columns:
+            values = df_stock[column].to_numpy()
+            if column in BOLL_COLUMNS:
+                np.testing.assert_allclose(values, expected[column].to_numpy(), atol=1e-5, equal_nan=True, err_msg=f'{code} {column}')
+            else:
+                np.testing.assert_array_equal(values, expected[column].to_numpy(), err_msg=f'{code} {column}')
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from manager.period_manager import TimePeriod
+from manager.period_alignment_manager import PeriodAlignment, PeriodAlignmentManager
+from processor.kline_resampler import resample_kline
+
+
+def make_minute_data(days=40, seed=0):
+    '''30分钟k线，随机缺少部分k线（停牌、数据缺失）'''
+    rng = np.random.default_rng(seed)
+    list_rows = []
+    for day in pd.bdate_range('2024-01-02', periods=days):
+        if rng.random() < 0.1:
+            continue
+        for end in (600, 630, 660, 690, 810, 840, 870, 900):
+            if rng.random() < 0.1:
+                continue
+            time = day + pd.Timedelta(minutes=end)
+            list_rows.append({'date': day.strftime('%Y-%m-%d'), 'time': time.strftime('%Y%m%d%H%M%S') + '000'})
+    df = pd.DataFrame(list_rows)
+    df['close'] = 10 + rng.standard_normal(len(df))
+    return df
+
+
+def make_day_data(days=60, seed=1):
+    '''日线与分钟线的日期范围不同，部分日期只有其中一个周期'''
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-12-20', periods=days)
+    dates = dates[rng.random(days) > 0.05]
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'close': 10 + rng.standard_normal(len(dates))})
+
+
+def get_minute_bucket(time_text, minutes):
+    '''分钟k线所属的区间（日期、结束时间），按交易时段逐段列出区间'''
+    time = pd.Timestamp(time_text[:14])
+    minute_of_day = time.hour * 60 + time.minute
+    for session_start, session_end in ((570, 690), (780, 900)):
+        start = session_start
+        while start < session_end:
+            end = min(start + minutes, session_end)
+            if start < minute_of_day <= end:
+                return time.date(), end
+            start = end
+    raise AssertionError(time_text)
+
+
+def brute_force_maps(fine_keys, coarse_keys):
+    '''逐根比较区间得到parent、first_child、last_child'''
+    parent = [next((j for j, key in enumerate(coarse_keys) if key == fine_key), -1) for fine_key in fine_keys]
+    first_child, last_child = [], []
+    for coarse_key in coarse_keys:
+        children = [i for i, key in enumerate(fine_keys) if key == coarse_key]
+        first_child.append(children[0] if children else -1)
+        last_child.append(children[-1] if children else -1)
+    return parent, first_child, last_child
+
+
+def assert_pair_matches(alignment, fine_period, fine_keys, coarse_period, coarse_keys):
+    parent, first_child, last_child = brute_force_maps(fine_keys, coarse_keys)
+    assert [alignment.get_parent_index(fine_period, i, coarse_period) for i in range(len(fine_keys))] == parent
+    assert [alignment.get_child_range(coarse_period, j, fine_period) for j in range(len(coarse_keys))] == list(zip(first_child, last_child))
+    assert [alignment.map_index(fine_period, i, coarse_period) for i in range(len(fine_keys))] == parent
+    assert [alignment.map_index(coarse_period, j, fine_period) for j in range(len(coarse_keys))] == last_child
+
+
+def test_alignment_matches_brute_force():
+    df_30m = make_minute_data()
+    df_60m = resample_kline(df_30m, TimePeriod.MINUTE_60)
+    df_day = make_day_data()
+    df_week = resample_kline(df_day, TimePeriod.WEEK)
+
+    alignment = PeriodAlignment('sh.600000')
+    for period, df in ((TimePeriod.DAY, df_day), (TimePeriod.MINUTE_30, df_30m), (TimePeriod.WEEK, df_week), (TimePeriod.MINUTE_60, df_60m)):
+        assert alignment.set_period_data(period, df)
+    assert not alignment.set_period_data(TimePeriod.DAY, df_day.copy())
+
+    days_30m = list(df_30m['date'])
+    assert_pair_matches(alignment, TimePeriod.MINUTE_30, [get_minute_bucket(time, 60) for time in df_30m['time']],
+                        TimePeriod.MINUTE_60, [get_minute_bucket(time, 60) for time in df_60m['time']])
+    assert_pair_matches(alignment, TimePeriod.MINUTE_30, days_30m, TimePeriod.DAY, list(df_day['date']))
+    week_of = lambda dates: [pd.Timestamp(date).to_period('W-SUN') for date in dates]
+    assert_pair_matches(alignment, TimePeriod.DAY, week_of(df_day['date']), TimePeriod.WEEK, week_of(df_week['date']))
+    assert_pair_matches(alignment, TimePeriod.MINUTE_30, week_of(days_30m), TimePeriod.WEEK, week_of(df_week['date']))
+
+    # 日期早于k线日期的最后一根目标周期k线
+    for i, date in enumerate(days_30m):
+        expected = max([j for j, day in enumerate(df_day['date']) if day < date], default=-1)
+        assert alignment.get_before_day_index(TimePeriod.MINUTE_30, i, TimePeriod.DAY) == expected
+    for j, date in enumerate(df_day['date']):
+        expected = max([i for i, day in enumerate(days_30m) if day < date], default=-1)
+        assert alignment.get_before_day_index(TimePeriod.DAY, j, TimePeriod.MINUTE_30) == expected
+        assert alignment.find_last_index_by_date(TimePeriod.MINUTE_30, date) == max([i for i, day in enumerate(days_30m) if day <= date], default=-1)
+
+
+def test_alignment_out_of_range_and_remove():
+    alignment = PeriodAlignment('sh.600000')
+    alignment.set_period_data(TimePeriod.DAY, make_day_data())
+    assert alignment.get_parent_index(TimePeriod.DAY, 0, TimePeriod.WEEK) == -1
+    alignment.set_period_data(TimePeriod.WEEK, resample_kline(make_day_data(), TimePeriod.WEEK))
+    assert alignment.get_parent_index(TimePeriod.DAY, alignment.get_bar_count(TimePeriod.DAY), TimePeriod.WEEK) == -1
+    assert alignment.map_index(TimePeriod.DAY, -1, TimePeriod.DAY) == -1
+
+    alignment.remove_period(TimePeriod.WEEK)
+    assert not alignment.has_period(TimePeriod.WEEK)
+    assert alignment.get_child_range(TimePeriod.WEEK, 0, TimePeriod.DAY) == (-1, -1)
+
+
+def test_manager_lru():
+    manager = PeriodAlignmentManager(max_codes=2)
+    first = manager.get_alignment('sh.600000')
+    manager.get_alignment('sz.000001')
+    assert manager.get_alignment('sh.600000') is first
+    manager.get_alignment('sz.000002')       # 淘汰最久未使用的sz.000001
+    assert list(manager.dict_alignment) == ['sh.600000', 'sz.000002']
+
+    first.set_period_data(TimePeriod.DAY, make_day_data())
+    manager.invalidate('sh.600000', TimePeriod.DAY)
+    assert not first.has_period(TimePeriod.DAY)
+    manager.invalidate()
+    assert not manager.dict_alignment
@@ -0,0 +1,80 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processor.screen_expression import compile_expression
+from processor.stock_screener_engine import ScreenContext
+
+
+@pytest.mark.parametrize('text, position, message', [
+    ('close > ma5 $', 13, '无法识别的字符'),
+    ('   ', 1, '表达式为空'),
+    ('(close > ma5', 13, "缺少')'"),
+    ('abs(close > 1', 11, "缺少','"),
+    ('foo(close) > 1', 1, '未知函数：foo'),
+    ('abs(close, 1) > 1', 1, '函数abs的参数数量不正确'),
+    ('max(close) > 1', 1, '函数max的参数数量不正确'),
+    ('closex > 1', 1, '未知的列：closex'),
+    ('close[1.5] > 1', 7, '偏移需为非负整数'),
+    ('close and ma5 > 1', 1, '此处需要条件表达式'),
+    ('close > 1 or ma5', 14, '此处需要条件表达式'),
+    ('close > (ma5 > 1)', 9, '此处需要数值表达式'),
+    ('close between 1 or 2', 17, "缺少'and'"),
+    ('close > ma5 ma24', 13, '无法识别的内容'),
+    ('close > ', 8, '此处需要数值、列名或括号'),
+])
+def test_parse_errors(text, position, message):
+    with pytest.raises(ValueError, match=re.escape(f'（第{position}个字符）：{message}')):
+        compile_expression(text)
+
+
+def test_compile_plan():
+    expression = compile_expression('close > ma52 AND volume_ratio > 1.5 && ma52 < close[2] < ma24')
+    assert expression.kind == 'bool'
+    assert expression.columns == ('close', 'ma52', 'volume_ratio', 'ma24')
+    assert expression.max_offset == 2
+
+    score = compile_expression('abs(close / ma52 - 1) * (2 * 50)')
+    assert score.kind == 'number'
+    assert score.columns == ('close', 'ma52')
+    # 规范化空白后命中编译缓存
+    assert compile_expression('close  >   ma52') is compile_expression('close > ma52')
+
+
+def make_bars(seed=0):
+    rng = np.random.default_rng(seed)
+    list_df = []
+    for index in range(50):
+        length = int(rng.integers(1, 6))
+        list_df.append(pd.DataFrame({
+            'code': f'sh.{600000 + index}',
+            'date': pd.bdate_range('2024-01-01', periods=length).strftime('%Y-%m-%d'),
+            'close': rng.random(length) * 10, 'ma5': rng.random(length) * 10,
+            'volume_ratio': rng.random(length) * 3, 'turnover_rate': rng.random(length) * 15,
+        }))
+    return pd.concat(list_df, ignore_index=True).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_evaluate_matches_pandas():
+    df_bars = make_bars()
+    ctx = ScreenContext(df_bars)
+    df_sorted = df_bars.sort_values(['code', 'date'])
+    groups = df_sorted.groupby('code', sort=True)
+    last = groups.nth(-1).set_index('code')
+    prev = groups.nth(-2).set_index('code').reindex(last.index)
+
+    mask = compile_expression('close > ma5 and (volume_ratio >= 1.5 or turnover_rate between 3 and 10) and not close = ma5[1]').evaluate(ctx)
+    expected = ((last['close'] > last['ma5'])
+                & ((last['volume_ratio'] >= 1.5) | last['turnover_rate'].between(3, 10))
+                & ~(last['close'] == prev['ma5']))
+    assert list(ctx.codes) == list(last.index)
+    np.testing.assert_array_equal(mask, expected.to_numpy())
+
+    score = compile_expression('max(close, ma5) - min(close, ma5) + -abs(close - ma5)').evaluate(ctx)
+    np.testing.assert_allclose(score, np.zeros(len(last)), atol=1e-12)
+
+    # k线数量不足的股票偏移取值为NaN，比较结果为False
+    chained = compile_expression('0 <= close[1] < 100').evaluate(ctx)
+    np.testing.assert_array_equal(chained, prev['close'].notna().to_numpy())
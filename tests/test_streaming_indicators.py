@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import stock_data_indicators as sdi
+from indicators.indicator_registry import get_indicator_registry
+from indicators.streaming_indicators import StreamingIndicatorEngine, create_indicators
+from manager.streaming_indicator_manager import StreamingIndicatorManager
+
+# 显式传入参数，不依赖用户指标配置
+DICT_PARAMS = {
+    'macd': (12, 26, 9),
+    'ma': [('ma5', 5), ('ma24', 24), ('ma52', 52)],
+    'kdj': (9, 3, 3),
+    'rsi': [6, 12, 24],
+    'boll': (20, 2),
+}
+INDICATOR_NAMES = ['macd', 'ma', 'kdj', 'rsi', 'boll', 'volume_ratio', 'macd_divergence']
+
+
+def make_stock_data(bars=400, seed=0):
+    '''随机k线，含一字板（最高价等于最低价，RSV为0/0）与连续相同的收盘价'''
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.standard_normal(bars) * 0.1)
+    close[100:130] = close[99]
+    open_price = close + rng.standard_normal(bars) * 0.05
+    high = np.maximum(open_price, close) + rng.random(bars) * 0.2
+    low = np.minimum(open_price, close) - rng.random(bars) * 0.2
+    flat = rng.random(bars) < 0.02
+    open_price[flat] = high[flat] = low[flat] = close[flat]
+    return pd.DataFrame({
+        'date': pd.bdate_range('2020-01-01', periods=bars).strftime('%Y-%m-%d'), 'code': 'sh.600000',
+        'open': open_price, 'high': high, 'low': low, 'close': close,
+        'volume': rng.integers(1000, 100000, bars).astype(np.float64),
+    })
+
+
+def batch_calculate(stock_data):
+    '''stock_data_indicators批量计算（参照实现）'''
+    sdi.macd(stock_data, *DICT_PARAMS['macd'])
+    for column, period in DICT_PARAMS['ma']:
+        sdi.ma(stock_data, column, period)
+    sdi.kdj(stock_data, *DICT_PARAMS['kdj'])
+    for period in DICT_PARAMS['rsi']:
+        sdi.rsi(stock_data, period)
+    sdi.boll(stock_data, *DICT_PARAMS['boll'])
+    return stock_data
+
+
+def assert_same_bits(values, expected, column):
+    np.testing.assert_array_equal(np.asarray(values, dtype=np.float64), np.asarray(expected, dtype=np.float64), err_msg=column)
+
+
+def test_engine_matches_batch():
+    df = make_stock_data()
+    expected = batch_calculate(df.copy())
+    engine = StreamingIndicatorEngine(create_indicators(dict_params=DICT_PARAMS))
+    columns = engine.get_columns()
+
+    full = engine.calculate(df.copy())
+    for column in columns:
+        assert_same_bits(full[column], expected[column], column)
+
+    # 逐根追加
+    start = 300
+    appended = engine.calculate(df.iloc[:start].copy())
+    for length in range(start + 1, len(df) + 1):
+        appended = pd.concat([appended, df.iloc[length - 1:length]])
+        engine.append(appended)
+    for column in columns:
+        assert_same_bits(appended[column], expected[column], column)
+
+    # 回退后重新追加
+    engine.seek(df, 250)
+    list_rows = [engine.update(bar) for bar in engine.iter_bars(df, 250, len(df))]
+    for column in columns:
+        assert_same_bits([row[column] for row in list_rows], expected[column].iloc[250:], column)
+
+
+def test_engine_replace_last():
+    df = make_stock_data()
+    engine = StreamingIndicatorEngine(create_indicators(dict_params=DICT_PARAMS))
+    result = engine.calculate(df.copy())
+    result.loc[result.index[-1], ['high', 'close']] = [result['high'].iloc[-1] + 1, result['close'].iloc[-1] + 0.5]
+    engine.replace_last(result)
+
+    expected = batch_calculate(df.copy().assign(high=result['high'], close=result['close']))
+    for column in engine.get_columns():
+        assert_same_bits(result[column], expected[column], column)
+
+
+@pytest.mark.parametrize('steps', [[1], [3, 1, 2]])
+def test_manager_extend_matches_full_calculation(steps):
+    df = make_stock_data()
+    registry = get_indicator_registry()
+    expected = df.copy()
+    registry.ensure(expected, INDICATOR_NAMES, DICT_PARAMS)
+
+    manager = StreamingIndicatorManager()
+    manager.track('sh.600000', 'stock_data_1d', 'key_0')
+    length = len(df) - sum(steps)
+    df_cached = df.iloc[:length].copy()
+    registry.ensure(df_cached, INDICATOR_NAMES, DICT_PARAMS)
+    for index, step in enumerate(steps, 1):
+        df_new = df.iloc[length:length + step]
+        df_cached = manager.extend('sh.600000', 'stock_data_1d', df_cached, df_new, f'key_{index}', DICT_PARAMS)
+        length += step
+        assert manager.get_cache_key('sh.600000', 'stock_data_1d') == f'key_{index}'
+
+    assert list(df_cached.columns) == list(expected.columns)
+    for column in expected.columns:
+        if pd.api.types.is_float_dtype(expected[column]):
+            assert_same_bits(df_cached[column], expected[column], column)
+        else:
+            assert df_cached[column].tolist() == expected[column].tolist(), column
+    # 已计算的指标无需重新计算
+    assert registry.ensure(df_cached, INDICATOR_NAMES, DICT_PARAMS) == []
+
+
+def test_manager_extend_rejects_overlap():
+    df = make_stock_data()
+    manager = StreamingIndicatorManager()
+    df_cached = df.iloc[:300].copy()
+    get_indicator_registry().ensure(df_cached, ['ma'], DICT_PARAMS)
+
+    # 未登记
+    assert manager.extend('sh.600000', 'stock_data_1d', df_cached, df.iloc[300:301], dict_params=DICT_PARAMS) is None
+    # 覆盖最后一根k线（盘中更新当天数据）
+    manager.track('sh.600000', 'stock_data_1d', 'key_0')
+    assert manager.extend('sh.600000', 'stock_data_1d', df_cached, df.iloc[299:301], dict_params=DICT_PARAMS) is None
+    assert manager.get_cache_key('sh.600000', 'stock_data_1d') is None
@@ -0,0 +1,70 @@
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+from thread.base_task import BaseTask
+from thread.task_pool import TaskPool
+
+
+class LargeResult:
+    '''代替任务结果中的DataFrame，用弱引用检查是否被释放'''
+
+
+class ResultTask(BaseTask):
+    def __init__(self, event=None, **kwargs):
+        super().__init__(**kwargs)
+        self.event = event
+
+    def execute(self):
+        if self.event is not None:
+            self.event.wait(5)
+        return {"data": LargeResult()}
+
+
+@pytest.fixture(scope='module')
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def wait_until(app, condition, timeout=5):
+    end_time = time.time() + timeout
+    while not condition() and time.time() < end_time:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def test_finished_tasks_release_results(qt_app):
+    pool = TaskPool(max_workers=2)
+    list_refs = []
+    list_tasks = [ResultTask() for _ in range(5)]
+    for task in list_tasks:
+        task.task_completed.connect(lambda task_id, result: list_refs.append(weakref.ref(result["data"])))
+        pool.submit(task)
+
+    assert wait_until(qt_app, lambda: len(list_refs) == len(list_tasks) and not pool._tasks)
+    gc.collect()
+    # 接收方已拿到结果，任务池、任务均不再持有
+    assert all(task.result is None for task in list_tasks)
+    assert all(ref() is None for ref in list_refs)
+    pool.shutdown()
+
+
+def test_cancelled_tasks_are_released(qt_app):
+    pool = TaskPool(max_workers=1)
+    event = threading.Event()
+    running_task_id = pool.submit(ResultTask(event))
+    queued_task_id = pool.submit(ResultTask())
+
+    try:
+        assert pool.cancel_task(queued_task_id)
+        assert queued_task_id not in pool._tasks
+    finally:
+        event.set()
+    assert wait_until(qt_app, lambda: running_task_id not in pool._tasks)
+    assert pool.get_pool_status() == (0, 0)
+    pool.shutdown()